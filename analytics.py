@@ -0,0 +1,294 @@
+##
+# @file analytics.py
+# @brief history_data.json 전체를 훑는 CPU 집약 분석(레이팅, 시너지, 시즌 집계)을 프로세스 풀에서 돌리는 모듈.
+# @details 이런 집계를 슬래시 커맨드 안에서 바로 돌리면 이벤트 루프가 멈춰 진행 중인
+#          pick_timeout_handler 타이머까지 밀린다(to_thread도 GIL을 나눠 써서 마찬가지).
+#          AnalyticsExecutor는 작업을 별도 프로세스에서 실행하고 결과만 받아오며, 결과는
+#          (작업, 인자, history 버전) 키로 캐시한다. history 버전은 파일 크기+mtime이라 판이 기록되면
+#          자연히 새로 계산된다. 동시 실행 작업 수는 세마포어로 제한하고, 같은 키의 작업이 이미
+#          돌고 있으면 그 결과를 함께 기다린다.
+#
+#          작업 함수는 모듈 최상위 함수여야 한다(프로세스 간 pickle). 실행 중인 프로세스 작업은
+#          강제로 멈출 수 없으므로, 각 작업은 deadline을 받아 주기적으로 확인하고 넘으면
+#          JobTimeout으로 스스로 중단한다. 아직 시작 전인 작업은 취소 시 풀에서 바로 빠진다.
+#          시간 초과·취소로 호출자가 먼저 포기해도 세마포어 슬롯은 워커의 작업이 실제로 끝날 때
+#          돌려주므로, 제한 시간을 넘긴 작업이 쌓여도 동시에 도는 CPU 작업은 max_jobs를 넘지 않는다.
+#
+#          사용법(단독 실행):
+#            python analytics.py ratings|synergy|seasons [--dev]
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import columnar
+import history_io
+import metrics
+import paths
+from history_io import iter_games
+
+## 작업 중 deadline 확인 간격(판 수).
+CHECK_EVERY = 4096
+
+## Elo 초기 레이팅과 K 계수.
+ELO_START = 1000.0
+ELO_K = 24.0
+
+
+##
+# @brief 작업이 deadline을 넘겨 스스로 중단했음을 알리는 예외.
+class JobTimeout(Exception):
+    pass
+
+
+##
+# @brief 판 스트림을 돌면서 일정 간격으로 deadline을 확인한다.
+# @param path history json 경로.
+# @param deadline time.time() 기준 마감 시각(None이면 무제한).
+# @return game 제너레이터.
+def _games(path, deadline):
+    for offset, g in iter_games(path):
+        if deadline is not None and offset % CHECK_EVERY == 0 and time.time() > deadline:
+            raise JobTimeout(f"{offset}판 처리 중 시간 초과")
+        yield g
+
+
+##
+# @brief 레이팅 계산용 (팀 uid 리스트 2개, team1 승리 여부) 스트림.
+# @details 최신 열 단위 내보내기(columnar)가 있으면 JSON 대신 memmap 열에서 읽는다.
+# @param path history json 경로.
+# @param deadline 마감 시각.
+# @return ([team1 uid], [team2 uid]), bool 제너레이터.
+def _rating_games(path, deadline):
+    cols = columnar.load_for_history(path)
+    if cols is None:
+        for g in _games(path, deadline):
+            yield [[p["id"] for p in g["team1"]], [p["id"] for p in g["team2"]]], g.get("winner") == "team1"
+        return
+    ids, size = cols.player_ids, columnar.TEAM_SIZE
+    for offset, (row, winner) in enumerate(zip(cols.players.tolist(), cols.winner.tolist())):
+        if deadline is not None and offset % CHECK_EVERY == 0 and time.time() > deadline:
+            raise JobTimeout(f"{offset}판 처리 중 시간 초과")
+        yield [[ids[i] for i in row[:size]], [ids[i] for i in row[size:]]], winner == 0
+
+
+##
+# @brief 전 판 기준 팀 평균 Elo 레이팅을 계산한다.
+# @param path history json 경로.
+# @param deadline 마감 시각.
+# @return [(uid, rating, games), ...] 레이팅 내림차순.
+def ratings(path, deadline=None):
+    rating, games = {}, {}
+    for teams, team1_won in _rating_games(path, deadline):
+        avg = [sum(rating.get(u, ELO_START) for u in t) / max(len(t), 1) for t in teams]
+        expected = 1.0 / (1.0 + 10 ** ((avg[1] - avg[0]) / 400))
+        score = 1.0 if team1_won else 0.0
+        delta = ELO_K * (score - expected)
+        for sign, team in ((1, teams[0]), (-1, teams[1])):
+            for u in team:
+                rating[u] = rating.get(u, ELO_START) + sign * delta
+                games[u] = games.get(u, 0) + 1
+    return sorted(((u, r, games[u]) for u, r in rating.items()), key=lambda x: -x[1])
+
+
+##
+# @brief 같은 팀으로 뛴 두 플레이어 조합의 판수·승수를 집계한다.
+# @param path history json 경로.
+# @param deadline 마감 시각.
+# @param min_games 결과에 포함할 최소 판수.
+# @return [(uid_a, uid_b, games, wins), ...] 승률 내림차순.
+def synergy(path, deadline=None, min_games=5):
+    stats = {}
+    for g in _games(path, deadline):
+        winner = g.get("winner")
+        for tk in ("team1", "team2"):
+            ids = sorted(p["id"] for p in g[tk])
+            won = 1 if tk == winner else 0
+            for i in range(len(ids)):
+                for j in range(i + 1, len(ids)):
+                    rec = stats.get((ids[i], ids[j]))
+                    if rec is None:
+                        rec = stats[(ids[i], ids[j])] = [0, 0]
+                    rec[0] += 1
+                    rec[1] += won
+    rows = [(a, b, n, w) for (a, b), (n, w) in stats.items() if n >= min_games]
+    rows.sort(key=lambda r: (-r[3] / r[2], -r[2]))
+    return rows
+
+
+##
+# @brief 시즌별 개인 판수·승수를 집계한다.
+# @param path history json 경로.
+# @param deadline 마감 시각.
+# @return {season: {uid: [games, wins]}}.
+def seasons(path, deadline=None):
+    cols = columnar.load_for_history(path)
+    if cols is not None:
+        return columnar.season_totals(cols)
+    table = {}
+    for g in _games(path, deadline):
+        season = table.setdefault(g.get("season", 1), {})
+        winner = g.get("winner")
+        for tk in ("team1", "team2"):
+            for p in g[tk]:
+                rec = season.get(p["id"])
+                if rec is None:
+                    rec = season[p["id"]] = [0, 0]
+                rec[0] += 1
+                rec[1] += 1 if tk == winner else 0
+    return table
+
+
+## 이름 → 작업 함수. 프로세스로 넘길 수 있는 최상위 함수만 등록한다.
+JOBS = {"ratings": ratings, "synergy": synergy, "seasons": seasons}
+
+
+##
+# @brief 워커 프로세스에서 실행되는 진입점.
+def _run_job(name, path, deadline, kwargs):
+    return JOBS[name](path, deadline, **kwargs)
+
+
+##
+# @brief history 버전(본 파일과 저널의 크기·mtime). 판이 기록되면 바뀐다.
+# @param path history json 경로.
+# @return history_io.version() 튜플, 파일이 없으면 None.
+def history_version(path):
+    return history_io.version(path)
+
+
+##
+# @brief 분석 작업을 프로세스 풀에서 실행하고 결과를 history 버전별로 캐시하는 실행기.
+class AnalyticsExecutor:
+
+    ##
+    # @param max_workers 워커 프로세스 수.
+    # @param max_jobs 동시에 실행할 최대 작업 수(초과분은 순서대로 대기).
+    # @param timeout 작업당 기본 제한 시간(초).
+    # @param cache_size 보관할 결과 수(LRU).
+    def __init__(self, max_workers=1, max_jobs=2, timeout=30.0, cache_size=32):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.inflight = {}
+        self.pool = None
+        self.slots = asyncio.Semaphore(max_jobs)
+
+    ##
+    # @brief 프로세스 풀을 반환한다(처음 쓸 때 생성).
+    # @details fork는 스레드가 떠 있는 봇 프로세스를 복제해 교착 위험이 있으므로, 가능하면
+    #          forkserver(없으면 spawn)로 깨끗한 프로세스에서 워커를 띄운다.
+    def _get_pool(self):
+        if self.pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+        return self.pool
+
+    ##
+    # @brief 작업을 실행하고 결과를 반환한다(캐시 적중 시 즉시 반환).
+    # @param name JOBS에 등록된 작업 이름.
+    # @param dev_mode True면 dev history 사용.
+    # @param timeout 제한 시간(초, None이면 기본값).
+    # @param kwargs 작업 함수에 넘길 추가 인자(해시 가능해야 함).
+    # @return 작업 결과.
+    # @throws asyncio.TimeoutError 제한 시간 초과.
+    async def run(self, name, dev_mode=False, timeout=None, **kwargs):
+        path = paths.history_json(dev_mode)
+        key = (name, path, tuple(sorted(kwargs.items())), history_version(path))
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            metrics.incr("analytics.cache_hit")
+            return self.cache[key]
+        metrics.incr("analytics.cache_miss")
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(name, path, timeout or self.timeout, kwargs))
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # 기다리던 커맨드가 취소돼도 같은 결과를 기다리는 다른 요청을 위해 작업 자체는 유지
+        return await asyncio.shield(task)
+
+    ##
+    # @brief 세마포어 슬롯을 얻어 풀에서 작업을 실행한다.
+    # @details 슬롯은 풀 작업(concurrent Future)이 끝날 때 돌려준다. 시작 전에 취소되면 바로, 이미
+    #          워커에서 돌고 있으면 그 작업이 deadline에 멈추거나 끝날 때 돌려준다.
+    async def _execute(self, name, path, timeout, kwargs):
+        await self.slots.acquire()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        deadline = time.time() + timeout
+        try:
+            job = self._get_pool().submit(_run_job, name, path, deadline, kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        def release(_):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self.slots.release)
+
+        job.add_done_callback(release)
+        try:
+            # 워커가 deadline에 스스로 멈추므로, 결과 전달 여유를 조금 두고 기다린다
+            result = await asyncio.wait_for(asyncio.wrap_future(job), timeout + 5)
+        except (asyncio.TimeoutError, JobTimeout):
+            metrics.incr("analytics.timeout")
+            raise asyncio.TimeoutError(f"{name}: {timeout:g}초 초과")
+        except asyncio.CancelledError:
+            metrics.incr("analytics.cancelled")
+            raise
+        metrics.observe(f"analytics.{name}", time.perf_counter() - start)
+        return result
+
+    ##
+    # @brief 작업 종료 시 inflight에서 빼고, 성공했으면 캐시에 넣는다.
+    def _finish(self, key, task):
+        self.inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.cache[key] = task.result()
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    ##
+    # @brief 대기·실행 중인 작업을 모두 취소한다(실행 중인 프로세스 작업은 deadline에 멈춤).
+    def cancel_all(self):
+        for task in list(self.inflight.values()):
+            task.cancel()
+
+    ##
+    # @brief 풀을 종료한다(시작 전 작업은 취소).
+    def shutdown(self):
+        self.cancel_all()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+##
+# @brief CLI 진입점. 작업 하나를 현재 프로세스에서 실행해 결과를 출력한다.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history_data.json 분석 작업 실행")
+    parser.add_argument("job", choices=sorted(JOBS))
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    result = JOBS[args.job](paths.history_json(args.dev))
+    elapsed = time.perf_counter() - t0
+    rows = result.items() if isinstance(result, dict) else result
+    for row in list(rows)[:20]:
+        print(row)
+    print(f"[{args.job}] {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+##
+# @file autocomplete.py
+# @brief 슬래시 커맨드 옵션 자동완성용 정렬 접두사 색인 (챔피언 이름 / 플레이어 이름).
+# @details 디스코드 자동완성 콜백은 키 입력마다 불리고 짧은 시간 안에 답해야 하므로, 후보를
+#          (검색 키, 항목 id) 정렬 리스트 하나에 넣어 두고 bisect로 접두사 구간만 훑는다.
+#          한 항목은 여러 검색 키로 들어간다.
+#            - 공백을 뺀 소문자 이름, 그리고 이름 안 각 단어의 시작부터("미스 포츈" → "포츈")
+#            - 한글 초성("아우렐리온 솔" → "ㅇㅇㄹㄹㅇㅅ") — 입력에 자음(ㄱ~ㅎ)이 섞이면 초성으로 찾는다
+#            - 영문 id(챔피언 ddragon id, 예: "aurelionsol")
+#          챔피언 색인은 ddragon 버전(또는 목록 크기)이 바뀔 때만 다시 만들고, 플레이어 색인은
+#          uid → 이름 매핑의 추가/변경/삭제분만 삽입·삭제한다.
+#
+#          사용법:
+#            python autocomplete.py bench      # 합성 챔피언 170 + 플레이어 1000명 질의 지연
+import argparse
+import bisect
+import random
+import sys
+import threading
+import time
+
+import history_io
+import paths
+
+## 자동완성 후보 최대 개수(디스코드 제한 25).
+MAX_CHOICES = 25
+
+_CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JAMO = set(_CHOSUNG)
+
+
+##
+# @brief 검색용 정규화(소문자, 공백 제거).
+def normalize(text):
+    return "".join(text.lower().split())
+
+
+##
+# @brief 한글 음절을 초성으로 바꾼다(그 외 문자는 그대로, 공백 제거).
+# @param text 원문.
+# @return 초성 문자열.
+def chosung(text):
+    out = []
+    for ch in normalize(text):
+        code = ord(ch) - 0xAC00
+        out.append(_CHOSUNG[code // 588] if 0 <= code < 11172 else ch)
+    return "".join(out)
+
+
+##
+# @brief 이름 하나의 검색 키 목록.
+# @param name 표시 이름.
+# @param alias 추가 검색어(영문 id 등, 없으면 None).
+# @return 중복 없는 키 리스트.
+def search_keys(name, alias=None):
+    words = name.lower().split()
+    keys = {normalize(name), chosung(name)}
+    for i in range(1, len(words)):
+        rest = " ".join(words[i:])
+        keys.add(normalize(rest))
+        keys.add(chosung(rest))
+    if alias:
+        keys.add(normalize(alias))
+    keys.discard("")
+    return list(keys)
+
+
+##
+# @brief (검색 키, 항목 id) 정렬 리스트 기반 접두사 색인.
+class PrefixIndex:
+
+    def __init__(self):
+        self.pairs = []      # [(key, entry_id)] 정렬 상태 유지
+        self.entries = {}    # entry_id -> (label, value, keys)
+        self.by_value = {}   # value -> entry_id
+        self.next_id = 0
+
+    ##
+    # @brief 항목을 추가한다(같은 value가 있으면 교체).
+    # @param label 자동완성에 보이는 이름.
+    # @param value 커맨드에 넘어갈 값.
+    # @param alias 추가 검색어.
+    def add(self, label, value, alias=None):
+        if value in self.by_value:
+            self.remove(value)
+        entry_id = self.next_id
+        self.next_id += 1
+        keys = search_keys(label, alias)
+        self.entries[entry_id] = (label, value, keys)
+        self.by_value[value] = entry_id
+        for key in keys:
+            bisect.insort(self.pairs, (key, entry_id))
+
+    ##
+    # @brief value 항목을 뺀다(없으면 무시).
+    def remove(self, value):
+        entry_id = self.by_value.pop(value, None)
+        if entry_id is None:
+            return
+        _, _, keys = self.entries.pop(entry_id)
+        for key in keys:
+            i = bisect.bisect_left(self.pairs, (key, entry_id))
+            if i < len(self.pairs) and self.pairs[i] == (key, entry_id):
+                del self.pairs[i]
+
+    ##
+    # @brief 여러 항목을 한 번에 넣고 정렬을 한 번만 한다(초기 구축용).
+    # @param items [(label, value, alias)].
+    def bulk_load(self, items):
+        self.__init__()
+        for label, value, alias in items:
+            entry_id = self.next_id
+            self.next_id += 1
+            keys = search_keys(label, alias)
+            self.entries[entry_id] = (label, value, keys)
+            self.by_value[value] = entry_id
+            self.pairs.extend((key, entry_id) for key in keys)
+        self.pairs.sort()
+
+    ##
+    # @brief 접두사로 후보를 찾는다.
+    # @details 입력에 자음(ㄱ~ㅎ)이 있으면 입력 전체를 초성으로 바꿔 찾는다. 입력과 키가 정확히
+    #          같은 항목을 앞에 두고, 나머지는 키 순서대로 채운다. 빈 입력이면 처음 limit개.
+    # @param query 사용자가 입력 중인 문자열.
+    # @param limit 최대 개수.
+    # @return [(label, value)].
+    def complete(self, query, limit=MAX_CHOICES):
+        q = normalize(query)
+        if any(ch in _JAMO for ch in q):
+            q = chosung(q)
+        exact, rest, seen = [], [], set()
+        i = bisect.bisect_left(self.pairs, (q,))
+        pairs = self.pairs
+        while i < len(pairs) and len(exact) + len(rest) < limit:
+            key, entry_id = pairs[i]
+            if not key.startswith(q):
+                break
+            i += 1
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            (exact if key == q else rest).append(entry_id)
+        return [self.entries[e][:2] for e in exact + rest]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+##
+# @brief 챔피언·플레이어 자동완성 색인 묶음(스레드 안전).
+class Autocomplete:
+
+    def __init__(self):
+        self.champions = PrefixIndex()
+        self.players = PrefixIndex()
+        self.champion_version = None
+        self.player_names = {}
+        self.lock = threading.Lock()
+
+    ##
+    # @brief 챔피언 목록을 반영한다. ddragon 버전과 개수가 같으면 아무것도 하지 않는다.
+    # @param champs [{"name", "id", "version", ...}].
+    # @return 다시 만들었으면 True.
+    def set_champions(self, champs):
+        version = (champs[0].get("version") if champs else None, len(champs))
+        if version == self.champion_version:
+            return False
+        with self.lock:
+            self.champions.bulk_load((c["name"], c["name"], c.get("id")) for c in champs)
+            self.champion_version = version
+        return True
+
+    ##
+    # @brief uid → 이름 매핑을 반영한다. 바뀐 항목만 넣고 뺀다.
+    # @param names {uid: 표시 이름}.
+    # @return 바뀐 항목 수.
+    def set_players(self, names):
+        changed = 0
+        with self.lock:
+            for uid in [u for u in self.player_names if u not in names]:
+                self.players.remove(uid)
+                del self.player_names[uid]
+                changed += 1
+            for uid, name in names.items():
+                if self.player_names.get(uid) != name:
+                    self.players.add(name, uid)
+                    self.player_names[uid] = name
+                    changed += 1
+        return changed
+
+    ##
+    # @brief 챔피언 이름 후보.
+    # @return [(label, value)].
+    def complete_champion(self, query, limit=MAX_CHOICES):
+        return self.champions.complete(query, limit)
+
+    ##
+    # @brief 플레이어 후보(value는 uid 문자열).
+    # @return [(label, value)].
+    def complete_player(self, query, limit=MAX_CHOICES):
+        return self.players.complete(query, limit)
+
+
+##
+# @brief 플레이어 이름 매핑을 모은다(history_data.players 위에 wins 이름을 덮어씀).
+# @details 판 수 이후부터 읽으므로 games 배열은 디코드하지 않고, 본 파일 헤더와 아직 합치지 않은
+#          저널의 새 이름만 모인다.
+# @param wins 전적(WinsRecord).
+# @param dev_mode True면 dev history.
+# @return {uid: 이름}.
+def player_names(wins, dev_mode=False):
+    path = paths.history_json(dev_mode)
+    header = {}
+    try:
+        for _ in history_io.iter_games(path, header=header, start=history_io.count(path)):
+            pass
+    except FileNotFoundError:
+        pass
+    names = {uid: name for uid, name in header.get("players", {}).items() if name}
+    for uid, p in wins.players.items():
+        if p.name:
+            names[uid] = p.name
+    return names
+
+
+##
+# @brief 벤치마크용 합성 한글 이름.
+def _synthetic_name(rng, syllables):
+    return "".join(chr(0xAC00 + rng.randrange(11172)) for _ in range(syllables))
+
+
+def bench(champions=170, players=1000, queries=20000, seed=0):
+    rng = random.Random(seed)
+    champs = [{"name": _synthetic_name(rng, rng.randint(2, 5)), "id": f"Champ{i}", "version": "bench"}
+              for i in range(champions)]
+    names = {str(10**17 + i): _synthetic_name(rng, rng.randint(2, 4)) for i in range(players)}
+    ac = Autocomplete()
+
+    start = time.perf_counter()
+    ac.set_champions(champs)
+    ac.set_players(names)
+    build = time.perf_counter() - start
+
+    names[str(10**17 + players)] = "새플레이어"
+    start = time.perf_counter()
+    ac.set_players(names)
+    incremental = time.perf_counter() - start
+
+    samples = []
+    for _ in range(queries):
+        name = rng.choice(champs)["name"] if rng.random() < 0.5 else rng.choice(list(names.values()))
+        cut = rng.randint(0, len(name))
+        samples.append(chosung(name[:cut]) if rng.random() < 0.3 else name[:cut])
+    for label, complete in (("champion", ac.complete_champion), ("player", ac.complete_player)):
+        start = time.perf_counter()
+        for q in samples:
+            complete(q)
+        per = (time.perf_counter() - start) / len(samples)
+        print(f"{label:<9} {per * 1e6:6.2f} µs/query")
+    print(f"build {build * 1000:.1f} ms ({len(ac.champions)} champs, {len(ac.players)} players), "
+          f"incremental player add {incremental * 1000:.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="자동완성 접두사 색인 벤치마크")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--players", type=int, default=1000)
+    args = parser.parse_args(argv)
+    bench(players=args.players)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+##
+# @file backup.py
+# @brief history_data.json + wins.json 자동 증분 백업과 복구.
+# @details 판이 기록될 때마다(game_recorder.after_commit) backup/auto/에 새로 추가된 판만 gzip 델타로
+#          남기고, 마지막 전체 스냅샷 이후 FULL_EVERY판이 쌓이면 전체 스냅샷을 새로 뜬다. 각 파일의
+#          sha256은 manifest.json에 기록하고, 전체 스냅샷은 최근 KEEP_FULLS개만 보관한다(지워진
+#          스냅샷에 딸린 델타도 함께 삭제). wins.json은 작으므로 스냅샷·델타마다 통째로 넣는다.
+#
+#          복구는 체크섬이 맞는 가장 최근 전체 스냅샷을 읽고 그 뒤 델타를 순서대로 이어 붙인다.
+#          판 수만큼이 아니라 스냅샷 1개 + 델타 최대 FULL_EVERY개만 읽으므로 빠르다.
+#
+#          사용법:
+#            python backup.py list [--dev]               # 스냅샷/델타 목록
+#            python backup.py full [--dev]               # 지금 파일로 전체 스냅샷
+#            python backup.py verify [--dev]             # 모든 백업 파일 체크섬 확인
+#            python backup.py restore [--dev] [--out 폴더] # 최신 스냅샷 + 델타로 복구
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+import botlog
+import history_io
+import paths
+import safe_io
+
+log = logging.getLogger(__name__)
+
+## 마지막 전체 스냅샷 이후 이만큼 판이 쌓이면 전체 스냅샷을 새로 뜬다.
+FULL_EVERY = 100
+
+## 보관할 전체 스냅샷 수(이보다 오래된 스냅샷과 그 델타는 삭제).
+KEEP_FULLS = 4
+
+## 백업 목록 파일 이름.
+MANIFEST = "manifest.json"
+
+_lock = threading.Lock()
+
+
+##
+# @brief 백업 목록을 읽는다.
+# @param dev_mode True면 dev 백업.
+# @return {"fulls": [...], "deltas": [...]}.
+def load_manifest(dev_mode=False):
+    path = os.path.join(paths.backup_dir(dev_mode), MANIFEST)
+    try:
+        return safe_io.read_json(path)
+    except FileNotFoundError:
+        return {"fulls": [], "deltas": []}
+
+
+##
+# @brief 백업 목록을 원자적으로 저장한다.
+def save_manifest(manifest, dev_mode=False):
+    safe_io.write_json(os.path.join(paths.backup_dir(dev_mode), MANIFEST), manifest, indent=2)
+
+
+##
+# @brief 값을 gzip JSON 파일로 원자적으로 쓴다.
+# @return 압축 본문 sha256.
+def _write_gz(path, value):
+    data = gzip.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+    safe_io.atomic_replace(path, data)
+    return safe_io.sha256_bytes(data)
+
+
+##
+# @brief gzip JSON 백업 파일을 체크섬 확인 후 읽는다.
+# @param path 파일 경로.
+# @param sha256 manifest에 기록된 체크섬.
+# @return 값. 체크섬이 다르면 CorruptFileError.
+def _read_gz(path, sha256):
+    with open(path, "rb") as f:
+        data = f.read()
+    if safe_io.sha256_bytes(data) != sha256:
+        raise safe_io.CorruptFileError(f"{path} 체크섬 불일치")
+    return json.loads(gzip.decompress(data))
+
+
+##
+# @brief 현재 wins 파일을 읽는다(없으면 None).
+def _load_wins(dev_mode):
+    try:
+        return safe_io.read_json(paths.wins_file(dev_mode))
+    except FileNotFoundError:
+        return None
+
+
+##
+# @brief 파일명용 현재 시각 문자열.
+def _stamp():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+##
+# @brief 전체 스냅샷을 만든다.
+# @param data history_data 전체 dict.
+# @param wins wins 데이터(None 가능).
+# @param manifest 갱신할 백업 목록.
+# @param dev_mode True면 dev 백업.
+def _write_full(data, wins, manifest, dev_mode):
+    n = len(data["games"])
+    name = f"full_{_stamp()}_{n:06d}.json.gz"
+    sha = _write_gz(os.path.join(paths.backup_dir(dev_mode), name), {"history": data, "wins": wins})
+    manifest["fulls"].append({"file": name, "games": n, "sha256": sha,
+                              "time": datetime.now(timezone.utc).isoformat()})
+    _prune(manifest, dev_mode)
+
+
+##
+# @brief 마지막 전체 스냅샷 이후 추가된 판만 델타로 남긴다(history 전체를 읽지 않고 새 판만 스트리밍).
+# @param path history json 경로.
+# @param start 델타 시작 판 오프셋(이미 백업된 판 수).
+# @param wins wins 데이터(None 가능).
+# @param manifest 갱신할 백업 목록.
+# @param dev_mode True면 dev 백업.
+def _write_delta(path, start, wins, manifest, dev_mode):
+    header = {}
+    games = [g for _, g in history_io.iter_games(path, header=header, start=start)]
+    end = start + len(games)
+    ids = {p["id"] for g in games for p in g["team1"] + g["team2"]}
+    delta = {
+        "games": games,
+        "players": {uid: name for uid, name in header.get("players", {}).items() if uid in ids},
+        "generated_at": header.get("generated_at"),
+        "wins": wins,
+    }
+    name = f"delta_{_stamp()}_{start:06d}-{end:06d}.json.gz"
+    sha = _write_gz(os.path.join(paths.backup_dir(dev_mode), name), delta)
+    manifest["deltas"].append({"file": name, "base": manifest["fulls"][-1]["file"],
+                               "from": start, "to": end, "sha256": sha})
+
+
+##
+# @brief 보관 개수를 넘는 전체 스냅샷과 그 델타를 삭제한다.
+def _prune(manifest, dev_mode):
+    folder = paths.backup_dir(dev_mode)
+    drop = manifest["fulls"][:-KEEP_FULLS]
+    manifest["fulls"] = manifest["fulls"][-KEEP_FULLS:]
+    kept = {f["file"] for f in manifest["fulls"]}
+    stale = [d for d in manifest["deltas"] if d["base"] not in kept]
+    manifest["deltas"] = [d for d in manifest["deltas"] if d["base"] in kept]
+    for entry in drop + stale:
+        try:
+            os.remove(os.path.join(folder, entry["file"]))
+        except FileNotFoundError:
+            pass
+
+
+##
+# @brief 최신 전체 스냅샷 뒤로 이어지는 델타들.
+# @return (스냅샷 항목 또는 None, 델타 항목 리스트(from 순)).
+def _chain(manifest):
+    if not manifest["fulls"]:
+        return None, []
+    full = manifest["fulls"][-1]
+    deltas = sorted((d for d in manifest["deltas"] if d["base"] == full["file"]), key=lambda d: d["from"])
+    return full, deltas
+
+
+##
+# @brief 판이 기록된 직후 증분 백업한다(game_recorder.after_commit()에서 호출, 실패해도 예외를 내지 않음).
+# @details 판 수는 저널 꼬리로 O(1)에 보고, 델타는 백업 이후의 새 판만 읽는다. history 전체는
+#          FULL_EVERY판마다 전체 스냅샷을 뜰 때만 읽는다. 샤드 프로세스 간은 manifest 파일 잠금으로 직렬화한다.
+# @param dev_mode True면 dev 백업.
+# @param wins 방금 커밋한 판까지 반영한 전적 dict. 없으면 디스크의 wins 파일을 읽는다.
+def after_record(dev_mode=False, wins=None):
+    path = paths.history_json(dev_mode)
+    try:
+        with _lock, safe_io.file_lock(os.path.join(paths.backup_dir(dev_mode), MANIFEST)):
+            manifest = load_manifest(dev_mode)
+            full, deltas = _chain(manifest)
+            n = history_io.count(path)
+            covered = deltas[-1]["to"] if deltas else (full["games"] if full else 0)
+            if wins is None:
+                wins = _load_wins(dev_mode)
+            if full is None or covered > n or n - full["games"] >= FULL_EVERY:
+                _write_full(history_io.load(path), wins, manifest, dev_mode)
+            elif covered < n:
+                _write_delta(path, covered, wins, manifest, dev_mode)
+            else:
+                return
+            save_manifest(manifest, dev_mode)
+    except Exception as e:
+        log.warning(f"증분 백업 실패 (기록은 정상): {e}")
+
+
+##
+# @brief 지금 파일로 전체 스냅샷을 뜬다.
+# @param dev_mode True면 dev 데이터.
+# @return 스냅샷 파일 이름.
+def full_backup(dev_mode=False):
+    data = history_io.load(paths.history_json(dev_mode))
+    with _lock, safe_io.file_lock(os.path.join(paths.backup_dir(dev_mode), MANIFEST)):
+        manifest = load_manifest(dev_mode)
+        _write_full(data, _load_wins(dev_mode), manifest, dev_mode)
+        save_manifest(manifest, dev_mode)
+    return manifest["fulls"][-1]["file"]
+
+
+##
+# @brief 최신 전체 스냅샷 + 델타로 history/wins를 재구성한다.
+# @details 최신 스냅샷이 손상됐으면 그 이전 스냅샷으로 내려간다(그 스냅샷의 델타도 함께 적용).
+#          델타 사슬이 끊기거나 손상된 델타를 만나면 거기까지만 적용한다.
+# @param dev_mode True면 dev 백업.
+# @return (history dict, wins dict 또는 None, 적용한 델타 수).
+def rebuild(dev_mode=False):
+    manifest = load_manifest(dev_mode)
+    folder = paths.backup_dir(dev_mode)
+    while manifest["fulls"]:
+        full, deltas = _chain(manifest)
+        try:
+            snap = _read_gz(os.path.join(folder, full["file"]), full["sha256"])
+            break
+        except (OSError, ValueError) as e:
+            log.warning(f"스냅샷 {full['file']} 사용 불가, 이전 스냅샷 시도: {e}")
+            manifest["fulls"].pop()
+    else:
+        raise FileNotFoundError(f"{folder}에 사용할 수 있는 전체 스냅샷이 없습니다")
+
+    data, wins = snap["history"], snap["wins"]
+    applied = 0
+    for d in deltas:
+        if d["from"] != len(data["games"]):
+            log.warning(f"델타 사슬 끊김: {d['file']} (from={d['from']}, 현재 {len(data['games'])}판)")
+            break
+        try:
+            delta = _read_gz(os.path.join(folder, d["file"]), d["sha256"])
+        except (OSError, ValueError) as e:
+            log.warning(f"델타 {d['file']} 손상, 여기까지만 복구: {e}")
+            break
+        data["games"].extend(delta["games"])
+        for uid, name in delta["players"].items():
+            data["players"].setdefault(uid, name)
+        data["generated_at"] = delta["generated_at"]
+        if delta["wins"] is not None:
+            wins = delta["wins"]
+        applied += 1
+    data["total_games"] = len(data["games"])
+    return data, wins, applied
+
+
+##
+# @brief 백업으로 history/wins 파일을 복구한다.
+# @details 제자리 복구면 history에서 파생되는 캐시(시즌 인덱스, 역색인, 승리 확률 모델)를 지워
+#          다음 시작 때 새로 만들게 한다.
+# @param dev_mode True면 dev 데이터.
+# @param out_dir 지정하면 그 폴더에 파일을 쓰고 data/는 건드리지 않는다.
+# @return (복구한 판 수, 적용한 델타 수).
+def restore(dev_mode=False, out_dir=None):
+    data, wins, applied = rebuild(dev_mode)
+    history_path = paths.history_json(dev_mode)
+    wins_path = paths.wins_file(dev_mode)
+    if out_dir:
+        history_path = os.path.join(out_dir, os.path.basename(history_path))
+        wins_path = os.path.join(out_dir, os.path.basename(wins_path))
+    if out_dir:
+        safe_io.write_json(history_path, data, indent=2)
+    else:
+        history_io.save(history_path, data)  # 저널까지 백업 시점으로 되돌림
+    if wins is not None:
+        safe_io.write_json(wins_path, wins, indent=2)
+    if not out_dir:
+        for derived in paths.derived_files(dev_mode):
+            if os.path.exists(derived):
+                os.remove(derived)
+    return len(data["games"]), applied
+
+
+##
+# @brief 모든 백업 파일의 체크섬을 확인한다.
+# @return 손상/누락 파일 이름 리스트.
+def verify(dev_mode=False):
+    manifest = load_manifest(dev_mode)
+    folder = paths.backup_dir(dev_mode)
+    bad = []
+    for entry in manifest["fulls"] + manifest["deltas"]:
+        path = os.path.join(folder, entry["file"])
+        if not os.path.exists(path) or safe_io.sha256_file(path) != entry["sha256"]:
+            bad.append(entry["file"])
+    return bad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history/wins 증분 백업·복구")
+    parser.add_argument("command", choices=["list", "full", "verify", "restore"])
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    parser.add_argument("--out", help="restore: 이 폴더에 복구(data/는 그대로)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        manifest = load_manifest(args.dev)
+        for full in manifest["fulls"]:
+            deltas = [d for d in manifest["deltas"] if d["base"] == full["file"]]
+            last = deltas[-1]["to"] if deltas else full["games"]
+            print(f"{full['file']}  {full['games']}판 + 델타 {len(deltas)}개 → {last}판")
+    elif args.command == "full":
+        print(f"[BACKUP] {full_backup(args.dev)}")
+    elif args.command == "verify":
+        bad = verify(args.dev)
+        print("OK" if not bad else "손상/누락: " + ", ".join(bad))
+        return 1 if bad else 0
+    else:
+        games, applied = restore(args.dev, args.out)
+        print(f"[RESTORE] {games}판 복구 (델타 {applied}개 적용) → {args.out or paths.DATA_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    botlog.setup()
+    sys.exit(main())
@@ -0,0 +1,210 @@
+##
+# @file botlog.py
+# @brief 비동기 구조화 로깅 파이프라인 (QueueHandler + 백그라운드 리스너 + 인메모리 링 버퍼).
+# @details 로그를 찍는 쪽(이벤트 루프/스레드)은 레코드를 큐에 넣기만 하고, 콘솔 출력·파일 기록·
+#          링 버퍼 적재는 QueueListener 스레드가 한다. 핫패스에는 디스크/stdout I/O가 없다.
+#          레코드에는 lobby(게임 채널), round, handler(상호작용/커맨드 이름) 태그가 붙는다.
+#          handler는 contextvars로(태스크마다 분리), lobby/round는 봇이 bind_defaults()로 등록한
+#          함수로 기본값을 채운다. 최근 RING_SIZE개 레코드는 메모리 링 버퍼에 dict로 남아
+#          /로그 커맨드나 통계 API(/api/logs)로 사고 직후 바로 덤프할 수 있다.
+#
+#          파일 로그(logs/bot.jsonl)는 setup(log_file=...)로 켤 때만 JSON 한 줄씩 기록한다.
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import deque
+
+## 링 버퍼에 보관할 최근 레코드 수.
+RING_SIZE = 2000
+
+## 레코드에 붙이는 태그 이름.
+TAGS = ("lobby", "round", "handler")
+
+_tag_vars = {name: contextvars.ContextVar(f"log_{name}", default=None) for name in TAGS}
+_defaults = None
+_ring = deque(maxlen=RING_SIZE)
+_listener = None
+
+
+##
+# @brief lobby/round 기본값을 돌려주는 함수를 등록한다(contextvars 태그가 없을 때 사용).
+# @param provider 인자 없이 {"lobby": ..., "round": ...}를 반환하는 함수.
+def bind_defaults(provider):
+    global _defaults
+    _defaults = provider
+
+
+##
+# @brief 현재 태스크(컨텍스트)에 태그를 설정한다. 태스크가 끝나면 자연히 사라진다.
+# @param tags lobby/round/handler 중 설정할 값.
+def set_tags(**tags):
+    for name, value in tags.items():
+        _tag_vars[name].set(value)
+
+
+##
+# @brief with 블록 동안만 태그를 설정한다.
+# @param tags lobby/round/handler 중 설정할 값.
+@contextlib.contextmanager
+def tags(**tags):
+    tokens = [(_tag_vars[name], _tag_vars[name].set(value)) for name, value in tags.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+##
+# @brief 레코드를 만든 쪽(호출 스레드/태스크)에서 태그를 붙이고 메시지를 확정하는 QueueHandler.
+# @details 리스너 스레드에는 호출 측 컨텍스트가 없으므로 태그는 여기서 붙여야 한다.
+class _TaggingQueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        defaults = None
+        for name in TAGS:
+            value = _tag_vars[name].get()
+            if value is None:
+                if defaults is None:
+                    try:
+                        defaults = _defaults() if _defaults else {}
+                    except Exception:
+                        defaults = {}
+                value = defaults.get(name)
+            setattr(record, name, value)
+        return super().prepare(record)
+
+
+##
+# @brief 레코드를 JSON 직렬화 가능한 dict로 바꾼다.
+# @param record LogRecord(prepare 이후라 msg에 예외 traceback까지 포함된 상태).
+# @return dict.
+def to_dict(record):
+    entry = {
+        "ts": round(record.created, 3),
+        "level": record.levelname,
+        "logger": record.name,
+        "msg": record.getMessage(),
+    }
+    for name in TAGS:
+        value = getattr(record, name, None)
+        if value is not None:
+            entry[name] = value
+    return entry
+
+
+##
+# @brief 레코드를 JSON 한 줄로 만드는 포매터(파일 로그용).
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        return json.dumps(to_dict(record), ensure_ascii=False)
+
+
+##
+# @brief 사람이 읽는 콘솔 포매터. 태그가 있으면 메시지 뒤에 붙인다.
+class ConsoleFormatter(logging.Formatter):
+
+    def format(self, record):
+        tags = " ".join(f"{name}={getattr(record, name)}" for name in TAGS if getattr(record, name, None) is not None)
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{stamp} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if tags:
+            line += f" ({tags})"
+        return line
+
+
+##
+# @brief 리스너 스레드에서 레코드를 링 버퍼에 dict로 쌓는 핸들러.
+class _RingHandler(logging.Handler):
+
+    def emit(self, record):
+        _ring.append(to_dict(record))
+
+
+##
+# @brief 루트 로거를 큐 기반 파이프라인으로 설정한다(여러 번 불러도 한 번만 적용).
+# @param level 루트 로그 레벨.
+# @param log_file 지정하면 JSON 줄 로그를 이 파일에 기록(회전 5MB × 3).
+# @param discord_level py-cord 로거 레벨(게이트웨이 이벤트 스팸 방지로 기본 WARNING).
+def setup(level=logging.INFO, log_file=None, discord_level=logging.WARNING):
+    global _listener
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    handlers = [console, _RingHandler()]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    q = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_TaggingQueueHandler(q))
+    root.setLevel(level)
+    logging.getLogger("discord").setLevel(discord_level)
+
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+##
+# @brief 리스너를 멈추고 큐에 남은 레코드를 모두 내보낸다.
+def shutdown():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+##
+# @brief 링 버퍼의 최근 레코드를 반환한다.
+# @param n 최대 개수(최신 n개, 0 이하면 빈 리스트).
+# @param level 이 레벨 이상만(예: "WARNING"). None이면 전부.
+# @param lobby 지정하면 해당 lobby 태그만.
+# @return 오래된 것부터 dict 리스트.
+def recent(n=50, level=None, lobby=None):
+    if n <= 0:
+        return []
+    min_level = logging.getLevelName(level.upper()) if isinstance(level, str) else (level or 0)
+    if not isinstance(min_level, int):
+        min_level = 0  # 모르는 레벨 이름이면 필터 없음
+    out = []
+    for entry in reversed(list(_ring)):
+        if logging.getLevelName(entry["level"]) < min_level:
+            continue
+        if lobby is not None and str(entry.get("lobby")) != str(lobby):
+            continue
+        out.append(entry)
+        if len(out) >= n:
+            break
+    out.reverse()
+    return out
+
+
+##
+# @brief 링 버퍼 레코드를 한 줄씩 텍스트로 만든다(/로그 커맨드용).
+# @param entries recent() 결과.
+# @return 줄바꿈으로 이은 문자열.
+def format_entries(entries):
+    lines = []
+    for e in entries:
+        stamp = time.strftime("%H:%M:%S", time.localtime(e["ts"]))
+        tags = " ".join(f"{k}={e[k]}" for k in TAGS if k in e)
+        lines.append(f"{stamp} {e['level'][:4]} {e['msg']}" + (f" ({tags})" if tags else ""))
+    return "\n".join(lines)
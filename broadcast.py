@@ -0,0 +1,273 @@
+##
+# @file broadcast.py
+# @brief 게임 채널(팀짜기/TEAM1/TEAM2)로 나가는 메시지를 채널별 순서 보장 큐로 보내는 모듈.
+# @details 예전에는 방송마다 asyncio.gather로 3채널에 동시에 send 해서, 연달아 나가는 메시지들이
+#          같은 채널 rate-limit 버킷에서 부딪혔다. 여기서는 채널마다 큐 하나와 워커 하나를 두고
+#          들어온 순서대로 보낸다. 같은 방송은 모든 채널 큐에 같은 순서로 들어가므로 채널 간 순서도
+#          유지된다. merge=True로 넣은 텍스트는 큐에서 바로 뒤따르는 병합 가능 메시지와 하나로
+#          합쳐(2000자 이내) 판당 메시지 수를 줄인다. rate-limit(429) 대기·재시도는 py-cord의 HTTP
+#          클라이언트가 버킷 단위로 처리하므로 여기서는 하지 않는다(전송이 끝내 실패하면 로그만 남김).
+#
+#          웹훅 백엔드(선택): config broadcast_webhooks에 적힌 채널(예: TEAM1/TEAM2)은 View·첨부가 없는
+#          메시지(상태 안내, 결과 embed)를 채널 웹훅으로 보낸다. 웹훅은 봇 계정과 다른 rate-limit 버킷을
+#          쓰므로 명령 채널 전송과 부딪히지 않는다. 웹훅은 채널마다 한 번 만들어(또는 찾아) 캐시하고,
+#          지워졌으면 다시 만든다. 권한이 없거나 웹훅 전송이 실패하면(429 포함) 기존 채널 전송으로 보낸다.
+#          지표는 backend별로 broadcast.<channel|webhook>.messages / .send 로도 남는다.
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+## 디스코드 메시지 content 최대 길이.
+MAX_CONTENT = 2000
+
+## 봇이 만드는 웹훅 이름(같은 이름의 기존 웹훅이 있으면 재사용).
+WEBHOOK_NAME = "got_champe"
+
+## 웹훅 권한이 없던 채널은 이 시간(초) 동안 웹훅을 다시 시도하지 않는다.
+WEBHOOK_RETRY_AFTER = 600.0
+
+
+##
+# @brief 큐에 들어가는 전송 요청 하나.
+class _Outgoing:
+    __slots__ = ("content", "embed", "view", "file", "merge", "futures")
+
+    def __init__(self, content, embed, view, merge, future, file=None):
+        self.content = content
+        self.embed = embed
+        self.view = view
+        self.file = file
+        self.merge = merge
+        self.futures = [future]
+
+    ##
+    # @brief 뒤따르는 요청 nxt를 이 텍스트 앞에 붙여 하나로 보낼 수 있는지 판단한다.
+    # @details 텍스트 전용(merge=True) 요청 뒤에, embed가 없는 merge=True 요청(텍스트 또는
+    #          텍스트+View)이 오면 content를 이어붙인다. embed 앞에 텍스트를 붙이면 표시 순서가
+    #          바뀌므로 embed가 있는 요청과는 합치지 않는다.
+    # @param nxt 바로 다음 요청.
+    # @return 합칠 수 있으면 True.
+    def can_absorb(self, nxt):
+        if not (self.merge and nxt.merge) or self.embed is not None or self.view is not None:
+            return False
+        if nxt.embed is not None or self.file is not None or nxt.file is not None:
+            return False
+        return len(self.content or "") + 1 + len(nxt.content or "") <= MAX_CONTENT
+
+    ##
+    # @brief can_absorb()가 True인 다음 요청을 흡수한다(다음 요청의 View를 이어받음).
+    # @param nxt 흡수할 요청.
+    def absorb(self, nxt):
+        self.content = f"{self.content}\n{nxt.content}" if nxt.content else self.content
+        self.view = nxt.view
+        self.futures.extend(nxt.futures)
+
+
+##
+# @brief 채널별 웹훅 캐시(웹훅 백엔드).
+class WebhookPool:
+
+    ##
+    # @param names 웹훅으로 보낼 채널 이름들(비어 있으면 웹훅을 쓰지 않음).
+    def __init__(self, names=()):
+        self.names = set(names)
+        self.hooks = {}  # {channel_id: discord.Webhook}
+        self.blocked = {}  # {channel_id: 다시 시도할 time.monotonic 시각} - 권한 없음
+        self.locks = {}  # {channel_id: asyncio.Lock} - 동시에 두 번 만들지 않도록
+
+    ##
+    # @brief 웹훅으로 보낼 채널 이름을 바꾼다(캐시는 유지).
+    def configure(self, names):
+        self.names = set(names or ())
+
+    ##
+    # @brief 이 채널·요청을 웹훅으로 보낼지.
+    # @details View(상호작용 버튼/셀렉트)와 첨부 파일이 있는 메시지는 채널 전송으로 보낸다.
+    def wants(self, channel, item):
+        if item.view is not None or item.file is not None:
+            return False
+        if getattr(channel, "name", None) not in self.names:
+            return False
+        return self.blocked.get(channel.id, 0.0) <= time.monotonic()
+
+    ##
+    # @brief 채널 웹훅을 돌려준다(캐시 → 기존 웹훅 찾기 → 새로 만들기).
+    # @param channel 대상 채널.
+    # @return discord.Webhook, 권한이 없으면 None.
+    async def get(self, channel):
+        hook = self.hooks.get(channel.id)
+        if hook is not None:
+            return hook
+        lock = self.locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            hook = self.hooks.get(channel.id)
+            if hook is not None:
+                return hook
+            try:
+                hook = next((h for h in await channel.webhooks() if h.name == WEBHOOK_NAME and h.token), None)
+                if hook is None:
+                    hook = await channel.create_webhook(name=WEBHOOK_NAME)
+                    metrics.incr("broadcast.webhook.created")
+            except discord.Forbidden:
+                log.warning(f"웹훅 권한 없음 ({getattr(channel, 'name', '?')}) - 채널 전송으로 보냄")
+                self.blocked[channel.id] = time.monotonic() + WEBHOOK_RETRY_AFTER
+                return None
+            self.hooks[channel.id] = hook
+            return hook
+
+    ##
+    # @brief 웹훅으로 보낸다. 웹훅이 지워졌으면(404) 다시 만들어 한 번 더 보낸다.
+    # @param channel 대상 채널.
+    # @param kwargs content/embed.
+    # @return WebhookMessage, 권한이 없으면 None.
+    async def send(self, channel, **kwargs):
+        me = getattr(getattr(channel, "guild", None), "me", None)
+        if me is not None:  # 봇과 같은 이름·아바타로 보이게
+            kwargs["username"] = me.display_name
+            kwargs["avatar_url"] = me.display_avatar.url
+        for attempt in range(2):
+            hook = await self.get(channel)
+            if hook is None:
+                return None
+            try:
+                return await hook.send(wait=True, **kwargs)
+            except discord.NotFound:
+                self.hooks.pop(channel.id, None)
+                if attempt:
+                    raise
+                metrics.incr("broadcast.webhook.recreated")
+        return None
+
+
+##
+# @brief 한 채널 전용 FIFO 전송 큐. 큐가 비면 워커가 종료되고 다음 put 때 다시 뜬다.
+class ChannelQueue:
+
+    ##
+    # @param channel 전송 대상 채널(send(content=, embed=, view=)를 지원하는 객체).
+    # @param webhooks WebhookPool(없으면 채널 전송만).
+    def __init__(self, channel, webhooks=None):
+        self.channel = channel
+        self.webhooks = webhooks
+        self.pending = deque()
+        self.worker = None
+
+    ##
+    # @brief 요청을 큐에 넣고 워커가 없으면 띄운다.
+    # @param item _Outgoing 요청.
+    def put(self, item):
+        self.pending.append(item)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+    ##
+    # @brief 큐가 빌 때까지 순서대로 꺼내(가능하면 병합해) 전송한다.
+    async def _run(self):
+        while self.pending:
+            item = self.pending.popleft()
+            while self.pending and item.can_absorb(self.pending[0]):
+                item.absorb(self.pending.popleft())
+                metrics.incr("broadcast.merged")
+
+            message = await self._send(item)
+            for fut in item.futures:
+                if not fut.done():
+                    fut.set_result(message)
+
+    ##
+    # @brief 요청 하나를 전송한다(rate-limit 대기·재시도는 py-cord가 처리).
+    # @param item 전송할 요청.
+    # @return 전송된 Message, 실패하면 None.
+    async def _send(self, item):
+        start = time.perf_counter()
+        try:
+            kwargs = {}
+            if item.content is not None:
+                kwargs["content"] = item.content
+            if item.embed is not None:
+                kwargs["embed"] = item.embed
+            if item.view is not None:
+                kwargs["view"] = item.view
+            if item.file is not None:
+                kwargs["file"] = item.file
+            message, backend = await self._deliver(item, kwargs)
+        except Exception as e:
+            log.error(f"메시지 전송 실패 ({getattr(self.channel, 'name', '?')}): {e}")
+            metrics.incr("broadcast.failed")
+            return None
+        elapsed = time.perf_counter() - start
+        metrics.incr("broadcast.messages")
+        metrics.observe("broadcast.send", elapsed)
+        metrics.incr(f"broadcast.{backend}.messages")
+        metrics.observe(f"broadcast.{backend}.send", elapsed)
+        return message
+
+    ##
+    # @brief 웹훅 대상이면 웹훅으로, 아니면(또는 웹훅이 안 되면) 채널로 보낸다.
+    # @return (Message, "webhook" 또는 "channel").
+    async def _deliver(self, item, kwargs):
+        if self.webhooks is not None and self.webhooks.wants(self.channel, item):
+            try:
+                message = await self.webhooks.send(self.channel, **kwargs)
+            except discord.HTTPException as e:
+                log.warning(f"웹훅 전송 실패 ({getattr(self.channel, 'name', '?')}): {e} - 채널 전송으로 보냄")
+                message = None
+            if message is not None:
+                return message, "webhook"
+            metrics.incr("broadcast.webhook.fallback")
+        return await self.channel.send(**kwargs), "channel"
+
+
+##
+# @brief 여러 채널로 나가는 방송을 채널별 ChannelQueue에 나눠 넣는 디스패처.
+class Broadcaster:
+
+    ##
+    # @param webhooks WebhookPool(없으면 빈 풀 = 채널 전송만, configure로 나중에 켬).
+    def __init__(self, webhooks=None):
+        self.queues = {}  # {channel_id: ChannelQueue}
+        self.webhooks = webhooks if webhooks is not None else WebhookPool()
+
+    ##
+    # @brief 채널의 큐를 반환한다(처음이면 생성).
+    # @param channel 대상 채널.
+    # @return ChannelQueue.
+    def queue_for(self, channel):
+        q = self.queues.get(channel.id)
+        if q is None or q.channel is not channel:
+            q = self.queues[channel.id] = ChannelQueue(channel, self.webhooks)
+        return q
+
+    ##
+    # @brief 여러 채널에 같은 메시지를 넣는다(전송 완료를 기다리지 않음).
+    # @param channels 대상 채널 리스트(이 순서대로 큐에 들어감).
+    # @param content 텍스트.
+    # @param embed 첨부할 Embed(채널 공통).
+    # @param view_factory 채널을 받아 그 채널용 새 View를 만드는 함수(View는 메시지마다 독립이어야 함).
+    # @param merge True면 큐에서 인접한 텍스트와 한 메시지로 합칠 수 있음.
+    # @param file_factory 채널을 받아 그 채널용 새 discord.File을 만드는 함수(File도 메시지마다 독립).
+    # @return 채널 순서대로 Message(실패 시 None)를 돌려줄 Future 리스트.
+    def post(self, channels, content=None, embed=None, view_factory=None, merge=False, file_factory=None):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for channel in channels:
+            fut = loop.create_future()
+            view = view_factory(channel) if view_factory else None
+            file = file_factory(channel) if file_factory else None
+            self.queue_for(channel).put(_Outgoing(content, embed, view, merge, fut, file))
+            futures.append(fut)
+        return futures
+
+    ##
+    # @brief post() 후 모든 채널 전송이 끝날 때까지 기다린다.
+    # @return 채널 순서대로 Message(실패 시 None) 리스트.
+    async def send(self, channels, content=None, embed=None, view_factory=None, merge=False, file_factory=None):
+        futures = self.post(channels, content, embed, view_factory, merge, file_factory)
+        return list(await asyncio.gather(*futures))
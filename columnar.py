@@ -0,0 +1,371 @@
+##
+# @file columnar.py
+# @brief history_data.json의 판을 열 단위 바이너리 파일로 내보내고 memmap으로 읽는 모듈.
+# @details 분석할 때마다 pretty-print된 history JSON 전체를 파싱하는 대신, 판을 열 파일로 한 번
+#          내보내 두고 np.memmap으로 연다. 여는 데 파싱이 없어 바로 시작하고, 같은 파일을 여는
+#          여러 프로세스(분석 워커 등)가 OS 페이지 캐시를 공유한다.
+#
+#          data/history_columns/ 구성:
+#            season.bin round.bin round_orig.bin time_us.bin winner.bin   판당 스칼라 1개
+#            players.bin champs.bin                                       판당 6개(team1 3 + team2 3)
+#            players.json champs.json                                     인덱스 → uid / 챔피언 이름
+#            meta.json                                                    판 수, dtype/모양, 원본 history 버전
+#          .npy는 헤더에 모양이 박혀 있어 제자리 append가 안 되므로, 열은 헤더 없는 리틀 엔디언 원시
+#          바이트로 두고 dtype/모양은 meta.json에 적는다. 판이 기록되면(game_recorder.after_commit) 열 파일 끝에 새 판을
+#          붙이고 meta.json을 마지막에 원자적으로 갱신한다(meta가 커밋 지점 — 그 뒤 꼬리는 무시·절단).
+#
+#          3v3이 아니거나 승자가 team1/team2가 아닌 판이 있으면 meta.exact = False가 되고,
+#          load_for_history()는 None을 돌려줘 분석은 JSON 스트리밍으로 돌아간다.
+#
+#          사용법:
+#            python columnar.py export [--dev]          # history → 열 파일 전체 재생성
+#            python columnar.py bench [--games 100000]  # JSON 파싱 대비 memmap 로드/시즌 집계 시간
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import history_io
+import paths
+import safe_io
+from compact_model import IdTable, MISSING, TEAM_SIZE, time_to_us
+from history_io import iter_games
+
+## 파일 형식 버전(2: players/champs 인덱스를 u2 → u4로 넓힘, 예전 폴더는 sync()가 다시 내보냄).
+FORMAT_VERSION = 2
+
+## 열 이름 → (dtype, 판당 원소 수).
+COLUMNS = {
+    "season": ("<i2", 1),
+    "round": ("<i4", 1),
+    "round_orig": ("<i4", 1),
+    "time_us": ("<i8", 1),
+    "winner": ("i1", 1),
+    "players": ("<u4", TEAM_SIZE * 2),
+    "champs": ("<u4", TEAM_SIZE * 2),
+}
+
+## 빈 슬롯(3명 미만 팀)을 나타내는 인덱스. u2였을 때는 플레이어 65535명째부터 이 값과 겹치고 넘쳤다.
+NONE = 0xFFFFFFFF
+
+_WINNERS = {"team1": 0, "team2": 1}
+_lock = threading.Lock()
+
+
+##
+# @brief memmap으로 연 열들과 사전 테이블.
+class Columns:
+    __slots__ = ("games", "exact", "source", "player_ids", "champ_names", "arrays")
+
+    def __init__(self, games, exact, source, player_ids, champ_names, arrays):
+        self.games = games
+        self.exact = exact
+        self.source = source
+        self.player_ids = player_ids      # players 열 인덱스 → uid
+        self.champ_names = champ_names    # champs 열 인덱스 → 챔피언 이름
+        self.arrays = arrays
+
+    def __getattr__(self, name):
+        try:
+            return self.arrays[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return self.games
+
+
+##
+# @brief 판 하나를 열 값으로 바꾼다.
+# @param g 판 dict.
+# @param players 플레이어 IdTable.
+# @param champs 챔피언 IdTable.
+# @return ({열 이름: 값 또는 값 리스트}, 정확히 표현됐는지).
+def _row(g, players, champs):
+    t1, t2 = g.get("team1") or [], g.get("team2") or []
+    winner = _WINNERS.get(g.get("winner"), MISSING)
+    us, _ = time_to_us(g.get("time"))
+    exact = len(t1) == TEAM_SIZE and len(t2) == TEAM_SIZE and winner != MISSING
+    pids, cids = [], []
+    for team in (t1, t2):
+        team = list(team[:TEAM_SIZE])
+        for p in team:
+            pids.append(players.intern(p["id"]))
+            cids.append(champs.intern(p["champ"]))
+        pids.extend([NONE] * (TEAM_SIZE - len(team)))
+        cids.extend([NONE] * (TEAM_SIZE - len(team)))
+    row = {
+        "season": g.get("season", MISSING),
+        "round": g.get("round", 0),
+        "round_orig": g.get("round_orig", MISSING),
+        "time_us": us,
+        "winner": winner,
+        "players": pids,
+        "champs": cids,
+    }
+    return row, exact
+
+
+##
+# @brief 판 리스트를 열 배열 dict로 만든다.
+# @return ({열 이름: ndarray}, exact).
+def _encode(games, players, champs):
+    rows = {name: [] for name in COLUMNS}
+    exact = True
+    for g in games:
+        row, ok = _row(g, players, champs)
+        exact = exact and ok
+        for name, value in row.items():
+            rows[name].append(value)
+    arrays = {}
+    for name, (dtype, width) in COLUMNS.items():
+        arr = np.asarray(rows[name], dtype=dtype)
+        arrays[name] = arr.reshape(len(games), width) if width > 1 else arr.reshape(len(games))
+    return arrays, exact
+
+
+##
+# @brief 메타 파일을 읽는다(없으면 None).
+def _read_meta(directory):
+    try:
+        return safe_io.read_json(os.path.join(directory, "meta.json"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+##
+# @brief 메타·사전 테이블을 쓴다(meta.json이 마지막 = 커밋 지점).
+def _write_tables(directory, games, exact, source, players, champs):
+    safe_io.atomic_replace(os.path.join(directory, "players.json"),
+                           json.dumps(players.values, ensure_ascii=False).encode("utf-8"))
+    safe_io.atomic_replace(os.path.join(directory, "champs.json"),
+                           json.dumps(champs.values, ensure_ascii=False).encode("utf-8"))
+    meta = {
+        "version": FORMAT_VERSION,
+        "games": games,
+        "exact": exact,
+        "source": list(source) if source else None,
+        "columns": {name: {"dtype": dtype, "width": width} for name, (dtype, width) in COLUMNS.items()},
+    }
+    safe_io.write_json(os.path.join(directory, "meta.json"), meta, indent=2)
+
+
+##
+# @brief 판 리스트 전체로 열 폴더를 새로 만든다(임시 폴더에 쓰고 바꿔치기).
+# @param games 판 리스트(또는 판 이터러블).
+# @param directory 열 폴더.
+# @param source 원본 history 버전(history_io.version).
+# @return 내보낸 판 수.
+def export_games(games, directory, source=None):
+    games = list(games)
+    players, champs = IdTable(), IdTable()
+    arrays, exact = _encode(games, players, champs)
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".columns_", dir=parent)
+    try:
+        for name, arr in arrays.items():
+            with open(os.path.join(tmp, f"{name}.bin"), "wb") as f:
+                f.write(arr.tobytes())
+        _write_tables(tmp, len(games), exact, source, players, champs)
+        old = None
+        if os.path.exists(directory):
+            old = directory + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(directory, old)
+        os.replace(tmp, directory)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return len(games)
+
+
+##
+# @brief history 파일 전체를 스트리밍으로 읽어 열 폴더를 새로 만든다.
+# @param dev_mode True면 dev 데이터.
+# @return 내보낸 판 수.
+def export(dev_mode=False):
+    path = paths.history_json(dev_mode)
+    source = history_io.version(path)
+    with _lock, safe_io.file_lock(paths.columnar_dir(dev_mode)):
+        return export_games((g for _, g in iter_games(path)), paths.columnar_dir(dev_mode), source)
+
+
+##
+# @brief 열 폴더 끝에 판들을 붙인다(meta 이후의 찢긴 꼬리는 먼저 잘라 냄).
+# @param directory 열 폴더.
+# @param meta 현재 메타.
+# @param new_games 붙일 판 리스트.
+# @param source 붙인 뒤의 원본 history 버전.
+def _append(directory, meta, new_games, source):
+    players = IdTable(_read_list(directory, "players.json"))
+    champs = IdTable(_read_list(directory, "champs.json"))
+    arrays, exact = _encode(new_games, players, champs)
+    n = meta["games"]
+    for name, arr in arrays.items():
+        dtype, width = COLUMNS[name]
+        path = os.path.join(directory, f"{name}.bin")
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(n * np.dtype(dtype).itemsize * width)
+            f.seek(0, os.SEEK_END)
+            f.write(arr.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+    _write_tables(directory, n + len(new_games), meta["exact"] and exact, source, players, champs)
+
+
+##
+# @brief 사전 테이블(JSON 리스트)을 읽는다.
+def _read_list(directory, name):
+    with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+##
+# @brief 열 폴더를 history의 새 판까지 따라잡게 한다(game_recorder.after_commit()에서 호출).
+# @details 열 폴더가 반영한 판 수 이후의 판만 스트리밍해 끝에 붙인다(다른 샤드 프로세스가 먼저 붙였으면
+#          할 일이 없음 — 디스크 쓰기는 파일 잠금으로 직렬화). 열 폴더가 없거나 형식이 다르거나 history보다
+#          앞서 있으면(복구 등) 전체를 다시 내보낸다.
+# @param dev_mode True면 dev 데이터.
+def sync(dev_mode=False):
+    directory = paths.columnar_dir(dev_mode)
+    path = paths.history_json(dev_mode)
+    source = history_io.version(path)
+    total = history_io.count(path)
+    with _lock, safe_io.file_lock(directory):
+        meta = _read_meta(directory)
+        if meta is None or meta.get("version") != FORMAT_VERSION or meta["games"] > total:
+            export_games((g for _, g in iter_games(path)), directory, source)
+        elif meta["games"] < total:
+            _append(directory, meta, [g for _, g in iter_games(path, start=meta["games"])], source)
+
+
+##
+# @brief 열 폴더를 memmap으로 연다.
+# @param directory 열 폴더.
+# @return Columns 또는 None(없음/형식 다름).
+def load(directory):
+    meta = _read_meta(directory)
+    if meta is None or meta.get("version") != FORMAT_VERSION:
+        return None
+    n = meta["games"]
+    arrays = {}
+    for name, spec in meta["columns"].items():
+        dtype, width = spec["dtype"], spec["width"]
+        shape = (n, width) if width > 1 else (n,)
+        if n == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode="r", shape=shape)
+    return Columns(n, meta["exact"], tuple(meta["source"]) if meta["source"] else None,
+                   _read_list(directory, "players.json"), _read_list(directory, "champs.json"), arrays)
+
+
+##
+# @brief history와 판 수가 같고 모든 판이 정확히 표현된 열을 연다.
+# @details 판은 뒤에만 붙으므로 판 수(저널 꼬리, O(1))로 낡았는지 본다. 저널을 본 파일에 합치는 것(fold)은
+#          판을 바꾸지 않으므로 파일 버전이 바뀌어도 열을 그대로 쓴다. history를 통째로 바꾸는 도구는
+#          파생 캐시(meta.json 포함)를 지운다.
+# @param history_path history json 경로(dev/실제 중 어느 파일인지로 열 폴더를 고른다).
+# @return Columns 또는 None(열 없음/낡음/부정확 → 호출자는 JSON으로 처리).
+def load_for_history(history_path):
+    target = os.path.abspath(history_path)
+    for dev_mode in (False, True):
+        if os.path.abspath(paths.history_json(dev_mode)) == target:
+            cols = load(paths.columnar_dir(dev_mode))
+            if cols is not None and cols.exact and cols.games == history_io.count(history_path):
+                return cols
+            return None
+    return None
+
+
+##
+# @brief 시즌별 개인 판수·승수를 열에서 한 번의 bincount로 집계한다(analytics.seasons와 같은 결과).
+# @param cols load()한 Columns(exact여야 함).
+# @return {season: {uid: [games, wins]}}. 시즌이 없던 판은 1시즌.
+def season_totals(cols):
+    if cols.games == 0:
+        return {}
+    season = np.where(cols.season == MISSING, 1, cols.season).astype(np.int64)
+    labels, season_idx = np.unique(season, return_inverse=True)
+    n_players = len(cols.player_ids)
+    won = np.empty(cols.players.shape, dtype=np.int64)
+    won[:, :TEAM_SIZE] = (cols.winner == 0)[:, None]
+    won[:, TEAM_SIZE:] = (cols.winner == 1)[:, None]
+    key = (season_idx.reshape(-1, 1) * n_players + cols.players).ravel()
+    size = len(labels) * n_players
+    games = np.bincount(key, minlength=size).reshape(len(labels), n_players)
+    wins = np.bincount(key, weights=won.ravel(), minlength=size).reshape(len(labels), n_players)
+    table = {}
+    for i, label in enumerate(labels.tolist()):
+        row = table[label] = {}
+        for p in np.flatnonzero(games[i]).tolist():
+            row[cols.player_ids[p]] = [int(games[i, p]), int(wins[i, p])]
+    return table
+
+
+##
+# @brief JSON 전체 파싱 대비 열 로드 + 시즌 집계 시간을 잰다.
+# @param n 합성 판 수.
+def bench(n):
+    import season_index
+
+    games = season_index.synthetic_games(n)
+    season_index.retag_seasons(games)
+    with tempfile.TemporaryDirectory() as tmp:
+        hist = os.path.join(tmp, "history.json")
+        with open(hist, "w", encoding="utf-8") as f:
+            json.dump({"games": games}, f, ensure_ascii=False, indent=2)
+        directory = os.path.join(tmp, "columns")
+
+        start = time.perf_counter()
+        export_games(games, directory)
+        t_export = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(hist, "r", encoding="utf-8") as f:
+            json.load(f)
+        t_json = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cols = load(directory)
+        t_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        season_totals(cols)
+        t_seasons = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for g in games[:1000]:
+            meta = _read_meta(directory)
+            _append(directory, meta, [g], None)
+        t_append = (time.perf_counter() - start) / 1000
+
+    print(f"games={n}  export {t_export * 1000:.0f} ms  json.load {t_json * 1000:.0f} ms  "
+          f"memmap load {t_load * 1000:.2f} ms  season totals {t_seasons * 1000:.1f} ms  "
+          f"append {t_append * 1000:.2f} ms/game")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history 열 단위 내보내기/벤치마크")
+    parser.add_argument("command", choices=["export", "bench"])
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    parser.add_argument("--games", type=int, default=100000, help="bench: 합성 판 수")
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        print(f"[COLUMNAR] {export(args.dev)}판 → {paths.columnar_dir(args.dev)}")
+    else:
+        bench(args.games)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+##
+# @file compact_model.py
+# @brief history_data.json / wins.json의 메모리 절약형 표현(인턴 테이블 + 열 단위 배열).
+# @details history의 판은 원래 문자열 id·챔피언 이름이 든 중첩 dict라 판당 1KB 이상을 차지한다.
+#          여기서는 플레이어/챔피언을 IdTable로 정수 인턴하고, 판은 GameTable의 열(array)로
+#          보관한다(판당 수십 바이트). wins.json은 total_rounds(int)와 유저 dict가 섞인 구조라
+#          소비자마다 `uid != "total_rounds"` 필터가 필요했는데, WinsRecord로 타입을 분리한다.
+#          from_json()/to_json()은 현재 JSON 형식과 왕복(round-trip) 동일하다.
+#
+#          history_io.load_history()/write_history()는 history 파일을 History(GameTable)로 스트리밍해
+#          읽고 쓰며(저널 합치기·오프라인 도구), 봇의 전적(got_champe.wins_data)은 WinsRecord로 들고 있다.
+#          columnar의 열 인코딩도 IdTable과 time_to_us()를 같이 쓴다.
+#
+#          사용법:
+#            python compact_model.py bench [--games 100000]   # dict-of-dicts 대비 메모리 비교
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from array import array
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_WINNERS = ("team1", "team2")
+_GAME_FIELDS = frozenset(
+    ("round", "round_orig", "season", "team1", "team2", "winner", "time", "sources", "game_id")
+)
+_PICK_FIELDS = frozenset(("id", "champ"))
+## 판당 팀 인원(열 배열 stride의 절반).
+TEAM_SIZE = 3
+## round_orig/season/winner가 없는 판을 나타내는 값.
+MISSING = -1
+## game_id 열의 칸 크기(uuid4 hex 32자 → 16바이트). 0으로 채운 칸은 game_id 없음.
+GAME_ID_BYTES = 16
+_NO_GAME_ID = bytes(GAME_ID_BYTES)
+
+
+##
+# @brief 해시 가능한 값(문자열, 튜플)을 0부터 시작하는 정수 id로 인턴하는 테이블.
+class IdTable:
+    __slots__ = ("values", "index")
+
+    ##
+    # @param values 초기 값 목록(순서대로 0, 1, ... 부여).
+    def __init__(self, values=()):
+        self.values = []
+        self.index = {}
+        for v in values:
+            self.intern(v)
+
+    ##
+    # @brief 값의 id를 반환한다(처음 보는 값이면 새로 부여).
+    # @param value 인턴할 값.
+    # @return 정수 id.
+    def intern(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    ##
+    # @brief 값의 id를 조회한다(없으면 None, 새로 부여하지 않음).
+    # @param value 조회할 값.
+    # @return 정수 id 또는 None.
+    def get(self, value):
+        return self.index.get(value)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+
+##
+# @brief ISO8601 시각을 UTC 에포크 마이크로초로 바꾼다.
+# @param text 시각 문자열.
+# @return (마이크로초, 왕복 가능 여부). 다시 문자열로 만들었을 때 원문과 같아야 True.
+def time_to_us(text):
+    try:
+        dt = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return 0, False
+    if dt.tzinfo is None or dt.utcoffset() != timedelta(0):
+        return 0, False
+    delta = dt - _EPOCH
+    us = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return us, us_to_time(us) == text
+
+
+##
+# @brief UTC 에포크 마이크로초를 ISO8601 문자열(+00:00)로 바꾼다.
+# @param us 마이크로초.
+# @return 시각 문자열.
+def us_to_time(us):
+    return (_EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+##
+# @brief bool이 아닌 32비트 정수인지(array("i") 열에 그대로 들어가는지).
+def _is_int(v):
+    return isinstance(v, int) and not isinstance(v, bool) and -2**31 <= v < 2**31
+
+
+##
+# @brief game_id 문자열을 열에 넣을 16바이트로 바꾼다.
+# @param text game_id.
+# @return 16바이트, 그대로 되돌릴 수 없는 형식이면 None.
+def _game_id_bytes(text):
+    if not isinstance(text, str) or len(text) != GAME_ID_BYTES * 2:
+        return None
+    try:
+        raw = bytes.fromhex(text)
+    except ValueError:
+        return None
+    return raw if raw.hex() == text and raw != _NO_GAME_ID else None
+
+
+##
+# @brief 판 목록을 열 단위 배열로 보관하는 테이블.
+# @details 판 i의 플레이어/챔피언 id는 player_ids/champ_ids[i*6 : i*6+6]
+#          (앞 3개 team1, 뒤 3개 team2), game_id는 game_ids[i*16 : i*16+16](hex를 바이트로).
+#          3v3이 아니거나, 알 수 없는 필드가 있거나, 시각이 UTC ISO 형식이 아니거나, game_id가
+#          32자 소문자 hex가 아닌 판은 열 대신 raw[i]에 원본 dict를 그대로 둔다(왕복 보존).
+class GameTable:
+    __slots__ = (
+        "players", "champs", "sources", "raw",
+        "round", "round_orig", "season", "winner", "time_us", "source_id",
+        "player_ids", "champ_ids", "game_ids",
+    )
+
+    ##
+    # @param players 플레이어 id 인턴 테이블(다른 테이블과 공유 가능).
+    # @param champs 챔피언 이름 인턴 테이블(다른 테이블과 공유 가능).
+    def __init__(self, players=None, champs=None):
+        self.players = players if players is not None else IdTable()
+        self.champs = champs if champs is not None else IdTable()
+        self.sources = IdTable()  # ("T2", "T1", "CMD") 같은 출처 튜플
+        self.raw = {}
+        self.round = array("i")
+        self.round_orig = array("i")
+        self.season = array("i")
+        self.winner = array("b")
+        self.time_us = array("q")
+        self.source_id = array("h")
+        self.player_ids = array("I")
+        self.champ_ids = array("I")
+        self.game_ids = bytearray()
+
+    def __len__(self):
+        return len(self.round)
+
+    ##
+    # @brief 판 하나를 추가한다.
+    # @param g history_data.json 형식의 판 dict.
+    # @return 추가된 판의 오프셋.
+    def append(self, g):
+        offset = len(self.round)
+        t1, t2 = g.get("team1") or (), g.get("team2") or ()
+        us, exact = time_to_us(g.get("time"))
+        src = g.get("sources")
+        gid = _game_id_bytes(g["game_id"]) if "game_id" in g else _NO_GAME_ID
+        fits = (
+            exact
+            and gid is not None
+            and len(t1) == TEAM_SIZE
+            and len(t2) == TEAM_SIZE
+            and g.get("winner") in _WINNERS
+            and _is_int(g.get("round"))
+            and _is_int(g.get("round_orig", MISSING))
+            and _is_int(g.get("season", MISSING))
+            and _GAME_FIELDS.issuperset(g)
+            and all(p.keys() == _PICK_FIELDS for p in t1)
+            and all(p.keys() == _PICK_FIELDS for p in t2)
+            and (src is None or (isinstance(src, list) and all(isinstance(x, str) for x in src)))
+        )
+        if not fits:
+            self.raw[offset] = g
+            self.round.append(g.get("round") if _is_int(g.get("round")) else 0)
+            self.round_orig.append(MISSING)
+            self.season.append(MISSING)
+            self.winner.append(MISSING)
+            self.time_us.append(0)
+            self.source_id.append(MISSING)
+            self.player_ids.extend([0] * (TEAM_SIZE * 2))
+            self.champ_ids.extend([0] * (TEAM_SIZE * 2))
+            self.game_ids += _NO_GAME_ID
+            return offset
+
+        self.round.append(g["round"])
+        self.round_orig.append(g.get("round_orig", MISSING))
+        self.season.append(g.get("season", MISSING))
+        self.winner.append(0 if g["winner"] == "team1" else 1)
+        self.time_us.append(us)
+        self.source_id.append(MISSING if src is None else self.sources.intern(tuple(src)))
+        for team in (t1, t2):
+            for p in team:
+                self.player_ids.append(self.players.intern(p["id"]))
+                self.champ_ids.append(self.champs.intern(p["champ"]))
+        self.game_ids += gid
+        return offset
+
+    ##
+    # @brief 오프셋 i의 판을 history_data.json 형식 dict로 복원한다.
+    # @param i 오프셋.
+    # @return 판 dict.
+    def game(self, i):
+        raw = self.raw.get(i)
+        if raw is not None:
+            return raw
+        base = i * TEAM_SIZE * 2
+        pid, cid = self.player_ids, self.champ_ids
+        pv, cv = self.players.values, self.champs.values
+        picks = [{"id": pv[pid[base + k]], "champ": cv[cid[base + k]]} for k in range(TEAM_SIZE * 2)]
+        g = {"round": self.round[i]}
+        if self.round_orig[i] != MISSING:
+            g["round_orig"] = self.round_orig[i]
+        if self.season[i] != MISSING:
+            g["season"] = self.season[i]
+        g["team1"] = picks[:TEAM_SIZE]
+        g["team2"] = picks[TEAM_SIZE:]
+        g["winner"] = _WINNERS[self.winner[i]]
+        g["time"] = us_to_time(self.time_us[i])
+        if self.source_id[i] != MISSING:
+            g["sources"] = list(self.sources[self.source_id[i]])
+        gid = self.game_ids[i * GAME_ID_BYTES:(i + 1) * GAME_ID_BYTES]
+        if gid != _NO_GAME_ID:
+            g["game_id"] = gid.hex()
+        return g
+
+    ##
+    # @brief 오프셋 i 판의 (team1 플레이어 id 3개, team2 플레이어 id 3개)를 정수로 반환한다.
+    # @param i 오프셋(raw 판이면 의미 없음).
+    # @return 플레이어 인턴 id 6개 튜플.
+    def player_slots(self, i):
+        base = i * TEAM_SIZE * 2
+        return tuple(self.player_ids[base:base + TEAM_SIZE * 2])
+
+    ##
+    # @brief 모든 판을 dict 리스트로 복원한다.
+    # @return history_data.json의 games 형식 리스트.
+    def to_games(self):
+        return [self.game(i) for i in range(len(self.round))]
+
+
+##
+# @brief history_data.json 전체(헤더 + GameTable).
+class History:
+    __slots__ = ("header", "games", "games_pos")
+
+    ##
+    # @param header games를 뺀 최상위 키/값(generated_at, channels, players, ...).
+    # @param games GameTable.
+    # @param games_pos 원본에서 games 키의 위치(키 순서 보존용, None이면 맨 끝).
+    def __init__(self, header, games, games_pos=None):
+        self.header = header
+        self.games = games
+        self.games_pos = games_pos
+
+    ##
+    # @brief 판이 없는 새 history(봇이 처음 기록할 때의 스켈레톤).
+    # @return History.
+    @classmethod
+    def empty(cls):
+        header = {"generated_at": None, "channels": [], "total_games": 0, "players": {}, "sessions_summary": []}
+        return cls(header, GameTable())
+
+    ##
+    # @brief 판 하나를 뒤에 붙이고 헤더(players, total_games, generated_at)를 맞춘다.
+    # @param game 판 dict.
+    # @param players 참가자 {id: 이름}(처음 보는 id만 추가, 기존 이름 보존).
+    # @return 붙인 판의 오프셋.
+    def add_game(self, game, players=None):
+        offset = self.games.append(game)
+        names = self.header.setdefault("players", {})
+        for uid, name in (players or {}).items():
+            names.setdefault(uid, name)
+        self.header["total_games"] = len(self.games)
+        self.header["generated_at"] = game.get("time")
+        return offset
+
+    ##
+    # @brief history_data.json dict로부터 만든다.
+    # @param data json.load 결과.
+    # @return History.
+    @classmethod
+    def from_json(cls, data):
+        table = GameTable()
+        for g in data.get("games", ()):
+            table.append(g)
+        header = {k: v for k, v in data.items() if k != "games"}
+        games_pos = list(data).index("games") if "games" in data else None
+        return cls(header, table, games_pos)
+
+    ##
+    # @brief history_data.json과 같은 구조(키 순서 포함)의 dict로 되돌린다.
+    # @return dict.
+    def to_json(self):
+        out = {}
+        for n, (k, v) in enumerate(self.header.items()):
+            if n == self.games_pos:
+                out["games"] = self.games.to_games()
+            out[k] = v
+        if "games" not in out:
+            out["games"] = self.games.to_games()
+        return out
+
+
+##
+# @brief 플레이어 한 명의 누적 승수(wins.json의 유저 항목).
+class PlayerWins:
+    __slots__ = ("name", "wins", "extra")
+
+    ##
+    # @param name 표시 이름.
+    # @param wins 누적 승수.
+    # @param extra name/wins 외 필드(왕복 보존용, 없으면 None).
+    def __init__(self, name, wins, extra=None):
+        self.name = name
+        self.wins = wins
+        self.extra = extra
+
+    ##
+    # @brief wins.json 유저 항목 형식으로 되돌린다.
+    # @return {"name", "wins", ...} dict.
+    def to_json(self):
+        d = {"name": self.name, "wins": self.wins}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+##
+# @brief wins.json을 total_rounds와 플레이어 맵으로 분리한 타입.
+class WinsRecord:
+    __slots__ = ("total_rounds", "players")
+
+    ##
+    # @param total_rounds 누적 판수.
+    # @param players {uid(str): PlayerWins} (삽입 순서 유지).
+    def __init__(self, total_rounds=0, players=None):
+        self.total_rounds = total_rounds
+        self.players = players if players is not None else {}
+
+    ##
+    # @brief wins.json dict로부터 만든다. dict가 아닌 항목(total_rounds)은 플레이어로 보지 않는다.
+    # @param data json.load 결과.
+    # @return WinsRecord.
+    @classmethod
+    def from_json(cls, data):
+        players = {}
+        for uid, v in wins_players(data):
+            extra = {k: x for k, x in v.items() if k not in ("name", "wins")} or None
+            players[uid] = PlayerWins(v.get("name"), v.get("wins", 0), extra)
+        return cls(data.get("total_rounds", 0), players)
+
+    ##
+    # @brief uid의 누적 승수(없으면 0).
+    # @param uid 플레이어 id 문자열.
+    def wins_of(self, uid):
+        p = self.players.get(uid)
+        return p.wins if p is not None else 0
+
+    ##
+    # @brief uid의 표시 이름(없으면 None).
+    # @param uid 플레이어 id 문자열.
+    def name_of(self, uid):
+        p = self.players.get(uid)
+        return p.name if p is not None else None
+
+    ##
+    # @brief wins.json 형식 dict로 되돌린다(total_rounds가 맨 앞).
+    # @return dict.
+    def to_json(self):
+        out = {"total_rounds": self.total_rounds}
+        for uid, p in self.players.items():
+            out[uid] = p.to_json()
+        return out
+
+
+##
+# @brief wins.json dict에서 (uid, 유저 dict) 쌍만 순서대로 꺼낸다(total_rounds 등 비-dict 제외).
+# @param wins_data wins.json dict.
+# @return (uid, {"name", "wins"}) 제너레이터.
+def wins_players(wins_data):
+    for uid, v in wins_data.items():
+        if isinstance(v, dict):
+            yield uid, v
+
+
+##
+# @brief 같은 판 수에 대해 dict-of-dicts와 GameTable의 메모리 사용량을 비교한다.
+# @param n 판 수.
+# @return (dict 바이트, compact 바이트).
+def bench(n):
+    import season_index
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        obj = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return obj, size
+
+    def build_games():
+        games = season_index.synthetic_games(n)
+        rng = random.Random(1)
+        for g in games:
+            g["game_id"] = "%032x" % rng.getrandbits(128)  # 봇이 기록한 판처럼 game_id 포함
+        return games
+
+    games, dict_bytes = measure(build_games)
+    season_index.retag_seasons(games)
+
+    def build_table():
+        t = GameTable()
+        for g in games:
+            t.append(g)
+        return t
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    table = build_table()
+    compact_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    assert table.to_games() == games, "왕복 불일치"
+    per100k = 100_000 / n
+    print(f"[BENCH] {n} games (round-trip OK)")
+    print(f"  dict-of-dicts : {dict_bytes / 2**20:8.1f} MiB  "
+          f"({dict_bytes * per100k / 2**20:.1f} MiB / 100k, {dict_bytes / n:.0f} B/game)")
+    print(f"  GameTable     : {compact_bytes / 2**20:8.1f} MiB  "
+          f"({compact_bytes * per100k / 2**20:.1f} MiB / 100k, {compact_bytes / n:.0f} B/game)")
+    print(f"  ratio         : {dict_bytes / max(compact_bytes, 1):.1f}x")
+    return dict_bytes, compact_bytes
+
+
+##
+# @brief CLI 진입점.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="compact history 모델 도구")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--games", type=int, default=100_000, help="bench 판 수")
+    args = parser.parse_args(argv)
+    bench(args.games)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+##
+# @file dev_loadgen.py
+# @brief DEV_MODE 부하 생성기: 가상 유저 수천 명과 판을 만들고, 실제 핸들러로 게임을 끝까지 진행한다.
+# @details 디스코드 없이 got_champe의 실제 핸들러(/게임시작 → 시작 버튼 → 챔피언 버튼 → 타이머 →
+#          승리 셀렉트)를 가짜 채널·상호작용 객체로 호출한다. 타이머는 config timer_tick으로 가속한다.
+#          각 차례는 확률에 따라 바로 선택 / 이미 나간 챔피언을 눌러 거절된 뒤 선택 / 시간 초과(자동 배정)로
+#          진행하고, 일부 게임은 픽 도중 /게임시작을 다시 불러 버린다(진행 중 게임 취소).
+#          승리 셀렉트는 --victory-clicks번을 여러 채널에서 동시에 눌러 중복 커밋이 없는지도 본다.
+#          --guilds N이면 길드 N개가 한 프로세스에서 동시에 게임을 진행해 로비 상태가 섞이지 않는지 본다.
+#
+#          1) 가상 유저 --players명을 만든다(MockUser, __slots__).
+#          2) --fill N이면 그 유저들로 합성 판 N개를 history_data_dev.json에 바로 쓰고
+#             wins_dev.json은 마지막 시즌 기준으로 맞춘다(판마다 파일을 다시 쓰는 기록 경로로는 느림).
+#          3) --games M판을 실제 핸들러로 진행한다(victory_commit → record_game → 파생 캐시·백업 전부).
+#          결과 파일은 --out 폴더(기본 data/)의 wins_dev.json / history_data_dev.json 이라
+#          DEV_MODE 봇과 각 모듈 bench/CLI(--dev)가 그대로 읽는다.
+#
+#          사용법:
+#            python dev_loadgen.py --players 2000 --fill 100000 --games 50 [--out data] [--force]
+#            python dev_loadgen.py --games 200 --tick 0.001 --timeout-rate 0.2 --misclick-rate 0.1
+#            python dev_loadgen.py --games 50 --victory-clicks 20
+#            python dev_loadgen.py --games 30 --guilds 3   # 길드별 로비 분리 (판 수는 길드마다)
+#            python dev_loadgen.py --games 50 --timer-display timestamp   # 판당 메시지 수정 수 비교
+#            python dev_loadgen.py --games 50 --webhooks --webhook-delete-rate 0.01   # 팀 채널 웹훅 백엔드
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import discord
+
+import botlog
+import history_io
+import paths
+import safe_io
+
+## 합성 판 챔피언 이름 수(ddragon 없이 오프라인으로 만든다).
+CHAMPIONS = 170
+
+## 합성 판에서 한 시즌이 끝날 확률(판당).
+SEASON_END = 0.01
+
+_FAMILY = "김이박최정강조윤장임한오서신권황안송류홍"
+_GIVEN = "민서지현우준도윤하은수연예진태호성재영훈"
+
+
+##
+# @brief 합성 플레이어 (uid, 이름) 목록.
+# @param n 인원.
+# @param rng random.Random.
+def make_players(n, rng):
+    return [(str(10**17 + i), rng.choice(_FAMILY) + rng.choice(_GIVEN) + rng.choice(_GIVEN) + str(i))
+            for i in range(n)]
+
+
+##
+# @brief 합성 챔피언 목록(got_champe.champion_list 형식).
+def make_champions():
+    return [{"name": f"챔피언{i:03d}", "id": f"Champ{i:03d}", "version": "loadgen", "image": ""}
+            for i in range(CHAMPIONS)]
+
+
+##
+# @brief 합성 챔피언 초상화(단색 PNG)를 초상화 캐시 폴더에 만든다(sprite_grid가 받지 않고 바로 씀).
+# @param champions make_champions() 결과.
+# @param rng random.Random.
+# @return 만들었으면 True, Pillow가 없으면 False.
+def make_portraits(champions, rng):
+    import sprite_grid
+    if not sprite_grid.available():
+        return False
+    for champ in champions:
+        path = os.path.join(paths.sprite_dir(champ["version"]), f"{champ['id']}.png")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            sprite_grid.Image.new("RGB", (120, 120), color).save(path)
+    return True
+
+
+##
+# @brief 합성 판 n개로 history/wins dev 파일을 쓴다.
+# @details 시즌은 SEASON_END 확률로 끝나고(round 1부터 다시), wins는 마지막 시즌 집계라
+#          이어지는 실제 기록이 같은 시즌으로 붙는다.
+# @param players make_players() 결과.
+# @param champions make_champions() 결과.
+# @param n 판 수.
+# @param rng random.Random.
+def fill(players, champions, n, rng):
+    names = [c["name"] for c in champions]
+    t = datetime.now(timezone.utc) - timedelta(minutes=23 * (n + 1))
+    games, season, rnd = [], 1, 0
+    for _ in range(n):
+        if rnd and rng.random() < SEASON_END:
+            season, rnd = season + 1, 0
+        rnd += 1
+        t += timedelta(minutes=23)
+        picked = rng.sample(players, 6)
+        champs = rng.sample(names, 6)
+        team = [{"id": uid, "name": name, "champ": champ} for (uid, name), champ in zip(picked, champs)]
+        games.append({
+            "round": rnd,
+            "round_orig": rnd,
+            "season": season,
+            "time": t.isoformat(),
+            "team1": team[:3],
+            "team2": team[3:],
+            "winner": rng.choice(("team1", "team2")),
+            "sources": ["loadgen"],
+        })
+
+    wins = {"total_rounds": rnd}
+    for uid, name in players:
+        wins[uid] = {"name": name, "wins": 0}
+    for g in games[len(games) - rnd:]:
+        for p in g[g["winner"]]:
+            wins[p["id"]]["wins"] += 1
+    data = {
+        "generated_at": games[-1]["time"] if games else None,
+        "channels": [],
+        "total_games": len(games),
+        "players": {uid: name for uid, name in players},
+        "sessions_summary": [],
+        "games": games,
+    }
+    history_io.save(paths.history_json(True), data)
+    safe_io.write_json(paths.wins_file(True), wins, indent=2)
+
+
+# === 가짜 디스코드 객체 (got_champe 핸들러가 쓰는 속성만) ===
+class FakeMessage:
+    __slots__ = ("channel", "content", "embeds", "view")
+
+    def __init__(self, channel, content, embed, view):
+        self.channel = channel
+        self.content = content
+        self.embeds = [embed] if embed is not None else []
+        self.view = view
+
+    async def edit(self, content=None, embed=None, view=None):
+        self.channel.edits += 1
+        if embed is not None:
+            self.embeds = [embed]
+        if view is not None:
+            self.view = view
+        return self
+
+
+class FakeChannel:
+
+    def __init__(self, channel_id, name, guild):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.sent = 0
+        self.edits = 0
+        self.last_view = None
+        self.hooks = []
+
+    async def send(self, content=None, embed=None, view=None, file=None):
+        self.sent += 1
+        if view is not None:
+            self.last_view = view
+        return FakeMessage(self, content, embed, view)
+
+    async def webhooks(self):
+        return list(self.hooks)
+
+    async def create_webhook(self, name):
+        hook = FakeWebhook(self, name)
+        self.hooks.append(hook)
+        return hook
+
+
+##
+# @brief 채널 웹훅 가짜. delete_rate 확률로 누가 지운 것처럼 404를 낸다(재생성 경로 확인).
+class FakeWebhook:
+    delete_rate = 0.0
+
+    def __init__(self, channel, name):
+        self.channel = channel
+        self.name = name
+        self.token = "token"
+        self.deleted = False
+
+    async def send(self, content=None, embed=None, wait=False, username=None, avatar_url=None):
+        if not self.deleted and random.random() < self.delete_rate:
+            self.deleted = True
+            self.channel.hooks.remove(self)
+        if self.deleted:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"),
+                                   {"code": 10015, "message": "Unknown Webhook"})
+        self.channel.sent += 1
+        return FakeMessage(self.channel, content, embed, None)
+
+
+class FakeGuild:
+
+    def __init__(self, guild_id, channel_names):
+        self.id = guild_id
+        self.channels = [FakeChannel(guild_id * 10 + i, name, self) for i, name in enumerate(channel_names)]
+        self.members = []
+
+
+class FakeResponse:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = False
+
+    async def send_message(self, content=None, ephemeral=False, **kwargs):
+        self.done = True
+
+    async def defer(self, ephemeral=False):
+        self.done = True
+
+
+class FakeFollowup:
+    async def send(self, content=None, ephemeral=False, **kwargs):
+        return None
+
+
+class FakeInteraction:
+    __slots__ = ("user", "channel", "guild", "response", "followup")
+
+    def __init__(self, user, channel):
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+class FakeContext:
+    __slots__ = ("guild", "channel", "author")
+
+    def __init__(self, guild, channel, author):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+
+    async def respond(self, content=None, embed=None, view=None, ephemeral=False, **kwargs):
+        if not ephemeral:
+            return await self.channel.send(content=content, embed=embed, view=view)
+        return None
+
+
+##
+# @brief 스크립트 게임 진행기.
+class Driver:
+
+    def __init__(self, bot_module, guild, rng, timeout_rate, misclick_rate, abandon_rate, victory_clicks=1,
+                 think=0, pick_delay=0):
+        self.g = bot_module
+        self.guild = guild
+        self.lobby = bot_module.get_lobby(guild.id)
+        self.rng = rng
+        self.timeout_rate = timeout_rate
+        self.misclick_rate = misclick_rate
+        self.abandon_rate = abandon_rate
+        self.victory_clicks = victory_clicks
+        self.think = think
+        # 고민 시간은 제한 시간 안에서만 (넘으면 시간 초과 경로와 겹침)
+        self.pick_delay = min(pick_delay, max(bot_module.config.get("pick_timeout", 15) - 1, 0))
+        self.tick = bot_module.config.get("timer_tick", 1.0)
+        self.stats = {"games": 0, "abandoned": 0, "timeouts": 0, "rejected": 0, "picks": 0, "victory_clicks": 0}
+
+    def _buttons(self, cls):
+        channel = self.rng.choice(self.lobby.game_channels)
+        view = self.lobby.champion_views.get(channel.id)
+        items = [item for item in view.children if isinstance(item, cls)] if view else []
+        return channel, items
+
+    async def _click(self, name):
+        channel, items = self._buttons(self.g.ChampionButton)
+        button = next(b for b in items if b.champ_name == name)
+        picker = self.lobby.pick_order[self.lobby.current_pick_index]
+        await button.callback(FakeInteraction(picker, channel))
+
+    def _free_champion(self):
+        return self.rng.choice([c["name"] for c in self.lobby.game_champions
+                                if c["name"] not in self.lobby.excluded])
+
+    def _victory_select(self, view):
+        if view is None:
+            return None
+        return next((item for item in view.children if isinstance(item, self.g.VictorySelect)), None)
+
+    async def _wait(self, predicate, limit):
+        deadline = time.monotonic() + limit
+        while not predicate():
+            if time.monotonic() > deadline:
+                raise TimeoutError("핸들러 진행이 멈췄습니다")
+            await asyncio.sleep(self.tick / 4)
+
+    ##
+    # @brief 한 판을 끝까지(또는 버려질 때까지) 진행한다.
+    # @return True면 승리 기록까지 마침, False면 도중에 버림.
+    async def play(self):
+        g, lobby = self.g, self.lobby
+        if len(g.champion_list) - len(lobby.excluded) < g.config.get("champion_count", 8):
+            lobby.excluded.clear()  # 세션 중 쓴 챔피언 제외가 쌓여 제시할 챔피언이 모자라면 새 세션처럼 비움
+        await asyncio.sleep(self.think * self.tick)  # 판 사이 사람이 쉬는 시간 (다음 판 준비가 도는 동안)
+
+        command_channel = self.guild.channels[0]
+        await g.게임시작.callback(FakeContext(self.guild, command_channel, g.mock_members[0]))
+        if not lobby.champion_views:
+            raise RuntimeError("/게임시작이 챔피언 선택 메시지를 만들지 못했습니다")
+
+        channel, starts = self._buttons(g.StartButton)
+        await starts[0].callback(FakeInteraction(lobby.pick_order[0], channel))
+
+        abandon_at = self.rng.randrange(g.MAX_PLAYERS) if self.rng.random() < self.abandon_rate else None
+        timer_limit = g.config.get("pick_timeout", 15) * self.tick * 4 + 5
+        while len(lobby.selected_users) < g.MAX_PLAYERS:
+            index = lobby.current_pick_index
+            if index == abandon_at:
+                self.stats["abandoned"] += 1
+                return False
+            roll = self.rng.random()
+            if roll < self.timeout_rate:
+                self.stats["timeouts"] += 1
+                await self._wait(lambda: lobby.current_pick_index != index, timer_limit)
+                continue
+            if roll < self.timeout_rate + self.misclick_rate:
+                # 잘못 누름: 이미 나간 챔피언을 눌러 거절당한 뒤 다시 고른다
+                taken = list(lobby.selected_users.values())
+                if taken:
+                    self.stats["rejected"] += 1
+                    await self._click(self.rng.choice(taken))
+            await asyncio.sleep(self.rng.uniform(0, self.pick_delay) * self.tick)  # 고민 시간
+            await self._click(self._free_champion())
+            self.stats["picks"] += 1
+
+        # 승리 셀렉트가 모든 채널 큐로 나갈 때까지 기다렸다가 여러 채널에서 동시에 고른다
+        channels = lobby.game_channels
+        await self._wait(lambda: all(self._victory_select(ch.last_view) for ch in channels), timer_limit)
+        clicks = []
+        for i in range(self.victory_clicks):
+            channel = channels[i % len(channels)]
+            select = self._victory_select(channel.last_view)
+            select._selected_values = [self.rng.choice(["team1", "team2"])]
+            clicks.append(select.callback(FakeInteraction(self.rng.choice(lobby.pick_order), channel)))
+        await asyncio.gather(*clicks)
+        self.stats["victory_clicks"] += len(clicks)
+        for ch in channels:
+            ch.last_view = None
+        self.stats["games"] += 1
+        return True
+
+
+##
+# @brief 실제 핸들러로 판들을 진행한다(길드가 여럿이면 길드마다 동시에).
+# @param guilds 동시에 진행할 길드 수(길드마다 games판).
+# @return 통계 dict(길드 합계).
+async def drive(bot_module, players, games, rng, timeout_rate, misclick_rate, abandon_rate, victory_clicks=1,
+                think=0, pick_delay=0, guilds=1):
+    g = bot_module
+    g.mock_members = [g.MockUser(int(uid), name) for uid, name in players]
+    channel_names = list(g.config.get("channels", [])) or ["팀짜기"]
+    drivers = [
+        Driver(g, FakeGuild((1 << 22) + i, channel_names), rng, timeout_rate,
+               misclick_rate, abandon_rate, victory_clicks, think, pick_delay)
+        for i in range(guilds)
+    ]
+
+    # @brief 한 길드의 판들을 끝까지 진행한다.
+    async def run(driver):
+        while driver.stats["games"] < games:
+            await driver.play()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(driver) for driver in drivers))
+    await asyncio.sleep(0)
+    stats = {key: sum(driver.stats[key] for driver in drivers) for key in drivers[0].stats}
+    stats["elapsed"] = time.perf_counter() - start
+    stats["sent"] = sum(ch.sent for driver in drivers for ch in driver.guild.channels)
+    stats["edits"] = sum(ch.edits for driver in drivers for ch in driver.guild.channels)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DEV_MODE 가상 유저/판 생성 + 실제 핸들러 부하 진행")
+    parser.add_argument("--players", type=int, default=1000, help="가상 유저 수")
+    parser.add_argument("--fill", type=int, default=0, help="합성으로 미리 채울 판 수")
+    parser.add_argument("--games", type=int, default=20, help="실제 핸들러로 진행할 판 수")
+    parser.add_argument("--out", default=paths.DATA_DIR, help="데이터 폴더 (dev 파일을 여기에 씀)")
+    parser.add_argument("--force", action="store_true", help="기존 dev 파일이 있어도 --fill로 덮어씀")
+    parser.add_argument("--tick", type=float, default=0.002, help="타이머 표시 1초당 실제 대기(초)")
+    parser.add_argument("--pick-timeout", type=int, default=5, help="차례당 제한 시간(표시 초)")
+    parser.add_argument("--timeout-rate", type=float, default=0.1, help="차례를 시간 초과로 보낼 확률")
+    parser.add_argument("--misclick-rate", type=float, default=0.1, help="이미 나간 챔피언을 눌러 거절당할 확률")
+    parser.add_argument("--abandon-rate", type=float, default=0.05, help="판을 도중에 버리고 다시 시작할 확률")
+    parser.add_argument("--pick-delay", type=float, default=3, help="차례마다 고르기 전 고민 시간 최대(표시 초)")
+    parser.add_argument("--timer-display", choices=["edit", "timestamp"], default=None,
+                        help="남은 시간 표시 방식 (기본: config.json 값)")
+    parser.add_argument("--think", type=float, default=5, help="판 사이 쉬는 시간(표시 초, --tick 적용)")
+    parser.add_argument("--no-prepare", action="store_true", help="다음 판 미리 준비를 끈다(전후 비교용)")
+    parser.add_argument("--grid", action="store_true", help="합성 초상화로 픽 embed 격자 이미지까지 만든다(Pillow)")
+    parser.add_argument("--webhooks", action="store_true", help="명령 채널 외 게임 채널은 웹훅 백엔드로 방송")
+    parser.add_argument("--webhook-delete-rate", type=float, default=0.0, help="웹훅 전송마다 웹훅이 지워져 있을 확률")
+    parser.add_argument("--victory-clicks", type=int, default=1, help="판마다 승리 셀렉트를 동시에 누르는 횟수")
+    parser.add_argument("--guilds", type=int, default=1, help="한 프로세스에서 동시에 진행할 길드 수 (길드마다 --games판)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    botlog.setup(level=logging.WARNING)
+    os.environ["DEV_MODE"] = "true"
+    paths.DATA_DIR = args.out
+    paths.BACKUP_DIR = os.path.join(args.out, "backup")
+    rng = random.Random(args.seed)
+    random.seed(args.seed)  # 핸들러 안의 팀 나누기·자동 배정
+    players = make_players(args.players, rng)
+    champions = make_champions()
+
+    generate = args.fill or not os.path.exists(paths.wins_file(True))
+    if generate:
+        if os.path.exists(paths.history_json(True)) and not args.force:
+            print(f"{paths.history_json(True)}이 이미 있습니다. 덮어쓰려면 --force")
+            return 1
+        for derived in paths.derived_files(True):
+            if os.path.exists(derived):
+                os.remove(derived)
+        start = time.perf_counter()
+        fill(players, champions, args.fill, rng)
+        print(f"[FILL] 유저 {len(players)}명, 판 {args.fill}개 ({time.perf_counter() - start:.1f}s)")
+
+    import got_champe  # DEV_MODE/경로 설정 후에 import (전역 상태 저장소가 여기서 열림)
+
+    grid = args.grid and make_portraits(champions, rng)
+    got_champe.config = dict(got_champe.load_config(), pick_timeout=args.pick_timeout, timer_tick=args.tick,
+                             champion_grid=grid, prepare_next_round=not args.no_prepare)
+    if args.timer_display:
+        got_champe.config["timer_display"] = args.timer_display
+    if args.webhooks:
+        got_champe.config["broadcast_webhooks"] = list(got_champe.config.get("channels", []))[1:]
+        got_champe.broadcaster.webhooks.configure(got_champe.config["broadcast_webhooks"])
+        FakeWebhook.delete_rate = args.webhook_delete_rate
+    got_champe.champion_list = champions
+    got_champe.wins_data = got_champe.load_wins()
+    got_champe.round_counter = got_champe.wins_data.total_rounds + 1
+    rounds_before = got_champe.wins_data.total_rounds
+    if not generate:  # 기존 wins_dev.json의 유저로 진행
+        players = [(uid, p.name) for uid, p in got_champe.wins_data.players.items()]
+    if len(players) < got_champe.MAX_PLAYERS:
+        print(f"가상 유저가 {got_champe.MAX_PLAYERS}명 이상 필요합니다 (현재 {len(players)}명)")
+        return 1
+
+    try:
+        stats = asyncio.run(drive(got_champe, players, args.games, rng,
+                                  args.timeout_rate, args.misclick_rate, args.abandon_rate, args.victory_clicks,
+                                  args.think, args.pick_delay, args.guilds))
+    finally:
+        got_champe.analytics_executor.shutdown()
+    recorded = got_champe.load_wins().total_rounds - rounds_before
+    per = stats["elapsed"] / max(stats["games"], 1)
+    print(f"[PLAY] {stats['games']}판 ({per * 1000:.0f} ms/판, 길드 {args.guilds}, 기록 {recorded}판), "
+          f"버림 {stats['abandoned']}, "
+          f"시간 초과 {stats['timeouts']}, 거절된 클릭 {stats['rejected']}, 선택 {stats['picks']}, "
+          f"승리 클릭 {stats['victory_clicks']}, 메시지 {stats['sent']} / 수정 {stats['edits']} "
+          f"(판당 수정 {stats['edits'] / max(stats['games'], 1):.1f}, "
+          f"timer_display={got_champe.config.get('timer_display', 'edit')})")
+    print(got_champe.metrics.format_summary())
+    if recorded != stats["games"]:
+        print(f"[FAIL] 진행한 판 {stats['games']}개 중 {recorded}개만 기록됨")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
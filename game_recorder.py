@@ -1,16 +1,30 @@
 ##
 # @file game_recorder.py
-# @brief 승리 확정 시 판 기록을 history_data.json에 추가하고 GitHub Pages에 배포하는 모듈.
-# @details 봇(got_champe.py)이 판마다 호출한다. 로컬 마스터 데이터(history_data.json)를 갱신한 뒤,
-#          설정이 있으면 GitHub Contents API로 이 json을 lol_arena 리포에 커밋한다(대시보드가 직접 fetch).
+# @brief 승리 확정 시 판 기록을 history에 추가하고 GitHub Pages에 배포하는 모듈.
+# @details 봇(got_champe.py)이 판마다 호출한다. 로컬 마스터 데이터(history_data.json + 저널)를 갱신한 뒤,
+#          설정이 있으면 GitHub Contents API로 이 json을 lol_arena 리포에 커밋한다(대시보드가 직접 fetch,
+#          요청은 http_client의 공유 세션으로 봇 이벤트 루프에서 보냄).
 #          업로드 실패는 봇 동작에 영향을 주지 않는다.
+import asyncio
 import base64
-import json
+import logging
 import os
-import threading
 from datetime import datetime, timezone
 
+import backup
+import columnar
+import history_index
+import history_io
+import http_client
 import paths
+import season_index
+import win_model
+from compact_model import History
+
+log = logging.getLogger(__name__)
+
+## 업로드 진행 상태 (봇 루프에서만 갱신): 진행 중이면 끝난 뒤 한 번 더.
+_upload = {"running": False, "again": False}
 
 
 ##
@@ -18,133 +32,182 @@ import paths
 # @details .env의 ARENA_GH_TOKEN/ARENA_GH_REPO가 설정된 경우에만 동작하며, 미설정 시 조용히
 #          반환한다. 기존 파일이면 현재 sha를 조회해 함께 PUT하고(없으면 신규 생성),
 #          sha 경합(409)이면 재조회 후 1회 재시도한다. Contents API는 단일 커밋이라 별도 원자성
-#          처리가 필요없다. 모든 예외는 내부에서 삼켜 로그만 남긴다.
+#          처리가 필요없다. 요청은 공유 HTTP 클라이언트(http_client, 타임아웃·재시도 포함)로 보낸다.
+#          모든 예외는 내부에서 삼켜 로그만 남긴다.
 # @param local_path 업로드할 로컬 파일 경로.
 # @param remote_path 리포 내 대상 경로(예: "history_data.json").
 # @param message 커밋 메시지.
 # @return bool 성공하면 True, 미설정/실패면 False.
-def _github_put_file(local_path, remote_path, message):
+async def _github_put_file(local_path, remote_path, message):
     token = os.getenv("ARENA_GH_TOKEN")
     repo = os.getenv("ARENA_GH_REPO")  # 예: "HANSOLJJ/lol_arena"
     if not token or not repo:
         return False  # 미설정이면 조용히 스킵 (로컬 기록만)
     branch = os.getenv("ARENA_GH_BRANCH", "main")
     try:
-        import requests
         url = f"https://api.github.com/repos/{repo}/contents/{remote_path}"
         headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github+json",
             "X-GitHub-Api-Version": "2022-11-28",
         }
-        with open(local_path, "rb") as f:
-            content_b64 = base64.b64encode(f.read()).decode()
+        content_b64 = await asyncio.to_thread(_read_b64, local_path)
 
-        def _get_sha():  # 기존 파일 sha 조회 (없으면 404 → None → 신규 생성)
-            r = requests.get(url, headers=headers, params={"ref": branch}, timeout=15)
-            return r.json().get("sha") if r.status_code == 200 else None
+        async def _get_sha():  # 기존 파일 sha 조회 (없으면 404 → None → 신규 생성)
+            r = await http_client.request("GET", url, tag="github", headers=headers, params={"ref": branch})
+            return r.json().get("sha") if r.status == 200 else None
 
         body = {"message": message, "content": content_b64, "branch": branch}
-        sha = _get_sha()
+        sha = await _get_sha()
         if sha:
             body["sha"] = sha
-        r = requests.put(url, headers=headers, json=body, timeout=15)
-        if r.status_code == 409:  # sha 경합 → 재조회 후 1회 재시도
-            body["sha"] = _get_sha()
-            r = requests.put(url, headers=headers, json=body, timeout=15)
-        if r.status_code in (200, 201):
-            print(f"[UPLOAD] {remote_path} -> GitHub Pages 반영 완료")
+        r = await http_client.request("PUT", url, tag="github", headers=headers, json=body)
+        if r.status == 409:  # sha 경합 → 재조회 후 1회 재시도
+            body["sha"] = await _get_sha()
+            r = await http_client.request("PUT", url, tag="github", headers=headers, json=body)
+        if r.status in (200, 201):
+            log.info(f"[UPLOAD] {remote_path} -> GitHub Pages 반영 완료")
             return True
-        print(f"[WARN] GitHub 업로드 실패 {r.status_code}: {r.text[:200]}")
+        log.warning(f"GitHub 업로드 실패 {r.status}: {r.text[:200]}")
         return False
     except Exception as e:
-        print(f"[WARN] GitHub 업로드 실패 (로컬 기록은 정상): {e}")
+        log.warning(f"GitHub 업로드 실패 (로컬 기록은 정상): {e}")
         return False
 
 
+def _read_b64(path):
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
 ##
 # @brief history_data.json을 GitHub 리포에 커밋해 GitHub Pages에 반영한다.
+# @details 올리기 전에 저널의 판을 본 파일에 합친다(history_io.fold). 업로드 중에 새 판이 기록되면
+#          끝난 뒤 최신 파일로 한 번만 더 올린다(판마다 쌓이지 않음).
 # @param local_json 업로드할 로컬 json 파일 경로.
 # @return 없음.
-def _upload_to_github(local_json):
-    remote = os.getenv("ARENA_GH_PATH", "history_data.json")
-    _github_put_file(local_json, remote, "chore: update history_data.json")
+async def _upload_to_github(local_json):
+    if _upload["running"]:
+        _upload["again"] = True
+        return
+    _upload["running"] = True
+    try:
+        remote = os.getenv("ARENA_GH_PATH", "history_data.json")
+        while True:
+            _upload["again"] = False
+            try:  # 저널의 판을 본 파일에 합친 뒤 올린다 (대시보드는 본 파일만 읽음)
+                await asyncio.to_thread(history_io.fold, local_json)
+            except Exception as e:
+                log.warning(f"history 저널 합치기 실패 (업로드는 합쳐진 판까지만): {e}")
+            await _github_put_file(local_json, remote, "chore: update history_data.json")
+            if not _upload["again"]:
+                break
+    finally:
+        _upload["running"] = False
+
+
+##
+# @brief 이 환경이 GitHub Pages에 업로드하는지(dev 모드가 아니고 ARENA_GH_TOKEN/REPO 설정).
+def _publishing(dev_mode):
+    return not dev_mode and bool(os.getenv("ARENA_GH_TOKEN")) and bool(os.getenv("ARENA_GH_REPO"))
 
 
 ##
-# @brief GitHub Pages 업로드를 백그라운드 스레드에서 실행한다.
-# @details 승리 처리(async 이벤트 루프)를 막지 않도록 daemon 스레드로 분리한다.
-#          dev 모드에서는 테스트 데이터를 배포하지 않도록 스킵한다.
+# @brief GitHub Pages 업로드를 봇 이벤트 루프에 넘긴다.
+# @details 승리 처리를 막지 않도록 기다리지 않는다(스레드를 새로 띄우지 않고 공유 HTTP 클라이언트 사용).
+#          dev 모드이거나 업로드 설정이 없으면 스킵한다.
 # @param dev_mode True면 업로드하지 않음.
 # @return 없음.
 def upload_async(dev_mode=False):
-    if dev_mode:
+    if not _publishing(dev_mode):
         return
     json_path = paths.history_json(dev_mode)
-    threading.Thread(target=_upload_to_github, args=(json_path,), daemon=True).start()
+    http_client.submit(lambda: _upload_to_github(json_path))
 
 
 ##
-# @brief 한 판 결과를 history_data.json에 append하고 GitHub Pages 업로드까지 수행한다.
+# @brief 한 판 결과를 history 저널에 한 줄 append한다(판 기록만, 파생 캐시·백업·업로드는 after_commit()).
 # @details 라운드 번호가 직전 기록 이하로 회귀하면(예: R32 다음에 R1) 새 시즌으로 판정한다
-#          (시즌 시작 = wins.json 리셋 = round_counter 1부터 재시작). 파일이 없으면
-#          빈 스켈레톤을 생성한다. players 매핑은 처음 보는 id만 추가해 기존 이름을 보존한다.
+#          (시즌 시작 = wins.json 리셋 = round_counter 1부터 재시작). 시즌 판정은 history를 읽기 전에
+#          시즌 인덱스 로그 꼬리의 마지막 판으로 O(1)에 하고, 인덱스에도 한 줄만 붙인다. history는
+#          history_data.json을 다시 쓰지 않고 저널에 한 줄 붙인다(history_io.append, 본 파일에는
+#          저널이 찼거나 업로드할 때 트랜잭션 밖에서 합침). 파일이 없으면 빈 스켈레톤을 생성한다.
+#          players 매핑은 처음 보는 id만 추가돼 기존 이름을 보존한다.
+#          game_id를 주면 판에 함께 남기고, 마지막 판이 이미 같은 game_id면 다시 쓰지 않는다(재시도 멱등).
+#          victory_commit.record()의 저장소 트랜잭션 안에서 불리므로 여기서는 판 기록 외에 아무것도 하지 않는다.
 # @param round_num 현재 라운드 번호(round_counter).
 # @param teams {"team1": [{"id","name","champ"}]x3, "team2": [...]} 형태의 양 팀 정보.
 # @param winner 승리 팀 키. "team1" 또는 "team2".
 # @param dev_mode True면 history_data_dev.*에 기록(테스트 분리).
-# @return int 기록된 시즌 번호.
-def record_game(round_num, teams, winner, dev_mode=False):
+# @param game_id 게임 식별자(victory_commit), 없으면 None.
+# @return (기록된 시즌 번호, 판 오프셋).
+def record_game(round_num, teams, winner, dev_mode=False, game_id=None):
     json_path = paths.history_json(dev_mode)
 
-    if os.path.exists(json_path):
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {
-            "generated_at": None,
-            "channels": [],
-            "total_games": 0,
-            "players": {},
-            "sessions_summary": [],
-            "games": [],
-        }
+    if not os.path.exists(json_path):
+        history_io.write_history(json_path, History.empty())
+    history_io.trim(json_path)  # 본 파일에 이미 합쳐진 저널 앞부분 정리 (저널이 찼을 때만)
+
+    last = history_io.last_game(json_path)
+    if game_id is not None and last and last[1].get("game_id") == game_id:
+        return last[1].get("season", 1), last[0]
+    offset = last[0] + 1 if last else 0
 
-    games = data["games"]
-    # 시즌 판정: 라운드가 직전 기록 이하로 돌아가면 새 시즌
-    if not games:
-        season = 1
-    elif round_num <= games[-1]["round"]:
-        season = games[-1]["season"] + 1
-    else:
-        season = games[-1]["season"]
-
-    now = datetime.now(timezone.utc).isoformat()
-    games.append({
+    # 시즌 판정: 라운드가 직전 기록 이하로 돌아가면 새 시즌 (인덱스 로그 꼬리의 마지막 판, O(1))
+    tail = season_index.last_entry(dev_mode)
+    if (tail["offset"] if tail else -1) != offset - 1:  # 인덱스가 지워졌거나 어긋남 → 새 판만 따라잡기
+        tail = season_index.ensure_index(dev_mode)["last"]
+    season = season_index.season_after(tail, round_num)
+
+    game = {
         "round": round_num,
         "round_orig": round_num,
         "season": season,
         "team1": [{"id": p["id"], "champ": p["champ"]} for p in teams["team1"]],
         "team2": [{"id": p["id"], "champ": p["champ"]} for p in teams["team2"]],
         "winner": winner,
-        "time": now,
+        "time": datetime.now(timezone.utc).isoformat(),
         "sources": ["BOT"],
-    })
-
-    # 이름 매핑은 처음 보는 id만 추가 (기존 이름 보존)
-    for p in teams["team1"] + teams["team2"]:
-        data["players"].setdefault(p["id"], p.get("name") or p["id"])
+    }
+    if game_id is not None:
+        game["game_id"] = game_id
 
-    data["total_games"] = len(games)
-    data["generated_at"] = now
+    names = {p["id"]: p.get("name") or p["id"] for p in teams["team1"] + teams["team2"]}
+    history_io.append(json_path, offset, game, names)
+    season_index.append(game, offset, dev_mode)
+    return season, offset
 
-    # 대상 폴더(data/)가 없으면 생성
-    os.makedirs(os.path.dirname(json_path), exist_ok=True)
 
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    # GitHub Pages 자동 반영 (백그라운드, 실패해도 무해 - 다음 성공 업로드가 전체 파일이라 자동 만회)
-    upload_async(dev_mode)
+##
+# @brief 커밋이 끝난 판까지 파생 캐시와 증분 백업을 따라잡게 하고 GitHub Pages 업로드를 건다.
+# @details 저장소 트랜잭션이 끝난 뒤 부른다(모델 갱신 같은 무거운 일이 샤드 간 쓰기 잠금을 잡지 않도록).
+#          각 모듈은 자기가 반영한 판 수 이후의 판만 history에서 스트리밍해 반영하므로, 동시에 커밋된
+#          다른 판이 먼저 갱신했으면 할 일이 없다. 파생 캐시는 모두 history에서 다시 만들 수 있으므로
+#          하나가 실패해도 로그만 남기고 나머지를 계속한다 — 다음 기록 때 다시 따라잡는다.
+#          업로드하지 않는 환경에서는 저널이 찼을 때 여기서 본 파일에 합친다(업로드 경로는 올리기 직전에 합침).
+# @param dev_mode True면 dev 데이터.
+# @param wins 방금 커밋한 판까지 반영한 전적 dict(백업에 함께 남김). 없으면 디스크의 wins 파일을 읽는다.
+# @return 없음.
+def after_commit(dev_mode=False, wins=None):
+    steps = (
+        ("history_index", history_index.sync),  # 플레이어/챔피언 역색인 (새 판마다 로그 한 줄 append)
+        ("win_model", win_model.sync),  # 승리 확률 모델 증분 학습 (새 판으로 SGD 몇 스텝)
+        ("columnar", columnar.sync),  # 분석용 열 단위 내보내기에 새 판 append
+    )
+    for name, update in steps:
+        try:
+            update(dev_mode)
+        except Exception as e:
+            log.warning(f"[DERIVED] {name} 갱신 실패 (기록은 정상, 다음 기록 때 재생성): {e}")
+    # 증분 백업 (새 판만 gzip 델타, FULL_EVERY판마다 전체 스냅샷)
+    backup.after_record(dev_mode, wins)
 
-    return season
+    json_path = paths.history_json(dev_mode)
+    if _publishing(dev_mode):
+        # GitHub Pages 자동 반영 (백그라운드, 실패해도 무해 - 다음 성공 업로드가 전체 파일이라 자동 만회)
+        upload_async(dev_mode)
+    elif history_io.journal_full(json_path):
+        try:
+            history_io.fold(json_path)
+        except Exception as e:
+            log.warning(f"history 저널 합치기 실패 (저널에 기록은 정상, 다음 기록 때 재시도): {e}")
@@ -7,7 +7,6 @@
 #          팀짜기/TEAM1/TEAM2 3채널에 결과 embed을 동시 전송한다. DEV_MODE면 wins_dev.json으로
 #          테스트를 분리한다.
 import discord
-import requests
 import random
 import os
 import logging
@@ -17,24 +16,58 @@ from discord import Interaction, Embed, SelectOption
 from discord.ui import Select
 from dotenv import load_dotenv
 import json
+import hashlib
+import io
+import math
+import sys
+import time
 import unicodedata
 import paths
-from game_recorder import record_game
+import metrics
+import interactions
+import http_client
+import botlog
+import history_index
+import analytics
+import autocomplete
+import stats_api
+import win_model
+import profiler
+import sprite_grid
+import state_store
+import victory_commit
+from broadcast import Broadcaster
+from compact_model import WinsRecord, wins_players
+
+## 프로세스 시작 시각 (첫 커맨드 가능 시점까지의 시간 측정용).
+PROCESS_START = time.perf_counter()
+
+#  === 환경변수 로드 ===
+load_dotenv()
+DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
+## 샤딩: SHARD_COUNT를 주면 AutoShardedBot, SHARD_IDS(쉼표 구분)를 주면 그 샤드만 이 프로세스가 맡는다.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s.strip()] or None
 
 intents = discord.Intents.default()
 intents.presences = True
 intents.members = True
-bot = discord.Bot(intents=intents)
+# 커맨드 동기화는 on_ready에서 트리 해시가 바뀐 경우에만 직접 수행 (재연결마다 sync 방지)
+if SHARD_COUNT or SHARD_IDS:
+    bot = discord.AutoShardedBot(
+        intents=intents, auto_sync_commands=False, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS
+    )
+else:
+    bot = discord.Bot(intents=intents, auto_sync_commands=False)
 
-#  === 환경변수 로드 ===
-load_dotenv()
-DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
+log = logging.getLogger("bot")
 
 
 # === Mock User for DEV_MODE ===
 ##
 # @brief DEV_MODE에서 실제 디스코드 멤버 대신 사용하는 가상 유저.
 class MockUser:
+    __slots__ = ("id", "name", "display_name", "mention", "bot")
 
     ##
     # @brief 가상 유저 속성(id, name, mention 등)을 초기화한다.
@@ -56,23 +89,105 @@ class MockUser:
 
 # === 전역 상태 ===
 champion_list = []
-excluded = set()
-selected_users = {}  # user_id: champ_name
 MAX_PLAYERS = 6
-round_counter = 1
-current_teams = {}  # {'team1': [member1, ...], 'team2': [member4, ...]}
-overall_results = {}  # user_id: {'mention': str, 'results': ["O", "X"]}
-wins_data = {}  # user_id: {'name': str, 'wins': int}
-pick_order = []  # 픽 순서 (member 객체 리스트)
-current_pick_index = 0  # 현재 픽 순서
+GRID_FILENAME = "champions.png"  # 픽 embed에 첨부하는 초상화 격자 파일 이름
+round_counter = 1  # 다음에 기록될 라운드 번호 (전적·판 기록은 모든 길드가 공유)
+wins_data = WinsRecord()  # total_rounds + {user_id: PlayerWins(name, wins)}
+wins_version = 0  # wins_data를 갈아끼울 때마다 +1 (통계 API가 표시 이름 캐시 키로 사용)
 config = {}  # 설정 (pick_timeout, champion_count, channels)
-current_timer_task = None  # 현재 실행 중인 타이머 Task
-champion_messages = {}  # {channel_id: message} - 여러 채널의 챔피언 선택 메시지
-champion_views = {}  # {channel_id: view} - 여러 채널의 View
-current_game_channels = []  # 현재 게임에 사용 중인 채널 리스트
-current_game_champions = []  # 현재 게임에서 제시된 챔피언 리스트
-game_started = False  # 게임이 시작되었는지 여부 (시작 버튼 눌렀는지)
-victory_processed = False  # 승리 처리 완료 여부 (중복 방지)
+mock_members = None  # DEV_MODE 가상 유저 풀 (dev_loadgen이 채움, None이면 wins_data에서 생성)
+lobbies = {}  # {guild_id: Lobby} - 길드별 진행 중인 게임·세션 상태
+victory_pipeline = victory_commit.CommitPipeline()  # 게임 id별 승리 커밋 1회 보장 (중복 클릭 방지)
+startup_done = False  # 시작 파이프라인 1회 실행 여부 (on_ready는 재연결마다 다시 불림)
+autocomplete_index = autocomplete.Autocomplete()  # 챔피언/플레이어 옵션 자동완성 접두사 색인
+background_tasks = set()  # 참조를 잡아 둬야 하는 fire-and-forget 태스크
+broadcaster = Broadcaster()  # 게임 채널별 순서 보장 전송 큐 (인접 텍스트 병합, 선택적으로 팀 채널 웹훅)
+analytics_executor = analytics.AnalyticsExecutor()  # 전 판 집계용 프로세스 풀 (이벤트 루프 CPU 보호)
+state = state_store.from_env(DEV_MODE)  # 샤드 프로세스 공유 상태 (전적, 로비 소유권, 지표)
+STATE_OWNER = state_store.process_owner(SHARD_IDS)  # 이 프로세스의 로비 소유자 이름
+METRICS_PUBLISH_INTERVAL = 30  # 샤드별 지표를 저장소에 올리는 주기(초)
+stats_server = None  # 대시보드용 통계 HTTP API (STATS_API_PORT 설정 시에만)
+
+
+# === 길드별 로비 상태 ===
+##
+# @brief 길드 하나의 로비 상태. 한 프로세스가 여러 길드를 맡아도 게임끼리 섞이지 않게 길드마다 따로 둔다.
+# @details 게임 필드(팀, 픽 순서, 선택, 메시지/View, 타이머, 게임 id)는 /게임시작마다 reset()으로
+#          새로 채우고, 세션 필드(쓴 챔피언 제외, 오늘의 결과, 다음 판 준비물)는 프로세스가 살아 있는
+#          동안 유지한다. 디스코드 객체는 직렬화할 수 없으므로 상태 저장소(LOBBY 네임스페이스, 길드 id
+#          키)에는 snapshot() 요약만 올린다.
+class Lobby:
+    __slots__ = (
+        "guild_id", "teams", "selected_users", "pick_order", "current_pick_index", "timer_task",
+        "champion_messages", "champion_views", "game_channels", "game_champions", "game_started",
+        "game_id", "round", "wins", "excluded", "overall_results", "next_round", "prepare_task",
+    )
+
+    ##
+    # @brief 빈 로비를 만든다.
+    # @param guild_id 길드 id.
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.teams = {}  # {'team1': [member1, ...], 'team2': [member4, ...]}
+        self.selected_users = {}  # user_id: champ_name
+        self.pick_order = []  # 픽 순서 (member 객체 리스트)
+        self.current_pick_index = 0  # 현재 픽 순서
+        self.timer_task = None  # 현재 실행 중인 타이머 Task
+        self.champion_messages = {}  # {channel_id: message} - 여러 채널의 챔피언 선택 메시지
+        self.champion_views = {}  # {channel_id: view} - 여러 채널의 View
+        self.game_channels = []  # 현재 게임에 사용 중인 채널 리스트
+        self.game_champions = []  # 현재 게임에서 제시된 챔피언 리스트
+        self.game_started = False  # 게임이 시작되었는지 여부 (시작 버튼 눌렀는지)
+        self.game_id = None  # 진행 중인 게임 id (/게임시작마다 새로, 승리 셀렉트가 이 값에 묶임)
+        self.round = None  # 진행 중인 게임의 표시 라운드 (기록 후 저장소가 정한 번호로 바뀜)
+        self.wins = WinsRecord()  # 게임 시작 때 저장소에서 읽은 전적 (픽 순서·선택 현황의 승수)
+        self.excluded = set()  # 이번 세션에 이미 나온 챔피언
+        self.overall_results = {}  # user_id: {'mention': str, 'results': ["O", "X"]}
+        self.next_round = None  # 다음 판 준비물 (승리 기록 직후 미리 만듦, /게임시작에서 맞으면 그대로 사용)
+        self.prepare_task = None  # 다음 판 준비 Task
+
+    ##
+    # @brief 새 게임을 위해 게임 필드를 초기화한다(진행 중이던 게임의 차례 타이머도 정지).
+    # @param wins 게임 시작 때 저장소에서 읽은 전적(라운드 번호 = total_rounds + 1).
+    def reset(self, wins):
+        if self.timer_task and not self.timer_task.done():
+            self.timer_task.cancel()
+        self.timer_task = None
+        self.selected_users.clear()
+        self.game_started = False
+        self.game_id = victory_commit.new_game_id()
+        self.wins = wins
+        self.round = wins.total_rounds + 1
+        self.current_pick_index = 0
+        self.champion_messages.clear()
+        self.champion_views.clear()
+
+    ##
+    # @brief 상태 저장소에 올릴 로비 요약(채널, 라운드, 팀 uid, 시작 여부).
+    # @return JSON 직렬화 가능한 dict.
+    def snapshot(self):
+        return {
+            "channels": [ch.id for ch in self.game_channels],
+            "round": self.round,
+            "teams": {k: [str(m.id) for m in v] for k, v in self.teams.items()},
+            "started": self.game_started,
+        }
+
+    ##
+    # @brief 현재 태스크의 로그 태그(lobby=명령 채널, round)를 이 로비로 맞춘다.
+    def tag(self):
+        botlog.set_tags(lobby=self.game_channels[0].id if self.game_channels else None, round=self.round)
+
+
+##
+# @brief 길드의 로비를 꺼낸다(없으면 새로 만든다).
+# @param guild_id 길드 id.
+# @return Lobby.
+def get_lobby(guild_id):
+    lobby = lobbies.get(guild_id)
+    if lobby is None:
+        lobby = lobbies[guild_id] = Lobby(guild_id)
+    return lobby
 
 
 # === 설정 로드 ===
@@ -85,7 +200,7 @@ def load_config():
         with open(paths.CONFIG_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
-        print("[WARNING] config.json not found, using defaults")
+        log.warning("config.json not found, using defaults")
         return {
             "pick_timeout": 60,
             "champion_count": 8,
@@ -110,7 +225,7 @@ def get_game_channels(guild, command_channel):
             if channel.id not in [ch.id for ch in channels]:
                 channels.append(channel)
         else:
-            print(f"[WARNING] 채널 '{name}'을 찾을 수 없습니다!")
+            log.warning(f"채널 '{name}'을 찾을 수 없습니다!")
 
     return channels
 
@@ -124,58 +239,76 @@ def get_wins_file():
 
 
 ##
-# @brief 전적 데이터를 로드한다(DEV_MODE에 따라 파일 선택).
-# @details 구조는 {total_rounds: int, user_id: {name, wins}} 형태다. total_rounds가 없으면
-#          총 승수를 3으로 나눠(한 판당 3명 승리) 자동 계산해 추가한다. 파일이 없으면 {total_rounds: 0}을 반환한다.
-# @return 전적 데이터 dict.
+# @brief 전적 데이터를 상태 저장소에서 로드한다(저장소가 비었거나 wins 파일이 바뀌었으면 파일을 가져옴).
+# @details 파일 구조는 {total_rounds: int, user_id: {name, wins}} 형태다. total_rounds가 없으면
+#          총 승수를 3으로 나눠(한 판당 3명 승리) 자동 계산해 추가한다. 둘 다 없으면 빈 WinsRecord를 반환한다.
+# @return 전적 데이터 WinsRecord.
 def load_wins():
     filename = get_wins_file()
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # total_rounds가 없으면 계산해서 추가
-            if "total_rounds" not in data:
-                total_wins = sum(
-                    user.get("wins", 0)
-                    for uid, user in data.items()
-                    if uid != "total_rounds"
-                )
-                data["total_rounds"] = total_wins // 3  # 한 판당 3명 승리
-            return data
-    except FileNotFoundError:
-        print(f"[WARNING] {filename} not found, returning empty dict")
-        return {"total_rounds": 0}
+    data = state_store.load_wins(state, filename)
+    if data is None:
+        log.warning(f"{filename} not found, returning empty record")
+        return WinsRecord()
+    # total_rounds가 없으면 계산해서 추가
+    if "total_rounds" not in data:
+        total_wins = sum(
+            user.get("wins", 0) for _uid, user in wins_players(data)
+        )
+        data["total_rounds"] = total_wins // 3  # 한 판당 3명 승리
+        state.put(state_store.WINS, state_store.TOTAL_ROUNDS, data["total_rounds"])
+    return WinsRecord.from_json(data)
 
 
 ##
-# @brief 전적 데이터를 파일에 저장한다(DEV_MODE에 따라 파일 선택).
-# @param data 저장할 전적 데이터(load_wins와 동일한 구조).
-def save_wins(data):
-    filename = get_wins_file()
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[SAVED] Wins data saved to {filename}")
+# @brief 길드 로비를 잡고 저장소의 최신 전적을 읽는다(블로킹 → 스레드에서 호출).
+# @details 전적과 다음 라운드 번호는 모든 샤드 프로세스가 저장소에서 공유한다. 이 프로세스의
+#          wins_data/round_counter는 마지막으로 직접 기록한 시점 값이라 다른 프로세스가 그사이
+#          기록했으면 낡았으므로, 게임은 여기서 읽은 전적으로 시작한다.
+#          승리 확률 모델도 여기서 history 버전에 맞춰 두어(다른 프로세스가 기록한 판까지 증분 학습)
+#          이벤트 루프의 예측은 캐시만 읽는다.
+# @param lobby 길드 로비.
+# @return (다른 프로세스 소유자 또는 None, WinsRecord).
+def claim_game(lobby):
+    wins = load_wins()
+    owner = state_store.claim_lobby(state, lobby.guild_id, STATE_OWNER, {"round": wins.total_rounds + 1})
+    if owner is None:
+        try:
+            win_model.get_model(DEV_MODE)
+        except Exception as e:
+            log.warning(f"승리 확률 모델 갱신 실패: {e}")
+    return owner, wins
+
+
+##
+# @brief 저장소에서 읽은 전적이 이 프로세스의 wins_data보다 새로우면 갈아끼운다(round_counter 포함).
+# @param wins 저장소에서 읽은 WinsRecord.
+def adopt_wins(wins):
+    global wins_data, wins_version, round_counter
+    if wins.total_rounds > wins_data.total_rounds:
+        wins_data = wins
+        wins_version += 1
+    round_counter = max(round_counter, wins.total_rounds + 1)
 
 
 # === 챔피언 데이터 불러오기 ===
 ##
-# @brief Riot Games Data Dragon API에서 챔피언 데이터를 가져온다.
-# @return [{"name": 챔피언 이름, "image": 이미지 URL}, ...] 리스트.
-def fetch_champion_data():
+# @brief Riot Games Data Dragon API에서 챔피언 데이터를 가져온다(공유 HTTP 클라이언트, 타임아웃·재시도).
+# @return [{"name": 챔피언 이름, "id": ddragon id, "version": ddragon 버전, "image": 이미지 URL}, ...] 리스트.
+async def fetch_champion_data():
     version_url = "https://ddragon.leagueoflegends.com/api/versions.json"
-    version = requests.get(version_url).json()[0]
+    version = (await http_client.get_json(version_url, tag="ddragon"))[0]
 
     champ_data_url = (
         f"https://ddragon.leagueoflegends.com/cdn/{version}/data/ko_KR/champion.json"
     )
-    champ_data = requests.get(champ_data_url).json()["data"]
+    champ_data = (await http_client.get_json(champ_data_url, tag="ddragon"))["data"]
 
     champions = []
     for champ in champ_data.values():
         name = champ["name"]
         champ_id = champ["id"]
         image_url = f"https://ddragon.leagueoflegends.com/cdn/{version}/img/champion/{champ_id}.png"
-        champions.append({"name": name, "image": image_url})
+        champions.append({"name": name, "id": champ_id, "version": version, "image": image_url})
     return champions
 
 
@@ -200,14 +333,14 @@ def pick_random_champions(champion_list, excluded_champs, count=8):
 # @brief 승리 수 기준으로 픽 순서를 계산한다.
 # @details 승수 낮은 순으로 정렬하며(승수가 낮을수록 먼저 픽), 동률이면 랜덤하게 섞는다.
 # @param members 픽 순서를 정할 멤버 리스트.
+# @param record 승수를 읽을 전적(WinsRecord, 게임 시작 때 저장소에서 읽은 것).
 # @return 픽 순서대로 정렬된 멤버 리스트.
-def calculate_pick_order(members):
+def calculate_pick_order(members, record):
     # 각 멤버의 승수 가져오기
     member_wins = []
     for member in members:
         uid_str = str(member.id)
-        user_data = wins_data.get(uid_str)
-        wins = user_data.get("wins", 0) if isinstance(user_data, dict) else 0
+        wins = record.wins_of(uid_str)
         member_wins.append((member, wins))
 
     # 승수별로 그룹화
@@ -233,14 +366,15 @@ def calculate_pick_order(members):
 # === 팀 확인 헬퍼 ===
 ##
 # @brief 멤버가 어느 팀 소속인지 확인한다.
+# @param lobby 길드 로비.
 # @param member 확인할 멤버 객체.
 # @return "team1" 또는 "team2", 없으면 None.
-def get_member_team(member):
-    if not current_teams:
+def get_member_team(lobby, member):
+    if not lobby.teams:
         return None
-    if member in current_teams.get("team1", []):
+    if member in lobby.teams.get("team1", []):
         return "team1"
-    elif member in current_teams.get("team2", []):
+    elif member in lobby.teams.get("team2", []):
         return "team2"
     return None
 
@@ -265,10 +399,12 @@ def get_display_width(text):
 # === 선택 현황 업데이트 ===
 ##
 # @brief 현재 챔피언 선택 현황 문자열을 생성한다.
-# @details 팀별 이모지(🔵 team1, 🔴 team2), 각 플레이어 승수, 선택 완료/대기 상태를 표시한다.
+# @details 팀별 이모지(🔵 team1, 🔴 team2), 각 플레이어 승수(게임 시작 때의 lobby.wins), 선택 완료/대기 상태를 표시한다.
+# @param lobby 길드 로비.
 # @return 디스코드 메시지로 표시할 선택 현황 문자열.
-def get_selection_status():
+def get_selection_status(lobby):
     status = ""
+    pick_order = lobby.pick_order
 
     # 최대 display_name 폭 계산 (한글/영어 고려)
     max_name_width = (
@@ -278,13 +414,12 @@ def get_selection_status():
     )
 
     for i, member in enumerate(pick_order):
-        team = get_member_team(member)
+        team = get_member_team(lobby, member)
         check_emoji = "🔵" if team == "team1" else "🔴"
 
         # 승수 가져오기
         uid_str = str(member.id)
-        user_data = wins_data.get(uid_str)
-        wins = user_data.get("wins", 0) if isinstance(user_data, dict) else 0
+        wins = lobby.wins.wins_of(uid_str)
 
         # 이름 폭 기준 패딩 계산 ("--완료" 열 정렬용)
         current_width = get_display_width(member.display_name)
@@ -292,7 +427,7 @@ def get_selection_status():
         padding_count = (padding_width + 1) // 2  # 전각 공백 개수 (전각 1개 = 폭 2)
         name_padding = "　" * padding_count
 
-        if member.id in selected_users:
+        if member.id in lobby.selected_users:
             # 이미 선택 완료 (승수를 3자리로 고정, "--완료"만 간격 조정)
             status += f"{check_emoji} {member.mention}({wins:3d}승){name_padding}　　　--완료\n"
         else:
@@ -301,26 +436,41 @@ def get_selection_status():
     return status
 
 
+##
+# @brief 현재 차례 안내 description을 만든다.
+# @details config timer_display가 "timestamp"면 마감 시각을 디스코드 상대 시각(<t:unix:R>)으로 넣어
+#          클라이언트가 알아서 카운트다운하게 하고(타이머는 매초 수정하지 않음), "edit"(기본)이면
+#          남은 초를 적는다(타이머가 매초 수정).
+# @param picker 현재 차례 멤버.
+# @param remaining 남은 표시 초(없으면 제한 시간 전체 = 차례 시작).
+# @return description 문자열.
+def turn_description(picker, remaining=None):
+    if remaining is None:
+        remaining = config.get("pick_timeout", 15)
+    if config.get("timer_display", "edit") == "timestamp":
+        deadline = math.ceil(time.time() + remaining * config.get("timer_tick", 1.0))
+        countdown = f"## ⏰ 마감: <t:{deadline}:R>"
+    else:
+        countdown = f"## ⏰ 남은 시간: **{remaining}초**"
+    return f"## 현재 차례 - {picker.mention} 님의 차례입니다!\n\n{countdown}"
+
+
 ##
 # @brief 모든 채널의 챔피언 선택 embed을 병렬로 업데이트한다.
 # @details description에 현재 차례 플레이어와 남은 시간을, field 0에 선택 현황을 표시한다.
 #          embed description은 일반 field보다 크게 보이며, asyncio.gather로 모든 채널을 동시 갱신한다.
-async def update_champion_message():
-    if not champion_messages or not pick_order:
+# @param lobby 길드 로비.
+async def update_champion_message(lobby):
+    if not lobby.champion_messages or not lobby.pick_order:
         return
 
     # Description 및 필드 값 미리 계산 (모든 채널에 동일하게 적용)
-    if current_pick_index < len(pick_order):
-        current_picker = pick_order[current_pick_index]
-        timeout_val = config.get("pick_timeout", 15)
-        description = (
-            f"## 현재 차례 - {current_picker.mention} 님의 차례입니다!\n\n"
-            f"## ⏰ 남은 시간: **{timeout_val}초**"
-        )
+    if lobby.current_pick_index < len(lobby.pick_order):
+        description = turn_description(lobby.pick_order[lobby.current_pick_index])
     else:
         description = "## ✅ 모든 선택 완료!"
 
-    selection_status = get_selection_status()
+    selection_status = get_selection_status(lobby)
 
     # 각 채널 업데이트 태스크 생성
     # @brief 단일 채널 embed을 복사·수정 후 반영한다.
@@ -334,45 +484,95 @@ async def update_champion_message():
                 value=selection_status,
                 inline=False,
             )
-            view = champion_views.get(channel_id)
+            view = lobby.champion_views.get(channel_id)
             await message.edit(embed=embed, view=view)
         except Exception as e:
-            print(f"[ERROR] Failed to update message in channel {channel_id}: {e}")
+            log.error(f"Failed to update message in channel {channel_id}: {e}")
 
     # 모든 채널 동시 업데이트 (병렬 처리)
-    tasks = [update_single_channel(cid, msg) for cid, msg in champion_messages.items()]
+    tasks = [update_single_channel(cid, msg) for cid, msg in lobby.champion_messages.items()]
     await asyncio.gather(*tasks, return_exceptions=True)
 
 
+# === 전원 선택 완료 알림 ===
+##
+# @brief 모든 게임 채널 큐에 전원 선택 완료 메시지와 승리 팀 선택 View를 넣는다.
+# @details 완료 목록과 "승리한 팀을 선택" 안내는 병합 가능 텍스트라 한 메시지(View 포함)로 나간다.
+# @param lobby 길드 로비.
+def post_selection_complete(lobby):
+    msg = f"{MAX_PLAYERS}명 모두 선택 완료!\n"
+    for member in lobby.pick_order:
+        champ = lobby.selected_users.get(member.id, "❓")
+        msg += f"- {member.mention}: **{champ}**\n"
+    p = predict_team1(lobby, with_champs=True)
+    if p is not None:
+        msg += f"📊 예상 승률: {win_model.format_probability(p)}\n"
+
+    game_id = lobby.game_id
+    broadcaster.post(lobby.game_channels, msg, merge=True)
+    broadcaster.post(
+        lobby.game_channels,
+        "🎯 승리한 팀을 선택해주세요:",
+        view_factory=lambda ch: VictoryView(lobby, game_id),
+        merge=True,
+    )
+
+
+##
+# @brief 현재 팀 구성으로 TEAM1 승리 확률을 예측한다(모델 캐시 조회, 실패 시 None).
+# @param lobby 길드 로비.
+# @param with_champs True면 selected_users의 챔피언까지 특성에 넣는다.
+# @return 0~1 확률 또는 None.
+def predict_team1(lobby, with_champs=False):
+    selected_users = lobby.selected_users
+
+    # @brief 팀 멤버를 (uid, champ) 리스트로 만든다.
+    def team(key):
+        return [
+            (str(m.id), str(selected_users[m.id]) if with_champs and m.id in selected_users else None)
+            for m in lobby.teams.get(key, [])
+        ]
+
+    try:
+        with metrics.timer("win_model.predict"):
+            return win_model.get_model(DEV_MODE).predict(team("team1"), team("team2"))
+    except Exception as e:
+        log.warning(f"승리 확률 예측 실패: {e}")
+        return None
+
+
 # === 개인별 선택 타이머 ===
 ##
 # @brief 개인별 챔피언 선택 타이머를 관리한다.
 # @details 매 1초마다 남은 시간을 모든 채널 embed에 갱신하고, 시간 초과 시 현재 게임 챔피언
 #          중 랜덤으로 자동 배정한다. 다른 플레이어가 선택을 끝내면 index 검증으로 자동 종료된다.
+#          timer_display가 "timestamp"면 마감 시각이 이미 embed에 있으므로 수정 없이 마감까지 기다리기만 한다.
+# @param lobby 길드 로비.
 # @param picker_index 현재 선택할 플레이어의 인덱스.
-async def pick_timeout_handler(picker_index):
-    global selected_users, excluded, current_pick_index, current_timer_task
-
+async def pick_timeout_handler(lobby, picker_index):
+    pick_order = lobby.pick_order
     timeout = config.get("pick_timeout", 15)
     update_interval = 1
+    tick = config.get("timer_tick", 1.0)  # 표시 1초당 실제 대기(초), 부하 테스트에서 가속
     elapsed = 0
 
     try:
+        if config.get("timer_display", "edit") == "timestamp":
+            # 클라이언트가 <t:unix:R>로 카운트다운 → 상태가 바뀔 때(선택/시간 초과/차례 변경)만 수정
+            await asyncio.sleep(timeout * tick)
+            elapsed = timeout
+
         while elapsed < timeout:
             remaining = timeout - elapsed
 
             # 이 타이머가 여전히 현재 차례인지 확인
-            if picker_index != current_pick_index:
+            if picker_index != lobby.current_pick_index:
                 # 이미 다음 차례로 넘어갔으면 타이머 종료
                 return
 
             # 모든 채널의 메시지 업데이트 (남은 시간 표시) - 병렬 처리
-            if champion_messages and pick_order and picker_index < len(pick_order):
-                current_picker = pick_order[picker_index]
-                description = (
-                    f"## 현재 차례 - {current_picker.mention} 님의 차례입니다!\n\n"
-                    f"## ⏰ 남은 시간: **{remaining}초**"
-                )
+            if lobby.champion_messages and pick_order and picker_index < len(pick_order):
+                description = turn_description(pick_order[picker_index], remaining)
 
                 # @brief 남은 시간·선택 현황을 반영해 단일 채널 embed을 갱신한다.
                 async def update_timer(channel_id, message):
@@ -383,20 +583,20 @@ async def pick_timeout_handler(picker_index):
                         embed.set_field_at(
                             0,
                             name="선택 현황 및 픽순",
-                            value=get_selection_status(),
+                            value=get_selection_status(lobby),
                             inline=False,
                         )
-                        view = champion_views.get(channel_id)
+                        view = lobby.champion_views.get(channel_id)
                         await message.edit(embed=embed, view=view)
                     except:
                         pass  # 메시지 삭제됨 등의 에러 무시
 
                 tasks = [
-                    update_timer(cid, msg) for cid, msg in champion_messages.items()
+                    update_timer(cid, msg) for cid, msg in lobby.champion_messages.items()
                 ]
                 await asyncio.gather(*tasks, return_exceptions=True)
 
-            await asyncio.sleep(update_interval)
+            await asyncio.sleep(update_interval * tick)
             elapsed += update_interval
 
     except asyncio.CancelledError:
@@ -405,23 +605,23 @@ async def pick_timeout_handler(picker_index):
 
     # 타임아웃 후에도 선택 안했으면 자동 배정
     # 이 타이머가 여전히 현재 차례인지 재확인
-    if picker_index != current_pick_index:
+    if picker_index != lobby.current_pick_index:
         return
 
     current_picker = pick_order[picker_index]
-    if current_picker.id not in selected_users:
+    if current_picker.id not in lobby.selected_users:
         # 현재 게임의 챔피언 중 남은 챔피언에서 랜덤 선택
         available_champs = [
-            champ for champ in current_game_champions if champ["name"] not in excluded
+            champ for champ in lobby.game_champions if champ["name"] not in lobby.excluded
         ]
 
         if available_champs:
             random_champ = random.choice(available_champs)
-            selected_users[current_picker.id] = random_champ["name"]
-            excluded.add(random_champ["name"])
+            lobby.selected_users[current_picker.id] = random_champ["name"]
+            lobby.excluded.add(random_champ["name"])
 
             # 팀별 버튼 스타일 및 이모지
-            team = get_member_team(current_picker)
+            team = get_member_team(lobby, current_picker)
             team_emoji = "🔵" if team == "team1" else "🔴"
             button_style = (
                 discord.ButtonStyle.primary
@@ -430,7 +630,7 @@ async def pick_timeout_handler(picker_index):
             )
 
             # 모든 채널의 챔피언 버튼 스타일 변경
-            for channel_id, view in champion_views.items():
+            for channel_id, view in lobby.champion_views.items():
                 for item in view.children:
                     if (
                         isinstance(item, ChampionButton)
@@ -441,53 +641,26 @@ async def pick_timeout_handler(picker_index):
                         break
 
             # current_pick_index 증가 (embed 업데이트 전에 먼저 증가)
-            current_pick_index += 1
+            lobby.current_pick_index += 1
 
             # 버튼 변경사항을 즉시 Discord에 반영 (타임아웃 메시지 전에 먼저 업데이트)
-            await update_champion_message()
-
-            # 모든 채널에 타임아웃 메시지 전송 (병렬 처리)
-            # @brief 시간 초과 자동 배정 알림을 단일 채널에 전송한다.
-            async def send_timeout_msg(channel):
-                try:
-                    await channel.send(
-                        f"⏰ **{current_picker.mention}** 님 시간 초과! "
-                        f"{team_emoji} **{random_champ['name']}** 자동 배정되었습니다."
-                    )
-                except:
-                    pass
-
-            await asyncio.gather(
-                *[send_timeout_msg(ch) for ch in current_game_channels],
-                return_exceptions=True,
+            await update_champion_message(lobby)
+
+            # 모든 채널에 타임아웃 메시지 전송 (채널 큐, 완료 메시지가 뒤따르면 한 메시지로 병합)
+            broadcaster.post(
+                lobby.game_channels,
+                f"⏰ **{current_picker.mention}** 님 시간 초과! "
+                f"{team_emoji} **{random_champ['name']}** 자동 배정되었습니다.",
+                merge=True,
             )
 
             # 모두 선택 완료
-            if len(selected_users) >= MAX_PLAYERS:
-                msg = f"{MAX_PLAYERS}명 모두 선택 완료!\n"
-                for member in pick_order:
-                    champ = selected_users.get(member.id, "❓")
-                    msg += f"- {member.mention}: **{champ}**\n"
-
-                # 모든 채널에 완료 메시지 전송 (병렬 처리)
-                # @brief 전원 선택 완료 메시지와 승리 팀 선택 View를 전송한다.
-                async def send_complete_msg(channel):
-                    try:
-                        await channel.send(msg)
-                        await channel.send(
-                            "🎯 승리한 팀을 선택해주세요:", view=VictoryView()
-                        )
-                    except:
-                        pass
-
-                await asyncio.gather(
-                    *[send_complete_msg(ch) for ch in current_game_channels],
-                    return_exceptions=True,
-                )
+            if len(lobby.selected_users) >= MAX_PLAYERS:
+                post_selection_complete(lobby)
             else:
                 # 다음 유저 타이머 시작
-                current_timer_task = asyncio.create_task(
-                    pick_timeout_handler(current_pick_index)
+                lobby.timer_task = asyncio.create_task(
+                    pick_timeout_handler(lobby, lobby.current_pick_index)
                 )
 
 
@@ -499,61 +672,62 @@ class StartButton(Button):
 
     ##
     # @brief 시작 버튼 라벨·스타일·custom_id를 설정한다.
-    def __init__(self):
+    # @param lobby 이 버튼이 속한 길드 로비.
+    def __init__(self, lobby):
         super().__init__(
             label="🚀 챔피언 선택 시작",
             style=discord.ButtonStyle.success,
             custom_id="start_button",
         )
+        self.lobby = lobby
 
     ##
     # @brief 시작 버튼 클릭 처리. 게임을 시작하고 첫 플레이어 타이머를 건다.
     # @param interaction 버튼 클릭 상호작용 객체.
     async def callback(self, interaction: Interaction):
-        global game_started, current_timer_task
+        lobby = self.lobby
+        lobby.tag()
 
-        if game_started:
+        if lobby.game_started:
             await interaction.response.send_message(
                 "⚠️ 이미 게임이 시작되었습니다!", ephemeral=True
             )
             return
 
         # 게임 시작
-        game_started = True
-
-        await interaction.response.send_message(
-            "🚀 **챔피언 선택을 시작합니다!**", ephemeral=False
+        lobby.game_started = True
+
+        # 먼저 interaction에 응답 (3초 내), 채널 전파·embed 갱신은 ack 이후 처리
+        await interactions.run_acked(
+            interaction,
+            "start",
+            "🚀 **챔피언 선택을 시작합니다!**",
+            lambda: self._begin(interaction.channel.id),
+            ephemeral=False,
         )
 
-        # 클릭 채널을 제외한 나머지 게임 채널에도 시작 알림 전파
-        # @brief 클릭 채널 외 나머지 채널에 시작 알림을 전송한다.
-        async def send_start_msg(channel):
-            try:
-                await channel.send("🚀 **챔피언 선택을 시작합니다!**")
-            except:
-                pass
-
-        await asyncio.gather(
-            *[
-                send_start_msg(ch)
-                for ch in current_game_channels
-                if ch.id != interaction.channel.id
-            ],
-            return_exceptions=True,
+    ##
+    # @brief 시작 ack 이후 처리. 나머지 채널에 알림을 전파하고 첫 플레이어 타이머를 건다.
+    # @param clicked_channel_id 시작 버튼이 눌린 채널 ID(이미 응답했으므로 전파 제외).
+    async def _begin(self, clicked_channel_id):
+        lobby = self.lobby
+
+        # 클릭 채널을 제외한 나머지 게임 채널에도 시작 알림 전파 (채널 큐)
+        broadcaster.post(
+            [ch for ch in lobby.game_channels if ch.id != clicked_channel_id],
+            "🚀 **챔피언 선택을 시작합니다!**",
+            merge=True,
         )
+        await asyncio.to_thread(state_store.save_lobby, state, lobby.guild_id, STATE_OWNER, lobby.snapshot())
 
         # 모든 채널의 View에서 시작 버튼 제거
-        for channel_id, view in champion_views.items():
+        for channel_id, view in lobby.champion_views.items():
             for item in view.children[:]:
                 if isinstance(item, StartButton):
                     view.remove_item(item)
 
         # Embed description 업데이트 (첫 번째 플레이어 차례)
-        timeout_val = config.get("pick_timeout", 15)
-        description = (
-            f"## 현재 차례 - {pick_order[0].mention} 님의 차례입니다!\n\n"
-            f"## ⏰ 남은 시간: **{timeout_val}초**"
-        )
+        description = turn_description(lobby.pick_order[0])
 
         # 모든 채널의 메시지 업데이트 (병렬 처리)
         # @brief 시작 시점의 embed description을 단일 채널에 반영한다.
@@ -561,16 +735,16 @@ class StartButton(Button):
             try:
                 embed = message.embeds[0].copy()
                 embed.description = description
-                view = champion_views.get(channel_id)
+                view = lobby.champion_views.get(channel_id)
                 await message.edit(embed=embed, view=view)
             except:
                 pass
 
-        tasks = [update_start(cid, msg) for cid, msg in champion_messages.items()]
+        tasks = [update_start(cid, msg) for cid, msg in lobby.champion_messages.items()]
         await asyncio.gather(*tasks, return_exceptions=True)
 
         # 첫 번째 유저 타이머 시작
-        current_timer_task = asyncio.create_task(pick_timeout_handler(0))
+        lobby.timer_task = asyncio.create_task(pick_timeout_handler(lobby, 0))
 
 
 # === 챔피언 선택 버튼 클래스 ===
@@ -582,19 +756,24 @@ class ChampionButton(Button):
 
     ##
     # @brief 챔피언 이름으로 버튼을 초기화한다.
+    # @param lobby 이 버튼이 속한 길드 로비.
     # @param champ_name 이 버튼이 나타내는 챔피언 이름.
-    def __init__(self, champ_name):
+    def __init__(self, lobby, champ_name):
         super().__init__(label=champ_name, style=discord.ButtonStyle.secondary)
+        self.lobby = lobby
         self.champ_name = champ_name
 
     ##
     # @brief 챔피언 버튼 클릭 처리. 턴 검증 후 선택/취소하고 다음 차례로 넘긴다.
     # @param interaction 버튼 클릭 상호작용 객체.
     async def callback(self, interaction: Interaction):
-        global selected_users, excluded, current_pick_index, current_timer_task
+        lobby = self.lobby
+        lobby.tag()
+        selected_users = lobby.selected_users
+        pick_order = lobby.pick_order
 
         # 게임 시작 확인
-        if not game_started:
+        if not lobby.game_started:
             await interaction.response.send_message(
                 "⚠️ 먼저 '🚀 챔피언 선택 시작' 버튼을 눌러주세요!",
                 ephemeral=True,
@@ -608,13 +787,13 @@ class ChampionButton(Button):
             )
             return
 
-        if current_pick_index >= len(pick_order):
+        if lobby.current_pick_index >= len(pick_order):
             await interaction.response.send_message(
                 "⚠️ 모든 선택이 완료되었습니다!", ephemeral=True
             )
             return
 
-        current_picker = pick_order[current_pick_index]
+        current_picker = pick_order[lobby.current_pick_index]
 
         # 턴제 확인 (DEV_MODE가 아닐 때만)
         if not DEV_MODE:
@@ -631,10 +810,10 @@ class ChampionButton(Button):
             and selected_users[current_picker.id] == self.champ_name
         ):
             del selected_users[current_picker.id]
-            excluded.discard(self.champ_name)
+            lobby.excluded.discard(self.champ_name)
 
             # 모든 채널의 버튼 스타일 초기화
-            for channel_id, view in champion_views.items():
+            for channel_id, view in lobby.champion_views.items():
                 for item in view.children:
                     if (
                         isinstance(item, ChampionButton)
@@ -644,14 +823,8 @@ class ChampionButton(Button):
                         item.style = discord.ButtonStyle.secondary
                         break
 
-            # 먼저 interaction에 응답
-            await interaction.response.send_message(
-                f"↩️ **{self.champ_name}** 선택 취소",
-                ephemeral=True,
-            )
-
             # 모든 채널의 embed 업데이트 (병렬 처리)
-            selection_status = get_selection_status()
+            selection_status = get_selection_status(lobby)
 
             # @brief 선택 취소 후 선택 현황을 단일 채널 embed에 반영한다.
             async def update_cancel(channel_id, message):
@@ -663,13 +836,22 @@ class ChampionButton(Button):
                         value=selection_status,
                         inline=False,
                     )
-                    view = champion_views.get(channel_id)
+                    view = lobby.champion_views.get(channel_id)
                     await message.edit(embed=embed, view=view)
                 except:
                     pass
 
-            tasks = [update_cancel(cid, msg) for cid, msg in champion_messages.items()]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # @brief 취소 ack 이후 모든 채널 embed을 갱신한다.
+            async def after_cancel():
+                tasks = [
+                    update_cancel(cid, msg) for cid, msg in lobby.champion_messages.items()
+                ]
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            # 먼저 interaction에 응답
+            await interactions.run_acked(
+                interaction, "cancel", f"↩️ **{self.champ_name}** 선택 취소", after_cancel
+            )
             return
 
         # 이미 선택된 챔피언
@@ -687,15 +869,15 @@ class ChampionButton(Button):
             return
 
         # 현재 타이머 취소
-        if current_timer_task and not current_timer_task.done():
-            current_timer_task.cancel()
+        if lobby.timer_task and not lobby.timer_task.done():
+            lobby.timer_task.cancel()
 
         # 챔피언 선택
         selected_users[current_picker.id] = self.champ_name
-        excluded.add(self.champ_name)
+        lobby.excluded.add(self.champ_name)
 
         # 팀별 버튼 색상 및 이모지
-        team = get_member_team(current_picker)
+        team = get_member_team(lobby, current_picker)
         team_emoji = "🔵" if team == "team1" else "🔴"
         button_style = (
             discord.ButtonStyle.primary
@@ -704,7 +886,7 @@ class ChampionButton(Button):
         )
 
         # 모든 채널의 버튼 스타일 변경
-        for channel_id, view in champion_views.items():
+        for channel_id, view in lobby.champion_views.items():
             for item in view.children:
                 if (
                     isinstance(item, ChampionButton)
@@ -714,27 +896,29 @@ class ChampionButton(Button):
                     item.style = button_style
                     break
 
-        # 먼저 interaction에 응답 (3초 내) - 본인에게만 보임
-        await interaction.response.send_message(
+        # 다음 차례로 이동
+        lobby.current_pick_index += 1
+
+        # 먼저 interaction에 응답 (3초 내) - 본인에게만 보임, 채널 갱신은 ack 이후 처리
+        await interactions.run_acked(
+            interaction,
+            "pick",
             f"{team_emoji} **{self.champ_name}** 선택 완료!",
-            ephemeral=True,
+            self._advance,
         )
 
-        # 다음 차례로 이동
-        current_pick_index += 1
+    ##
+    # @brief 선택 ack 이후 처리. 모든 채널 embed을 갱신하고 완료 메시지 또는 다음 타이머로 넘긴다.
+    async def _advance(self):
+        lobby = self.lobby
 
         # Description 및 선택 현황 미리 계산
-        if current_pick_index < len(pick_order):
-            next_picker = pick_order[current_pick_index]
-            timeout_val = config.get("pick_timeout", 15)
-            description = (
-                f"## 현재 차례 - {next_picker.mention} 님의 차례입니다!\n\n"
-                f"## ⏰ 남은 시간: **{timeout_val}초**"
-            )
+        if lobby.current_pick_index < len(lobby.pick_order):
+            description = turn_description(lobby.pick_order[lobby.current_pick_index])
         else:
             description = "## ✅ 모든 선택 완료!"
 
-        selection_status = get_selection_status()
+        selection_status = get_selection_status(lobby)
 
         # 모든 채널의 embed 업데이트 (병렬 처리)
         # @brief 선택 후 다음 차례 description·선택 현황을 단일 채널에 반영한다.
@@ -748,66 +932,143 @@ class ChampionButton(Button):
                     value=selection_status,
                     inline=False,
                 )
-                view = champion_views.get(channel_id)
+                view = lobby.champion_views.get(channel_id)
                 await message.edit(embed=embed, view=view)
             except:
                 pass
 
-        tasks = [update_pick(cid, msg) for cid, msg in champion_messages.items()]
+        tasks = [update_pick(cid, msg) for cid, msg in lobby.champion_messages.items()]
         await asyncio.gather(*tasks, return_exceptions=True)
 
         # 모두 선택 완료
-        if len(selected_users) >= MAX_PLAYERS:
-            msg = f"{MAX_PLAYERS}명 모두 선택 완료!\n"
-            for member in pick_order:
-                champ = selected_users.get(member.id, "❓")
-                msg += f"- {member.mention}: **{champ}**\n"
-
-            # 모든 채널에 완료 메시지 전송 (병렬 처리)
-            # @brief 전원 선택 완료 메시지와 승리 팀 선택 View를 전송한다.
-            async def send_final_msg(channel):
-                try:
-                    await channel.send(msg)
-                    await channel.send(
-                        "🎯 승리한 팀을 선택해주세요:", view=VictoryView()
-                    )
-                except:
-                    pass
-
-            await asyncio.gather(
-                *[send_final_msg(ch) for ch in current_game_channels],
-                return_exceptions=True,
-            )
+        if len(lobby.selected_users) >= MAX_PLAYERS:
+            post_selection_complete(lobby)
         else:
             # 다음 유저 타이머 시작 (이전 타이머는 자동으로 index 체크로 종료됨)
-            current_timer_task = asyncio.create_task(
-                pick_timeout_handler(current_pick_index)
+            lobby.timer_task = asyncio.create_task(
+                pick_timeout_handler(lobby, lobby.current_pick_index)
             )
 
 
+# === 다음 판 미리 준비 ===
+##
+# @brief 다음 판에 제시할 챔피언 후보·초상화 격자·채널별 View.
+# @details 승리 기록 직후(그리고 봇 시작 직후) 백그라운드에서 만들어 두면 /게임시작은 확인만 하고
+#          메시지를 보내기만 하면 된다. 만든 뒤 챔피언 목록·제외 목록·설정이 바뀌었으면 쓰지 않는다.
+#          참가자 스캔은 접속 상태가 판 사이에 바뀌므로 미리 하지 않는다.
+class PreparedRound:
+    __slots__ = ("source", "champions", "champion_count", "grid", "grid_png", "views")
+
+    def __init__(self, source, champions, champion_count, grid, grid_png, views):
+        self.source = source
+        self.champions = champions
+        self.champion_count = champion_count
+        self.grid = grid
+        self.grid_png = grid_png
+        self.views = views
+
+    ##
+    # @brief 지금 상태에서 그대로 쓸 수 있는지(같은 챔피언 목록·수·격자 설정, 후보가 제외되지 않음).
+    # @param excluded 준비물을 쓸 로비의 제외 챔피언 집합.
+    def usable(self, champ_count, grid, excluded):
+        return (
+            self.source is champion_list
+            and self.champion_count == champ_count
+            and self.grid == grid
+            and not any(champ["name"] in excluded for champ in self.champions)
+        )
+
+
+##
+# @brief 시작 버튼 + 챔피언 버튼 View를 만든다(채널마다 독립적인 View 필요).
+# @param lobby 버튼이 속할 길드 로비.
+# @param champ_names 버튼 순서대로의 챔피언 이름 리스트.
+# @return View.
+def build_champion_view(lobby, champ_names):
+    view = View(timeout=None)
+    view.add_item(StartButton(lobby))  # 시작 버튼 추가
+    for champ in champ_names:
+        view.add_item(ChampionButton(lobby, champ))
+    return view
+
+
+##
+# @brief 다음 판 준비물을 만든다(챔피언 후보 추첨, 격자 합성은 스레드, View는 루프에서).
+# @param lobby 준비물을 받을 길드 로비.
+# @param channel_ids View를 미리 만들 채널 id 리스트(이번 판 게임 채널).
+async def prepare_next_round(lobby, channel_ids):
+    lobby.next_round = None
+    champ_count = config.get("champion_count", 8)
+    grid = config.get("champion_grid", True)
+    source = champion_list
+    champions = pick_random_champions(source, lobby.excluded, champ_count)
+    if not champions:
+        return
+    with metrics.timer("start.prepare"):
+        grid_png = await asyncio.to_thread(sprite_grid.get_grid, champions) if grid else None
+        names = [champ["name"] for champ in champions]
+        views = {channel_id: build_champion_view(lobby, names) for channel_id in channel_ids}
+    lobby.next_round = PreparedRound(source, champions, champ_count, grid, grid_png, views)
+
+
+##
+# @brief 다음 판 준비를 백그라운드로 시작한다(그 로비에서 진행 중이던 준비는 취소).
+# @param lobby 준비물을 받을 길드 로비.
+# @param channel_ids View를 미리 만들 채널 id 리스트.
+def schedule_prepare(lobby, channel_ids):
+    if lobby.prepare_task and not lobby.prepare_task.done():
+        lobby.prepare_task.cancel()
+    if not config.get("prepare_next_round", True):
+        return
+    task = lobby.prepare_task = asyncio.create_task(prepare_next_round(lobby, list(channel_ids)))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+##
+# @brief 미리 준비한 판을 꺼낸다(지금 상태와 맞지 않으면 None).
+# @details 아직 준비 중이면 끝나기를 기다린다(이미 하던 일이라 새로 만드는 것보다 늦지 않음).
+# @param lobby 길드 로비.
+# @param champ_count 제시할 챔피언 수.
+# @param grid 격자 이미지 사용 여부.
+# @return PreparedRound 또는 None. 꺼낸 준비물은 다시 쓰지 않는다.
+async def take_prepared_round(lobby, champ_count, grid):
+    task, lobby.prepare_task = lobby.prepare_task, None
+    if task is not None and not task.done():
+        try:
+            await task
+        except Exception as e:
+            log.warning(f"다음 판 준비 실패: {e}")
+    prepared, lobby.next_round = lobby.next_round, None
+    if prepared is None or not prepared.usable(champ_count, grid, lobby.excluded):
+        metrics.incr("start.prepare_miss")
+        return None
+    metrics.incr("start.prepare_hit")
+    return prepared
+
+
 # === /게임시작 (기존 팀짜기) ===
 ##
 # @brief /게임시작 슬래시 커맨드. 팀을 나누고 랜덤 챔피언 픽을 준비한다.
 # @details 온라인 유저(또는 DEV_MODE의 가상 유저) 중 6명을 뽑아 두 팀으로 나누고, 승수 기반
 #          픽 순서를 계산한 뒤 각 채널에 팀 구성 embed과 챔피언 선택 View를 전송한다.
+#          상태는 명령을 실행한 길드의 로비에만 쓰므로 다른 길드의 진행 중인 게임은 건드리지 않는다.
 #          타이머는 시작 버튼을 누를 때까지 시작하지 않는다.
 # @param ctx 슬래시 커맨드 상호작용 컨텍스트.
 @bot.slash_command(name="게임시작", description="팀을 나누고 랜덤 챔피언을 보여줍니다.")
 async def 게임시작(ctx):
-    global current_teams, selected_users, pick_order, current_pick_index, current_timer_task
-    global champion_messages, champion_views, current_game_champions, game_started, current_game_channels, victory_processed
+    lobby = get_lobby(ctx.guild.id)
+    started_at = time.perf_counter()
 
     if DEV_MODE:
         # DEV_MODE: wins.json에서 가상 유저 생성
-        if not wins_data:
+        if not wins_data.players:
             await ctx.respond("⚠️ wins.json 파일이 비어있습니다!", ephemeral=True)
             return
 
-        # total_rounds 제외하고 유저만 생성
-        members = [
-            MockUser(int(uid), data["name"])
-            for uid, data in wins_data.items()
-            if uid != "total_rounds" and isinstance(data, dict)
+        # 전적의 유저로 생성 (dev_loadgen이 풀을 넣었으면 그 풀에서)
+        members = mock_members or [
+            MockUser(int(uid), p.name) for uid, p in wins_data.players.items()
         ]
         if len(members) < MAX_PLAYERS:
             await ctx.respond(
@@ -829,100 +1090,120 @@ async def 게임시작(ctx):
             )
             return
 
-    # 게임 상태 초기화
-    selected_users.clear()
-    game_started = False
-    victory_processed = False
-    current_pick_index = 0
-    champion_messages.clear()
-    champion_views.clear()
+    # 다른 샤드 프로세스가 이 길드에서 게임을 진행 중이면 시작하지 않음 (재시작/배포 중 중복 방지)
+    # 같은 스레드 홉에서 저장소의 최신 전적을 읽음 (다른 프로세스가 기록한 판까지 반영한 승수·라운드)
+    owner, wins = await asyncio.to_thread(claim_game, lobby)
+    if owner is not None:
+        await ctx.respond(f"⚠️ 다른 봇 프로세스({owner})에서 게임이 진행 중입니다.", ephemeral=True)
+        return
+    adopt_wins(wins)
+
+    # 이 길드의 게임 상태 초기화 (진행 중이던 게임을 버리고 새로 시작하면 이전 차례 타이머도 정지)
+    lobby.reset(wins)
     half = MAX_PLAYERS // 2
 
-    if DEV_MODE:
+    if DEV_MODE and not mock_members:
         # 테스트 모드: wins.json의 6명 사용
         selected = members[:MAX_PLAYERS]
     else:
         selected = random.sample(members, MAX_PLAYERS)
 
     # 픽 순서 계산 (승수 기반)
-    pick_order = calculate_pick_order(selected)
+    lobby.pick_order = calculate_pick_order(selected, wins)
 
     # 팀 구성 (랜덤 분할)
     shuffled_for_teams = selected.copy()
     random.shuffle(shuffled_for_teams)
-    current_teams = {
+    lobby.teams = {
         "team1": shuffled_for_teams[:half],
         "team2": shuffled_for_teams[half:],
     }
 
     # 게임에 사용할 채널들 먼저 확보 (명령 실행 채널 + config 채널들)
-    current_game_channels = get_game_channels(ctx.guild, ctx.channel)
-    if not current_game_channels:
+    lobby.game_channels = get_game_channels(ctx.guild, ctx.channel)
+    lobby.tag()
+    if not lobby.game_channels:
         await ctx.channel.send(
             "⚠️ 설정된 채널을 찾을 수 없습니다. config.json을 확인해주세요!"
         )
         return
 
-    embed = Embed(title=f"🔀 ROUND {round_counter}: 팀 구성", color=0xFFD700)
+    embed = Embed(title=f"🔀 ROUND {lobby.round}: 팀 구성", color=0xFFD700)
     for key in ["team1", "team2"]:
         team_emoji = "🔵" if key == "team1" else "🔴"
         embed.add_field(
             name=f"{team_emoji} {key.upper()}",
-            value="\n".join([m.mention for m in current_teams[key]]),
+            value="\n".join([m.mention for m in lobby.teams[key]]),
             inline=True,
         )
+    p = predict_team1(lobby)
+    if p is not None:
+        embed.add_field(name="📊 예상 승률", value=win_model.format_probability(p), inline=False)
     # 명령 채널(channels[0])은 respond로, 나머지 채널은 send로 전파
     await ctx.respond(embed=embed)
+    metrics.observe("start.first_message", time.perf_counter() - started_at)
 
-    async def send_team_embed(channel):
-        try:
-            await channel.send(embed=embed)
-        except Exception as e:
-            print(f"[ERROR] 팀 구성 embed 전송 실패 ({channel.name}): {e}")
-
-    await asyncio.gather(
-        *[send_team_embed(ch) for ch in current_game_channels[1:]],
-        return_exceptions=True,
-    )
+    broadcaster.post(lobby.game_channels[1:], embed=embed)
 
-    # 자동으로 챔피언 추천도 실행
+    # 자동으로 챔피언 추천도 실행 (지난 판 기록 직후 미리 준비한 후보·격자·View가 맞으면 그대로 사용)
     champ_count = config.get("champion_count", 8)
-    picked_champ = pick_random_champions(champion_list, excluded, champ_count)
-    current_game_champions = picked_champ  # 현재 게임 챔피언 저장
+    use_grid = config.get("champion_grid", True)
+    prepared = await take_prepared_round(lobby, champ_count, use_grid)
+    if prepared is not None:
+        picked_champ = prepared.champions
+    else:
+        picked_champ = pick_random_champions(champion_list, lobby.excluded, champ_count)
+    lobby.game_champions = picked_champ  # 현재 게임 챔피언 저장
     champ_names = [champ["name"] for champ in picked_champ]
 
     # Embed 생성 - description에 게임 시작 대기 메시지
     embed2 = Embed(title=f"무작위 챔피언 {champ_count}명", color=0x00CCFF)
     embed2.description = (
         f"## 🚀 준비 완료!\n"
-        f"**'{pick_order[0].mention}' 님부터 시작합니다.**\n\n"
+        f"**'{lobby.pick_order[0].mention}' 님부터 시작합니다.**\n\n"
         f"아래 **'🚀 챔피언 선택 시작'** 버튼을 눌러 게임을 시작하세요!"
     )
 
     # Field 0: 선택 현황 및 픽순
     embed2.add_field(
         name="선택 현황 및 픽순",
-        value=get_selection_status(),
+        value=get_selection_status(lobby),
         inline=False,
     )
 
-    # 각 채널에 챔피언 선택 메시지 전송
-    for channel in current_game_channels:
-        try:
-            # View 생성 - 시작 버튼 + 챔피언 버튼들 (각 채널마다 독립적인 View 필요)
-            view = View(timeout=None)
-            view.add_item(StartButton())  # 시작 버튼 추가
-            for champ in champ_names:
-                view.add_item(ChampionButton(champ))
-
-            # 메시지 전송
-            message = await channel.send(embed=embed2, view=view)
-
-            # 저장
-            champion_messages[channel.id] = message
-            champion_views[channel.id] = view
-        except Exception as e:
-            print(f"[ERROR] Failed to send message to channel {channel.name}: {e}")
+    # 제시 챔피언 초상화 격자 (한 장으로 합성해 첨부, 같은 조합은 LRU 캐시)
+    grid_png = None
+    if prepared is not None:
+        grid_png = prepared.grid_png
+    elif use_grid:
+        grid_png = await asyncio.to_thread(sprite_grid.get_grid, picked_champ)
+    if grid_png is not None:
+        embed2.set_image(url=f"attachment://{GRID_FILENAME}")
+
+    # @brief 채널별 View - 미리 만든 것이 있으면 쓰고 없으면 새로 만든다
+    def make_champion_view(channel):
+        view = prepared.views.pop(channel.id, None) if prepared is not None else None
+        if view is None:
+            view = build_champion_view(lobby, champ_names)
+        lobby.champion_views[channel.id] = view
+        return view
+
+    # 각 채널에 챔피언 선택 메시지 전송 (팀 구성 embed 뒤에 채널 큐 순서대로)
+    messages = await broadcaster.send(
+        lobby.game_channels,
+        embed=embed2,
+        view_factory=make_champion_view,
+        file_factory=(lambda ch: discord.File(io.BytesIO(grid_png), GRID_FILENAME)) if grid_png else None,
+    )
+    for channel, message in zip(lobby.game_channels, messages):
+        if message is None:
+            lobby.champion_views.pop(channel.id, None)
+            continue
+        lobby.champion_messages[channel.id] = message
+    metrics.observe("start.ready", time.perf_counter() - started_at)
+
+    # 로비 요약 갱신 (소유권은 위에서 이미 잡았으므로 첫 메시지 뒤로 미룸)
+    await asyncio.to_thread(state_store.save_lobby, state, lobby.guild_id, STATE_OWNER, lobby.snapshot())
 
     # 타이머는 시작 버튼을 누를 때까지 시작하지 않음
 
@@ -931,15 +1212,23 @@ async def 게임시작(ctx):
 ##
 # @brief 승리한 팀을 고르는 셀렉트 메뉴.
 # @details 각 팀 멤버가 고른 챔피언을 라벨에 표시하고, 선택 시 전적·판 기록을 갱신한다.
+#          셀렉트는 만들 때의 로비·게임 id에 묶여, 여러 채널에서 동시에 눌러도 그 게임은 한 번만
+#          커밋된다(victory_commit.CommitPipeline). 이전 게임의 셀렉트는 거부한다.
 class VictorySelect(Select):
 
     ##
     # @brief 양 팀 옵션(팀명 + 픽한 챔피언 목록)을 만들어 셀렉트를 초기화한다.
-    def __init__(self):
+    # @param lobby 이 셀렉트가 속한 길드 로비.
+    # @param game_id 이 셀렉트가 속한 게임 id(진행 중인 게임이 없으면 None).
+    def __init__(self, lobby, game_id):
+        self.lobby = lobby
+        self.game_id = game_id
+        self.round = None  # 커밋이 끝나면 저장소가 정한 라운드 번호
+
         # @brief 팀 멤버가 고른 챔피언들을 라벨 문자열로 만든다.
         def label_with_champs(team_key):
-            members = current_teams.get(team_key, [])
-            champ_list = [selected_users.get(m.id, "❓") for m in members]
+            members = lobby.teams.get(team_key, [])
+            champ_list = [lobby.selected_users.get(m.id, "❓") for m in members]
             champ_text = ", ".join(champ_list)
             return f"TEAM {team_key[-1]} ({champ_text})"
 
@@ -954,117 +1243,68 @@ class VictorySelect(Select):
             max_values=1,
         )
 
+    ##
+    # @brief 커밋 전 검증. 상태를 바꾸지 않으므로 실패해도 다시 선택할 수 있다.
+    # @param teams 선택 시점에 떠 둔 팀 구성.
+    # @param selected 선택 시점에 떠 둔 픽 {user_id: 챔피언}.
+    # @return 문제가 있으면 사용자 안내 문자열, 없으면 None.
+    def _validate(self, teams, selected):
+        if not teams or self.game_id is None:
+            return "⚠️ 먼저 `/게임시작`으로 팀을 구성해주세요!"
+        if self.game_id != self.lobby.game_id:
+            return "⚠️ 이전 게임의 선택창입니다. 현재 게임의 선택창을 이용해주세요!"
+        for key in teams:
+            for member in teams[key]:
+                if member.id not in selected:
+                    return f"❌ {member.mention} 님이 챔피언을 선택하지 않았습니다!"
+        return None
+
     ##
     # @brief 승리 팀 선택 처리. 전적·wins_data·판 기록을 갱신하고 결과를 방송한다.
+    # @details 팀·픽·채널은 첫 await 전에 떠 두고 이후에는 그 사본만 쓴다 — 기록하는 동안 같은 길드에서
+    #          /게임시작이 로비를 새 게임으로 바꿔도 이 게임의 결과가 섞이지 않는다. 로비를 비우고 다음 판을
+    #          준비하는 것은 로비가 아직 이 게임일 때만 한다.
     # @param interaction 셀렉트 상호작용 객체.
     async def callback(self, interaction: Interaction):
-        global round_counter, current_teams, wins_data, victory_processed
-
-        if victory_processed:
-            await interaction.response.send_message(
-                "⚠️ 이미 승리 처리가 완료되었습니다!", ephemeral=True
-            )
-            return
-
-        if not current_teams:
-            await interaction.response.send_message(
-                "⚠️ 먼저 `/게임시작`으로 팀을 구성해주세요!", ephemeral=True
-            )
-            return
-
-        victory_processed = True
-
-        for key in current_teams:
-            for member in current_teams[key]:
-                if member.id not in selected_users:
-                    await interaction.response.send_message(
-                        f"❌ {member.mention} 님이 챔피언을 선택하지 않았습니다!",
-                        ephemeral=True,
-                    )
-                    return
-
+        lobby = self.lobby
+        lobby.tag()
         team_key = self.values[0]
-
-        # 전적 업데이트 (overall_results + wins_data)
-        for key in current_teams:
-            for member in current_teams[key]:
-                uid = member.id
-                uid_str = str(uid)
-
-                # overall_results 업데이트 (세션 전적)
-                if uid not in overall_results:
-                    overall_results[uid] = {"mention": member.mention, "results": []}
-                overall_results[uid]["results"].append("O" if key == team_key else "X")
-
-                # wins_data 업데이트 (영구 전적)
-                if key == team_key:  # 승리 팀만
-                    if uid_str in wins_data:
-                        wins_data[uid_str]["wins"] += 1
-                    else:
-                        # 새 유저 추가
-                        wins_data[uid_str] = {"name": member.display_name, "wins": 1}
-
-        # total_rounds 증가
-        wins_data["total_rounds"] = wins_data.get("total_rounds", 0) + 1
-
-        # wins 데이터 파일에 저장
-        save_wins(wins_data)
-
-        # history_data에 판 기록 (대시보드용) - 실패해도 승리 처리에는 영향 없음
-        try:
-            season = record_game(
-                round_counter,
-                {
-                    tk: [
-                        {
-                            "id": str(m.id),
-                            "name": m.display_name,
-                            "champ": str(selected_users.get(m.id, "")),
-                        }
-                        for m in current_teams[tk]
-                    ]
-                    for tk in ("team1", "team2")
-                },
-                team_key,
-                DEV_MODE,
-            )
-            print(f"[RECORD] history_data: 시즌{season} R{round_counter} 기록 완료")
-            # record_game 내부에서 호스팅 SFTP 업로드까지 처리 (백그라운드, 실패해도 무영향)
-        except Exception as e:
-            print(f"[WARN] history_data 기록 실패: {e}")
-
-        # @brief 팀 멤버와 픽한 챔피언을 embed용 문자열로 만든다.
-        def format_team(key):
-            return "\n".join(
-                f"{m.mention}: **{selected_users.get(m.id, '챔피언 없음')}**"
-                for m in current_teams[key]
-            )
-
-        embed = Embed(title=f"🏆 ROUND {round_counter} 결과", color=0x44DD88)
-        embed.add_field(name="TEAM 1", value=format_team("team1"), inline=True)
-        embed.add_field(name="TEAM 2", value=format_team("team2"), inline=True)
-        embed.add_field(name="승리 팀", value=f"**{team_key.upper()}**", inline=False)
-        await interaction.response.send_message(
-            f"✅ **{team_key.upper()}** 승리 기록 완료!", ephemeral=True
+        teams = {k: list(v) for k, v in lobby.teams.items()}
+        selected = dict(lobby.selected_users)
+        channels = list(lobby.game_channels)
+
+        # 검증 통과 시에만 defer로 ack (3초 내) → 저장·기록은 ack 이후 → 완료 안내는 followup
+        status, result = await victory_pipeline.run(
+            self.game_id,
+            lambda: self._validate(teams, selected),
+            lambda: interactions.run_deferred(
+                interaction, "victory", lambda: self._commit(team_key, teams, selected)
+            ),
         )
+        if status != victory_commit.COMMITTED:
+            metrics.incr(f"victory.{status}")
+            if status == victory_commit.INVALID:
+                message = result
+            elif status == victory_commit.IN_PROGRESS:
+                message = "⏳ 승리 처리 중입니다. 잠시 후 결과가 표시됩니다."
+            else:
+                message = "⚠️ 이미 승리 처리가 완료되었습니다!"
+            await interaction.response.send_message(message, ephemeral=True)
+            return
 
-        # 모든 게임 채널에 결과 embed 전송
-        # @brief 결과 embed을 단일 채널에 전송한다.
-        async def send_result(channel):
-            try:
-                await channel.send(embed=embed)
-            except Exception as e:
-                print(f"[ERROR] 결과 embed 전송 실패 ({channel.name}): {e}")
+        embed = self._result_embed(team_key, teams, selected)
 
-        await asyncio.gather(
-            *[send_result(ch) for ch in current_game_channels],
-            return_exceptions=True,
-        )
+        # 모든 게임 채널에 결과 embed 전송 (채널 큐)
+        broadcaster.post(channels, embed=embed)
 
-        round_counter += 1
-        current_teams.clear()
+        if lobby.game_id == self.game_id:  # 그사이 /게임시작으로 새 게임이 시작됐으면 그 게임은 건드리지 않음
+            lobby.teams.clear()
 
-        # 전체 전적 출력
+            # 다음 판 챔피언 후보·격자·View를 백그라운드에서 미리 준비 (/게임시작은 보내기만)
+            schedule_prepare(lobby, (ch.id for ch in channels))
+
+        # 전체 전적 출력 (이 길드의 세션 결과)
+        overall_results = lobby.overall_results
         if overall_results:
             # 오늘의 결과 섹션
             today_msg = "━━━━━━━━━━━━━━━━━━━━━━━━━\n"
@@ -1084,9 +1324,8 @@ class VictorySelect(Select):
 
             today_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━"
 
-            # 모든 게임 채널에 오늘의 결과 전송
-            today_tasks = [ch.send(today_msg) for ch in current_game_channels]
-            await asyncio.gather(*today_tasks, return_exceptions=True)
+            # 모든 게임 채널에 오늘의 결과 전송 (바로 뒤 누적 전적과 한 메시지로 병합)
+            broadcaster.post(channels, today_msg, merge=True)
 
             # 누적 전적 섹션
             total_msg = "━━━━━━━━━━━━━━━━━━━━━━━━━\n"
@@ -1096,10 +1335,10 @@ class VictorySelect(Select):
             for uid, record in overall_results.items():
                 # 누적 전적 (wins_data에서)
                 uid_str = str(uid)
-                user_data = wins_data.get(uid_str)
-                if isinstance(user_data, dict):
-                    total_wins = user_data.get("wins", 0)
-                    total_games = wins_data.get("total_rounds", 0)
+                user_data = wins_data.players.get(uid_str)
+                if user_data is not None:
+                    total_wins = user_data.wins
+                    total_games = wins_data.total_rounds
                     total_losses = total_games - total_wins
                     total_winrate = (
                         (total_wins / total_games * 100) if total_games > 0 else 0
@@ -1114,8 +1353,81 @@ class VictorySelect(Select):
             total_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━"
 
             # 모든 게임 채널에 누적 전적 전송
-            total_tasks = [ch.send(total_msg) for ch in current_game_channels]
-            await asyncio.gather(*total_tasks, return_exceptions=True)
+            broadcaster.post(channels, total_msg, merge=True)
+
+    ##
+    # @brief 승리 결과를 전적·wins 파일·판 기록에 반영한다(ack 이후 실행).
+    # @details 영구 전적·wins 파일 사본·판 기록·이벤트 로그는 victory_commit.record()가 저장소
+    #          트랜잭션 하나 안에서 처리한다(다른 샤드 프로세스·다른 길드와 직렬화, round 번호도 여기서
+    #          정해짐, 같은 게임 id면 다시 쓰지 않음). 블로킹 I/O라 스레드에서 실행한다. overall_results는
+    #          기록이 끝난 뒤 갱신해서, 실패 후 다시 선택해도 세션 전적이 두 번 쌓이지 않는다.
+    # @param team_key 승리 팀 키("team1" 또는 "team2").
+    # @param teams 선택 시점에 떠 둔 팀 구성.
+    # @param selected 선택 시점에 떠 둔 픽 {user_id: 챔피언}.
+    # @return followup으로 보낼 완료 안내 문자열.
+    async def _commit(self, team_key, teams, selected):
+        lobby = self.lobby
+        # 영구 전적 + 판 기록 (저장소 트랜잭션 하나로 샤드 프로세스 간 직렬화, 블로킹 I/O → 스레드)
+        record_teams = {
+            tk: [
+                {
+                    "id": str(m.id),
+                    "name": m.display_name,
+                    "champ": str(selected.get(m.id, "")),
+                }
+                for m in teams[tk]
+            ]
+            for tk in ("team1", "team2")
+        }
+        data, info, created = await asyncio.to_thread(
+            victory_commit.record, state, self.game_id, record_teams, team_key, DEV_MODE
+        )
+        adopt_wins(WinsRecord.from_json(data))
+        # 다른 샤드 프로세스나 다른 길드가 그사이 판을 기록했으면 번호가 밀린다 (저장소가 정한 round가 기준)
+        self.round = info["round"]
+        if lobby.game_id == self.game_id:
+            lobby.round = info["round"]
+            lobby.tag()
+        if created:
+            log.info(f"[RECORD] history_data: 시즌{info['season']} R{self.round} 기록 완료")
+            # 커밋 후 파생 캐시·백업·GitHub Pages 업로드는 victory_commit.record가 처리 (실패해도 무영향)
+
+        # 세션 전적 업데이트 (overall_results)
+        overall_results = lobby.overall_results
+        for key in teams:
+            for member in teams[key]:
+                uid = member.id
+                if uid not in overall_results:
+                    overall_results[uid] = {"mention": member.mention, "results": []}
+                overall_results[uid]["results"].append("O" if key == team_key else "X")
+
+        # 자동완성 색인에 새 플레이어/이름 변경 반영 (바뀐 항목만)
+        await asyncio.to_thread(refresh_autocomplete)
+        # 로비 소유권 반납 (그사이 새 게임이 시작됐으면 그 게임의 소유권이므로 두고 감)
+        if lobby.game_id == self.game_id:
+            await asyncio.to_thread(state_store.release_lobby, state, lobby.guild_id, STATE_OWNER)
+
+        return f"✅ **{team_key.upper()}** 승리 기록 완료!"
+
+    ##
+    # @brief 이번 라운드 결과 embed을 만든다.
+    # @param team_key 승리 팀 키.
+    # @param teams 선택 시점에 떠 둔 팀 구성.
+    # @param selected 선택 시점에 떠 둔 픽 {user_id: 챔피언}.
+    # @return 결과 Embed 객체.
+    def _result_embed(self, team_key, teams, selected):
+        # @brief 팀 멤버와 픽한 챔피언을 embed용 문자열로 만든다.
+        def format_team(key):
+            return "\n".join(
+                f"{m.mention}: **{selected.get(m.id, '챔피언 없음')}**"
+                for m in teams[key]
+            )
+
+        embed = Embed(title=f"🏆 ROUND {self.round} 결과", color=0x44DD88)
+        embed.add_field(name="TEAM 1", value=format_team("team1"), inline=True)
+        embed.add_field(name="TEAM 2", value=format_team("team2"), inline=True)
+        embed.add_field(name="승리 팀", value=f"**{team_key.upper()}**", inline=False)
+        return embed
 
 
 ##
@@ -1124,9 +1436,11 @@ class VictoryView(View):
 
     ##
     # @brief View를 초기화하고 VictorySelect를 추가한다.
-    def __init__(self):
+    # @param lobby 셀렉트가 속할 길드 로비.
+    # @param game_id 셀렉트가 속할 게임 id.
+    def __init__(self, lobby, game_id):
         super().__init__(timeout=None)
-        self.add_item(VictorySelect())
+        self.add_item(VictorySelect(lobby, game_id))
 
 
 ##
@@ -1134,7 +1448,8 @@ class VictoryView(View):
 # @param ctx 슬래시 커맨드 상호작용 컨텍스트.
 @bot.slash_command(name="승리", description="해당 라운드의 승리 팀을 선택합니다.")
 async def 승리(ctx):
-    await ctx.respond("승리한 팀을 선택", view=VictoryView())
+    lobby = get_lobby(ctx.guild.id)
+    await ctx.respond("승리한 팀을 선택", view=VictoryView(lobby, lobby.game_id))
 
 
 ##
@@ -1142,11 +1457,11 @@ async def 승리(ctx):
 # @param ctx 슬래시 커맨드 상호작용 컨텍스트.
 @bot.slash_command(name="누적결과", description="전체 누적 전적을 확인합니다.")
 async def 누적결과(ctx):
-    if not wins_data or len(wins_data) <= 1:
+    if not wins_data.players:
         await ctx.respond("⚠️ 전적 데이터가 없습니다!", ephemeral=True)
         return
 
-    total_games = wins_data.get("total_rounds", 0)
+    total_games = wins_data.total_rounds
 
     msg = "━━━━━━━━━━━━━━━━━━━━━━━━━\n"
     msg += "📈 **누적 전적**\n"
@@ -1154,16 +1469,11 @@ async def 누적결과(ctx):
     msg += f"총 **{total_games}** 라운드 진행\n\n"
 
     # 승수 내림차순 정렬
-    players = [
-        (uid, data)
-        for uid, data in wins_data.items()
-        if uid != "total_rounds" and isinstance(data, dict)
-    ]
-    players.sort(key=lambda x: x[1].get("wins", 0), reverse=True)
+    players = sorted(wins_data.players.values(), key=lambda p: p.wins, reverse=True)
 
-    for rank, (_uid, data) in enumerate(players, 1):
-        name = data.get("name", "???")
-        wins = data.get("wins", 0)
+    for rank, p in enumerate(players, 1):
+        name = p.name or "???"
+        wins = p.wins
         losses = total_games - wins
         winrate = (wins / total_games * 100) if total_games > 0 else 0
         msg += (
@@ -1175,36 +1485,473 @@ async def 누적결과(ctx):
     await ctx.respond(msg)
 
 
+##
+# @brief /지표 슬래시 커맨드. 상호작용 ack/followup 지연 등 내부 지표를 본인에게만 보여준다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+@bot.slash_command(name="지표", description="봇 내부 응답 지연 지표를 확인합니다.")
+async def 지표(ctx):
+    text = metrics.format_summary()
+    shards = await asyncio.to_thread(state_store.format_shards, state)
+    if shards:
+        text = f"{text}\n\n[샤드 프로세스]\n{shards}"
+    await ctx.respond(f"```\n{text[:1900]}\n```", ephemeral=True)
+
+
+##
+# @brief 이 프로세스의 지표와 샤드별 게이트웨이 지연을 주기적으로 상태 저장소에 올린다.
+# @details 다른 샤드 프로세스의 /지표가 모든 프로세스 상태를 함께 보여줄 수 있게 한다.
+async def publish_metrics_loop():
+    while True:
+        if isinstance(bot, discord.AutoShardedBot):
+            shards = {str(sid): lat for sid, lat in bot.latencies}
+        else:
+            shards = {"0": bot.latency}
+        try:
+            await asyncio.to_thread(state_store.publish_metrics, state, STATE_OWNER, metrics.snapshot(), shards)
+        except Exception as e:  # 저장소 잠금 대기 초과 등 - 다음 주기에 재시도
+            log.warning(f"지표 게시 실패: {e}")
+        await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
+
+
+##
+# @brief 역색인 결과 행(키, 판수, 승수) 목록을 전적 텍스트로 만든다.
+# @param rows (표시 이름, 판수, 승수) 리스트.
+# @param limit 최대 표시 행 수.
+# @return 줄바꿈으로 이은 문자열.
+def format_record_rows(rows, limit=15):
+    lines = [
+        f"**{label}**: {g}판 {w}승 {g - w}패 (승률 **{w / g * 100:.1f}%**)"
+        for label, g, w in rows[:limit]
+    ]
+    if len(rows) > limit:
+        lines.append(f"... 외 {len(rows) - limit}개")
+    return "\n".join(lines)
+
+
+##
+# @brief uid의 표시 이름을 찾는다(wins.json → 길드 멤버 → uid 순).
+# @param guild 조회할 길드(없으면 None).
+# @param uid 플레이어 id 문자열.
+# @return 표시 이름.
+def player_name(guild, uid):
+    name = wins_data.name_of(uid)
+    if name:
+        return name
+    member = guild.get_member(int(uid)) if guild and uid.isdigit() else None
+    return member.display_name if member else uid
+
+
+##
+# @brief 챔피언 목록과 플레이어 이름 매핑을 자동완성 색인에 반영한다(바뀐 부분만, 블로킹 → 스레드).
+def refresh_autocomplete():
+    autocomplete_index.set_champions(champion_list)
+    autocomplete_index.set_players(autocomplete.player_names(wins_data, DEV_MODE))
+
+
+##
+# @brief 챔피언 이름 옵션 자동완성 콜백(초성·영문 id 지원).
+# @param ctx 자동완성 컨텍스트(value = 입력 중인 문자열).
+# @return OptionChoice 리스트.
+async def champion_choices(ctx: discord.AutocompleteContext):
+    with metrics.timer("autocomplete.champion"):
+        matches = autocomplete_index.complete_champion(ctx.value or "")
+    return [discord.OptionChoice(name=label, value=value) for label, value in matches]
+
+
+##
+# @brief 플레이어 이름 옵션 자동완성 콜백(value는 uid).
+# @param ctx 자동완성 컨텍스트.
+# @return OptionChoice 리스트.
+async def player_choices(ctx: discord.AutocompleteContext):
+    with metrics.timer("autocomplete.player"):
+        matches = autocomplete_index.complete_player(ctx.value or "")
+    return [discord.OptionChoice(name=label, value=value) for label, value in matches]
+
+
+##
+# @brief /플레이어 슬래시 커맨드. 역색인으로 한 플레이어의 통산 전적과 챔피언별 전적을 보여준다.
+# @details 서버 멤버는 유저로, 서버를 떠난 플레이어는 이름(자동완성, 값은 uid)으로 조회한다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+# @param 유저 조회할 플레이어(서버 멤버).
+# @param 이름 조회할 플레이어 이름(기록 기준 자동완성).
+@bot.slash_command(name="플레이어", description="플레이어의 통산 전적과 챔피언별 전적을 확인합니다.")
+async def 플레이어(
+    ctx,
+    유저: discord.Option(discord.Member, "조회할 플레이어", required=False, default=None),
+    이름: discord.Option(str, "플레이어 이름 (기록 기준)", required=False, default=None, autocomplete=player_choices),
+):
+    if 유저 is not None:
+        uid, display = str(유저.id), 유저.display_name
+    elif 이름:
+        uid = 이름.strip()
+        if uid not in autocomplete_index.player_names:  # 자동완성을 고르지 않고 직접 친 경우
+            matches = autocomplete_index.complete_player(uid, limit=1)
+            uid = matches[0][1] if matches else uid
+        display = player_name(ctx.guild, uid)
+    else:
+        await ctx.respond("⚠️ 유저 또는 이름을 지정해주세요!", ephemeral=True)
+        return
+
+    with metrics.timer("query.player"):
+        index = await asyncio.to_thread(history_index.get_index, DEV_MODE)  # 다른 프로세스가 기록했으면 따라잡음
+        profile = index.player_profile(uid)
+    if profile is None:
+        await ctx.respond(f"⚠️ {display}님의 기록이 없습니다!", ephemeral=True)
+        return
+
+    games, wins = profile["games"], profile["wins"]
+    embed = Embed(
+        title=f"👤 {display}",
+        description=f"통산 **{games}판 {wins}승 {games - wins}패** (승률 **{wins / games * 100:.1f}%**)",
+        color=0x3498DB,
+    )
+    embed.add_field(name="챔피언별 전적", value=format_record_rows(profile["champs"]) or "-", inline=False)
+    await ctx.respond(embed=embed)
+
+
+##
+# @brief /챔피언 슬래시 커맨드. 역색인으로 한 챔피언의 통산 전적과 플레이어별 전적을 보여준다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+# @param 이름 챔피언 이름(기록된 이름 그대로, 자동완성).
+@bot.slash_command(name="챔피언", description="챔피언의 통산 전적과 플레이어별 전적을 확인합니다.")
+async def 챔피언(ctx, 이름: discord.Option(str, "챔피언 이름", autocomplete=champion_choices)):
+    name = 이름.strip()
+    with metrics.timer("query.champion"):
+        index = await asyncio.to_thread(history_index.get_index, DEV_MODE)  # 다른 프로세스가 기록했으면 따라잡음
+        profile = index.champion_profile(name)
+    if profile is None:
+        await ctx.respond(f"⚠️ '{name}' 챔피언 기록이 없습니다!", ephemeral=True)
+        return
+
+    games, wins = profile["games"], profile["wins"]
+    rows = [(player_name(ctx.guild, uid), g, w) for uid, g, w in profile["players"]]
+    embed = Embed(
+        title=f"🛡️ {name}",
+        description=f"통산 **{games}회 출전 {wins}승** (승률 **{wins / games * 100:.1f}%**)",
+        color=0x9B59B6,
+    )
+    embed.add_field(name="플레이어별 전적", value=format_record_rows(rows) or "-", inline=False)
+    await ctx.respond(embed=embed)
+
+
+##
+# @brief 분석 작업을 프로세스 풀에 맡기고 결과를 문자열로 만들어 반환하는 공통 처리.
+# @param name analytics.JOBS 작업 이름.
+# @param render 결과를 받아 응답 문자열을 만드는 함수.
+# @param kwargs 작업 추가 인자.
+# @return 응답 문자열.
+async def run_analytics(name, render, **kwargs):
+    try:
+        result = await analytics_executor.run(name, DEV_MODE, **kwargs)
+    except asyncio.TimeoutError:
+        return "⏱️ 분석 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
+    return render(result)
+
+
+##
+# @brief /레이팅 슬래시 커맨드. 전 판 기준 Elo 레이팅 순위를 보여준다(프로세스 풀에서 계산).
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+@bot.slash_command(name="레이팅", description="전체 기록 기준 Elo 레이팅 순위를 확인합니다.")
+async def 레이팅(ctx):
+    def render(rows):
+        if not rows:
+            return "⚠️ 기록된 판이 없습니다!"
+        lines = ["📊 **Elo 레이팅** (전체 기록)"]
+        for rank, (uid, rating, games) in enumerate(rows[:15], 1):
+            lines.append(f"**{rank}.** {player_name(ctx.guild, uid)}: **{rating:.0f}** ({games}판)")
+        return "\n".join(lines)
+
+    await interactions.run_deferred(
+        ctx.interaction, "ratings", lambda: run_analytics("ratings", render), ephemeral=False
+    )
+
+
+##
+# @brief /시너지 슬래시 커맨드. 같은 팀 두 명 조합의 승률 순위를 보여준다(프로세스 풀에서 계산).
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+@bot.slash_command(name="시너지", description="같은 팀 조합별 승률 순위를 확인합니다.")
+async def 시너지(ctx):
+    def render(rows):
+        if not rows:
+            return "⚠️ 5판 이상 함께한 조합이 없습니다!"
+        lines = ["🤝 **팀 조합 승률** (5판 이상)"]
+        for rank, (a, b, games, wins) in enumerate(rows[:10], 1):
+            lines.append(
+                f"**{rank}.** {player_name(ctx.guild, a)} + {player_name(ctx.guild, b)}: "
+                f"{games}판 {wins}승 (승률 **{wins / games * 100:.1f}%**)"
+            )
+        return "\n".join(lines)
+
+    await interactions.run_deferred(
+        ctx.interaction, "synergy", lambda: run_analytics("synergy", render), ephemeral=False
+    )
+
+
+##
+# @brief /시즌 슬래시 커맨드. 시즌 개인 순위(승수 순)를 보여준다(프로세스 풀에서 계산).
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+# @param 번호 시즌 번호(없으면 마지막 시즌).
+@bot.slash_command(name="시즌", description="시즌별 개인 순위를 확인합니다.")
+async def 시즌(ctx, 번호: discord.Option(int, "시즌 번호 (비우면 최신 시즌)", required=False, default=None, min_value=1)):
+    def render(table):
+        if not table:
+            return "⚠️ 기록된 판이 없습니다!"
+        season = 번호 or max(table)
+        players = table.get(season)
+        if not players:
+            return f"⚠️ 시즌 {season} 기록이 없습니다! (1~{max(table)}시즌)"
+        rows = sorted(players.items(), key=lambda kv: (-kv[1][1], -kv[1][1] / kv[1][0], kv[0]))
+        lines = [f"🏆 **시즌 {season} 순위** ({sum(g for g, _ in players.values()) // 6}판)"]
+        for rank, (uid, (games, wins)) in enumerate(rows[:15], 1):
+            lines.append(
+                f"**{rank}.** {player_name(ctx.guild, uid)}: {games}판 {wins}승 (승률 **{wins / games * 100:.1f}%**)"
+            )
+        return "\n".join(lines)
+
+    await interactions.run_deferred(
+        ctx.interaction, "seasons", lambda: run_analytics("seasons", render), ephemeral=False
+    )
+
+
+##
+# @brief 모든 슬래시 커맨드 실행 직전 훅. 이 커맨드 태스크의 로그에 handler 태그를 붙인다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+@bot.before_invoke
+async def tag_command(ctx):
+    botlog.set_tags(handler=f"/{ctx.command.qualified_name}")
+
+
+##
+# @brief /로그 슬래시 커맨드(관리자). 메모리 링 버퍼의 최근 로그를 본인에게만 보여준다.
+# @details 디스크를 읽지 않으므로 사고 직후 바로 확인할 수 있다. 2000자 제한에 맞춰 최신 줄부터 자른다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+# @param 개수 최대 줄 수.
+# @param 레벨 최소 로그 레벨.
+@bot.slash_command(
+    name="로그",
+    description="최근 봇 로그를 확인합니다. (관리자)",
+    default_member_permissions=discord.Permissions(administrator=True),
+)
+async def 로그(
+    ctx,
+    개수: discord.Option(int, "최대 줄 수", default=30, min_value=1, max_value=200),
+    레벨: discord.Option(str, "최소 레벨", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO"),
+):
+    text = botlog.format_entries(botlog.recent(개수, 레벨))
+    if len(text) > 1900:
+        text = "…\n" + text[-1900:].split("\n", 1)[-1]
+    await ctx.respond(f"```\n{text or '(로그 없음)'}\n```", ephemeral=True)
+
+
+##
+# @brief 프로파일링 세션 동안 wall time을 잴 핸들러들(이름 → (소유 객체, 속성)).
+# @details 모듈 전역 함수는 호출 시점에 전역 이름으로 찾으므로 모듈 속성을 바꿔 끼우면 적용된다.
+def profile_targets():
+    module = sys.modules[__name__]
+    return {
+        "ChampionButton.callback": (ChampionButton, "callback"),
+        "StartButton.callback": (StartButton, "callback"),
+        "VictorySelect.callback": (VictorySelect, "callback"),
+        "pick_timeout_handler": (module, "pick_timeout_handler"),
+        "update_champion_message": (module, "update_champion_message"),
+        "Broadcaster._send": (Broadcaster, "_send"),
+    }
+
+
+##
+# @brief /프로파일 슬래시 커맨드(관리자). 정해진 시간 동안 실제 게임 진행을 프로파일링한다.
+# @details 끝나면 data/profile_<시각>.txt에 상위 함수, await 중인 코루틴, 핸들러별 wall time을
+#          기록하고 파일을 본인에게만 보낸다. 꺼져 있을 때는 아무 훅도 걸려 있지 않다.
+# @param ctx 슬래시 커맨드 상호작용 컨텍스트.
+# @param 초 측정 시간.
+# @param 방식 sample(스택 샘플링) 또는 cprofile.
+@bot.slash_command(
+    name="프로파일",
+    description="봇을 일정 시간 프로파일링해 리포트를 남깁니다. (관리자)",
+    default_member_permissions=discord.Permissions(administrator=True),
+)
+async def 프로파일(
+    ctx,
+    초: discord.Option(int, "측정 시간(초)", default=60, min_value=5, max_value=600),
+    방식: discord.Option(str, "측정 방식", choices=["sample", "cprofile"], default="sample"),
+):
+    if profiler.is_active():
+        await ctx.respond("이미 프로파일링 중입니다.", ephemeral=True)
+        return
+    await ctx.respond(f"🔬 {초}초 동안 프로파일링합니다 ({방식}).", ephemeral=True)
+    path = await profiler.capture(초, 방식, profile_targets())
+    log.info(f"[PROFILE] {path}")
+    await ctx.followup.send(f"🔬 프로파일 완료: `{path}`", file=discord.File(path), ephemeral=True)
+
+
+# === 슬래시 커맨드 동기화 (변경 시에만) ===
+##
+# @brief 등록할 슬래시 커맨드 트리의 해시를 계산한다.
+# @details 커맨드 정의(to_dict)와 애플리케이션 ID를 정렬·직렬화해 sha256을 구한다. 커맨드를
+#          추가/수정하거나 다른 봇 토큰으로 실행하면 값이 바뀐다.
+# @return 16진수 해시 문자열.
+def command_tree_hash():
+    payload = sorted(
+        (cmd.to_dict() for cmd in bot.pending_application_commands),
+        key=lambda d: d["name"],
+    )
+    raw = json.dumps([bot.application_id, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+##
+# @brief 커맨드 트리가 마지막 동기화 이후 바뀌었을 때만 sync_commands()를 호출한다.
+# @details 해시가 같으면 캐시에 저장해 둔 커맨드 ID를 봇에 연결만 한다(py-cord가 sync 때 하는
+#          id → 커맨드 매핑과 동일). 캐시가 없거나 커맨드가 빠져 있으면 정상 동기화한다.
+# @return 실제로 동기화했으면 True, 건너뛰었으면 False.
+async def sync_commands_if_changed():
+    cache_path = paths.command_cache_json(DEV_MODE)
+    tree_hash = command_tree_hash()
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+
+    ids = cache.get("ids", {})
+    commands = bot.pending_application_commands
+    if cache.get("hash") == tree_hash and all(cmd.name in ids for cmd in commands):
+        for cmd in commands:
+            cmd.id = int(ids[cmd.name])
+            bot._application_commands[cmd.id] = cmd
+        return False
+
+    await bot.sync_commands()
+    cache = {
+        "hash": tree_hash,
+        "ids": {cmd.name: str(cmd.id) for cmd in commands if cmd.id},
+    }
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    return True
+
+
 # === 봇 시작 시 챔피언 로드 ===
 ##
 # @brief 봇 준비 완료 이벤트. 챔피언·전적·설정을 로드하고 커맨드를 동기화한다.
-# @details round_counter를 total_rounds+1로 초기화한 뒤 슬래시 커맨드를 등록한다.
+# @details on_ready는 재연결마다 다시 불리므로 시작 파이프라인은 프로세스당 한 번만 돈다.
+#          챔피언 데이터(네트워크)·전적·설정·역색인·승리 확률 모델(로컬 파일)은 스레드에서 동시에
+#          로드하고, 커맨드는 트리 해시가 바뀐 경우에만 동기화한다. 단계별 소요 시간과 프로세스
+#          시작부터 첫 커맨드 가능 시점까지의 시간을 출력하고 metrics(startup.*)에도 남긴다.
 @bot.event
 async def on_ready():
-    global champion_list, wins_data, config, round_counter
-    champion_list = fetch_champion_data()
-    wins_data = load_wins()
-    config = load_config()
+    global champion_list, wins_data, wins_version, config, round_counter, startup_done, stats_server
+    if startup_done:
+        log.info(f"[RECONNECT] {bot.user} 재연결 (시작 파이프라인 생략)")
+        return
+    startup_done = True
 
-    # round_counter 초기화 (total_rounds + 1)
-    round_counter = wins_data.get("total_rounds", 0) + 1
+    timings = {}
+    http_client.bind()  # 스레드(판 기록 업로드, 초상화 받기)의 HTTP 요청이 이 루프의 공유 세션을 쓰도록
 
-    await bot.sync_commands()
-    print(f"[OK] Bot logged in: {bot.user}")
-    print(f"[DEV_MODE] {DEV_MODE}")
-    print(f"[WINS] Loaded {len(wins_data) - 1} players")  # total_rounds 제외
-    print(f"[ROUNDS] Starting from Round {round_counter}")
-    print(
-        f"[CONFIG] pick_timeout={config.get('pick_timeout')}s, champion_count={config.get('champion_count')}"
+    # @brief 로더 하나를 실행하고(블로킹 함수는 스레드에서, 코루틴 함수는 그대로) 소요 시간을 기록한다.
+    async def phase(name, func):
+        start = time.perf_counter()
+        if asyncio.iscoroutinefunction(func):
+            result = await func()
+        else:
+            result = await asyncio.to_thread(func)
+        timings[name] = time.perf_counter() - start
+        metrics.observe(f"startup.{name}", timings[name])
+        return result
+
+    try:
+        start = time.perf_counter()
+        champion_list, wins_data, config, _, _ = await asyncio.gather(
+            phase("champions", fetch_champion_data),
+            phase("wins", load_wins),
+            phase("config", load_config),
+            phase("history_index", lambda: history_index.get_index(DEV_MODE)),
+            phase("win_model", lambda: win_model.get_model(DEV_MODE)),
+        )
+        timings["load"] = time.perf_counter() - start
+
+        wins_version += 1
+        # round_counter 초기화 (total_rounds + 1)
+        round_counter = wins_data.total_rounds + 1
+        # 팀 채널 상태 안내·결과 embed을 채널 웹훅으로 (봇 전송과 다른 rate-limit 버킷, 설정된 채널만)
+        broadcaster.webhooks.configure(config.get("broadcast_webhooks", []))
+        await phase("autocomplete", refresh_autocomplete)
+
+        start = time.perf_counter()
+        synced = await sync_commands_if_changed()
+        timings["commands"] = time.perf_counter() - start
+        metrics.observe("startup.commands", timings["commands"])
+    except Exception:
+        startup_done = False  # 다음 on_ready에서 재시도
+        raise
+
+    # 챔피언 초상화 로컬 캐시 미리 채우기 (백그라운드, Pillow 없으면 아무것도 안 함)
+    if config.get("champion_grid", True) and sprite_grid.available():
+        task = asyncio.create_task(asyncio.to_thread(sprite_grid.prefetch, champion_list))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    # 길드별 첫 판 챔피언 후보·격자 미리 준비 (채널은 첫 /게임시작 전엔 모르므로 View는 그때 만듦)
+    for guild in bot.guilds:
+        schedule_prepare(get_lobby(guild.id), [])
+
+    # 샤드별 지표 게시 (상태 저장소, /지표에서 모든 프로세스 요약)
+    task = asyncio.create_task(publish_metrics_loop())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    # 대시보드용 통계 API (선택) - 실패해도 봇 동작에는 영향 없음
+    stats_server = stats_api.from_env(DEV_MODE, names=lambda uid: player_name(None, uid),
+                                      names_version=lambda: wins_version)
+    if stats_server is not None:
+        try:
+            await stats_server.start()
+        except OSError as e:
+            log.warning(f"통계 API 시작 실패: {e}")
+            stats_server = None
+
+    ready = time.perf_counter() - PROCESS_START
+    metrics.observe("startup.time_to_ready", ready)
+
+    log.info(f"[OK] Bot logged in: {bot.user}")
+    log.info(f"[DEV_MODE] {DEV_MODE}")
+    log.info(f"[SHARDS] count={bot.shard_count} ids={SHARD_IDS or 'all'} owner={STATE_OWNER}")
+    log.info(f"[WINS] Loaded {len(wins_data.players)} players")
+    log.info(f"[ROUNDS] Starting from Round {round_counter}")
+    log.info(
+        f"[CONFIG] pick_timeout={config.get('pick_timeout')}s, champion_count={config.get('champion_count')}, "
+        f"timer_display={config.get('timer_display', 'edit')}, "
+        f"broadcast_webhooks={config.get('broadcast_webhooks', [])}"
+    )
+    log.info(
+        "[STARTUP] "
+        + " | ".join(
+            f"{name} {timings[name] * 1000:.0f}ms"
+            for name in ("champions", "wins", "config", "history_index", "win_model", "load", "autocomplete",
+                         "commands")
+        )
+        + f" | sync={'done' if synced else 'skipped (unchanged)'}"
+        + f" | time-to-ready {ready * 1000:.0f}ms"
     )
 
 
 # === 봇 실행 ===
-logging.basicConfig(level=logging.INFO)
+# 분석 워커 프로세스(forkserver/spawn)가 이 모듈을 다시 import 해도 봇이 뜨지 않도록 가드
+if __name__ == "__main__":
+    # 큐 기반 비동기 로깅 (콘솔 + logs/bot.jsonl + 링 버퍼), py-cord 게이트웨이 로그는 WARNING 이상만
+    botlog.setup(log_file=paths.bot_log_file())
+    # 로비 태그는 핸들러가 Lobby.tag()로 태스크마다 붙이고, 기본값은 다음 라운드 번호만
+    botlog.bind_defaults(lambda: {"lobby": None, "round": round_counter})
+
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        log.error("❌ DISCORD_TOKEN이 .env 파일에 없습니다!")
+        botlog.shutdown()
+        exit(1)
 
-token = os.getenv("DISCORD_TOKEN")
-if not token:
-    print("❌ DISCORD_TOKEN이 .env 파일에 없습니다!")
-    exit(1)
-
-bot.run(token)
+    try:
+        bot.run(token)
+    finally:
+        analytics_executor.shutdown()
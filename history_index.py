@@ -0,0 +1,434 @@
+##
+# @file history_index.py
+# @brief history_data.json의 판을 플레이어/챔피언/(플레이어, 챔피언) 기준으로 찾는 역색인.
+# @details "X가 나온 판", "X의 Y 챔피언 전적" 같은 질의는 지금까지 games 전체를 훑어야 했다.
+#          여기서는 키마다 판 오프셋(games 배열의 0-based 인덱스)의 정렬된 posting list를
+#          array("i")로 유지한다. 판은 항상 뒤에 append되므로 posting은 추가만으로 정렬이 유지된다.
+#            - players[uid] / player_wins[uid]             : 출전 판 / 이긴 판
+#            - champs[champ] / champ_wins[champ]           : 챔피언이 나온 판 / 이긴 판
+#            - pairs[uid][champ] / pair_wins[uid][champ]   : uid가 champ으로 출전한 판 / 이긴 판
+#          프로필 조회는 posting 길이만 보므로 판 수와 무관하게 빠르고, 임의 조합 질의는
+#          games_with()가 짧은 posting부터 정렬 순서로 교집합을 구한다.
+#
+#          디스크에는 스냅샷(history_index.bin: 헤더 한 줄 + posting 원시 바이트)과 스냅샷 이후
+#          추가된 판의 append-only 로그(history_index.log: 판당 JSON 한 줄)를 둔다. 판이 기록되면
+#          판마다 로그 한 줄만 덧붙이고, 판 수가 COMPACT_EVERY의 배수가 될 때마다 스냅샷을 새로 쓴다
+#          (로그는 최대 COMPACT_EVERY 줄).
+#          둘 다 history에서 파생되는 캐시라 지워도 `rebuild`로 다시 만들 수 있다.
+#
+#          사용법:
+#            python history_index.py rebuild [--dev]    # history_data.json을 스트리밍해 재생성
+#            python history_index.py player <uid> [--dev]
+#            python history_index.py champ <이름> [--dev]
+#            python history_index.py bench [--games N]  # 합성 데이터로 조회 속도 측정
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import history_io
+import paths
+import safe_io
+from history_io import iter_games
+
+log = logging.getLogger(__name__)
+
+## 스냅샷 형식 버전(헤더와 다르면 재생성).
+FORMAT_VERSION = 1
+
+## 판 오프셋이 이 값의 배수가 될 때마다 로그를 스냅샷으로 합친다.
+COMPACT_EVERY = 500
+
+_TYPECODE = "i"
+
+
+##
+# @brief 메모리 역색인. 판 오프셋 posting list 묶음.
+# @details 프로세스 캐시의 색인은 기록 스레드(sync)가 판을 더하는 동안 이벤트 루프가 조회한다.
+#          조회 메서드와 sync()의 add_game은 lock을 잡으므로 조회 중에 dict 크기가 바뀌지 않는다
+#          (재생성은 새 객체를 만든 뒤 캐시를 바꿔 끼우므로 조회를 막지 않음).
+class HistoryIndex:
+    __slots__ = ("total_games", "players", "player_wins", "champs", "champ_wins", "pairs", "pair_wins", "lock")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_games = 0
+        self.players = {}
+        self.player_wins = {}
+        self.champs = {}
+        self.champ_wins = {}
+        self.pairs = {}
+        self.pair_wins = {}
+
+    ##
+    # @brief 판 하나를 색인에 추가한다. offset은 직전 판보다 커야 한다(정렬 유지).
+    # @param game 판 레코드(team1, team2, winner).
+    # @param offset 이 판의 games 배열 오프셋.
+    def add_game(self, game, offset):
+        winner = game.get("winner")
+        for tk in ("team1", "team2"):
+            won = tk == winner
+            for p in game[tk]:
+                uid, champ = p["id"], p["champ"]
+                _posting(self.players, uid).append(offset)
+                _posting(self.champs, champ).append(offset)
+                _posting(self.pairs.setdefault(uid, {}), champ).append(offset)
+                if won:
+                    _posting(self.player_wins, uid).append(offset)
+                    _posting(self.champ_wins, champ).append(offset)
+                    _posting(self.pair_wins.setdefault(uid, {}), champ).append(offset)
+        self.total_games = offset + 1
+
+    ##
+    # @brief 플레이어 전체 전적과 챔피언별 전적을 posting 길이로 계산한다.
+    # @param uid 플레이어 id.
+    # @return {"games", "wins", "champs": [(champ, games, wins), ...] (판수 내림차순)} 또는 None.
+    def player_profile(self, uid):
+        with self.lock:
+            games = self.players.get(uid)
+            if games is None:
+                return None
+            games, wins = len(games), len(self.player_wins.get(uid, ()))
+            pair_wins = self.pair_wins.get(uid, {})
+            champs = [
+                (champ, len(offsets), len(pair_wins.get(champ, ())))
+                for champ, offsets in self.pairs.get(uid, {}).items()
+            ]
+        champs.sort(key=lambda c: (-c[1], -c[2], c[0]))
+        return {"games": games, "wins": wins, "champs": champs}
+
+    ##
+    # @brief 챔피언 전체 전적과 플레이어별 전적을 계산한다.
+    # @param champ 챔피언 이름.
+    # @return {"games", "wins", "players": [(uid, games, wins), ...] (판수 내림차순)} 또는 None.
+    def champion_profile(self, champ):
+        with self.lock:
+            games = self.champs.get(champ)
+            if games is None:
+                return None
+            games, wins = len(games), len(self.champ_wins.get(champ, ()))
+            players = []
+            for uid, by_champ in self.pairs.items():
+                offsets = by_champ.get(champ)
+                if offsets:
+                    won = self.pair_wins.get(uid, {}).get(champ, ())
+                    players.append((uid, len(offsets), len(won)))
+        players.sort(key=lambda p: (-p[1], -p[2], p[0]))
+        return {"games": games, "wins": wins, "players": players}
+
+    ##
+    # @brief 조건을 모두 만족하는 판 오프셋을 오름차순으로 반환한다.
+    # @param players 함께 출전해야 하는 플레이어 id들.
+    # @param champs 나와야 하는 챔피언들.
+    # @param pairs 있어야 하는 (uid, champ) 조합들.
+    # @param winners 이긴 팀에 있어야 하는 플레이어 id들.
+    # @return 판 오프셋 리스트.
+    def games_with(self, players=(), champs=(), pairs=(), winners=()):
+        with self.lock:
+            lists = [self.players.get(uid, ()) for uid in players]
+            lists += [self.champs.get(c, ()) for c in champs]
+            lists += [self.pairs.get(uid, {}).get(c, ()) for uid, c in pairs]
+            lists += [self.player_wins.get(uid, ()) for uid in winners]
+            if not lists:
+                return []
+            return intersect(*lists)
+
+    ##
+    # @brief 이름 → posting 묶음 순회(스냅샷 저장용).
+    # @return (kind, key, posting) 제너레이터. pair 계열 key는 [uid, champ].
+    def _lists(self):
+        for kind in ("players", "player_wins", "champs", "champ_wins"):
+            for key, offsets in getattr(self, kind).items():
+                yield kind, key, offsets
+        for kind in ("pairs", "pair_wins"):
+            for uid, by_champ in getattr(self, kind).items():
+                for champ, offsets in by_champ.items():
+                    yield kind, [uid, champ], offsets
+
+
+##
+# @brief dict에서 키의 posting을 꺼낸다(없으면 빈 배열 생성).
+def _posting(table, key):
+    offsets = table.get(key)
+    if offsets is None:
+        offsets = table[key] = array(_TYPECODE)
+    return offsets
+
+
+##
+# @brief 정렬된 posting 여러 개의 교집합을 오름차순으로 구한다.
+# @details 가장 짧은 posting을 기준으로, 나머지 posting에서는 이전 위치부터 bisect로 건너뛰며
+#          찾는다(긴 posting을 처음부터 훑지 않음). 비용은 대략 최단 길이 × log(최장 길이).
+# @param lists 오름차순 정렬된 정수 시퀀스들.
+# @return 공통 원소 리스트.
+def intersect(*lists):
+    lists = sorted(lists, key=len)
+    result = list(lists[0])
+    for other in lists[1:]:
+        if not result:
+            break
+        found, lo, n = [], 0, len(other)
+        for x in result:
+            lo = bisect_left(other, x, lo)
+            if lo == n:
+                break
+            if other[lo] == x:
+                found.append(x)
+                lo += 1
+        result = found
+    return result
+
+
+##
+# @brief games 리스트(또는 (offset, game) 스트림)로 색인을 한 번에 만든다.
+# @param games 판 리스트, 또는 iter_games() 같은 (offset, game) 이터러블(stream=True).
+# @param stream True면 games를 (offset, game) 쌍으로 받는다.
+# @return HistoryIndex.
+def build_index(games, stream=False):
+    index = HistoryIndex()
+    pairs = games if stream else enumerate(games)
+    for offset, g in pairs:
+        index.add_game(g, offset)
+    return index
+
+
+##
+# @brief 색인 스냅샷을 저장하고 로그를 비운다.
+# @param index 저장할 색인.
+# @param dev_mode True면 dev 파일.
+def save_snapshot(index, dev_mode=False):
+    path = paths.history_index_bin(dev_mode)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lists = list(index._lists())
+    header = {
+        "version": FORMAT_VERSION,
+        "total_games": index.total_games,
+        "lists": [[kind, key, len(offsets)] for kind, key, offsets in lists],
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+        f.write(b"\n")
+        for _, _, offsets in lists:
+            offsets.tofile(f)
+    os.replace(tmp, path)
+    with open(paths.history_index_log(dev_mode), "w", encoding="utf-8"):
+        pass
+
+
+##
+# @brief 스냅샷을 읽고 로그를 재생해 색인을 복원한다.
+# @param dev_mode True면 dev 파일.
+# @return HistoryIndex, 스냅샷이 없거나 깨졌으면 None.
+def load_index(dev_mode=False):
+    try:
+        with open(paths.history_index_bin(dev_mode), "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != FORMAT_VERSION:
+                return None
+            index = HistoryIndex()
+            index.total_games = header["total_games"]
+            for kind, key, count in header["lists"]:
+                offsets = array(_TYPECODE)
+                offsets.fromfile(f, count)
+                table = getattr(index, kind)
+                if isinstance(key, list):
+                    table = table.setdefault(key[0], {})
+                    key = key[1]
+                table[key] = offsets
+    except (FileNotFoundError, EOFError, ValueError, KeyError):
+        return None
+
+    try:
+        with open(paths.history_index_log(dev_mode), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["offset"] != index.total_games:
+                    log.warning(f"history_index 로그 오프셋 불일치 ({entry['offset']} ≠ {index.total_games})")
+                    return None
+                index.add_game(entry, entry["offset"])
+    except FileNotFoundError:
+        pass
+    except (ValueError, KeyError):
+        log.warning("history_index 로그 손상 → 재생성 필요")
+        return None
+    return index
+
+
+## 프로세스 내 색인 캐시 {dev_mode: HistoryIndex}. 기록(스레드)과 조회(이벤트 루프)가 공유한다.
+_cache = {}
+_lock = threading.Lock()
+
+## 캐시한 색인이 따라잡은 history 버전 {dev_mode: history_io.version()}. 다르면 어떤 프로세스가 판을 기록한 것.
+_versions = {}
+
+
+##
+# @brief 캐시의 색인을 반환한다(처음이거나 history 버전이 바뀌었으면 sync()로 따라잡음).
+# @details 판은 어느 샤드 프로세스든 기록할 수 있으므로 캐시는 프로세스가 아니라 history 버전
+#          (본 파일·저널의 크기와 mtime, stat 두 번)으로 무효화한다. 따라잡기는 새 판만 읽는다.
+# @param dev_mode True면 dev 데이터.
+# @return HistoryIndex (history 파일도 없으면 빈 색인).
+def get_index(dev_mode=False):
+    index = _cache.get(dev_mode)
+    if index is not None and _versions.get(dev_mode) == history_io.version(paths.history_json(dev_mode)):
+        return index
+    sync(dev_mode)
+    return _cache[dev_mode]
+
+
+##
+# @brief history_data.json을 스트리밍해 색인을 다시 만들고 스냅샷을 저장한다.
+# @param dev_mode True면 dev 데이터.
+# @return HistoryIndex.
+def _rebuild(dev_mode):
+    path = paths.history_json(dev_mode)
+    if not os.path.exists(path):
+        return HistoryIndex()
+    index = build_index(iter_games(path), stream=True)
+    save_snapshot(index, dev_mode)
+    return index
+
+
+##
+# @brief 디스크 색인(스냅샷 + 로그)이 반영한 판 수. 로그 꼬리나 스냅샷 헤더 한 줄만 읽는다.
+# @param dev_mode True면 dev 파일.
+# @return 판 수(없으면 0).
+def _disk_total(dev_mode):
+    try:
+        with open(paths.history_index_log(dev_mode), "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            if line.strip():
+                return json.loads(line)["offset"] + 1
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    try:
+        with open(paths.history_index_bin(dev_mode), "rb") as f:
+            return json.loads(f.readline())["total_games"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+
+##
+# @brief 색인을 history의 새 판까지 따라잡게 한다(game_recorder.after_commit()에서 호출).
+# @details 색인이 반영한 판 수 이후의 판만 스트리밍해 반영하고, 디스크에 아직 없는 판만 로그에 한 줄씩
+#          덧붙인다(다른 샤드 프로세스가 먼저 쓴 판은 다시 쓰지 않음 — 디스크 쓰기는 파일 잠금으로 직렬화).
+#          COMPACT_EVERY의 배수 오프셋을 지나면 스냅샷으로 합친다. 색인이 없거나 history보다 앞서 있으면
+#          (복구 등) 재생성한다.
+# @param dev_mode True면 dev 데이터.
+def sync(dev_mode=False):
+    path = paths.history_json(dev_mode)
+    version = history_io.version(path)  # 세기 전에 잡아 둠 (그사이 기록되면 다음 get_index가 다시 따라잡음)
+    total = history_io.count(path)
+    with _lock, safe_io.file_lock(paths.history_index_log(dev_mode)):
+        _versions[dev_mode] = version
+        index = _cache.get(dev_mode) or load_index(dev_mode)
+        if index is None or index.total_games > total:
+            _cache[dev_mode] = _rebuild(dev_mode)
+            return
+        if index.total_games == total:
+            _cache[dev_mode] = index
+            return
+        disk = _disk_total(dev_mode)
+        if disk < index.total_games:  # 디스크 파일이 지워졌으면 메모리 색인으로 다시 시작
+            save_snapshot(index, dev_mode)
+            disk = index.total_games
+        lines, compact = [], False
+        for offset, game in iter_games(path, start=index.total_games):
+            with index.lock:  # 이벤트 루프의 조회와 겹치지 않게
+                index.add_game(game, offset)
+            if offset >= disk:
+                lines.append(json.dumps({
+                    "offset": offset,
+                    "team1": [{"id": p["id"], "champ": p["champ"]} for p in game["team1"]],
+                    "team2": [{"id": p["id"], "champ": p["champ"]} for p in game["team2"]],
+                    "winner": game.get("winner"),
+                }, ensure_ascii=False) + "\n")
+                compact = compact or offset % COMPACT_EVERY == 0
+        if compact:
+            save_snapshot(index, dev_mode)
+        elif lines:
+            with open(paths.history_index_log(dev_mode), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+        _cache[dev_mode] = index
+
+
+##
+# @brief 합성 데이터로 색인 생성·조회 시간을 측정한다.
+# @param n 판 수.
+def bench(n):
+    import season_index
+
+    games = season_index.synthetic_games(n)
+    t0 = time.perf_counter()
+    index = build_index(games)
+    t1 = time.perf_counter()
+    print(f"[BENCH] build {n} games: {t1 - t0:.2f}s")
+    del games
+
+    uid = next(iter(index.players))
+    champ = next(iter(index.champs))
+    other = list(index.players)[1]
+    for label, fn in (
+        ("player_profile", lambda: index.player_profile(uid)),
+        ("champion_profile", lambda: index.champion_profile(champ)),
+        ("games_with(pair + teammate)", lambda: index.games_with(pairs=[(uid, champ)], players=[other])),
+    ):
+        reps = 100
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            fn()
+        print(f"[BENCH] {label}: {(time.perf_counter() - t0) / reps * 1000:.3f} ms")
+
+
+##
+# @brief CLI 진입점.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history_data.json 플레이어/챔피언 역색인 도구")
+    parser.add_argument("command", choices=["rebuild", "player", "champ", "bench"])
+    parser.add_argument("key", nargs="?", help="player: uid / champ: 챔피언 이름")
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    parser.add_argument("--games", type=int, default=1_000_000, help="bench 판 수")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.games)
+        return 0
+    if args.command == "rebuild":
+        t0 = time.perf_counter()
+        index = _rebuild(args.dev)
+        print(f"[REBUILD] {index.total_games} games, {len(index.players)} players, "
+              f"{len(index.champs)} champs: {time.perf_counter() - t0:.2f}s")
+        return 0
+
+    if not args.key:
+        parser.error(f"{args.command}: 조회할 키를 지정하세요")
+    index = get_index(args.dev)
+    if args.command == "player":
+        profile = index.player_profile(args.key)
+        rows = profile and profile["champs"]
+    else:
+        profile = index.champion_profile(args.key)
+        rows = profile and profile["players"]
+    if profile is None:
+        print(f"[WARN] '{args.key}' 기록 없음")
+        return 1
+    print(f"{args.key}: {profile['games']}판 {profile['wins']}승")
+    for key, g, w in rows:
+        print(f"  {key}: {g}판 {w}승 ({w / g * 100:.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,500 @@
+##
+# @file history_io.py
+# @brief history_data.json을 통째로 올리지 않고 읽고 쓰기 위한 스트리밍 리더, 판 저널, 판 식별 키.
+# @details history_data.json은 indent=2로 저장된 객체 하나라서 json.load()는 파일 전체를 메모리에
+#          올린다. iter_games()는 최상위 객체를 키 단위로 읽다가 "games" 배열을 만나면 판을 하나씩
+#          디코드해 넘겨준다. 버퍼는 청크 크기 정도만 유지하므로 판 수와 무관하게 메모리가 일정하다.
+#
+#          봇은 판마다 본 파일을 다시 쓰지 않고 옆의 저널(history_data.json.journal)에 한 줄만 붙인다
+#          (append()). 판 수·마지막 판은 저널 꼬리에서 O(1)로 읽는다. 저널이 차거나 업로드할 때
+#          fold()가 트랜잭션 밖에서 본 파일에 합치고, 합쳐진 앞부분은 다음 기록 때 trim()이 잘라 낸다.
+#          모든 리더(iter_games, load)는 본 파일 뒤에 저널을 이어 읽으므로 합치기 전에도 판이 다 보인다.
+#          load_history()/write_history()는 history를 compact_model.History(GameTable 열)로 스트리밍해
+#          읽고, indent=2 형식 그대로 조각 단위로 다시 쓴다(fold가 판 dict 전체를 메모리에 올리지 않음).
+#          content_key()는 parse_all_history.py(채널 간 dedup)와 검증기/병합기가 함께 쓰는
+#          내용 기반 판 키다. discord 의존이 없어 어디서든 import 할 수 있다.
+import json
+import logging
+import os
+import re
+
+import safe_io
+from compact_model import GameTable, History
+
+log = logging.getLogger(__name__)
+
+## 기본 읽기 청크 크기(문자 수).
+CHUNK_SIZE = 1 << 20
+
+## 저널 접미사(history_data.json 옆의 history_data.json.journal).
+JOURNAL_SUFFIX = ".journal"
+
+## 저널이 이 크기(바이트)를 넘으면 본 파일에 합치고, 합친 앞부분을 다음 기록 때 잘라 낸다.
+JOURNAL_MAX = 256 * 1024
+
+_SKIP = re.compile(r"[\s,]*")
+_WS = re.compile(r"\s*")
+
+
+##
+# @brief 채널과 무관하게 같은 판이면 동일해지는 내용 기반 dedup 키를 만든다.
+# @details 3채널에 중복 전송된 같은 판을 하나로 합치기 위해 (라운드, 승자, 정렬된 양 팀
+#          (id,champ) 조합)으로 키를 구성한다. round_orig가 있으면 원본 embed 번호를 쓴다
+#          (마이그레이션으로 round가 연번으로 바뀐 판도 재파싱 결과와 같은 키가 되도록).
+# @param g 판 레코드(round, team1, team2, winner).
+# @return 해시 가능한 튜플 키.
+def content_key(g):
+    t1 = tuple(sorted([(p["id"], p["champ"]) for p in g["team1"]]))
+    t2 = tuple(sorted([(p["id"], p["champ"]) for p in g["team2"]]))
+    return (g.get("round_orig", g["round"]), g["winner"], t1, t2)
+
+
+##
+# @brief 파일에서 청크 단위로 JSON 값을 꺼내는 내부 커서.
+class _Cursor:
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    ##
+    # @brief 다음 청크를 읽어 버퍼 뒤에 붙인다(이미 소비한 앞부분은 버림).
+    # @return 더 읽었으면 True, EOF면 False.
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    ##
+    # @brief 공백(과 skip_commas면 쉼표)을 건너뛰고 다음 문자를 반환한다.
+    # @param skip_commas True면 쉼표도 건너뜀.
+    # @return 다음 문자(EOF면 "").
+    def peek(self, skip_commas=False):
+        pattern = _SKIP if skip_commas else _WS
+        while True:
+            self.pos = pattern.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    ##
+    # @brief 현재 위치의 문자 하나를 소비한다(peek으로 확인한 뒤 호출).
+    def advance(self):
+        self.pos += 1
+
+    ##
+    # @brief 공백을 건너뛰고 JSON 값 하나를 디코드한다. 값이 버퍼 끝에 걸리면 더 읽고 재시도.
+    # @return 디코드된 값.
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # 숫자 등은 버퍼 끝에서 잘려도 디코드되므로, 끝에 닿았으면 더 읽고 다시 본다
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill():
+                obj, self.pos = self.decoder.raw_decode(self.buf, self.pos)
+                return obj
+
+
+
+
+##
+# @brief history json 본 파일의 games를 (오프셋, 판) 순서로 스트리밍한다(저널 제외).
+# @details 최상위 키 중 games 외의 값은 디코드해 header에 담고, games 배열 원소만 하나씩 yield 한다.
+#          indent로 저장된 파일은 청크 안의 완결된 판들을 json.loads 한 번으로 묶어 디코드한다.
+# @param path history json 경로.
+# @param chunk_size 읽기 청크 크기(문자 수).
+# @param header games 외 최상위 키/값을 채울 dict.
+# @param start 이 오프셋부터 yield(앞 판은 디코드만 하고 버림, 헤더의 total_games가 start 이하면 배열을 건너뜀).
+# @param games False면 games 배열을 만나는 곳에서 멈춘다(헤더만 읽기).
+# @return (offset, game) 제너레이터. 반환값(yield from)은 본 파일의 판 수(games=False면 None).
+def _json_games(path, chunk_size, header, start=0, games=True):
+    with open(path, "r", encoding="utf-8") as f:
+        cur = _Cursor(f, chunk_size)
+        if cur.peek() != "{":
+            raise ValueError(f"{path}: 최상위가 JSON 객체가 아닙니다")
+        cur.advance()
+        count = 0
+        while True:
+            ch = cur.peek(skip_commas=True)
+            if ch == "}" or ch == "":
+                return count
+            key = cur.value()
+            if cur.peek() != ":":
+                raise ValueError(f"{path}: '{key}' 뒤에 ':'가 없습니다")
+            cur.advance()
+            if key != "games":
+                header[key] = cur.value()
+                continue
+            if not games:
+                return None
+            total = header.get("total_games")
+            if start > 0 and isinstance(total, int) and not isinstance(total, bool) and total <= start:
+                return total  # start 앞의 판뿐 — 배열을 디코드하지 않음(games 뒤의 키는 읽지 않음)
+            if cur.peek() != "[":
+                raise ValueError(f"{path}: games가 배열이 아닙니다")
+            cur.advance()
+            pos = cur.pos
+            cur.peek()
+            # 줄바꿈+들여쓰기로 판을 구분하는 형식(indent 저장)이면, 판 시작 패턴 앞까지를 한 번에
+            # 디코드한다. JSON 문자열에는 날 줄바꿈이 올 수 없으므로 이 패턴은 판 경계에서만 나온다.
+            ws = cur.buf[pos:cur.pos]
+            boundary = "\n" + ws[ws.rfind("\n") + 1:] + "{" if "\n" in ws else None
+            while True:
+                ch = cur.peek(skip_commas=True)
+                if ch == "]":
+                    cur.advance()
+                    break
+                if ch == "":
+                    raise ValueError(f"{path}: games 배열이 닫히지 않았습니다")
+                if boundary is not None:
+                    cut = cur.buf.rfind(boundary, cur.pos + 1)
+                    if cut > 0:
+                        batch = cur.buf[cur.pos:cut].rstrip().rstrip(",")
+                        for g in json.loads(f"[{batch}]"):
+                            if count >= start:
+                                yield count, g
+                            count += 1
+                        cur.pos = cut
+                        if cur.pos * 2 > len(cur.buf):
+                            cur.fill()
+                        continue
+                g = cur.value()
+                if count >= start:
+                    yield count, g
+                count += 1
+
+
+##
+# @brief history json 본 파일의 games 앞 최상위 키(players, total_games 등)만 읽는다.
+# @param path history json 경로.
+# @param chunk_size 읽기 청크 크기(문자 수).
+# @return 헤더 dict(games 뒤에 오는 키는 빠짐).
+def read_header(path, chunk_size=CHUNK_SIZE):
+    header = {}
+    for _ in _json_games(path, chunk_size, header, games=False):
+        pass
+    return header
+
+
+##
+# @brief history json의 저널 경로(history_data.json.journal).
+def journal_path(path):
+    return path + JOURNAL_SUFFIX
+
+
+##
+# @brief 저널 줄들을 읽는다(없으면 빈 리스트). 찢긴 줄(기록 중 종료)은 경고 후 건너뛴다.
+# @param path 저널 경로.
+# @return [{"offset", "game", "players"}] 리스트(오프셋 순).
+def _read_journal(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            log.warning(f"{path}: 찢긴 저널 줄을 건너뜀")
+    return entries
+
+
+##
+# @brief 저널 마지막 줄을 꼬리만 읽어 O(1)로 돌려준다.
+# @param path 저널 경로.
+# @return 마지막 항목 dict 또는 None(없음/빈 저널).
+def _journal_tail(path):
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 65536))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    for line in reversed(lines):
+        if line.strip():
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue  # 찢긴 마지막 줄
+    return None
+
+
+##
+# @brief history의 games를 (오프셋, 판) 순서로 스트리밍한다(본 파일 + 아직 합치지 않은 저널).
+# @details 본 파일(history_data.json)은 최상위 키 단위로 읽다가 games 배열을 만나면 판을 하나씩
+#          디코드해 넘겨준다. 메모리는 청크 크기와 판 하나 크기에 비례한다. 본 파일 뒤에는 저널에만
+#          있는 판을 이어서 넘겨준다. 저널을 먼저 읽고 본 파일을 나중에 열기 때문에, 그 사이 fold()가
+#          끝나 본 파일이 커져도 판이 빠지지 않는다(겹치는 판은 오프셋으로 거름).
+#          start가 저널 첫 판 이후면 본 파일의 games는 읽지 않는다(파생 캐시의 따라잡기가 O(새 판)).
+# @param path history json 경로.
+# @param chunk_size 읽기 청크 크기(문자 수).
+# @param header 지정하면 games 외 최상위 키/값을 이 dict에 채운다(저널의 새 이름·판 수 포함).
+# @param start 이 오프셋부터 yield.
+# @return (offset, game) 제너레이터.
+def iter_games(path, chunk_size=CHUNK_SIZE, header=None, start=0):
+    journal = _read_journal(journal_path(path))
+    head = {} if header is None else header
+    if journal and journal[0]["offset"] <= start:
+        head.update(read_header(path, chunk_size))
+        offset = start
+    else:
+        offset = yield from _json_games(path, chunk_size, head, start)
+        offset = max(offset, start)
+    for entry in journal:
+        for uid, name in entry.get("players", {}).items():
+            head.setdefault("players", {}).setdefault(uid, name)
+        n = entry["offset"]
+        if n < offset:
+            continue
+        if n > offset:
+            raise ValueError(f"{path}: {offset}번째 판이 없습니다(저널은 {n}번째부터)")
+        head["generated_at"] = entry["game"].get("time")
+        yield n, entry["game"]
+        offset += 1
+    if journal:
+        head["total_games"] = offset
+
+
+##
+# @brief history의 판 수를 센다. 저널이 있으면 마지막 줄만 보고 O(1).
+# @param path history json 경로.
+# @return 판 수(본 파일도 없으면 0).
+def count(path):
+    tail = _journal_tail(journal_path(path))
+    if tail is not None:
+        return tail["offset"] + 1
+    try:
+        total = read_header(path).get("total_games")
+    except FileNotFoundError:
+        return 0
+    if isinstance(total, int):
+        return total
+    return sum(1 for _ in iter_games(path))
+
+
+##
+# @brief history의 마지막 판. 저널이 있으면 마지막 줄만 보고 O(1).
+# @details 저널이 아직 없을 때(예전 형식 파일의 첫 기록)만 본 파일을 끝까지 스트리밍한다.
+# @param path history json 경로.
+# @return (offset, game) 또는 None(판 없음).
+def last_game(path):
+    tail = _journal_tail(journal_path(path))
+    if tail is not None:
+        return tail["offset"], tail["game"]
+    last = None
+    try:
+        for last in iter_games(path):
+            pass
+    except FileNotFoundError:
+        return None
+    return last
+
+
+##
+# @brief 판 하나를 저널 끝에 붙인다(fsync까지). 본 파일은 건드리지 않는다.
+# @details victory_commit.record()의 저장소 트랜잭션 안에서 불린다(샤드 간 순서 보장).
+#          직전 기록이 찢긴 채 끝났으면 줄을 먼저 끊어 새 판이 그 줄에 섞이지 않게 한다.
+# @param path history json 경로.
+# @param offset 이 판의 오프셋(= 기록 전 판 수).
+# @param game 판 레코드.
+# @param players 이 판 참가자 {id: 이름}(본 파일 players 매핑에 처음 보는 id만 추가됨).
+def append(path, offset, game, players):
+    line = json.dumps({"offset": offset, "game": game, "players": players}, ensure_ascii=False)
+    jpath = journal_path(path)
+    os.makedirs(os.path.dirname(jpath) or ".", exist_ok=True)
+    with open(jpath, "a+b") as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write(line.encode("utf-8") + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+##
+# @brief 저널이 JOURNAL_MAX를 넘었는지(본 파일에 합칠 때가 됐는지).
+# @param path history json 경로.
+def journal_full(path):
+    try:
+        return os.path.getsize(journal_path(path)) >= JOURNAL_MAX
+    except FileNotFoundError:
+        return False
+
+
+##
+# @brief 본 파일에 이미 합쳐진 저널 앞부분을 잘라 낸다(마지막 판 한 줄은 항상 남김).
+# @details 저널에 쓰는 쪽과 겹치지 않도록 저장소 트랜잭션 안에서 부른다. 저널이 JOURNAL_MAX보다
+#          작거나 본 파일이 아직 합치지 않았으면 아무것도 하지 않는다(판마다 O(1)).
+# @param path history json 경로.
+# @return 잘라 낸 줄 수.
+def trim(path):
+    if not journal_full(path):
+        return 0
+    jpath = journal_path(path)
+    total = read_header(path).get("total_games", 0)
+    entries = _read_journal(jpath)
+    keep = [e for e in entries if e["offset"] >= total - 1]
+    if len(keep) == len(entries):
+        return 0
+    data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in keep).encode("utf-8")
+    safe_io.atomic_replace(jpath, data)
+    return len(entries) - len(keep)
+
+
+##
+# @brief 저널의 판을 본 파일과 합친 history 전체 dict를 만든다(오프라인 도구, 백업, fold용).
+# @param path history json 경로.
+# @return history dict(games, players, total_games, generated_at 반영).
+def load(path):
+    data = safe_io.read_json(path)
+    _merge(data, _read_journal(journal_path(path)), path)
+    return data
+
+
+##
+# @brief 저널 항목들을 history dict 뒤에 이어 붙인다(이미 있는 오프셋은 건너뜀).
+# @return 새로 붙인 판 수.
+def _merge(data, entries, path):
+    games = data["games"]
+    added = 0
+    for entry in entries:
+        n = entry["offset"]
+        if n < len(games):
+            continue
+        if n > len(games):
+            raise ValueError(f"{path}: {len(games)}번째 판이 없습니다(저널은 {n}번째부터)")
+        games.append(entry["game"])
+        for uid, name in entry.get("players", {}).items():
+            data["players"].setdefault(uid, name)
+        data["generated_at"] = entry["game"].get("time")
+        added += 1
+    data["total_games"] = len(games)
+    return added
+
+
+##
+# @brief 저널의 판을 본 파일에 합쳐 원자적으로 다시 쓴다(업로드 직전, 저널이 찼을 때).
+# @details 저장소 트랜잭션 밖에서 부른다(O(전체 판)). 판은 dict 대신 History(GameTable 열)로 스트리밍해
+#          읽고 조각 단위로 직렬화하므로 메모리는 판당 수십 바이트다. 본 파일 다시 쓰기는 safe_io.file_lock으로
+#          직렬화하고 잠금 안에서 다시 읽으므로, 늦게 끝난 fold가 더 최신 본 파일을 덮어쓰지 않는다.
+#          저널은 건드리지 않는다(합쳐진 앞부분은 다음 기록 때 trim()이 잘라 냄).
+# @param path history json 경로.
+# @return 본 파일에 새로 합친 판 수.
+def fold(path):
+    with safe_io.file_lock(path):
+        tail = _journal_tail(journal_path(path))
+        folded = read_header(path).get("total_games", 0)
+        if tail is None or folded > tail["offset"]:
+            return 0
+        history = load_history(path)
+        write_history(path, history)
+        return len(history.games) - folded
+
+
+##
+# @brief history(본 파일 + 저널)를 History(헤더 + GameTable)로 스트리밍해 읽는다.
+# @details 판 dict를 한꺼번에 만들지 않고 하나씩 GameTable에 넣는다(판당 1KB+ → 수십 바이트).
+# @param path history json 경로.
+# @param chunk_size 읽기 청크 크기(문자 수).
+# @return History(write_history()로 쓰면 원래 파일과 바이트 단위로 같음).
+def load_history(path, chunk_size=CHUNK_SIZE):
+    header, table, games_pos = {}, GameTable(), None
+    for _, game in iter_games(path, chunk_size, header=header):
+        if games_pos is None:
+            games_pos = len(header)  # 첫 판을 받을 때까지 읽은 키 = games 앞의 키
+        table.append(game)
+    return History(header, table, games_pos)
+
+
+##
+# @brief History를 json.dumps(indent=2, ensure_ascii=False)와 같은 바이트로 조각 단위 직렬화한다.
+# @param history History.
+# @return 문자열 조각 제너레이터.
+def _history_chunks(history, batch=1000):
+    header, games = history.header, history.games
+    keys = list(header)
+    keys.insert(len(keys) if history.games_pos is None else history.games_pos, None)  # None = games 자리
+    yield "{"
+    for n, key in enumerate(keys):
+        yield "\n  " if n == 0 else ",\n  "
+        if key is not None:
+            yield json.dumps(key, ensure_ascii=False) + ": " + \
+                json.dumps(header[key], ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            continue
+        yield '"games": '
+        if not len(games):
+            yield "[]"
+            continue
+        for lo in range(0, len(games), batch):
+            yield "".join(
+                ("[\n    " if i == 0 else ",\n    ")
+                + json.dumps(games.game(i), ensure_ascii=False, indent=2).replace("\n", "\n    ")
+                for i in range(lo, min(lo + batch, len(games)))
+            )
+        yield "\n  ]"
+    yield "\n}"
+
+
+##
+# @brief History를 본 파일에 원자적으로 쓴다(체크섬 포함, indent=2 형식 그대로, 전체 문자열을 만들지 않음).
+# @param path history json 경로.
+# @param history History.
+# @return 본문 sha256.
+def write_history(path, history):
+    return safe_io.write_stream(path, _history_chunks(history))
+
+
+##
+# @brief history 전체를 본 파일 하나로 다시 쓰고 저널을 지운다(병합·retag·복구 같은 오프라인 도구용).
+# @details 봇이 기록하지 않는 동안에만 쓴다. load()로 읽은 dict를 고쳐 넘긴다.
+# @param path history json 경로.
+# @param data history dict.
+def save(path, data):
+    data["total_games"] = len(data["games"])
+    with safe_io.file_lock(path):
+        safe_io.write_json(path, data, indent=2)
+        try:
+            os.remove(journal_path(path))
+        except FileNotFoundError:
+            pass
+
+
+##
+# @brief history 버전(본 파일과 저널의 크기·mtime). 판이 기록되거나 합쳐지면 바뀐다.
+# @param path history json 경로.
+# @return (size, mtime_ns, journal size, journal mtime_ns) 튜플, 본 파일이 없으면 None.
+def version(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    try:
+        jst = os.stat(journal_path(path))
+        return (st.st_size, st.st_mtime_ns, jst.st_size, jst.st_mtime_ns)
+    except FileNotFoundError:
+        return (st.st_size, st.st_mtime_ns, 0, 0)
@@ -0,0 +1,344 @@
+##
+# @file http_client.py
+# @brief 디스코드 밖 외부 HTTP(ddragon, GitHub)를 위한 공유 비동기 클라이언트.
+# @details 예전에는 요청마다 requests로 새 연결을 열었고(ddragon은 타임아웃도 없음), GitHub 업로드는
+#          판마다 스레드를 새로 띄웠다. 여기서는 py-cord가 이미 쓰는 aiohttp로 이벤트 루프당 세션 하나를
+#          두고 모든 요청이 연결 풀(keep-alive)을 같이 쓴다.
+#
+#            - 풀 크기 POOL_SIZE, 호스트당 동시 요청 PER_HOST (HOST_LIMITS로 호스트별 조정)
+#            - 연결/전체 타임아웃, 429·5xx·연결 오류는 지수 백오프 + 지터로 RETRIES번까지 재시도
+#              (Retry-After 헤더가 있으면 그만큼 기다림)
+#            - 지표: http.<tag> 지연(재시도 포함), http.<tag>.retry / http.<tag>.failed 카운터
+#
+#          봇은 on_ready에서 bind()로 자기 루프를 등록한다. 스레드(판 기록, 초상화 받기)에서는
+#          submit()/run_sync()로 그 루프에 요청을 넘긴다. 등록된 루프가 없으면(CLI) 호출한 스레드에서
+#          임시 루프로 실행하고 세션을 닫는다. 루프 스레드 자신에서 부르면 submit()은 그 루프의 Task로
+#          넘기고, run_sync()는 루프를 멈추게 되므로 RuntimeError를 낸다.
+#
+#          사용법 (로컬 가짜 서버로 공유 풀 vs 요청마다 새 연결 비교):
+#            python http_client.py bench [--requests 500 --concurrency 50 --fail-rate 0.1]
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+## 연결 풀 크기와 호스트당 동시 요청 수.
+POOL_SIZE = 32
+PER_HOST = 8
+
+## 호스트별 동시 요청 수 조정 (GitHub 쓰기는 sha 경합을 줄이려고 적게).
+HOST_LIMITS = {"api.github.com": 2}
+
+## 타임아웃(초).
+CONNECT_TIMEOUT = 5
+TOTAL_TIMEOUT = 15
+
+## 재시도 횟수와 백오프(초): BACKOFF × 2^시도 에 지터, BACKOFF_MAX까지.
+RETRIES = 3
+BACKOFF = 0.5
+BACKOFF_MAX = 8.0
+
+## 재시도할 응답 코드.
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+USER_AGENT = "got_champe (+https://github.com/HANSOLJJ/lol_arena)"
+
+_main_loop = None
+_states = {}  # loop -> _LoopState
+_tasks = set()  # 루프 스레드에서 submit()한 Task (끝날 때까지 참조 유지)
+
+
+##
+# @brief 재시도 후에도 실패한 요청(연결 오류, 타임아웃, 기대와 다른 응답 코드).
+class HTTPError(Exception):
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+##
+# @brief 본문까지 읽은 응답.
+class Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    ##
+    # @brief 본문을 JSON으로 파싱한다.
+    def json(self):
+        return json.loads(self.body)
+
+    ##
+    # @brief 본문 문자열(UTF-8).
+    @property
+    def text(self):
+        return self.body.decode("utf-8", "replace")
+
+
+##
+# @brief 이벤트 루프 하나의 세션과 호스트별 세마포어.
+class _LoopState:
+    __slots__ = ("session", "limits")
+
+    def __init__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_SIZE, limit_per_host=PER_HOST, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT),
+            headers={"User-Agent": USER_AGENT},
+        )
+        self.limits = {host: asyncio.Semaphore(n) for host, n in HOST_LIMITS.items()}
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None or state.session.closed:
+        state = _states[loop] = _LoopState()
+    return state
+
+
+##
+# @brief 봇 이벤트 루프를 등록한다(스레드에서 submit/run_sync가 이 루프로 요청을 넘김).
+# @param loop 등록할 루프(없으면 현재 실행 중인 루프).
+def bind(loop=None):
+    global _main_loop
+    _main_loop = loop or asyncio.get_running_loop()
+
+
+##
+# @brief 현재 루프의 세션을 닫는다.
+async def close():
+    state = _states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.session.close()
+
+
+##
+# @brief 재시도 대기 시간(초). Retry-After가 있으면 우선한다.
+def _delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return min(BACKOFF * (2 ** attempt), BACKOFF_MAX) * random.uniform(0.5, 1.5)
+
+
+##
+# @brief HTTP 요청 하나를 보낸다(공유 풀, 재시도, 지표).
+# @param method "GET", "PUT" 등.
+# @param url 주소.
+# @param tag 지표 이름(예: "ddragon", "github").
+# @param retries 재시도 횟수.
+# @param timeout 이 요청만의 전체 타임아웃(초), 없으면 기본값.
+# @param kwargs aiohttp 요청 인자(headers, params, json, data).
+# @return Response. 재시도 대상 코드도 마지막 시도 결과를 그대로 돌려준다.
+# @throws HTTPError 연결 오류·타임아웃이 재시도 후에도 계속되면.
+async def request(method, url, tag="http", retries=RETRIES, timeout=None, **kwargs):
+    state = _state()
+    if timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, CONNECT_TIMEOUT))
+    limit = state.limits.get(urlsplit(url).hostname)
+    start = time.perf_counter()
+    try:
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            try:
+                if limit is not None:
+                    await limit.acquire()
+                try:
+                    async with state.session.request(method, url, **kwargs) as r:
+                        body = await r.read()
+                        response = Response(r.status, r.headers, body)
+                finally:
+                    if limit is not None:
+                        limit.release()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last:
+                    metrics.incr(f"http.{tag}.failed")
+                    raise HTTPError(f"{method} {url}: {type(e).__name__} {e}") from e
+                retry_after = None
+            else:
+                if response.status not in RETRY_STATUS or last:
+                    if response.status >= 400:
+                        metrics.incr(f"http.{tag}.failed")
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            metrics.incr(f"http.{tag}.retry")
+            await asyncio.sleep(_delay(attempt, retry_after))
+    finally:
+        metrics.observe(f"http.{tag}", time.perf_counter() - start)
+
+
+##
+# @brief GET 후 200이면 JSON을 돌려준다.
+# @throws HTTPError 실패하거나 200이 아니면.
+async def get_json(url, tag="http", **kwargs):
+    r = await request("GET", url, tag=tag, **kwargs)
+    if r.status != 200:
+        raise HTTPError(f"GET {url}: {r.status}", r.status)
+    return r.json()
+
+
+##
+# @brief GET 후 200이면 본문 바이트를 돌려준다.
+# @throws HTTPError 실패하거나 200이 아니면.
+async def get_bytes(url, tag="http", **kwargs):
+    r = await request("GET", url, tag=tag, **kwargs)
+    if r.status != 200:
+        raise HTTPError(f"GET {url}: {r.status}", r.status)
+    return r.body
+
+
+async def _oneshot(factory):
+    try:
+        return await factory()
+    finally:
+        await close()
+
+
+##
+# @brief 지금 스레드에서 돌고 있는 이벤트 루프(없으면 None).
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+##
+# @brief 봇 루프가 돌고 있고 지금 스레드가 그 루프가 아닌지.
+def _use_main_loop():
+    if _main_loop is None or not _main_loop.is_running():
+        return False
+    return _running_loop() is not _main_loop
+
+
+##
+# @brief 코루틴을 봇 루프에서 실행하도록 넘기고 기다리지 않는다.
+# @details 스레드에서 부르면 봇 루프로 넘긴다. 루프 스레드 자신(봇 루프, 또는 봇 루프가 없을 때 돌고
+#          있는 루프)에서 부르면 asyncio.run()을 할 수 없으므로 그 루프의 Task로 만든다. 돌고 있는
+#          루프가 없으면(CLI) 이 스레드에서 바로 실행한다.
+# @param factory 인자 없는 코루틴 함수.
+# @return concurrent.futures.Future, asyncio.Task(루프 스레드에서 부른 경우) 또는 None(바로 실행한 경우).
+def submit(factory):
+    if _use_main_loop():
+        return asyncio.run_coroutine_threadsafe(factory(), _main_loop)
+    loop = _running_loop()
+    if loop is not None:
+        task = loop.create_task(factory())
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+        return task
+    asyncio.run(_oneshot(factory))
+    return None
+
+
+##
+# @brief 코루틴을 봇 루프에서 실행하고 결과를 기다린다(스레드에서 호출, 루프 스레드에서는 금지).
+# @param factory 인자 없는 코루틴 함수.
+# @param timeout 최대 대기(초).
+# @return 코루틴 결과.
+# @exception RuntimeError 이벤트 루프 스레드에서 부른 경우(기다리면 루프가 멈춤 — await 하거나
+#            asyncio.to_thread 안에서 부를 것).
+def run_sync(factory, timeout=None):
+    if _use_main_loop():
+        return asyncio.run_coroutine_threadsafe(factory(), _main_loop).result(timeout)
+    if _running_loop() is not None:
+        raise RuntimeError("http_client.run_sync()를 이벤트 루프 스레드에서 부를 수 없습니다 "
+                           "(await 하거나 asyncio.to_thread 안에서 부르세요)")
+    return asyncio.run(_oneshot(factory))
+
+
+# === 벤치 ===
+##
+# @brief 로컬 가짜 서버로 공유 풀과 요청마다 새 세션(예전 requests 방식)을 비교한다.
+# @param n 요청 수.
+# @param concurrency 동시 요청 수.
+# @param fail_rate 서버가 503을 돌려줄 확률(재시도 경로 확인).
+def bench(n, concurrency, fail_rate):
+    from aiohttp import web
+
+    global BACKOFF
+    BACKOFF = 0.01  # 벤치는 재시도 대기를 줄인다
+    peers = set()
+    rng = random.Random(0)
+    payload = json.dumps({"data": {f"Champ{i}": {"name": f"챔피언{i}"} for i in range(170)}}).encode()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        if rng.random() < fail_rate:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(body=payload, content_type="application/json")
+
+    async def run_case(url, shared):
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                if shared:
+                    return await get_json(url, tag="bench")
+                for attempt in range(RETRIES + 1):  # 예전 방식: 요청마다 새 연결
+                    async with aiohttp.ClientSession() as s:
+                        async with s.get(url) as r:
+                            if r.status == 200:
+                                return await r.json()
+                    await asyncio.sleep(_delay(attempt))
+                raise HTTPError(url)
+
+        peers.clear()
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(n)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        failed = sum(isinstance(r, Exception) for r in results)
+        return elapsed, len(peers), failed
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/champion.json", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/champion.json"
+        try:
+            for name, shared in (("요청마다 새 연결", False), ("공유 풀", True)):
+                elapsed, conns, failed = await run_case(url, shared)
+                print(f"{name:>10}: {n}건 {elapsed * 1000:.0f} ms ({n / elapsed:.0f} req/s), "
+                      f"연결 {conns}개, 실패 {failed}")
+        finally:
+            await close()
+            await runner.cleanup()
+
+    asyncio.run(main())
+    print(metrics.format_summary())
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공유 HTTP 클라이언트 벤치")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="가짜 서버가 503을 돌려줄 확률")
+    args = parser.parse_args(argv)
+    return bench(args.requests, args.concurrency, args.fail_rate)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
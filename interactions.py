@@ -0,0 +1,66 @@
+##
+# @file interactions.py
+# @brief 디스코드 상호작용을 "먼저 응답(ack) → 무거운 작업 → 후속 응답" 순서로 처리하는 파이프라인.
+# @details 디스코드는 상호작용을 3초 안에 응답하지 않으면 "상호작용 실패"로 처리한다.
+#          파일 저장·기록처럼 느려질 수 있는 작업은 반드시 ack 이후에 돌리고, 블로킹 I/O는
+#          asyncio.to_thread()로 이벤트 루프 밖에서 실행한다. ack 지연(<name>.ack)과
+#          후속 응답 지연(<name>.followup)은 metrics에 따로 기록하고, 이 상호작용 태스크의 로그에는
+#          handler=<name> 태그를 붙인다.
+import time
+
+import botlog
+import metrics
+
+
+##
+# @brief 상호작용을 즉시 defer로 ack한 뒤 작업을 실행하고 결과를 후속 메시지로 보낸다.
+# @details work는 인자 없는 코루틴 함수이며, 반환한 문자열을 followup으로 전송한다(None이면 생략).
+#          작업 중 예외가 나면 사용자에게 실패 안내를 보내고 예외를 다시 던진다.
+# @param interaction 디스코드 상호작용 객체.
+# @param name 지표 접두어(예: "victory").
+# @param work 실행할 코루틴 함수. 후속 메시지 문자열 또는 None을 반환.
+# @param ephemeral True면 본인에게만 보이는 응답.
+# @return work의 반환값.
+async def run_deferred(interaction, name, work, ephemeral=True):
+    botlog.set_tags(handler=name)
+    start = time.perf_counter()
+    await interaction.response.defer(ephemeral=ephemeral)
+    metrics.observe(f"{name}.ack", time.perf_counter() - start)
+
+    try:
+        result = await work()
+    except Exception:
+        metrics.incr(f"{name}.failed")
+        try:
+            await interaction.followup.send("❌ 처리 중 오류가 발생했습니다.", ephemeral=ephemeral)
+        except Exception:
+            pass
+        raise
+
+    if result:
+        await interaction.followup.send(result, ephemeral=ephemeral)
+    metrics.observe(f"{name}.followup", time.perf_counter() - start)
+    return result
+
+
+##
+# @brief 응답 문구가 이미 정해진 경우, 그 문구로 즉시 ack한 뒤 나머지 작업을 실행한다.
+# @details 챔피언 선택처럼 사용자에게 보여줄 답이 바로 나오는 상호작용용. work 완료 시점까지를
+#          후속 처리 지연으로 기록한다.
+# @param interaction 디스코드 상호작용 객체.
+# @param name 지표 접두어(예: "pick").
+# @param content ack로 보낼 메시지.
+# @param work ack 이후 실행할 코루틴 함수(없으면 None).
+# @param ephemeral True면 본인에게만 보이는 응답.
+# @return work의 반환값(없으면 None).
+async def run_acked(interaction, name, content, work=None, ephemeral=True):
+    botlog.set_tags(handler=name)
+    start = time.perf_counter()
+    await interaction.response.send_message(content, ephemeral=ephemeral)
+    metrics.observe(f"{name}.ack", time.perf_counter() - start)
+
+    if work is None:
+        return None
+    result = await work()
+    metrics.observe(f"{name}.followup", time.perf_counter() - start)
+    return result
@@ -0,0 +1,125 @@
+##
+# @file metrics.py
+# @brief 봇 내부 카운터·지연시간 지표를 모으는 경량 인메모리 모듈.
+# @details 상호작용 응답(ack) 지연, 후속 응답(follow-up) 지연처럼 핫패스에서 측정하는 값을
+#          프로세스 메모리에만 쌓는다. 디스크 I/O나 외부 의존이 없어 어디서든 import 해도 된다.
+#          /지표 커맨드가 format_summary()로 현재 값을 보여준다.
+import time
+from collections import defaultdict, deque
+
+## 지연시간 분포(p50/p95) 계산에 쓰는 최근 샘플 개수.
+SAMPLE_WINDOW = 256
+
+_counters = defaultdict(int)
+_timings = {}
+
+
+##
+# @brief 한 지표의 지연시간 누적 통계(횟수, 합, 최대, 최근 샘플).
+class _TimingStat:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    ##
+    # @brief 샘플 하나를 반영한다.
+    # @param seconds 측정값(초).
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    ##
+    # @brief 최근 샘플 기준 백분위수를 계산한다.
+    # @param pct 0~100 백분위.
+    # @return 초 단위 값(샘플 없으면 0.0).
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[idx]
+
+
+##
+# @brief 카운터를 n만큼 증가시킨다.
+# @param name 지표 이름(예: "victory.followup.sent").
+# @param n 증가량(기본 1).
+def incr(name, n=1):
+    _counters[name] += n
+
+
+##
+# @brief 지연시간 샘플을 기록한다.
+# @param name 지표 이름(예: "victory.ack").
+# @param seconds 측정값(초).
+def observe(name, seconds):
+    stat = _timings.get(name)
+    if stat is None:
+        stat = _timings[name] = _TimingStat()
+    stat.add(seconds)
+
+
+##
+# @brief with 블록의 경과 시간을 observe()로 기록하는 컨텍스트 매니저.
+# @details 사용 예: `with metrics.timer("startup.load"): ...`
+class timer:
+
+    ##
+    # @param name 기록할 지표 이름.
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+##
+# @brief 현재 지표를 dict로 반환한다(대시보드/로그 덤프용).
+# @return {"counters": {name: int}, "timings": {name: {count, avg_ms, p50_ms, p95_ms, max_ms}}}.
+def snapshot():
+    timings = {}
+    for name, stat in _timings.items():
+        timings[name] = {
+            "count": stat.count,
+            "avg_ms": round(stat.total / stat.count * 1000, 2) if stat.count else 0.0,
+            "p50_ms": round(stat.percentile(50) * 1000, 2),
+            "p95_ms": round(stat.percentile(95) * 1000, 2),
+            "max_ms": round(stat.max * 1000, 2),
+        }
+    return {"counters": dict(_counters), "timings": timings}
+
+
+##
+# @brief 지표를 디스코드 메시지용 텍스트로 만든다.
+# @return 이름순으로 정렬된 여러 줄 문자열(지표가 없으면 안내 문구).
+def format_summary():
+    snap = snapshot()
+    lines = []
+    for name, t in sorted(snap["timings"].items()):
+        lines.append(
+            f"{name}: n={t['count']} avg={t['avg_ms']}ms p50={t['p50_ms']}ms "
+            f"p95={t['p95_ms']}ms max={t['max_ms']}ms"
+        )
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines) if lines else "(수집된 지표 없음)"
+
+
+##
+# @brief 모든 지표를 초기화한다(벤치마크 시작 전 등).
+def reset():
+    _counters.clear()
+    _timings.clear()
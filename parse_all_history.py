@@ -4,16 +4,40 @@
 # @details 팀짜기 채널의 메시지 유실을 다른 채널로 보정하기 위해, 세 채널의 결과 embed를
 #          내용 기반 키로 dedup 하여 하나의 history_data.json으로 재생성한다.
 #          평상시엔 봇(game_recorder)이 직접 기록하므로 이 스크립트는 재해복구 전용이다.
-# @warning 이 파서는 season/round_orig 필드를 생성하지 않는다. 재실행 시 마이그레이션으로
-#          부여했던 시즌/연번 정보가 사라지므로, 재해복구 후에는 시즌 재태깅이 필요하다.
+#
+#          --merge 모드는 덮어쓰지 않고 기존 history에 합친다. 기존 마지막 판 시각에서 MERGE_MARGIN만큼
+#          앞선 시점(또는 --after) 이후 메시지만 스캔하고, 그 이후 구간의 기존 판과 복구 판을
+#          content_key로 정렬해 한 번에 merge-join 한다. 기존 판의 season/round_orig 등은 그대로 두고
+#          빠진 판과 sources만 추가하며, 변경 내역을 data/merge_report_<시각>.json에 남긴다.
+#          비용은 전체 history가 아니라 새 메시지 수에 비례한다.
+#
+#          사용법:
+#            python parse_all_history.py                       # 전 채널 풀스캔 → history 덮어쓰기
+#            python parse_all_history.py --merge               # 마지막 판 이후만 스캔 → 병합
+#            python parse_all_history.py --merge --after 2025-03-01
+# @warning 덮어쓰기 모드는 season/round_orig 필드를 생성하지 않는다. 재실행 시 마이그레이션으로
+#          부여했던 시즌/연번 정보가 사라지므로, 재해복구 후에는 시즌 재태깅이 필요하다
+#          (`python season_index.py retag` — 남아있는 시즌 인덱스의 시즌 경계로 한 번에 복원).
+import argparse
 import discord
+import heapq
+import logging
 import os
 import json
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
+import backup
+import botlog
+import history_io
 import paths
+import safe_io
+from compact_model import WinsRecord
+from history_io import content_key
+from season_index import next_season
+
+log = logging.getLogger("parse_all_history")
 
 load_dotenv()
 token = os.getenv("DISCORD_TOKEN")
@@ -22,16 +46,16 @@ GUILD_ID = 391527401475014658
 CHANNELS = ["TEAM2", "TEAM1", "팀짜기"]
 CH_LABEL = {"TEAM2": "T2", "TEAM1": "T1", "팀짜기": "CMD"}
 
+## --merge 기본 스캔 시작점: 기존 마지막 판 시각에서 이만큼 앞(세션 구분 공백과 같은 값).
+MERGE_MARGIN = timedelta(hours=6)
+
 intents = discord.Intents.default()
 intents.members = True
 client = discord.Client(intents=intents)
 
 with open(paths.wins_file(False), "r", encoding="utf-8") as f:
-    wins_data = json.load(f)
-NAME_MAP = {
-    uid: v["name"] for uid, v in wins_data.items()
-    if isinstance(v, dict) and "name" in v
-}
+    wins_data = WinsRecord.from_json(json.load(f))
+NAME_MAP = {uid: p.name for uid, p in wins_data.players.items() if p.name}
 
 LINE_RE = re.compile(r"<@!?(\d+)>:\s*\*\*(.+?)\*\*")
 
@@ -75,40 +99,27 @@ def parse_result_embed(embed):
 
 
 ##
-# @brief 채널과 무관하게 같은 판이면 동일해지는 내용 기반 dedup 키를 만든다.
-# @details 3채널에 중복 전송된 같은 판을 하나로 합치기 위해 (라운드, 승자, 정렬된 양 팀
-#          (id,champ) 조합)으로 키를 구성한다.
-# @param g parse_result_embed가 반환한 판 레코드.
-# @return 해시 가능한 튜플 키.
-def content_key(g):
-    t1 = tuple(sorted((p["id"], p["champ"]) for p in g["team1"]))
-    t2 = tuple(sorted((p["id"], p["champ"]) for p in g["team2"]))
-    return (g["round"], g["winner"], t1, t2)
+# @brief 판의 time 문자열을 aware datetime으로 바꾼다.
+def parse_time(value):
+    t = datetime.fromisoformat(value)
+    return t if t.tzinfo else t.replace(tzinfo=timezone.utc)
 
 
 ##
-# @brief 봇 로그인 완료 시 실행되는 메인 파싱 루틴.
-# @details 3채널을 각각 풀스캔해 결과 embed를 내용 키로 병합(가장 이른 시각·소스 채널 유지),
-#          시간순 정렬 후 6시간 공백 기준으로 세션을 나눠 커버리지/유실 리포트를 출력하고
-#          history_data.json으로 저장한다.
-# @return 없음(완료 후 client 종료).
-@client.event
-async def on_ready():
-    print(f"[OK] Logged in as {client.user}")
-    guild = discord.utils.get(client.guilds, id=GUILD_ID)
-    if not guild:
-        print("[ERROR] Guild not found")
-        await client.close()
-        return
-
-    merged = {}  # content_key -> game record (+ sources, time)
+# @brief 3채널의 결과 embed를 스캔해 내용 키로 합친다.
+# @details 같은 판이 여러 채널에 있으면 소스 채널을 모으고 가장 이른 시각을 유지한다.
+# @param guild 대상 길드.
+# @param after 지정하면 이 시각 이후 메시지만 스캔.
+# @return {content_key: 판 레코드(+ sources, time, _ts)}.
+async def scan_channels(guild, after=None):
+    merged = {}
     for name in CHANNELS:
         ch = discord.utils.get(guild.channels, name=name)
         if not ch:
-            print(f"[SKIP] #{name} not found")
+            log.warning(f"[SKIP] #{name} not found")
             continue
         cnt = 0
-        async for message in ch.history(limit=None):
+        async for message in ch.history(limit=None, after=after):
             if message.author != client.user:
                 continue
             for embed in message.embeds:
@@ -130,7 +141,138 @@ async def on_ready():
                     if ts < e["_ts"]:  # 가장 이른 시각 유지
                         e["_ts"] = ts
                         e["time"] = ts.isoformat()
-        print(f"[SCAN] #{name}: {cnt} result embeds")
+        log.info(f"[SCAN] #{name}: {cnt} result embeds")
+    return merged
+
+
+##
+# @brief 복구한 판을 기존 games에 병합한다(in-place).
+# @details cutoff 이후의 기존 판(뒤에서부터 찾으므로 O(구간))과 복구 판을 content_key로 정렬해
+#          한 번에 merge-join 한다. 짝이 맞으면 기존 판을 유지하고 빠진 sources만 더하고,
+#          복구 쪽에만 있으면 시간순 위치에 끼워 넣으며 직전 판 기준 라운드 회귀 규칙으로
+#          season을 매긴다(round_orig = embed 라운드). 기존 쪽에만 있는 판은 건드리지 않고 보고만 한다.
+# @param games 기존 판 리스트(시간순, in-place 수정).
+# @param recovered 복구 판 레코드 리스트(_ts 포함).
+# @param cutoff 이 시각 이후 구간만 비교(None이면 전 구간).
+# @return diff 리포트 dict.
+def merge_games(games, recovered, cutoff=None):
+    start = len(games) if cutoff is not None else 0
+    while start > 0 and parse_time(games[start - 1]["time"]) >= cutoff:
+        start -= 1
+    tail = games[start:]
+
+    old = sorted(((content_key(g), i) for i, g in enumerate(tail)), key=lambda kv: kv[0])
+    new = sorted(((content_key(g), g) for g in recovered), key=lambda kv: kv[0])
+    added, sources_added, missing = [], [], []
+    matched = i = j = 0
+    while i < len(old) or j < len(new):
+        if j >= len(new) or (i < len(old) and old[i][0] < new[j][0]):
+            missing.append(tail[old[i][1]])
+            i += 1
+        elif i >= len(old) or new[j][0] < old[i][0]:
+            added.append(new[j][1])
+            j += 1
+        else:
+            e, r = tail[old[i][1]], new[j][1]
+            extra = [s for s in r["sources"] if s not in e.get("sources", [])]
+            if extra:
+                e["sources"] = e.get("sources", []) + extra
+                sources_added.append((e, extra))
+            matched += 1
+            i += 1
+            j += 1
+
+    added.sort(key=lambda g: g["_ts"])
+    merged_tail = list(heapq.merge(tail, added, key=lambda g: g["_ts"] if "_ts" in g else parse_time(g["time"])))
+    prev = games[start - 1] if start else None
+    fresh = {id(g) for g in added}
+    for g in merged_tail:
+        if id(g) in fresh:
+            del g["_ts"]
+            g["round_orig"] = g["round"]
+            if prev is None or "season" in prev:
+                prev_round = prev.get("round_orig", prev["round"]) if prev else None
+                g["season"] = next_season(prev_round, prev.get("season") if prev else None, g["round"])
+        prev = g
+    games[start:] = merged_tail
+
+    def brief(g):
+        return {"season": g.get("season"), "round": g["round"], "time": g["time"], "sources": g.get("sources")}
+
+    return {
+        "cutoff": cutoff.isoformat() if cutoff else None,
+        "scanned": len(recovered),
+        "compared": len(tail),
+        "matched": matched,
+        "added": [dict(brief(g), team1=g["team1"], team2=g["team2"], winner=g["winner"]) for g in added],
+        "sources_added": [dict(brief(g), added=extra) for g, extra in sources_added],
+        "missing_from_channels": [brief(g) for g in missing],
+    }
+
+
+##
+# @brief --merge 모드: 스캔 결과를 기존 history_data.json에 병합하고 리포트를 남긴다.
+# @param guild 대상 길드(새 플레이어 이름 조회용).
+async def run_merge(guild):
+    hist_json = paths.history_json(False)
+    data = history_io.load(hist_json)
+    games = data["games"]
+    if ARGS.after:
+        cutoff = parse_time(ARGS.after)
+    elif games:
+        cutoff = parse_time(games[-1]["time"]) - MERGE_MARGIN
+    else:
+        cutoff = None
+    recovered = await scan_channels(guild, cutoff)
+    report = merge_games(games, list(recovered.values()), cutoff)
+
+    for g in report["added"]:
+        for p in g["team1"] + g["team2"]:
+            if p["id"] not in data["players"]:
+                m = guild.get_member(int(p["id"]))
+                data["players"][p["id"]] = NAME_MAP.get(p["id"]) or (m.display_name if m else p["id"])
+
+    print(f"[MERGE] cutoff={report['cutoff']} scanned={report['scanned']} compared={report['compared']} "
+          f"matched={report['matched']} added={len(report['added'])} "
+          f"sources+={len(report['sources_added'])} missing={len(report['missing_from_channels'])}")
+    for g in report["added"]:
+        print(f"  + S{g['season']} R{g['round']} {g['time'][:16]} {g['sources']}")
+    report_path = paths.merge_report(datetime.now().strftime("%Y%m%d_%H%M%S"))
+    safe_io.write_json(report_path, report, indent=2)
+    log.info(f"[SAVED] {report_path}")
+
+    if report["added"] or report["sources_added"]:
+        data["generated_at"] = max(data.get("generated_at") or "", games[-1]["time"])
+        history_io.save(hist_json, data)
+        log.info(f"[SAVED] {hist_json}")
+        if report["added"]:  # 중간에 판이 끼면 오프셋 기반 캐시가 어긋나므로 재생성
+            for derived in paths.derived_files(False):
+                if os.path.exists(derived):
+                    os.remove(derived)
+        backup.full_backup(False)
+
+
+##
+# @brief 봇 로그인 완료 시 실행되는 메인 파싱 루틴.
+# @details 3채널을 각각 풀스캔해 결과 embed를 내용 키로 병합(가장 이른 시각·소스 채널 유지),
+#          시간순 정렬 후 6시간 공백 기준으로 세션을 나눠 커버리지/유실 리포트를 출력하고
+#          history_data.json으로 저장한다. --merge면 run_merge()로 기존 history에 병합한다.
+# @return 없음(완료 후 client 종료).
+@client.event
+async def on_ready():
+    log.info(f"[OK] Logged in as {client.user}")
+    guild = discord.utils.get(client.guilds, id=GUILD_ID)
+    if not guild:
+        log.error("Guild not found")
+        await client.close()
+        return
+
+    if ARGS.merge:
+        await run_merge(guild)
+        await client.close()
+        return
+
+    merged = await scan_channels(guild)  # content_key -> game record (+ sources, time)
 
     games = sorted(merged.values(), key=lambda x: x["_ts"])
 
@@ -193,12 +335,20 @@ async def on_ready():
         "games": games,
     }
     hist_json = paths.history_json(False)
-    os.makedirs(os.path.dirname(hist_json), exist_ok=True)
-    with open(hist_json, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
-    print(f"\n[SAVED] {hist_json}")
+    history_io.save(hist_json, out)  # 남아 있던 저널도 지움 (복구 결과가 전부)
+    log.info(f"[SAVED] {hist_json}")
+    for derived in paths.derived_files(False):  # 판이 통째로 바뀌었으므로 오프셋 기반 캐시 재생성
+        if os.path.exists(derived):
+            os.remove(derived)
+    backup.full_backup(False)  # 통째로 바뀌었으므로 증분 백업 사슬을 새로 시작
 
     await client.close()
 
 
+parser = argparse.ArgumentParser(description="디스코드 3채널 결과 embed로 history_data.json 복구")
+parser.add_argument("--merge", action="store_true", help="덮어쓰지 않고 기존 history에 병합")
+parser.add_argument("--after", help="--merge 스캔 시작 시각(ISO, 기본: 마지막 판 - 6시간)")
+ARGS = parser.parse_args()
+
+botlog.setup()
 client.run(token)
@@ -11,6 +11,12 @@ CONFIG_FILE = "config.json"
 ## 데이터 폴더 (개인 승수 + 판 상세 마스터).
 DATA_DIR = "data"
 
+## 봇 로그 폴더.
+LOG_DIR = "logs"
+
+## 백업 폴더 (수동 bak/구시즌 집계 + auto/ 자동 증분 백업).
+BACKUP_DIR = "backup"
+
 
 ##
 # @brief DEV_MODE에 따라 개인 승수 파일 경로를 반환한다.
@@ -29,3 +35,141 @@ def wins_file(dev_mode):
 def history_json(dev_mode=False):
     suffix = "_dev" if dev_mode else ""
     return os.path.join(DATA_DIR, f"history_data{suffix}.json")
+
+
+##
+# @brief 시즌 인덱스(시즌 → 판 오프셋/라운드/날짜 범위/개인 집계) 파일 경로를 반환한다.
+# @details history_data.json의 games 배열에서 파생되는 캐시라 지워도 다음 기록 때 재생성된다.
+# @param dev_mode True면 season_index_dev.json.
+# @return json 파일 경로.
+def season_index_json(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"season_index{suffix}.json")
+
+
+##
+# @brief 시즌 인덱스 스냅샷 이후 기록된 판의 append-only 로그 경로를 반환한다.
+# @param dev_mode True면 season_index_dev.log.
+# @return 로그 파일 경로.
+def season_index_log(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"season_index{suffix}.log")
+
+
+##
+# @brief 슬래시 커맨드 동기화 캐시(커맨드 트리 해시 + 등록된 커맨드 ID) 파일 경로를 반환한다.
+# @details 트리 해시가 같으면 봇 시작 시 sync_commands()를 건너뛰고 캐시된 ID만 연결한다.
+# @param dev_mode True면 command_cache_dev.json (개발용 봇/토큰 분리).
+# @return json 파일 경로.
+def command_cache_json(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"command_cache{suffix}.json")
+
+
+##
+# @brief 플레이어/챔피언 역색인 스냅샷(posting list 원시 바이트) 파일 경로를 반환한다.
+# @details history_data.json에서 파생되는 캐시라 지워도 다음 조회 때 재생성된다.
+# @param dev_mode True면 history_index_dev.bin.
+# @return bin 파일 경로.
+def history_index_bin(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"history_index{suffix}.bin")
+
+
+##
+# @brief 역색인 스냅샷 이후 추가된 판의 append-only 로그 경로를 반환한다.
+# @param dev_mode True면 history_index_dev.log.
+# @return 로그 파일 경로.
+def history_index_log(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"history_index{suffix}.log")
+
+
+##
+# @brief 팀 승리 확률 모델(특성 키 + 가중치) 파일 경로를 반환한다.
+# @details history_data.json으로 학습되는 파생물이라 지워도 다음 시작 때 재학습된다.
+# @param dev_mode True면 win_model_dev.json.
+# @return json 파일 경로.
+def win_model_json(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"win_model{suffix}.json")
+
+
+##
+# @brief 봇 구조화 로그(JSON 한 줄씩, 5MB 회전) 파일 경로를 반환한다.
+# @return jsonl 파일 경로.
+def bot_log_file():
+    return os.path.join(LOG_DIR, "bot.jsonl")
+
+
+##
+# @brief /프로파일 세션 리포트 파일 경로를 반환한다.
+# @param stamp 파일명에 붙일 시각 문자열(YYYYmmdd_HHMMSS).
+# @return txt 파일 경로.
+def profile_report(stamp):
+    return os.path.join(DATA_DIR, f"profile_{stamp}.txt")
+
+
+##
+# @brief 자동 증분 백업(전체 스냅샷 + 판 델타, gzip) 폴더 경로를 반환한다.
+# @param dev_mode True면 backup/auto_dev.
+# @return 폴더 경로.
+def backup_dir(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(BACKUP_DIR, f"auto{suffix}")
+
+
+##
+# @brief parse_all_history.py --merge 병합 리포트(diff) 파일 경로를 반환한다.
+# @param stamp 파일명에 붙일 시각 문자열(YYYYmmdd_HHMMSS).
+# @return json 파일 경로.
+def merge_report(stamp):
+    return os.path.join(DATA_DIR, f"merge_report_{stamp}.json")
+
+
+##
+# @brief history_data.json에서 파생되는 캐시 파일 목록을 반환한다.
+# @details history를 통째로 바꾸거나 중간에 판을 끼워 넣은 뒤 지우면 다음 사용 때 재생성된다.
+# @param dev_mode True면 dev 파일들.
+# @return 경로 리스트.
+def derived_files(dev_mode=False):
+    return [season_index_json(dev_mode), season_index_log(dev_mode), history_index_bin(dev_mode),
+            history_index_log(dev_mode), win_model_json(dev_mode),
+            os.path.join(columnar_dir(dev_mode), "meta.json")]  # meta가 없으면 열 폴더 전체를 다시 내보냄
+
+
+##
+# @brief 챔피언 초상화 로컬 캐시 폴더 경로를 반환한다(ddragon 버전별).
+# @param version ddragon 버전(빈 문자열이면 상위 sprites/ 폴더).
+# @return 폴더 경로.
+def sprite_dir(version):
+    return os.path.join(DATA_DIR, "sprites", version) if version else os.path.join(DATA_DIR, "sprites")
+
+
+##
+# @brief history 열 단위 내보내기(원시 열 파일 + 사전 테이블 + meta.json) 폴더 경로를 반환한다.
+# @details history_data.json에서 파생되는 캐시라 지워도 다음 기록 때 재생성된다.
+# @param dev_mode True면 history_columns_dev.
+# @return 폴더 경로.
+def columnar_dir(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"history_columns{suffix}")
+
+
+##
+# @brief 샤드 프로세스들이 공유하는 상태 저장소(SQLite) 경로를 반환한다.
+# @param dev_mode True면 state_dev.sqlite3.
+# @return DB 파일 경로.
+def state_db(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"state{suffix}.sqlite3")
+
+
+##
+# @brief 승리 커밋 이벤트 로그(JSON Lines) 경로를 반환한다.
+# @details 판마다 game_id·round·승리 팀·팀 구성을 한 줄씩 남긴다(같은 game_id는 한 번만).
+# @param dev_mode True면 events_dev.jsonl.
+# @return 파일 경로.
+def events_log(dev_mode=False):
+    suffix = "_dev" if dev_mode else ""
+    return os.path.join(DATA_DIR, f"events{suffix}.jsonl")
@@ -0,0 +1,255 @@
+##
+# @file pick_order_sim.py
+# @brief 픽 순서 정책의 공정성을 비교하는 몬테카를로 시뮬레이터 (NumPy 벡터화, 오프라인 CLI).
+# @details got_champe.calculate_pick_order()는 승수 낮은 순(동률은 랜덤)으로 픽 순서를 정하고,
+#          팀은 랜덤으로 3:3 분할한다. 이 정책이 한 시즌 동안 플레이어별 픽 순번 분포를 얼마나
+#          고르게 만드는지, 다른 정책과 비교하면 어떤지를 본다. 시즌 S개를 (S, 인원) 배열로 나란히
+#          두고 판마다 참가자 선택 → 정책 키 정렬 → 팀 분할 → 승패 → 상태 갱신을 배열 연산으로
+#          한 번에 처리한다(파이썬 루프는 시즌 내 판 수만큼만 돈다).
+#
+#          플레이어 풀은 실제 history_data.json에서 시딩한다: 출전 비율을 참가 가중치로,
+#          (보정한) 통산 승률의 로짓을 실력으로, 마지막 시즌 승수를 wins.json 시작 승수로 쓴다.
+#          승패 확률은 팀 실력 합 차이 + 앞 순번 픽 이점(pick_edge)의 로지스틱이다.
+#
+#          정책:
+#            wins    현재 봇 방식. wins.json 승수(마지막 시즌 값에서 시작) 낮은 순, 동률 랜덤
+#            season  시즌 승수(0부터) 낮은 순
+#            alltime 통산 승수(history 합계에서 시작) 낮은 순
+#            form    최근 폼(승패 지수이동평균) 낮은 순
+#            snake   시즌마다 랜덤 기준 순서에서 출전할 때마다 한 칸씩 회전
+#            random  완전 랜덤(기준선)
+#
+#          사용법:
+#            python pick_order_sim.py [--dev] [--seasons 20000] [--games 150] [--policies wins,form,snake]
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import paths
+from history_io import iter_games
+
+## 판당 인원(픽 순번 수).
+PLAYERS_PER_GAME = 6
+
+## 정책 이름 목록(출력 순서).
+POLICIES = ("wins", "season", "alltime", "form", "snake", "random")
+
+## form 정책의 지수이동평균 감쇠율(출전 1회당).
+FORM_DECAY = 0.8
+
+
+##
+# @brief 시뮬레이션용 플레이어 풀.
+class PlayerPool:
+    __slots__ = ("ids", "weight", "skill", "season_wins", "alltime_wins")
+
+    ##
+    # @param ids 플레이어 id 리스트.
+    # @param weight 참가 가중치(합 1).
+    # @param skill 실력(로짓 단위).
+    # @param season_wins 시작 시즌 승수(wins 정책).
+    # @param alltime_wins 시작 통산 승수(alltime 정책).
+    def __init__(self, ids, weight, skill, season_wins, alltime_wins):
+        self.ids = ids
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.skill = np.asarray(skill, dtype=np.float64)
+        self.season_wins = np.asarray(season_wins, dtype=np.float64)
+        self.alltime_wins = np.asarray(alltime_wins, dtype=np.float64)
+
+
+##
+# @brief history_data.json을 스트리밍해 플레이어 풀을 만든다.
+# @param path history json 경로.
+# @param min_games 이보다 적게 뛴 플레이어는 제외.
+# @return PlayerPool.
+# @throws ValueError 조건을 만족하는 플레이어가 6명 미만.
+def seed_from_history(path, min_games=5):
+    games, wins, season_wins = {}, {}, {}
+    last_season = None
+    for _, g in iter_games(path):
+        season = g.get("season", 1)
+        if season != last_season:
+            season_wins, last_season = {}, season
+        for tk in ("team1", "team2"):
+            won = 1 if tk == g.get("winner") else 0
+            for p in g[tk]:
+                uid = p["id"]
+                games[uid] = games.get(uid, 0) + 1
+                wins[uid] = wins.get(uid, 0) + won
+                season_wins[uid] = season_wins.get(uid, 0) + won
+
+    ids = sorted(uid for uid, n in games.items() if n >= min_games)
+    if len(ids) < PLAYERS_PER_GAME:
+        raise ValueError(f"{min_games}판 이상 뛴 플레이어가 {len(ids)}명뿐입니다 (최소 {PLAYERS_PER_GAME}명)")
+    n = np.array([games[u] for u in ids], dtype=np.float64)
+    w = np.array([wins[u] for u in ids], dtype=np.float64)
+    rate = (w + 5) / (n + 10)  # 판수가 적은 플레이어의 극단값 보정
+    return PlayerPool(
+        ids,
+        weight=n / n.sum(),
+        skill=np.log(rate / (1 - rate)),
+        season_wins=[season_wins.get(u, 0) for u in ids],
+        alltime_wins=w,
+    )
+
+
+##
+# @brief 정책 하나로 S개 시즌을 시뮬레이션한다.
+# @param pool 플레이어 풀.
+# @param policy POLICIES 중 하나.
+# @param seasons 병렬 시즌 수.
+# @param games 시즌당 판 수.
+# @param pick_edge 1번 픽이 6번 픽보다 갖는 승리 로짓 이점.
+# @param checkpoints 수렴 통계를 잴 판 번호들(1-based).
+# @param seed 난수 시드.
+# @return 결과 dict (pos_hist, winrate, spread, first_share, elapsed).
+def simulate(pool, policy, seasons=20000, games=150, pick_edge=0.2, checkpoints=(10, 25, 50, 100), seed=0):
+    rng = np.random.default_rng(seed)
+    S, N, K = seasons, len(pool.ids), PLAYERS_PER_GAME
+    rows = np.arange(S)[:, None]
+    log_w = np.log(pool.weight)
+
+    played = np.zeros((S, N))
+    won_total = np.zeros((S, N))
+    pos_sum = np.zeros((S, N))
+    if policy == "wins":
+        score = np.broadcast_to(pool.season_wins, (S, N)).copy()
+    elif policy == "alltime":
+        score = np.broadcast_to(pool.alltime_wins, (S, N)).copy()
+    else:
+        score = np.zeros((S, N))
+    base = rng.random((S, N)).argsort(axis=1) if policy == "snake" else None
+    pos_hist = np.zeros(N * K, dtype=np.int64)
+    spread = {}
+    # 1번 픽 +edge/2 ~ 6번 픽 -edge/2 (순번에 선형)
+    edge = pick_edge * (0.5 - np.arange(K) / (K - 1))
+
+    start = time.perf_counter()
+    for t in range(1, games + 1):
+        # 참가자 6명: 가중치 비복원 추출(Gumbel top-k). 풀이 6명이면 전원
+        if N > K:
+            keys = log_w - np.log(-np.log(rng.random((S, N))))
+            sel = np.argpartition(-keys, K, axis=1)[:, :K]
+        else:
+            sel = np.broadcast_to(np.arange(N), (S, N))
+
+        # 정책 키가 작은 순서로 픽. 정수 키에 [0, 1) 난수를 더하면 동률만 랜덤으로 깨진다
+        tie = rng.random((S, K))
+        if policy == "random":
+            key = tie
+        elif policy == "snake":
+            key = (base[rows, sel] + played[rows, sel]) % N + tie
+        else:
+            key = score[rows, sel] + tie
+        pos = key.argsort(axis=1).argsort(axis=1)  # 참가자별 픽 순번(0=1번 픽)
+
+        # 팀: 랜덤 3:3 분할
+        team1 = rng.random((S, K)).argsort(axis=1) < K // 2
+        strength = pool.skill[sel] + edge[pos]
+        diff = np.where(team1, strength, -strength).sum(axis=1)
+        team1_won = rng.random(S) < 1.0 / (1.0 + np.exp(-diff))
+        won = team1 == team1_won[:, None]
+
+        played[rows, sel] += 1
+        won_total[rows, sel] += won
+        pos_sum[rows, sel] += pos
+        if policy in ("wins", "season", "alltime"):
+            score[rows, sel] += won
+        elif policy == "form":
+            score[rows, sel] = FORM_DECAY * score[rows, sel] + won
+        pos_hist += np.bincount((sel * K + pos).ravel(), minlength=N * K)
+
+        if t in checkpoints or t == games:
+            spread[t] = _position_spread(pos_sum, played)
+
+    elapsed = time.perf_counter() - start
+    hist = pos_hist.reshape(N, K)
+    return {
+        "pos_hist": hist / np.maximum(hist.sum(axis=1, keepdims=True), 1),
+        "winrate": won_total.sum(axis=0) / np.maximum(played.sum(axis=0), 1),
+        "spread": spread,
+        "first_share": hist[:, 0] / np.maximum(hist.sum(axis=1), 1),
+        "elapsed": elapsed,
+        "games": S * games,
+    }
+
+
+##
+# @brief 시즌마다 플레이어 평균 픽 순번의 표준편차를 구해 시즌 평균(±표준오차)을 낸다.
+# @details 값이 작을수록 그 시점까지 모든 플레이어가 비슷한 순번을 받았다는 뜻(공정).
+# @param pos_sum (S, N) 픽 순번 합.
+# @param played (S, N) 출전 수.
+# @return (평균, 표준오차) — 순번 단위(1칸 = 1).
+def _position_spread(pos_sum, played):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_pos = np.where(played > 0, pos_sum / played, np.nan)
+    per_season = np.nanstd(mean_pos, axis=1)
+    return float(per_season.mean()), float(per_season.std() / np.sqrt(len(per_season)))
+
+
+##
+# @brief 정책 결과를 표로 출력한다.
+# @param pool 플레이어 풀.
+# @param policy 정책 이름.
+# @param result simulate() 결과.
+# @param names id → 표시 이름 dict.
+def report(pool, policy, result, names):
+    print(f"\n=== {policy} === {result['games']:,} games in {result['elapsed']:.2f}s")
+    header = "".join(f"{p:>7}" for p in range(1, PLAYERS_PER_GAME + 1))
+    print(f"{'player':<16}{header}   win%")
+    for i, uid in enumerate(pool.ids):
+        row = "".join(f"{v * 100:6.1f}%" for v in result["pos_hist"][i])
+        print(f"{names.get(uid, uid)[:15]:<16}{row}  {result['winrate'][i] * 100:5.1f}")
+    conv = ", ".join(f"{t}판 {m:.3f}±{se:.3f}" for t, (m, se) in sorted(result["spread"].items()))
+    print(f"평균 순번 편차(시즌 내, 작을수록 공정): {conv}")
+
+
+##
+# @brief CLI 진입점.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="픽 순서 정책 공정성 몬테카를로 시뮬레이터")
+    parser.add_argument("--dev", action="store_true", help="dev history에서 시딩")
+    parser.add_argument("--history", help="history json 경로(기본: paths.history_json)")
+    parser.add_argument("--seasons", type=int, default=20000, help="병렬 시즌 수")
+    parser.add_argument("--games", type=int, default=150, help="시즌당 판 수")
+    parser.add_argument("--policies", default=",".join(POLICIES), help="쉼표로 구분한 정책 목록")
+    parser.add_argument("--pick-edge", type=float, default=0.2, help="1번 픽의 승리 로짓 이점")
+    parser.add_argument("--min-games", type=int, default=5, help="시딩에 포함할 최소 판수")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    policies = [p.strip() for p in args.policies.split(",") if p.strip()]
+    unknown = [p for p in policies if p not in POLICIES]
+    if unknown:
+        parser.error(f"알 수 없는 정책: {', '.join(unknown)} (가능: {', '.join(POLICIES)})")
+
+    path = args.history or paths.history_json(args.dev)
+    header = {}
+    try:
+        pool = seed_from_history(path, args.min_games)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] 시딩 실패: {e}")
+        return 1
+    next(iter_games(path, header=header), None)  # games 앞의 players 이름 매핑만 읽음
+    names = header.get("players", {})
+    print(f"[SEED] {len(pool.ids)} players from {path}")
+
+    summary = []
+    for policy in policies:
+        result = simulate(pool, policy, args.seasons, args.games, args.pick_edge, seed=args.seed)
+        report(pool, policy, result, names)
+        final = result["spread"][args.games][0]
+        summary.append((policy, final, result["first_share"].max(), np.std(result["winrate"]), result["elapsed"]))
+
+    print("\n=== 요약 ===")
+    print(f"{'policy':<9}{'순번편차':>9}{'최대1픽%':>10}{'승률편차':>9}{'시간':>8}")
+    for policy, spread, first, wr, elapsed in summary:
+        print(f"{policy:<9}{spread:>9.3f}{first * 100:>9.1f}%{wr * 100:>8.2f}%{elapsed:>7.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+##
+# @file profiler.py
+# @brief 실행 중인 봇을 시간 제한을 두고 프로파일링해 data/에 리포트를 남기는 모듈 (/프로파일).
+# @details 두 가지 방식을 지원한다.
+#            - sample   : 별도 스레드가 이벤트 루프 스레드의 스택을 주기적으로 찍는다(오버헤드 작음).
+#                       GIL을 쥔 채 오래 도는 C 호출(json 직렬화 등)은 과소 집계될 수 있다.
+#            - cprofile : 이벤트 루프 스레드에서 cProfile을 켠다(정확하지만 느려짐).
+#          두 방식 모두 세션 동안 루프에서 asyncio 태스크들이 무엇을 await 중인지 표본을 모으고,
+#          지정한 핸들러(ChampionButton.callback, pick_timeout_handler 등)를 타이밍 래퍼로 잠시
+#          바꿔 끼워 핸들러별 wall time을 잰다. 세션이 끝나면 원래 함수로 되돌리므로, 꺼져 있을 때는
+#          핫패스에 추가 코드가 전혀 없다.
+import asyncio
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import paths
+
+## 스택/태스크 표본 간격(초).
+SAMPLE_INTERVAL = 0.005
+TASK_INTERVAL = 0.05
+
+## 리포트에 싣는 항목 수.
+TOP_N = 25
+
+
+##
+# @brief 핸들러 하나의 호출 통계.
+class _HandlerStat:
+    __slots__ = ("calls", "total", "max", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+
+##
+# @brief 시간 제한 프로파일링 세션 하나.
+class ProfileSession:
+
+    ##
+    # @param duration 측정 시간(초).
+    # @param mode "sample" 또는 "cprofile".
+    # @param targets {표시 이름: (소유 객체, 속성 이름)} — 세션 동안 타이밍 래퍼로 바꿔 낄 코루틴 함수.
+    def __init__(self, duration, mode="sample", targets=None):
+        self.duration = duration
+        self.mode = mode
+        self.targets = targets or {}
+        self.handlers = {name: _HandlerStat() for name in self.targets}
+        self.originals = {}
+        self.self_counts = Counter()
+        self.incl_counts = Counter()
+        self.await_counts = Counter()
+        self.task_counts = Counter()
+        self.samples = 0
+        self.task_samples = 0
+        self.profile = None
+        self.loop = None
+        self.stop_event = threading.Event()
+        self.sampler = None
+        self.task_timer = None
+        self.started = None
+        self.elapsed = 0.0
+
+    ##
+    # @brief 세션을 시작하고 duration 뒤에 멈춘 다음 리포트를 저장한다(이벤트 루프에서 호출).
+    # @return 저장한 리포트 파일 경로.
+    async def run(self):
+        self.start()
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.stop()
+        return await asyncio.to_thread(self.write_report)
+
+    ##
+    # @brief 측정을 시작한다.
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.started = time.perf_counter()
+        for name, (owner, attr) in self.targets.items():
+            original = getattr(owner, attr)
+            self.originals[name] = (owner, attr, original)
+            setattr(owner, attr, self._wrap(name, original))
+
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()  # 호출한 스레드 = 이벤트 루프 스레드
+        else:
+            loop_thread = threading.get_ident()
+            self.sampler = threading.Thread(target=self._sample_stacks, args=(loop_thread,), daemon=True)
+            self.sampler.start()
+        self.task_timer = self.loop.call_later(TASK_INTERVAL, self._sample_tasks)
+
+    ##
+    # @brief 측정을 멈추고 바꿔 낀 함수를 원래대로 되돌린다.
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join()
+        if self.task_timer is not None:
+            self.task_timer.cancel()
+        for owner, attr, original in self.originals.values():
+            setattr(owner, attr, original)
+        self.originals.clear()
+
+    ##
+    # @brief 코루틴 함수를 호출 시간(await 포함 wall time)을 재는 래퍼로 감싼다.
+    def _wrap(self, name, func):
+        stat = self.handlers[name]
+
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                stat.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                stat.calls += 1
+                stat.total += elapsed
+                stat.max = max(stat.max, elapsed)
+
+        return timed
+
+    ##
+    # @brief (샘플링 스레드) 이벤트 루프 스레드의 현재 스택을 주기적으로 기록한다.
+    # @param thread_id 이벤트 루프 스레드 id.
+    def _sample_stacks(self, thread_id):
+        while not self.stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                if key not in seen:
+                    seen.add(key)
+                    self.incl_counts[key] += 1
+                frame = frame.f_back
+            self.samples += 1
+
+    ##
+    # @brief (이벤트 루프) 살아 있는 태스크마다 가장 안쪽에서 await 중인 코루틴을 기록한다.
+    # @details cr_await 사슬을 따라 내려가되, 마지막 퓨처(FutureIter 등) 대신 그것을 기다리는
+    #          코루틴(예: sleep, _send)을 표시한다.
+    def _sample_tasks(self):
+        for task in asyncio.all_tasks(self.loop):
+            coro = task.get_coro()
+            root = _coro_name(coro)
+            inner = coro
+            while hasattr(getattr(inner, "cr_await", None), "cr_code"):
+                inner = inner.cr_await
+            self.task_counts[root] += 1
+            self.await_counts[f"{root} → {_coro_name(inner)}"] += 1
+        self.task_samples += 1
+        self.task_timer = self.loop.call_later(TASK_INTERVAL, self._sample_tasks)
+
+    ##
+    # @brief 리포트를 data/profile_<시각>.txt에 쓴다.
+    # @return 파일 경로.
+    def write_report(self):
+        path = paths.profile_report(datetime.now().strftime("%Y%m%d_%H%M%S"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        return path
+
+    ##
+    # @brief 리포트 본문을 만든다.
+    # @return 텍스트.
+    def report(self):
+        out = io.StringIO()
+        out.write(f"# profile ({self.mode}) {self.elapsed:.1f}s\n\n")
+
+        out.write("## 핸들러별 wall time\n")
+        out.write(f"{'handler':<32}{'calls':>7}{'total':>10}{'avg':>10}{'max':>10}{'errors':>8}\n")
+        for name, st in sorted(self.handlers.items(), key=lambda kv: -kv[1].total):
+            avg = st.total / st.calls if st.calls else 0.0
+            out.write(f"{name:<32}{st.calls:>7}{st.total * 1000:>8.1f}ms{avg * 1000:>8.1f}ms"
+                      f"{st.max * 1000:>8.1f}ms{st.errors:>8}\n")
+
+        out.write(f"\n## await 중인 코루틴 (태스크 표본 {self.task_samples}회)\n")
+        for name, n in self.await_counts.most_common(TOP_N):
+            out.write(f"{n / max(self.task_samples, 1):>7.2f}  {name}\n")
+
+        if self.profile is not None:
+            out.write("\n## 상위 함수 (cProfile, cumulative)\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(TOP_N)
+            out.write("\n## 상위 함수 (cProfile, tottime)\n")
+            stats.sort_stats("tottime").print_stats(TOP_N)
+        else:
+            total = max(self.samples, 1)
+            out.write(f"\n## 상위 함수 - self (이벤트 루프 스택 표본 {self.samples}회)\n")
+            for key, n in self.self_counts.most_common(TOP_N):
+                out.write(f"{n / total * 100:6.1f}%  {_frame_label(key)}\n")
+            out.write("\n## 상위 함수 - inclusive\n")
+            for key, n in self.incl_counts.most_common(TOP_N):
+                out.write(f"{n / total * 100:6.1f}%  {_frame_label(key)}\n")
+        return out.getvalue()
+
+
+##
+# @brief 코루틴/퓨처의 표시 이름.
+def _coro_name(obj):
+    code = getattr(obj, "cr_code", None) or getattr(obj, "gi_code", None)
+    if code is not None:
+        return getattr(code, "co_qualname", code.co_name)
+    return type(obj).__name__
+
+
+##
+# @brief (파일, 첫 줄, 함수명) 키를 짧은 표시 문자열로 만든다.
+def _frame_label(key):
+    filename, line, name = key
+    return f"{name} ({filename.replace(chr(92), '/').rsplit('/', 1)[-1]}:{line})"
+
+
+## 진행 중인 세션(동시에 하나만).
+_active = None
+
+
+##
+# @brief 세션을 실행한다. 이미 진행 중이면 RuntimeError.
+# @param duration 측정 시간(초).
+# @param mode "sample" 또는 "cprofile".
+# @param targets 타이밍 래퍼를 씌울 {이름: (소유 객체, 속성)}.
+# @return 리포트 파일 경로.
+async def capture(duration, mode="sample", targets=None):
+    global _active
+    if _active is not None:
+        raise RuntimeError("이미 프로파일링 중입니다")
+    _active = ProfileSession(duration, mode, targets)
+    try:
+        return await _active.run()
+    finally:
+        _active = None
+
+
+##
+# @brief 진행 중인 세션이 있는지.
+def is_active():
+    return _active is not None
@@ -0,0 +1,201 @@
+##
+# @file safe_io.py
+# @brief 데이터 파일을 원자적으로 쓰고 체크섬으로 검증하는 헬퍼.
+# @details 같은 폴더의 임시 파일에 쓰고 fsync한 뒤 os.replace로 바꿔치기하므로, 쓰는 도중 프로세스가
+#          죽어도 기존 파일이나 새 파일 중 하나는 온전히 남는다. wins.json/history_data.json은
+#          대시보드·외부 도구가 그대로 JSON으로 읽으므로 파일 안에 헤더를 넣지 않고, 본문 sha256을
+#          옆 파일(<파일>.sha256)에 함께 원자적으로 기록한다. 체크섬 파일이 없거나 본문과 다르면
+#          (봇 밖에서 손으로 고친 경우 등) 읽을 때 경고만 남기고, JSON이 깨져 있으면 CorruptFileError로
+#          알려 backup.py restore로 복구하도록 한다.
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: 봇 프로세스 하나만 쓴다고 보고 스레드 잠금만
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+## 체크섬 옆 파일 확장자.
+CHECKSUM_SUFFIX = ".sha256"
+
+## 잠금 옆 파일 확장자.
+LOCK_SUFFIX = ".lock"
+
+_thread_locks = {}  # 잠금 파일 경로 -> threading.Lock
+_thread_locks_guard = threading.Lock()
+
+
+##
+# @brief 파일이 JSON으로 읽히지 않을 때 발생한다.
+class CorruptFileError(ValueError):
+    pass
+
+
+##
+# @brief 바이트열의 sha256 16진수 문자열.
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+##
+# @brief 파일 본문의 sha256 16진수 문자열.
+# @param path 파일 경로.
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+##
+# @brief 임시 파일 + fsync + rename으로 바이트열을 원자적으로 쓴다.
+# @param path 대상 파일 경로(폴더가 없으면 만든다).
+# @param data 쓸 바이트열.
+def atomic_replace(path, data):
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(folder)
+
+
+##
+# @brief 폴더를 fsync해 rename 자체를 디스크에 확정한다(POSIX만).
+def _fsync_dir(folder):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+##
+# @brief 바이트열을 원자적으로 쓰고 체크섬 옆 파일을 갱신한다.
+# @param path 대상 파일 경로.
+# @param data 쓸 바이트열.
+# @return 본문 sha256.
+def write_bytes(path, data):
+    digest = sha256_bytes(data)
+    atomic_replace(path, data)
+    atomic_replace(path + CHECKSUM_SUFFIX, f"{digest}  {os.path.basename(path)}\n".encode("ascii"))
+    return digest
+
+
+##
+# @brief 문자열 조각들을 UTF-8로 흘려 쓰면서 원자적으로 쓰고 체크섬 옆 파일을 갱신한다.
+# @details 본문 전체를 메모리에 만들지 않는다(큰 history를 조각 단위로 직렬화할 때). 체크섬은 쓰면서 계산한다.
+# @param path 대상 파일 경로.
+# @param chunks 문자열 이터러블.
+# @return 본문 sha256.
+def write_stream(path, chunks):
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    h = hashlib.sha256()
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                h.update(data)
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(folder)
+    digest = h.hexdigest()
+    atomic_replace(path + CHECKSUM_SUFFIX, f"{digest}  {os.path.basename(path)}\n".encode("ascii"))
+    return digest
+
+
+##
+# @brief 값을 JSON으로 직렬화해 원자적으로 쓴다(체크섬 포함).
+# @param path 대상 파일 경로.
+# @param value JSON 직렬화 가능한 값.
+# @param indent json.dump indent(기존 파일 포맷 유지용).
+# @return 본문 sha256.
+def write_json(path, value, indent=None):
+    data = json.dumps(value, ensure_ascii=False, indent=indent).encode("utf-8")
+    return write_bytes(path, data)
+
+
+##
+# @brief 기록된 체크섬을 읽는다.
+# @param path 대상 파일 경로.
+# @return sha256 문자열 또는 None(체크섬 파일 없음).
+def stored_checksum(path):
+    try:
+        with open(path + CHECKSUM_SUFFIX, "r", encoding="ascii") as f:
+            return f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+
+##
+# @brief 파일 본문이 기록된 체크섬과 같은지 확인한다.
+# @param path 대상 파일 경로.
+# @return True(일치) / False(불일치) / None(체크섬 파일 없음).
+def verify(path):
+    expected = stored_checksum(path)
+    if expected is None:
+        return None
+    return sha256_file(path) == expected
+
+
+##
+# @brief JSON 파일을 읽으면서 체크섬을 확인한다.
+# @details 체크섬이 다르면 경고만 남기고 그대로 읽는다. JSON 파싱이 실패하면 CorruptFileError.
+# @param path 파일 경로. 없으면 FileNotFoundError.
+# @return 파싱된 값.
+def read_json(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    expected = stored_checksum(path)
+    if expected is not None and sha256_bytes(data) != expected:
+        log.warning(f"{path} 체크섬 불일치 (봇 밖에서 수정되었거나 손상됨)")
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        raise CorruptFileError(f"{path} 손상: {e} (python backup.py restore 로 복구)") from e
+
+
+##
+# @brief 파일 하나의 읽기-수정-쓰기를 프로세스·스레드 간 직렬화하는 잠금(<파일>.lock에 flock).
+# @details 샤드 프로세스들이 같은 파생 파일을 갱신할 때 쓴다. flock이 없는 플랫폼에서는 스레드 잠금만 잡는다.
+# @param path 보호할 파일 경로.
+@contextlib.contextmanager
+def file_lock(path):
+    lock_path = path + LOCK_SUFFIX
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(lock_path, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+        with open(lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
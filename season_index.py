@@ -0,0 +1,443 @@
+##
+# @file season_index.py
+# @brief history_data.json의 시즌별 요약을 디스크에 유지하는 시즌 인덱스.
+# @details 시즌 → (첫/마지막 판 오프셋, 라운드 범위, 날짜 범위, 개인별 판수·승수)를 담는다.
+#          디스크에는 스냅샷(season_index.json)과 그 뒤 판의 append-only 로그(season_index.log)로 둔다.
+#          판이 기록될 때마다 append()가 로그에 한 줄만 붙이고(LOG_MAX마다 스냅샷으로 합침), 새 판의
+#          시즌 판정은 last_entry()가 로그 꼬리에서 읽은 마지막 판으로 한다 — history를 읽지 않고 O(1).
+#          인덱스가 없거나 판 수가 어긋나면 ensure_index()가 history의 새 판만 스트리밍해 따라잡는다.
+#          오프셋은 games 배열의 0-based 인덱스다.
+#
+#          재해복구(parse_all_history.py)로 만든 데이터는 season/round_orig가 없으므로,
+#          retag_seasons()로 한 번의 순회에 시즌과 원본 라운드 번호를 복원한다.
+#
+#          사용법:
+#            python season_index.py rebuild [--dev]   # history_data.json에서 인덱스 재생성
+#            python season_index.py show [--dev]      # 시즌별 요약 출력
+#            python season_index.py retag [--dev]     # 복구 데이터에 season/round_orig 재부여
+#            python season_index.py bench [--games N] # 합성 데이터로 retag/인덱스 속도 측정
+import argparse
+import bisect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import backup
+import history_io
+import paths
+import safe_io
+
+## 로그가 이 크기(바이트)를 넘으면 스냅샷으로 합친다.
+LOG_MAX = 256 * 1024
+
+## 로그 쓰기·스냅샷 합치기를 스레드 간 직렬화한다(프로세스 간은 저장소 트랜잭션이 직렬화).
+_lock = threading.Lock()
+
+
+##
+# @brief 시즌 판정 규칙. 라운드가 직전 기록 이하로 돌아가면 새 시즌이다.
+# @details 시즌 시작 = wins.json 리셋 = round_counter 1부터 재시작. record_game()과
+#          retag_seasons()가 같은 규칙을 쓰도록 한곳에 둔다.
+# @param last_round 직전 판의 라운드(없으면 None).
+# @param last_season 직전 판의 시즌(없으면 None).
+# @param round_num 새 판의 라운드.
+# @return 새 판의 시즌 번호.
+def next_season(last_round, last_season, round_num):
+    if last_round is None:
+        return 1
+    if round_num <= last_round:
+        return last_season + 1
+    return last_season
+
+
+##
+# @brief 빈 인덱스 스켈레톤을 만든다.
+# @return {"total_games": 0, "last": None, "seasons": {}}.
+def empty_index():
+    return {"total_games": 0, "last": None, "seasons": {}}
+
+
+##
+# @brief 판 하나를 인덱스에 반영한다(증분 갱신).
+# @details 판에 season이 없으면 next_season() 규칙으로 판정해 채운다.
+# @param index 갱신할 인덱스(dict, in-place).
+# @param game 판 레코드(round, season, team1, team2, winner, time).
+# @param offset 이 판의 games 배열 오프셋.
+# @return 이 판의 시즌 번호.
+def add_game(index, game, offset):
+    last = index["last"]
+    season = game.get("season")
+    if season is None:
+        season = next_season(
+            last["round"] if last else None, last["season"] if last else None, game["round"]
+        )
+
+    key = str(season)
+    s = index["seasons"].get(key)
+    if s is None:
+        s = index["seasons"][key] = {
+            "first": offset,
+            "last": offset,
+            "games": 0,
+            "round_min": game["round"],
+            "round_max": game["round"],
+            "date_first": game.get("time"),
+            "date_last": game.get("time"),
+            "players": {},
+        }
+    s["last"] = offset
+    s["games"] += 1
+    s["round_min"] = min(s["round_min"], game["round"])
+    s["round_max"] = max(s["round_max"], game["round"])
+    t = game.get("time")
+    if t:
+        if not s["date_first"] or t < s["date_first"]:
+            s["date_first"] = t
+        if not s["date_last"] or t > s["date_last"]:
+            s["date_last"] = t
+
+    players = s["players"]
+    winner = game.get("winner")
+    for tk in ("team1", "team2"):
+        won = 1 if tk == winner else 0
+        for p in game[tk]:
+            rec = players.get(p["id"])
+            if rec is None:
+                rec = players[p["id"]] = {"games": 0, "wins": 0}
+            rec["games"] += 1
+            rec["wins"] += won
+
+    index["last"] = {"round": game["round"], "season": season, "offset": offset}
+    index["total_games"] = offset + 1
+    return season
+
+
+##
+# @brief games 배열 전체로 인덱스를 한 번에 생성한다.
+# @param games history_data.json의 games 리스트.
+# @return 새 인덱스 dict.
+def build_index(games):
+    index = empty_index()
+    for offset, g in enumerate(games):
+        add_game(index, g, offset)
+    return index
+
+
+##
+# @brief 디스크의 인덱스(스냅샷 + 로그 재생)를 로드한다. 없거나 깨졌으면 None.
+# @details 로그를 먼저 읽고 스냅샷을 나중에 읽는다. 그 사이 compact()가 끝나도 스냅샷이 로그의
+#          시작보다 뒤에 있으므로 판이 빠지지 않는다(스냅샷에 이미 든 로그 줄은 건너뜀).
+# @param dev_mode True면 dev 인덱스.
+# @return 인덱스 dict 또는 None.
+def load_index(dev_mode=False):
+    try:
+        entries = _read_log(dev_mode)
+        with open(paths.season_index_json(dev_mode), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        if not entries or entries[0]["offset"] != 0:
+            return None
+        index = empty_index()
+    except json.JSONDecodeError:
+        return None
+    for entry in entries:
+        if entry["offset"] < index["total_games"]:
+            continue
+        if entry["offset"] != index["total_games"]:
+            return None
+        add_game(index, entry, entry["offset"])
+    return index
+
+
+##
+# @brief 로그 줄들을 읽는다(없으면 빈 리스트, 찢긴 줄은 건너뜀).
+def _read_log(dev_mode):
+    try:
+        with open(paths.season_index_log(dev_mode), "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+##
+# @brief 인덱스 스냅샷을 디스크에 원자적으로 저장한다(stats_api가 다른 스레드에서 읽는 중에도 온전한 파일만 보임).
+# @param index 저장할 인덱스.
+# @param dev_mode True면 dev 인덱스.
+def save_index(index, dev_mode=False):
+    data = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    safe_io.atomic_replace(paths.season_index_json(dev_mode), data)
+
+
+##
+# @brief 스냅샷을 저장하고 로그를 비운다(스냅샷 → 로그 순서라 중간에 죽어도 판이 빠지지 않음).
+# @param index 저장할 인덱스(로그까지 반영된 것).
+# @param dev_mode True면 dev 인덱스.
+def _reset(index, dev_mode):
+    save_index(index, dev_mode)
+    safe_io.atomic_replace(paths.season_index_log(dev_mode), b"")
+
+
+##
+# @brief 인덱스의 마지막 판 {round, season, offset}을 로그 꼬리 한 줄로 O(1)에 읽는다.
+# @details 로그가 비어 있으면(압축 직후) 스냅샷의 last를 읽는다.
+# @param dev_mode True면 dev 인덱스.
+# @return 마지막 판 dict, 인덱스가 비었거나 없으면 None.
+def last_entry(dev_mode=False):
+    path = paths.season_index_log(dev_mode)
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        return {"round": entry["round"], "season": entry["season"], "offset": entry["offset"]}
+    index = load_index(dev_mode)
+    return index["last"] if index else None
+
+
+##
+# @brief 판 하나를 인덱스 로그에 한 줄 덧붙인다(판마다 O(1), 스냅샷은 다시 쓰지 않음).
+# @details game_recorder.record_game()이 저장소 트랜잭션 안에서 부른다. 로그가 LOG_MAX를 넘으면
+#          스냅샷으로 합친다(인덱스 크기는 시즌×플레이어 수라 판 수와 무관, LOG_MAX판마다 한 번).
+# @param game 판 레코드(season 포함).
+# @param offset 이 판의 오프셋.
+# @param dev_mode True면 dev 인덱스.
+def append(game, offset, dev_mode=False):
+    entry = {
+        "offset": offset,
+        "round": game["round"],
+        "season": game["season"],
+        "time": game.get("time"),
+        "winner": game.get("winner"),
+        "team1": [{"id": p["id"]} for p in game["team1"]],
+        "team2": [{"id": p["id"]} for p in game["team2"]],
+    }
+    path = paths.season_index_log(dev_mode)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            size = f.tell()
+        if size >= LOG_MAX:
+            index = load_index(dev_mode)
+            if index is not None:
+                _reset(index, dev_mode)
+
+
+##
+# @brief history와 맞는 인덱스를 반환한다. 인덱스가 뒤처져 있으면 새 판만 스트리밍해 따라잡는다.
+# @details 인덱스가 없거나 history보다 앞서 있으면(복구 등) history 전체로 다시 만든다. 판을 기록하는
+#          경로에서는 인덱스의 마지막 판이 history와 어긋났을 때만 불린다.
+# @param dev_mode True면 dev 인덱스.
+# @return 인덱스 dict.
+def ensure_index(dev_mode=False):
+    path = paths.history_json(dev_mode)
+    total = history_io.count(path)
+    with _lock:
+        index = load_index(dev_mode)
+        if index is not None and index["total_games"] == total:
+            return index
+        if index is None or index["total_games"] > total:
+            index = empty_index()
+        if total:
+            for offset, g in history_io.iter_games(path, start=index["total_games"]):
+                add_game(index, g, offset)
+        _reset(index, dev_mode)
+        return index
+
+
+##
+# @brief 새 판이 속할 시즌을 인덱스만 보고 O(1)로 판정한다.
+# @param index 인덱스.
+# @param round_num 새 판의 라운드.
+# @return 시즌 번호.
+def season_for_round(index, round_num):
+    return season_after(index["last"], round_num)
+
+
+##
+# @brief 마지막 판 {round, season} 다음에 올 판의 시즌.
+# @param last 마지막 판(last_entry() 결과, 없으면 None).
+# @param round_num 새 판의 라운드.
+# @return 시즌 번호.
+def season_after(last, round_num):
+    if not last:
+        return 1
+    return next_season(last["round"], last["season"], round_num)
+
+
+##
+# @brief 시즌 요약을 O(1)로 조회한다.
+# @param index 인덱스.
+# @param season 시즌 번호.
+# @return 시즌 요약 dict 또는 None.
+def get_season(index, season):
+    return index["seasons"].get(str(season))
+
+
+##
+# @brief 복구 데이터에 season/round_orig를 한 번의 순회로 재부여한다(in-place).
+# @details round_orig가 없으면 embed의 라운드 번호(round)를 round_orig로 보존한다.
+#          기존 인덱스가 있으면 각 시즌의 date_first를 경계로 시즌을 정하고(마이그레이션으로 합친
+#          시즌도 그대로 복원), 인덱스의 마지막 판 이후 구간은 라운드 회귀 규칙으로 판정한다.
+#          인덱스가 없으면 전 구간을 회귀 규칙으로 판정한다. 한 시즌 안에서 라운드가 리셋된 적이
+#          있으면(예: 시즌 1의 세션별 ROUND 1 재시작) 마이그레이션과 같이 시간순 연번으로 round를
+#          다시 매긴다. games는 시간순이어야 한다.
+# @param games 판 리스트(시간순, in-place 수정).
+# @param index 경계로 쓸 기존 시즌 인덱스(없으면 None).
+# @return 부여된 시즌 수.
+def retag_seasons(games, index=None):
+    bounds, bound_seasons, tail_after = [], [], None
+    if index and index.get("seasons"):
+        ordered = sorted(
+            ((int(k), v) for k, v in index["seasons"].items() if v.get("date_first")),
+            key=lambda kv: kv[1]["date_first"],
+        )
+        bounds = [v["date_first"] for _, v in ordered]
+        bound_seasons = [k for k, _ in ordered]
+        tail_after = ordered[-1][1]["date_last"] if ordered else None
+
+    season_start = 0
+    season_reset = False
+    last_round = last_season = None
+    seasons = 0
+
+    for i, g in enumerate(games):
+        orig = g.get("round_orig", g["round"])
+        g["round_orig"] = orig
+        t = g.get("time") or ""
+
+        if bounds and (tail_after is None or t <= tail_after):
+            pos = bisect.bisect_right(bounds, t) - 1
+            season = bound_seasons[pos] if pos >= 0 else bound_seasons[0]
+        else:
+            season = next_season(last_round, last_season, orig)
+
+        if season != last_season:
+            if season_reset:
+                _renumber(games, season_start, i)
+            season_start, season_reset = i, False
+            seasons += 1
+        elif last_round is not None and orig <= last_round:
+            season_reset = True
+
+        g["season"] = season
+        g["round"] = orig
+        last_round, last_season = orig, season
+
+    if season_reset:
+        _renumber(games, season_start, len(games))
+    return seasons
+
+
+##
+# @brief games[start:end] 구간의 round를 시간순 연번으로 다시 매긴다(round_orig는 유지).
+# @param games 판 리스트.
+# @param start 시작 오프셋(포함).
+# @param end 끝 오프셋(미포함).
+def _renumber(games, start, end):
+    for n, i in enumerate(range(start, end), 1):
+        games[i]["round"] = n
+
+
+##
+# @brief 벤치마크용 합성 games를 만든다(세션마다 ROUND 1부터, 시간순).
+# @param n 판 수.
+# @param seed 난수 시드.
+# @return season/round_orig가 없는 판 리스트.
+def synthetic_games(n, seed=0):
+    rng = random.Random(seed)
+    ids = [str(100000000000000001 + i) for i in range(12)]
+    champs = [f"C{i}" for i in range(160)]
+    t = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    games, rnd = [], 0
+    for _ in range(n):
+        if rnd and rng.random() < 0.05:
+            rnd = 0
+            t += timedelta(days=3)
+        rnd += 1
+        t += timedelta(minutes=23)
+        players = rng.sample(ids, 6)
+        picks = rng.sample(champs, 6)
+        games.append({
+            "round": rnd,
+            "team1": [{"id": players[k], "champ": picks[k]} for k in range(3)],
+            "team2": [{"id": players[k], "champ": picks[k]} for k in range(3, 6)],
+            "winner": rng.choice(("team1", "team2")),
+            "time": t.isoformat(),
+            "sources": ["T1"],
+        })
+    return games
+
+
+##
+# @brief CLI 진입점.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history_data.json 시즌 인덱스 도구")
+    parser.add_argument("command", choices=["rebuild", "show", "retag", "bench"])
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    parser.add_argument("--games", type=int, default=1_000_000, help="bench 판 수")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        games = synthetic_games(args.games)
+        t0 = time.perf_counter()
+        n = retag_seasons(games)
+        t1 = time.perf_counter()
+        index = build_index(games)
+        t2 = time.perf_counter()
+        print(f"[BENCH] retag {len(games)} games -> {n} seasons: {t1 - t0:.2f}s")
+        print(f"[BENCH] build_index: {t2 - t1:.2f}s, season_for_round: "
+              f"season {season_for_round(index, 1)} (O(1))")
+        return 0
+
+    path = paths.history_json(args.dev)
+
+    if args.command == "retag":
+        data = history_io.load(path)
+        games = data["games"]
+        n = retag_seasons(games, load_index(args.dev))
+        history_io.save(path, data)
+        # round가 다시 매겨졌을 수 있으므로 history에서 파생된 캐시는 지워 다음 로드 때 재생성
+        for derived in paths.derived_files(args.dev):
+            if os.path.exists(derived):
+                os.remove(derived)
+        _reset(build_index(games), args.dev)
+        backup.full_backup(args.dev)
+        print(f"[RETAG] {len(games)} games, {n} seasons -> {path}")
+        return 0
+
+    if args.command == "rebuild":
+        index = build_index(g for _, g in history_io.iter_games(path))
+        _reset(index, args.dev)
+    else:
+        index = ensure_index(args.dev)
+
+    for key in sorted(index["seasons"], key=int):
+        s = index["seasons"][key]
+        print(f"S{key}: games {s['games']} | offsets {s['first']}-{s['last']} | "
+              f"rounds {s['round_min']}-{s['round_max']} | "
+              f"{(s['date_first'] or '')[:10]} ~ {(s['date_last'] or '')[:10]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
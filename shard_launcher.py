@@ -0,0 +1,267 @@
+##
+# @file shard_launcher.py
+# @brief 봇을 샤드별 프로세스로 띄우는 런처와, 가짜 전송 계층으로 돌리는 다중 프로세스 부하 테스트.
+# @details run: 샤드 N개를 프로세스 P개에 나눠(프로세스 i는 샤드 i, i+P, ...) got_champe.py를
+#          SHARD_COUNT/SHARD_IDS 환경변수와 함께 띄우고, 죽은 프로세스는 지수 백오프로 다시 띄운다.
+#          모든 프로세스는 같은 상태 저장소(data/state.sqlite3)를 공유한다(state_store).
+#
+#          loadtest: 디스코드 없이 같은 경로(state_store.claim_lobby → 채널 큐 전송 → victory_commit.record
+#          → release_lobby)를 프로세스 P개가 동시에 돌린다. 채널은 send()마다 몇 ms 쉬는 가짜 객체이고,
+#          데이터는 임시 폴더에 쓴다. 끝나면 전적 합계·history round 연속성·wins 파일 사본 일치·
+#          경합 길드의 단일 소유를 확인하고 프로세스별 지표를 출력한다.
+#
+#          사용법:
+#            python shard_launcher.py run --shards 4 --processes 2
+#            python shard_launcher.py loadtest [--processes 4 --lobbies 3 --games 10]
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import botlog
+
+log = logging.getLogger("shard_launcher")
+
+## 재시작 백오프(초): 처음 RESTART_DELAY, 연달아 죽으면 두 배씩 RESTART_MAX까지.
+RESTART_DELAY = 2.0
+RESTART_MAX = 60.0
+
+## 이 시간(초) 이상 살아 있었으면 백오프를 처음 값으로 되돌린다.
+HEALTHY_AFTER = 60.0
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "got_champe.py")
+
+
+##
+# @brief 샤드 id를 프로세스별로 나눈다.
+# @param shards 전체 샤드 수.
+# @param processes 프로세스 수.
+# @return [[shard id, ...]] 프로세스 순서대로.
+def assign_shards(shards, processes):
+    return [list(range(i, shards, processes)) for i in range(min(processes, shards))]
+
+
+##
+# @brief 샤드 프로세스들을 띄우고 감시한다(Ctrl+C로 모두 종료).
+# @param shards 전체 샤드 수.
+# @param processes 프로세스 수.
+# @return 종료 코드.
+def run(shards, processes):
+    groups = assign_shards(shards, processes)
+    procs = {}  # index -> (Popen, 시작 시각, 다음 백오프)
+
+    def spawn(i, delay):
+        env = dict(os.environ, SHARD_COUNT=str(shards), SHARD_IDS=",".join(map(str, groups[i])))
+        procs[i] = (subprocess.Popen([sys.executable, BOT_SCRIPT], env=env), time.monotonic(), delay)
+        log.info(f"[SHARD] 프로세스 {i} 시작 (pid={procs[i][0].pid}, shards={groups[i]})")
+
+    for i in range(len(groups)):
+        spawn(i, RESTART_DELAY)
+    try:
+        while True:
+            time.sleep(1.0)
+            for i, (proc, started, delay) in list(procs.items()):
+                code = proc.poll()
+                if code is None:
+                    continue
+                if time.monotonic() - started >= HEALTHY_AFTER:
+                    delay = RESTART_DELAY
+                log.warning(f"[SHARD] 프로세스 {i} 종료(code={code}), {delay:.0f}초 후 재시작")
+                time.sleep(delay)
+                spawn(i, min(delay * 2, RESTART_MAX))
+    except KeyboardInterrupt:
+        log.info("[SHARD] 종료 요청 - 모든 프로세스 정리")
+        for proc, _, _ in procs.values():
+            proc.terminate()
+        for proc, _, _ in procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return 0
+
+
+# === 부하 테스트 ===
+##
+# @brief send()마다 몇 ms 쉬는 가짜 채널(broadcast.ChannelQueue가 보는 인터페이스만).
+class FakeChannel:
+
+    def __init__(self, channel_id, guild, rng):
+        self.id = channel_id
+        self.guild = guild
+        self.rng = rng
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, view=None, file=None):
+        await asyncio.sleep(self.rng.uniform(0.001, 0.005))
+        self.sent += 1
+        return self
+
+
+class _FakeGuild:
+    __slots__ = ("id",)
+
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+##
+# @brief 디스코드 길드 id가 속하는 샤드 번호(디스코드 규칙: (guild_id >> 22) % shard_count).
+def shard_of(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+##
+# @brief 부하 테스트 워커 프로세스 하나.
+# @param index 프로세스 번호.
+# @param shard_ids 이 프로세스의 샤드 id.
+# @param shard_count 전체 샤드 수.
+# @param root 임시 데이터 폴더.
+# @param guilds 전체 길드 id 리스트(자기 샤드 것만 진행).
+# @param contested 모든 프로세스가 동시에 가져가려는 길드 id.
+# @param games 길드당 판 수.
+# @return 결과 dict.
+def _worker(index, shard_ids, shard_count, root, guilds, contested, games):
+    import paths
+    paths.DATA_DIR = os.path.join(root, "data")
+    paths.BACKUP_DIR = os.path.join(root, "backup")
+    import metrics
+    import state_store
+    import victory_commit
+    from broadcast import Broadcaster
+
+    store = state_store.SqliteStore(paths.state_db(True))
+    owner = state_store.process_owner(shard_ids)
+    rng = random.Random(index)
+    broadcaster = Broadcaster()
+    players = [(str(10**17 + i), f"플레이어{i}") for i in range(30)]
+    mine = [g for g in guilds if shard_of(g, shard_count) in shard_ids]
+
+    async def lobby(guild_id):
+        guild = _FakeGuild(guild_id)
+        channels = [FakeChannel(guild_id * 10 + c, guild, rng) for c in range(3)]
+        for _ in range(games):
+            with metrics.timer("loadtest.claim"):
+                busy = await asyncio.to_thread(state_store.claim_lobby, store, guild_id, owner, {"round": 0})
+            if busy is not None:
+                metrics.incr("loadtest.claim_refused")
+                return
+            picked = rng.sample(players, 6)
+            teams = {
+                "team1": [{"id": u, "name": n, "champ": f"챔피언{rng.randrange(170)}"} for u, n in picked[:3]],
+                "team2": [{"id": u, "name": n, "champ": f"챔피언{rng.randrange(170)}"} for u, n in picked[3:]],
+            }
+            await broadcaster.send(channels, "팀 구성")
+            for p in teams["team1"] + teams["team2"]:
+                broadcaster.post(channels, f"{p['name']}: {p['champ']}", merge=True)
+            game_id = victory_commit.new_game_id()
+            winner = rng.choice(["team1", "team2"])
+            with metrics.timer("loadtest.commit"):
+                _, _, created = await asyncio.to_thread(victory_commit.record, store, game_id, teams, winner, True)
+                # 같은 게임의 중복 커밋(다른 채널의 늦은 선택)은 아무것도 더 쓰지 않아야 한다
+                _, _, again = await asyncio.to_thread(victory_commit.record, store, game_id, teams, winner, True)
+            if not created or again:
+                metrics.incr("loadtest.record_failed")
+            await broadcaster.send(channels, "결과")
+            await asyncio.to_thread(state_store.release_lobby, store, guild_id, owner)
+            metrics.incr("loadtest.games")
+
+    async def contest():
+        busy = await asyncio.to_thread(state_store.claim_lobby, store, contested, owner, {"round": 0})
+        return busy is None
+
+    async def main():
+        won, *_ = await asyncio.gather(contest(), *(lobby(g) for g in mine))
+        return won
+
+    start = time.perf_counter()
+    won_contested = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    snap = metrics.snapshot()
+    state_store.publish_metrics(store, owner, snap, {str(s): 0.0 for s in shard_ids})
+    return {
+        "owner": owner,
+        "guilds": len(mine),
+        "games": snap["counters"].get("loadtest.games", 0),
+        "refused": snap["counters"].get("loadtest.claim_refused", 0),
+        "record_failed": snap["counters"].get("loadtest.record_failed", 0),
+        "contested": won_contested,
+        "elapsed": elapsed,
+        "commit": snap["timings"].get("loadtest.commit"),
+    }
+
+
+##
+# @brief 다중 프로세스 부하 테스트를 돌리고 불변식을 확인한다.
+# @param processes 프로세스 수(= 샤드 수).
+# @param lobbies 프로세스당 길드(로비) 수.
+# @param games 길드당 판 수.
+# @return 모든 확인을 통과하면 0, 아니면 1.
+def loadtest(processes, lobbies, games):
+    import history_io
+    import paths
+    import safe_io
+    import state_store
+
+    shard_count = processes
+    # 샤드마다 lobbies개씩 돌아가도록 길드 id를 고른다 (shard = (id >> 22) % count)
+    guilds = [((n * shard_count + s) << 22) | 1 for s in range(shard_count) for n in range(1, lobbies + 1)]
+    contested = 1 << 22 | 7 if shard_count > 1 else 7
+    root = tempfile.mkdtemp(prefix="shard_loadtest_")
+    try:
+        groups = assign_shards(shard_count, processes)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_worker, i, ids, shard_count, root, guilds, contested, games)
+                       for i, ids in enumerate(groups)]
+            results = [f.result() for f in futures]
+
+        paths.DATA_DIR = os.path.join(root, "data")
+        store = state_store.SqliteStore(paths.state_db(True))
+        wins = store.items(state_store.WINS)
+        total = wins.get(state_store.TOTAL_ROUNDS, 0)
+        history = history_io.load(paths.history_json(True))["games"]
+        checks = {
+            "total_rounds == 판 수": total == sum(r["games"] for r in results) == len(guilds) * games,
+            "승수 합 == 3 × 판 수": sum(v["wins"] for k, v in wins.items() if k != state_store.TOTAL_ROUNDS) == 3 * total,
+            "history round 1..N 순서대로": [g["round"] for g in history] == list(range(1, total + 1)),
+            "시즌 하나(역행 없음)": {g.get("season", 1) for g in history} == {1},
+            "wins 파일 == 저장소": safe_io.read_json(paths.wins_file(True)) == wins,
+            "경합 길드 소유자 1명": sum(r["contested"] for r in results) == 1,
+            "기록 실패 없음": not any(r["record_failed"] for r in results),
+        }
+
+        for r in results:
+            c = r["commit"] or {}
+            print(f"{r['owner']}: 길드 {r['guilds']} 판 {r['games']} ({r['elapsed']:.2f}s) "
+                  f"commit p50={c.get('p50_ms')}ms p95={c.get('p95_ms')}ms max={c.get('max_ms')}ms")
+        print(state_store.format_shards(store))
+        for name, ok in checks.items():
+            print(f"[{'OK' if ok else 'FAIL'}] {name}")
+        return 0 if all(checks.values()) else 1
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="샤드 프로세스 런처 / 다중 프로세스 부하 테스트")
+    parser.add_argument("command", choices=["run", "loadtest"])
+    parser.add_argument("--shards", type=int, default=2, help="run: 전체 샤드 수")
+    parser.add_argument("--processes", type=int, default=2, help="프로세스 수")
+    parser.add_argument("--lobbies", type=int, default=3, help="loadtest: 프로세스당 길드 수")
+    parser.add_argument("--games", type=int, default=10, help="loadtest: 길드당 판 수")
+    args = parser.parse_args(argv)
+    botlog.setup()
+    if args.command == "run":
+        return run(args.shards, args.processes)
+    return loadtest(args.processes, args.lobbies, args.games)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
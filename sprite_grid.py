@@ -0,0 +1,231 @@
+##
+# @file sprite_grid.py
+# @brief 제시된 챔피언 초상화를 한 장의 격자 이미지로 합쳐 픽 embed에 첨부하는 모듈(선택 기능).
+# @details 챔피언 8명마다 이미지 embed를 따로 보내면 메시지가 무거워지고 클라이언트가 이미지를
+#          8번 받아야 한다. 여기서는 초상화를 data/sprites/<ddragon 버전>/<챔피언 id>.png에
+#          한 번만 받아 두고(버전이 바뀌면 예전 버전 폴더는 지움), 제시된 챔피언들을 버튼 순서대로
+#          한 장의 PNG로 합성한다. 합성 결과는 (버전, 챔피언 id 순서) 키의 LRU에 보관하므로 같은 조합이
+#          다시 나오면 비용이 없다.
+#
+#          Pillow가 없거나 초상화를 못 받으면 get_grid()는 None을 돌려주고 embed는 기존처럼
+#          텍스트만 나간다.
+#
+#          사용법 (네트워크 없이 로컬 PNG 폴더로 확인):
+#            python sprite_grid.py render <png 폴더> [--out grid.png] [--count 8]
+#            python sprite_grid.py bench <png 폴더>
+import argparse
+import io
+import logging
+import math
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import http_client
+import paths
+import safe_io
+
+try:
+    from PIL import Image
+except ImportError:  # 선택 의존성: 없으면 격자 이미지 없이 동작
+    Image = None
+
+log = logging.getLogger(__name__)
+
+## 격자 한 칸(초상화) 크기와 칸 사이 간격(px).
+TILE = 64
+GAP = 4
+
+## 한 줄에 놓을 최대 초상화 수.
+COLUMNS = 4
+
+## 배경색(디스코드 다크 테마 embed 배경).
+BACKGROUND = (43, 45, 49, 255)
+
+## 합성 결과 LRU 크기.
+GRID_CACHE = 64
+
+## 초상화 다운로드 타임아웃(초).
+FETCH_TIMEOUT = 10
+
+_URL_RE = re.compile(r"/cdn/([^/]+)/img/champion/([^/]+)\.png$")
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+##
+# @brief Pillow가 있어 격자 이미지를 만들 수 있는지.
+def available():
+    return Image is not None
+
+
+##
+# @brief 챔피언 dict의 (ddragon 버전, 챔피언 id). 예전 형식이면 image URL에서 뽑는다.
+# @param champ {"name", "image", ("id", "version")}.
+# @return (version, id) 또는 None.
+def champion_key(champ):
+    if champ.get("id") and champ.get("version"):
+        return champ["version"], champ["id"]
+    m = _URL_RE.search(champ.get("image", ""))
+    return (m.group(1), m.group(2)) if m else None
+
+
+##
+# @brief 초상화 파일이 로컬 캐시에 있도록 보장한다(없으면 받는다).
+# @details 새 버전 폴더를 처음 만들 때 다른 버전 폴더는 지운다. 받기는 봇 루프의 공유 HTTP 세션으로
+#          하고 끝날 때까지 기다리므로 스레드에서 호출한다.
+# @param champs 챔피언 dict 리스트.
+# @return 순서대로 로컬 파일 경로 리스트. 하나라도 못 받으면 None.
+def ensure_portraits(champs):
+    files = []
+    for champ in champs:
+        key = champion_key(champ)
+        if key is None:
+            return None
+        version, champ_id = key
+        folder = paths.sprite_dir(version)
+        path = os.path.join(folder, f"{champ_id}.png")
+        if not os.path.exists(path):
+            if not os.path.isdir(folder):
+                _prune_versions(version)
+            url = champ["image"]
+            try:
+                content = http_client.run_sync(
+                    lambda: http_client.get_bytes(url, tag="ddragon", timeout=FETCH_TIMEOUT)
+                )
+            except http_client.HTTPError as e:
+                log.warning(f"초상화 다운로드 실패 {champ_id}: {e}")
+                return None
+            safe_io.atomic_replace(path, content)
+        files.append(path)
+    return files
+
+
+##
+# @brief 현재 버전 외의 초상화 캐시 폴더를 지운다.
+# @param keep 남길 버전.
+def _prune_versions(keep):
+    root = paths.sprite_dir("")
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name != keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+##
+# @brief 초상화 파일들을 한 장의 격자 PNG로 합성한다(네트워크 없음).
+# @param files 초상화 파일 경로 리스트(이 순서대로 왼쪽 위부터 채움).
+# @param columns 한 줄 최대 칸 수.
+# @param tile 칸 크기(px).
+# @return PNG 바이트.
+def render_grid(files, columns=COLUMNS, tile=TILE):
+    cols = max(1, min(columns, len(files)))
+    rows = math.ceil(len(files) / cols)
+    width = cols * tile + (cols + 1) * GAP
+    height = rows * tile + (rows + 1) * GAP
+    canvas = Image.new("RGBA", (width, height), BACKGROUND)
+    for i, path in enumerate(files):
+        with Image.open(path) as img:
+            portrait = img.convert("RGBA").resize((tile, tile), Image.LANCZOS)
+        x = GAP + (i % cols) * (tile + GAP)
+        y = GAP + (i // cols) * (tile + GAP)
+        canvas.paste(portrait, (x, y), portrait)
+    out = io.BytesIO()
+    canvas.save(out, format="PNG")
+    return out.getvalue()
+
+
+##
+# @brief 제시된 챔피언들의 격자 이미지를 돌려준다(LRU 캐시, 블로킹 → 스레드에서 호출).
+# @param champs 버튼 순서대로의 챔피언 dict 리스트.
+# @param resolve 챔피언 리스트 → 로컬 파일 경로 리스트(기본: 캐시/다운로드, 확인용으로 교체 가능).
+# @return PNG 바이트 또는 None(Pillow 없음/초상화 실패).
+def get_grid(champs, resolve=ensure_portraits):
+    if Image is None or not champs:
+        return None
+    keys = [champion_key(c) for c in champs]
+    if None in keys:
+        return None
+    cache_key = tuple(keys)
+    with _lock:
+        png = _cache.get(cache_key)
+        if png is not None:
+            _cache.move_to_end(cache_key)
+            return png
+    files = resolve(champs)
+    if files is None:
+        return None
+    try:
+        png = render_grid(files)
+    except OSError as e:  # 깨진 캐시 파일 등
+        log.warning(f"격자 이미지 합성 실패: {e}")
+        return None
+    with _lock:
+        _cache[cache_key] = png
+        while len(_cache) > GRID_CACHE:
+            _cache.popitem(last=False)
+    return png
+
+
+##
+# @brief 전체 챔피언 초상화를 미리 받아 둔다(시작 직후 백그라운드, 실패해도 무해).
+# @param champs 전체 챔피언 리스트.
+def prefetch(champs):
+    if Image is None:
+        return
+    for champ in champs:
+        ensure_portraits([champ])
+
+
+##
+# @brief 로컬 PNG 폴더로 가짜 챔피언 리스트를 만든다(CLI 확인용, 네트워크 없음).
+# @param folder PNG 폴더. 파일 이름(확장자 제외)이 챔피언 id가 된다.
+# @return 챔피언 dict 리스트(image = 로컬 파일 경로).
+def _local_champions(folder):
+    names = sorted(f[:-4] for f in os.listdir(folder) if f.lower().endswith(".png"))
+    return [{"name": n, "id": n, "version": "local", "image": os.path.join(folder, n + ".png")} for n in names]
+
+
+##
+# @brief get_grid()용 resolve: image에 적힌 로컬 파일을 그대로 쓴다.
+def _local_files(champs):
+    return [c["image"] for c in champs]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="챔피언 초상화 격자 이미지 도구 (로컬 PNG 폴더)")
+    parser.add_argument("command", choices=["render", "bench"])
+    parser.add_argument("folder", help="초상화 PNG 폴더")
+    parser.add_argument("--out", default="grid.png", help="render: 출력 파일")
+    parser.add_argument("--count", type=int, default=8, help="격자에 넣을 초상화 수")
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("Pillow가 필요합니다: pip install Pillow")
+        return 1
+    champs = _local_champions(args.folder)[:args.count]
+
+    start = time.perf_counter()
+    png = get_grid(champs, _local_files)
+    cold = time.perf_counter() - start
+    if args.command == "render":
+        with open(args.out, "wb") as f:
+            f.write(png)
+        print(f"[GRID] {len(champs)}개 → {args.out} ({len(png) / 1024:.1f} KB, {cold * 1000:.1f} ms)")
+        return 0
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        get_grid(champs, _local_files)
+    hit = (time.perf_counter() - start) / 1000
+    print(f"render: {cold * 1000:.1f} ms ({len(png) / 1024:.1f} KB)  LRU hit: {hit * 1e6:.2f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
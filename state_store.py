@@ -0,0 +1,365 @@
+##
+# @file state_store.py
+# @brief 여러 샤드 프로세스가 함께 쓰는 상태 저장소 (로비 소유권, 개인 전적, history 기록 잠금, 지표).
+# @details 봇을 샤드별 프로세스로 나눠 띄우면 메모리 전역 상태와 로컬 JSON 파일만으로는
+#          두 프로세스가 같은 wins.json을 동시에 고쳐 쓰거나 같은 round 번호를 기록하게 된다.
+#          StateStore는 (namespace, key) → JSON 값 저장소에 트랜잭션을 얹은 인터페이스이고,
+#          트랜잭션 안의 읽기-수정-쓰기는 다른 프로세스와 직렬화된다.
+#            - SqliteStore: 기본 구현. data/state.sqlite3 하나를 WAL 모드로 여러 프로세스가 공유한다.
+#              트랜잭션은 BEGIN IMMEDIATE라 쓰기 트랜잭션끼리는 한 번에 하나만 돈다.
+#            - MemoryStore: 같은 의미의 프로세스 내 가짜 구현(확인용/단일 프로세스 개발용).
+#
+#          namespace:
+#            wins     uid → {name, wins}, "total_rounds" → int  (wins.json은 이 값의 사본으로 계속 씀)
+#            lobby    길드 id → {owner, channels, round, teams, started, updated}
+#            metrics  프로세스 id → metrics.snapshot() + 샤드 지연
+#            meta     wins_file_sha256 → 저장소가 마지막으로 쓴 wins 파일 체크섬(바뀌었으면 파일을 다시 가져옴)
+#
+#          STATE_STORE 환경변수: sqlite(기본) | memory.
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import paths
+import safe_io
+
+## 다른 프로세스의 로비를 버려진 것으로 보는 시간(초). 마지막 갱신 후 이만큼 지나면 넘겨받을 수 있다.
+LOBBY_TTL = 3600
+
+## SQLite 잠금 대기 시간(초). 다른 프로세스의 쓰기 트랜잭션이 이보다 길면 OperationalError.
+BUSY_TIMEOUT = 30.0
+
+log = logging.getLogger(__name__)
+
+WINS = "wins"
+LOBBY = "lobby"
+METRICS = "metrics"
+META = "meta"
+WINS_FILE = "wins_file_sha256"  # 저장소가 마지막으로 쓴 wins 파일 체크섬
+TOTAL_ROUNDS = "total_rounds"
+
+
+##
+# @brief 이 프로세스를 구분하는 소유자 문자열(호스트:pid, 샤드 id).
+# @param shard_ids 이 프로세스가 맡은 샤드 id 리스트(None이면 샤딩 안 함).
+# @return 예: "host:1234/shards=0,1".
+def process_owner(shard_ids=None):
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if shard_ids is not None:
+        owner += "/shards=" + ",".join(str(s) for s in shard_ids)
+    return owner
+
+
+##
+# @brief 상태 저장소 인터페이스. 하위 클래스는 transaction()만 구현하면 된다.
+class StateStore:
+
+    ##
+    # @brief 트랜잭션 컨텍스트. with 블록 안의 get/put/delete/items가 한 번에 반영된다.
+    # @details 블록에서 예외가 나면 쓰기는 모두 버려진다. 블록이 도는 동안 다른 프로세스의
+    #          트랜잭션은 기다린다(임계 구역으로도 쓴다 — 예: history 파일 기록).
+    # @return Txn(get, put, delete, items).
+    def transaction(self):
+        raise NotImplementedError
+
+    def get(self, ns, key, default=None):
+        with self.transaction() as txn:
+            return txn.get(ns, key, default)
+
+    def put(self, ns, key, value):
+        with self.transaction() as txn:
+            txn.put(ns, key, value)
+
+    def delete(self, ns, key):
+        with self.transaction() as txn:
+            txn.delete(ns, key)
+
+    def items(self, ns):
+        with self.transaction() as txn:
+            return txn.items(ns)
+
+    ##
+    # @brief 값 하나를 원자적으로 읽고 고쳐 쓴다.
+    # @param fn 현재 값 → 새 값.
+    # @return 새 값.
+    def update(self, ns, key, fn, default=None):
+        with self.transaction() as txn:
+            value = fn(txn.get(ns, key, default))
+            txn.put(ns, key, value)
+            return value
+
+    def close(self):
+        pass
+
+
+##
+# @brief SQLite 기반 저장소(여러 프로세스 공유). 연결은 스레드마다 하나.
+class SqliteStore(StateStore):
+
+    ##
+    # @param path DB 파일 경로.
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                     " PRIMARY KEY (ns, key))")
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # isolation_level=None: BEGIN/COMMIT을 직접 관리
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        if self.local.depth:  # 중첩: 바깥 트랜잭션에 합류
+            self.local.depth += 1
+            try:
+                yield _SqliteTxn(conn)
+            finally:
+                self.local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self.local.depth = 1
+        try:
+            yield _SqliteTxn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self.local.depth = 0
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class _SqliteTxn:
+    __slots__ = ("conn",)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get(self, ns, key, default=None):
+        row = self.conn.execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, str(key))).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put(self, ns, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)",
+                          (ns, str(key), json.dumps(value, ensure_ascii=False)))
+
+    def delete(self, ns, key):
+        self.conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, str(key)))
+
+    def items(self, ns):
+        rows = self.conn.execute("SELECT key, value FROM kv WHERE ns = ?", (ns,)).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+
+##
+# @brief 메모리 저장소(가짜). SqliteStore와 같은 의미 — 값은 JSON 왕복으로 복사, 예외 시 쓰기 버림.
+class MemoryStore(StateStore):
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.RLock()
+        self.current = None  # 잠금을 쥔 스레드의 바깥 트랜잭션
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self.current is not None:  # 중첩: 바깥 트랜잭션에 합류
+                yield self.current
+                return
+            txn = self.current = _MemoryTxn(self.data)
+            try:
+                yield txn
+            finally:
+                self.current = None
+            txn.apply()
+
+
+class _MemoryTxn:
+    __slots__ = ("data", "pending")
+
+    _DELETED = object()
+
+    def __init__(self, data):
+        self.data = data
+        self.pending = {}
+
+    def get(self, ns, key, default=None):
+        k = (ns, str(key))
+        text = self.pending[k] if k in self.pending else self.data.get(k)
+        return default if text is None or text is self._DELETED else json.loads(text)
+
+    def put(self, ns, key, value):
+        self.pending[(ns, str(key))] = json.dumps(value, ensure_ascii=False)
+
+    def delete(self, ns, key):
+        self.pending[(ns, str(key))] = self._DELETED
+
+    def items(self, ns):
+        out = {k: v for (n, k), v in self.data.items() if n == ns}
+        out.update({k: v for (n, k), v in self.pending.items() if n == ns})
+        return {k: json.loads(v) for k, v in out.items() if v is not self._DELETED}
+
+    def apply(self):
+        for k, v in self.pending.items():
+            if v is self._DELETED:
+                self.data.pop(k, None)
+            else:
+                self.data[k] = v
+
+
+##
+# @brief STATE_STORE 환경변수에 따라 저장소를 연다.
+# @param dev_mode True면 dev DB 파일.
+# @return StateStore.
+def from_env(dev_mode=False):
+    kind = os.getenv("STATE_STORE", "sqlite").lower()
+    if kind == "memory":
+        return MemoryStore()
+    if kind != "sqlite":
+        raise ValueError(f"알 수 없는 STATE_STORE: {kind}")
+    return SqliteStore(paths.state_db(dev_mode))
+
+
+# === 전적 ===
+##
+# @brief 저장소의 전적을 wins.json과 같은 dict로 읽는다.
+# @details 저장소가 비어 있거나, wins 파일이 저장소가 마지막으로 쓴 내용과 다르면(손으로 고침,
+#          backup.py restore 등) 파일 내용으로 저장소 전적을 바꾼다. 그 외에는 저장소가 원본이다.
+# @param store StateStore.
+# @param wins_path wins json 경로.
+# @return {total_rounds: int, uid: {name, wins}} 또는 둘 다 없으면 None.
+def load_wins(store, wins_path):
+    with store.transaction() as txn:
+        data = txn.items(WINS)
+        try:
+            digest = safe_io.sha256_file(wins_path)
+        except FileNotFoundError:
+            return data or None
+        if data and digest == txn.get(META, WINS_FILE):
+            return data
+        data = safe_io.read_json(wins_path)
+        for key in txn.items(WINS):
+            txn.delete(WINS, key)
+        for key, value in data.items():
+            txn.put(WINS, key, value)
+        txn.put(META, WINS_FILE, digest)
+        log.info(f"[STATE] {wins_path} → 상태 저장소 전적 가져옴")
+        return data
+
+
+##
+# @brief 전적 dict를 wins 파일 사본으로 쓰고, 쓴 내용의 체크섬을 저장소에 남긴다(트랜잭션 안에서 호출).
+# @param txn store.transaction()의 Txn.
+# @param wins_path wins json 경로.
+# @param data 전적 dict.
+def export_wins(txn, wins_path, data):
+    safe_io.write_json(wins_path, data, indent=2)
+    txn.put(META, WINS_FILE, safe_io.sha256_file(wins_path))
+
+
+##
+# @brief 한 판 결과를 전적에 반영한다(트랜잭션 안에서 호출).
+# @details total_rounds를 1 올려 이 판의 round 번호로 쓴다 — 여러 프로세스가 동시에 기록해도
+#          번호가 겹치지 않는다.
+# @param txn store.transaction()의 Txn.
+# @param winners [(uid, 표시 이름)] 승리 팀.
+# @return 반영 후 전적 dict 전체.
+def add_result(txn, winners):
+    for uid, name in winners:
+        rec = txn.get(WINS, uid) or {"name": name, "wins": 0}
+        rec["wins"] += 1
+        txn.put(WINS, uid, rec)
+    txn.put(WINS, TOTAL_ROUNDS, (txn.get(WINS, TOTAL_ROUNDS) or 0) + 1)
+    return txn.items(WINS)
+
+
+# === 로비 소유권 ===
+##
+# @brief 길드의 로비를 이 프로세스가 맡는다.
+# @details 다른 프로세스가 LOBBY_TTL 안에 갱신한 로비가 있으면 넘겨받지 않는다(재시작 중 두
+#          프로세스가 같은 길드에 동시에 게임을 여는 것 방지).
+# @param store StateStore.
+# @param guild_id 길드 id.
+# @param owner process_owner() 값.
+# @param snapshot 함께 저장할 로비 요약(dict).
+# @return 성공하면 None, 이미 다른 프로세스가 진행 중이면 그 소유자 문자열.
+def claim_lobby(store, guild_id, owner, snapshot=None):
+    now = time.time()
+    with store.transaction() as txn:
+        cur = txn.get(LOBBY, guild_id)
+        if cur and cur["owner"] != owner and now - cur["updated"] < LOBBY_TTL:
+            return cur["owner"]
+        txn.put(LOBBY, guild_id, dict(snapshot or {}, owner=owner, updated=now))
+    return None
+
+
+##
+# @brief 로비 요약을 갱신한다(이 프로세스가 소유한 경우에만).
+# @return 갱신했으면 True.
+def save_lobby(store, guild_id, owner, snapshot):
+    with store.transaction() as txn:
+        cur = txn.get(LOBBY, guild_id)
+        if cur and cur["owner"] != owner:
+            return False
+        txn.put(LOBBY, guild_id, dict(snapshot, owner=owner, updated=time.time()))
+    return True
+
+
+##
+# @brief 로비를 놓는다(게임 종료).
+def release_lobby(store, guild_id, owner):
+    with store.transaction() as txn:
+        cur = txn.get(LOBBY, guild_id)
+        if cur and cur["owner"] == owner:
+            txn.delete(LOBBY, guild_id)
+
+
+# === 샤드별 지표 ===
+##
+# @brief 이 프로세스의 지표 스냅샷을 저장소에 올린다.
+# @param store StateStore.
+# @param owner process_owner() 값.
+# @param snapshot metrics.snapshot() 결과.
+# @param shards {shard_id: 게이트웨이 지연(초)}.
+def publish_metrics(store, owner, snapshot, shards=None):
+    store.put(METRICS, owner, {"updated": time.time(), "shards": shards or {}, **snapshot})
+
+
+##
+# @brief 모든 프로세스의 지표를 한 줄 요약으로 만든다(/지표 덧붙임용).
+# @param store StateStore.
+# @param max_age 이보다 오래된 스냅샷은 뺀다(초).
+# @return 여러 줄 문자열(없으면 빈 문자열).
+def format_shards(store, max_age=300):
+    now = time.time()
+    lines = []
+    for owner, snap in sorted(store.items(METRICS).items()):
+        if now - snap["updated"] > max_age:
+            continue
+        shards = " ".join(f"#{s}={lat * 1000:.0f}ms" for s, lat in sorted(snap["shards"].items()))
+        ack = snap["timings"].get("victory.ack")
+        ack_text = f" victory.ack p95={ack['p95_ms']}ms" if ack else ""
+        lines.append(f"{owner}: {shards or '-'}{ack_text} ({now - snap['updated']:.0f}s 전)")
+    return "\n".join(lines)
@@ -0,0 +1,257 @@
+##
+# @file stats_api.py
+# @brief 봇 프로세스 안에서 띄우는 읽기 전용 통계 HTTP API (대시보드용, 선택 기능).
+# @details 대시보드는 지금 GitHub Pages의 history_data.json 원본을 받아 브라우저에서 전부
+#          집계한다. 이 서버는 같은 집계(리더보드, 시즌 요약, 플레이어/챔피언 프로필)를 시즌
+#          인덱스와 역색인에서 미리 계산해 JSON으로 내준다. py-cord가 이미 쓰는 aiohttp.web을
+#          사용하므로 추가 의존성이 없다.
+#
+#          응답 본문은 (경로, history 버전, 이름 세대) 키의 LRU에 원본/gzip 두 벌로 보관해 같은 버전에선
+#          다시 계산하지 않는다. ETag(본문 해시)를 붙이고 If-None-Match가 같으면 304를 돌려준다.
+#          history 버전은 파일 크기+mtime과 역색인의 판 수라, 판이 기록되면 자연히 갱신된다. 이름 세대는
+#          표시 이름 매핑(봇의 wins_data)이 바뀔 때마다 올라가므로 이름이 바뀌면 낡은 응답을 쓰지 않는다.
+#
+#          엔드포인트 (GET):
+#            /api/version                 history 버전
+#            /api/leaderboard             현재 시즌 개인 순위
+#            /api/seasons                 시즌별 요약
+#            /api/seasons/{season}        시즌 개인 순위
+#            /api/players/{uid}           플레이어 통산·챔피언별 전적
+#            /api/champions/{name}        챔피언 통산·플레이어별 전적
+#            /api/logs?n=100&level=WARNING  최근 로그(메모리 링 버퍼, 캐시 안 함, 토큰 필요)
+#
+#          .env의 STATS_API_PORT가 있을 때만 켜진다(STATS_API_HOST 기본 127.0.0.1). /api/logs는 로그에
+#          내부 정보가 담기므로 STATS_API_TOKEN이 설정됐을 때만 등록하고, 요청마다
+#          `Authorization: Bearer <토큰>` 헤더를 확인한다.
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from aiohttp import web
+
+import analytics
+import botlog
+import history_index
+import metrics
+import paths
+import season_index
+
+log = logging.getLogger(__name__)
+
+## 캐시할 응답 수.
+CACHE_SIZE = 256
+
+## 이보다 짧은 본문은 gzip하지 않는다(바이트).
+GZIP_MIN = 512
+
+
+##
+# @brief 통계 API 서버. start()/stop()으로 봇 이벤트 루프 안에서 띄우고 내린다.
+class StatsAPI:
+
+    ##
+    # @param dev_mode True면 dev 데이터.
+    # @param host 바인드 주소.
+    # @param port 포트.
+    # @param names uid → 표시 이름 함수(없으면 uid 그대로).
+    # @param names_version 표시 이름 매핑의 세대를 돌려주는 함수(매핑이 바뀌면 값이 달라져야 함).
+    # @param token /api/logs 접근 토큰(없으면 /api/logs를 등록하지 않음).
+    def __init__(self, dev_mode=False, host="127.0.0.1", port=8787, names=None, names_version=None, token=None):
+        self.dev_mode = dev_mode
+        self.host = host
+        self.port = port
+        self.names = names
+        self.names_version = names_version
+        self.token = token
+        self.cache = OrderedDict()
+        self.runner = None
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/api/version", self._route(self.version)),
+            web.get("/api/leaderboard", self._route(self.leaderboard)),
+            web.get("/api/seasons", self._route(self.seasons)),
+            web.get("/api/seasons/{season}", self._route(self.season)),
+            web.get("/api/players/{uid}", self._route(self.player)),
+            web.get("/api/champions/{name}", self._route(self.champion)),
+        ])
+        if token:
+            self.app.add_routes([web.get("/api/logs", self.logs)])
+
+    ##
+    # @brief 서버를 시작한다.
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        log.info(f"[STATS_API] http://{self.host}:{self.port}/api/leaderboard")
+
+    ##
+    # @brief 서버를 내린다.
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    ##
+    # @brief 현재 history 버전(파일 크기, mtime, 역색인 판 수).
+    # @details 역색인은 history 저장 직후 갱신되므로, 그 사이 요청이 낡은 색인 결과를 새 버전으로
+    #          캐시하지 않도록 색인 판 수도 키에 넣는다. 색인 조회는 다른 프로세스가 기록한 판을 따라잡느라
+    #          디스크를 읽을 수 있으므로 스레드에서 한다(_season_index와 같음).
+    async def history_version(self):
+        index = await asyncio.to_thread(history_index.get_index, self.dev_mode)
+        return (analytics.history_version(paths.history_json(self.dev_mode)), index.total_games)
+
+    ##
+    # @brief 집계 함수를 캐시·ETag·gzip 처리하는 aiohttp 핸들러로 감싼다.
+    # @param compute request를 받아 JSON 직렬화 가능한 값을 돌려주는 코루틴 함수(None이면 404).
+    # @return aiohttp 핸들러.
+    def _route(self, compute):
+        async def handler(request):
+            key = (request.path, await self.history_version(), self.names_version() if self.names_version else None)
+            entry = self.cache.get(key)
+            if entry is None:
+                metrics.incr("stats_api.miss")
+                with metrics.timer("stats_api.compute"):
+                    value = await compute(request)
+                if value is None:
+                    raise web.HTTPNotFound(text='{"error": "not found"}', content_type="application/json")
+                body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+                zipped = gzip.compress(body, 6) if len(body) >= GZIP_MIN else None
+                entry = self.cache[key] = (etag, body, zipped)
+                while len(self.cache) > CACHE_SIZE:
+                    self.cache.popitem(last=False)
+            else:
+                metrics.incr("stats_api.hit")
+                self.cache.move_to_end(key)
+
+            etag, body, zipped = entry
+            headers = {
+                "ETag": etag,
+                "Cache-Control": "no-cache",  # 브라우저가 매번 ETag로 재검증
+                "Access-Control-Allow-Origin": "*",
+                "Vary": "Accept-Encoding",
+            }
+            if etag in request.headers.get("If-None-Match", ""):
+                metrics.incr("stats_api.not_modified")
+                return web.Response(status=304, headers=headers)
+            if zipped is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+                body = zipped
+            return web.Response(body=body, headers=headers, content_type="application/json")
+
+        return handler
+
+    ##
+    # @brief uid의 표시 이름.
+    def _name(self, uid):
+        return self.names(uid) if self.names else uid
+
+    ##
+    # @brief 시즌 인덱스를 스레드에서 로드한다.
+    async def _season_index(self):
+        return await asyncio.to_thread(season_index.load_index, self.dev_mode) or season_index.empty_index()
+
+    ##
+    # @brief 시즌 요약의 players를 순위 리스트로 바꾼다.
+    def _ranking(self, summary):
+        rows = [
+            {"id": uid, "name": self._name(uid), "games": r["games"], "wins": r["wins"],
+             "winrate": round(r["wins"] / r["games"] * 100, 1) if r["games"] else 0.0}
+            for uid, r in summary["players"].items()
+        ]
+        rows.sort(key=lambda r: (-r["wins"], -r["winrate"], r["name"]))
+        return rows
+
+    ##
+    # @brief GET /api/version — 현재 history 버전.
+    async def version(self, request):
+        file_version, games = await self.history_version()
+        return {"file": list(file_version) if file_version else None, "games": games}
+
+    ##
+    # @brief GET /api/leaderboard — 현재(마지막) 시즌 개인 순위.
+    async def leaderboard(self, request):
+        index = await self._season_index()
+        last = index.get("last")
+        if not last:
+            return {"season": None, "games": 0, "players": []}
+        summary = season_index.get_season(index, last["season"])
+        return {"season": last["season"], "games": summary["games"], "players": self._ranking(summary)}
+
+    ##
+    # @brief GET /api/seasons — 시즌별 판수·라운드·날짜 범위.
+    async def seasons(self, request):
+        index = await self._season_index()
+        return [
+            {"season": int(k), "games": s["games"], "rounds": [s["round_min"], s["round_max"]],
+             "dates": [s["date_first"], s["date_last"]], "players": len(s["players"])}
+            for k, s in sorted(index["seasons"].items(), key=lambda kv: int(kv[0]))
+        ]
+
+    ##
+    # @brief GET /api/seasons/{season} — 시즌 개인 순위(없으면 404).
+    async def season(self, request):
+        index = await self._season_index()
+        summary = season_index.get_season(index, request.match_info["season"])
+        if summary is None:
+            return None
+        return {"season": int(request.match_info["season"]), "games": summary["games"],
+                "players": self._ranking(summary)}
+
+    ##
+    # @brief GET /api/players/{uid} — 플레이어 통산·챔피언별 전적(없으면 404).
+    async def player(self, request):
+        uid = request.match_info["uid"]
+        index = await asyncio.to_thread(history_index.get_index, self.dev_mode)
+        profile = index.player_profile(uid)
+        if profile is None:
+            return None
+        return {"id": uid, "name": self._name(uid), "games": profile["games"], "wins": profile["wins"],
+                "champs": [{"champ": c, "games": g, "wins": w} for c, g, w in profile["champs"]]}
+
+    ##
+    # @brief GET /api/champions/{name} — 챔피언 통산·플레이어별 전적(없으면 404).
+    async def champion(self, request):
+        name = request.match_info["name"]
+        index = await asyncio.to_thread(history_index.get_index, self.dev_mode)
+        profile = index.champion_profile(name)
+        if profile is None:
+            return None
+        return {"champ": name, "games": profile["games"], "wins": profile["wins"],
+                "players": [{"id": u, "name": self._name(u), "games": g, "wins": w}
+                            for u, g, w in profile["players"]]}
+
+
+    ##
+    # @brief GET /api/logs — 메모리 링 버퍼의 최근 로그(사고 직후 덤프용, 캐시하지 않음, 토큰 필요).
+    async def logs(self, request):
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth.encode("utf-8"), f"Bearer {self.token}".encode("utf-8")):
+            raise web.HTTPUnauthorized(text='{"error": "unauthorized"}', content_type="application/json")
+        try:
+            n = max(0, min(int(request.query.get("n", 100)), botlog.RING_SIZE))
+        except ValueError:
+            raise web.HTTPBadRequest(text='{"error": "n must be int"}', content_type="application/json")
+        entries = botlog.recent(n, request.query.get("level"), request.query.get("lobby"))
+        return web.json_response(entries, headers={"Cache-Control": "no-store"})
+
+
+##
+# @brief .env 설정으로 서버를 만든다. STATS_API_PORT가 없으면 None(기능 꺼짐).
+# @param dev_mode True면 dev 데이터.
+# @param names uid → 표시 이름 함수.
+# @param names_version 표시 이름 매핑 세대 함수.
+# @return StatsAPI 또는 None.
+def from_env(dev_mode=False, names=None, names_version=None):
+    port = os.getenv("STATS_API_PORT")
+    if not port:
+        return None
+    host = os.getenv("STATS_API_HOST", "127.0.0.1")
+    token = os.getenv("STATS_API_TOKEN") or None
+    return StatsAPI(dev_mode, host, int(port), names, names_version, token)
@@ -0,0 +1,7 @@
+##
+# @file conftest.py
+# @brief 저장소 루트의 평면 모듈(sprite_grid.py 등)을 테스트에서 import 할 수 있게 한다.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,140 @@
+##
+# @file test_sprite_grid.py
+# @brief sprite_grid 격자 합성·LRU 캐시 키·초상화 실패 시 폴백 테스트(네트워크 없음).
+# @details 초상화는 tests/fixtures/sprites의 8x8 단색 PNG(Red/Green/Blue)를 쓴다. 다운로드 경로는
+#          http_client.run_sync를 바꿔 끼워 네트워크에 닿지 않게 한다.
+import io
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+import http_client  # noqa: E402
+import paths  # noqa: E402
+import sprite_grid  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sprites")
+COLORS = {
+    "Red": (220, 40, 40, 255),
+    "Green": (40, 200, 60, 255),
+    "Blue": (40, 80, 220, 255),
+}
+
+
+##
+# @brief 픽스처 초상화를 가리키는 챔피언 dict.
+def champ(champ_id, version="local"):
+    return {"name": champ_id, "id": champ_id, "version": version,
+            "image": os.path.join(FIXTURES, f"{champ_id}.png")}
+
+
+##
+# @brief 칸 i의 가운데 좌표.
+def center(i, columns, tile):
+    return (sprite_grid.GAP + (i % columns) * (tile + sprite_grid.GAP) + tile // 2,
+            sprite_grid.GAP + (i // columns) * (tile + sprite_grid.GAP) + tile // 2)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch, tmp_path):
+    sprite_grid._cache.clear()
+    monkeypatch.setattr(paths, "DATA_DIR", str(tmp_path))
+
+    def no_network(factory, timeout=None):
+        raise AssertionError("테스트에서 네트워크를 쓰면 안 됨")
+
+    monkeypatch.setattr(http_client, "run_sync", no_network)
+    yield
+    sprite_grid._cache.clear()
+
+
+def test_grid_layout():
+    order = ["Red", "Green", "Blue", "Red", "Green"]
+    files = [os.path.join(FIXTURES, f"{name}.png") for name in order]
+    png = sprite_grid.render_grid(files, columns=2, tile=16)
+
+    img = Image.open(io.BytesIO(png)).convert("RGBA")
+    gap = sprite_grid.GAP
+    assert img.size == (2 * 16 + 3 * gap, 3 * 16 + 4 * gap)
+    for i, name in enumerate(order):
+        assert img.getpixel(center(i, 2, 16)) == COLORS[name]
+    assert img.getpixel((0, 0)) == sprite_grid.BACKGROUND  # 바깥 여백
+    assert img.getpixel(center(5, 2, 16)) == sprite_grid.BACKGROUND  # 마지막 줄의 빈 칸
+
+
+def test_grid_single_row_uses_count_as_columns():
+    files = [os.path.join(FIXTURES, "Blue.png")] * 3
+    img = Image.open(io.BytesIO(sprite_grid.render_grid(files, tile=8)))
+    assert img.size == (3 * 8 + 4 * sprite_grid.GAP, 8 + 2 * sprite_grid.GAP)
+
+
+def test_cache_key_reuse():
+    calls = []
+
+    def resolve(champs):
+        calls.append([c["id"] for c in champs])
+        return sprite_grid._local_files(champs)
+
+    champs = [champ("Red"), champ("Green"), champ("Blue")]
+    first = sprite_grid.get_grid(champs, resolve)
+    assert first is not None
+    assert sprite_grid.get_grid([dict(c) for c in champs], resolve) is first
+    assert len(calls) == 1
+
+    # 예전 형식(image URL에서 버전·id를 뽑음)도 같은 키
+    legacy = [{"name": c["id"], "image": f"https://ddragon.example/cdn/local/img/champion/{c['id']}.png"}
+              for c in champs]
+    assert sprite_grid.get_grid(legacy, resolve) is first
+    assert len(calls) == 1
+
+    # 순서나 버전이 다르면 다른 키
+    assert sprite_grid.get_grid(list(reversed(champs)), resolve) != first
+    sprite_grid.get_grid([champ(c["id"], version="other") for c in champs], resolve)
+    assert len(calls) == 3
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(sprite_grid, "GRID_CACHE", 2)
+    for name in ("Red", "Green", "Blue"):
+        sprite_grid.get_grid([champ(name)], sprite_grid._local_files)
+    assert list(sprite_grid._cache) == [(("local", "Green"),), (("local", "Blue"),)]
+
+
+def test_cached_portrait_is_used_without_download():
+    folder = paths.sprite_dir("14.1.1")
+    os.makedirs(folder)
+    with open(os.path.join(FIXTURES, "Red.png"), "rb") as src, \
+            open(os.path.join(folder, "Red.png"), "wb") as dst:
+        dst.write(src.read())
+
+    png = sprite_grid.get_grid([champ("Red", version="14.1.1")])
+    img = Image.open(io.BytesIO(png)).convert("RGBA")
+    assert img.getpixel(center(0, 1, sprite_grid.TILE)) == COLORS["Red"]
+
+
+def test_missing_portrait_falls_back_to_none(monkeypatch):
+    def fail(factory, timeout=None):
+        raise http_client.HTTPError("404", status=404)
+
+    monkeypatch.setattr(http_client, "run_sync", fail)
+    champs = [champ("Red", version="14.1.1"), champ("Missing", version="14.1.1")]
+    assert sprite_grid.get_grid(champs) is None
+    assert not sprite_grid._cache  # 실패는 캐시하지 않음 (다음 판에 다시 시도)
+
+
+def test_unknown_champion_key_falls_back_to_none():
+    assert sprite_grid.get_grid([{"name": "이름만", "image": ""}], sprite_grid._local_files) is None
+
+
+def test_broken_portrait_file_falls_back_to_none(tmp_path):
+    broken = tmp_path / "Broken.png"
+    broken.write_bytes(b"not a png")
+    champs = [{"name": "Broken", "id": "Broken", "version": "local", "image": str(broken)}]
+    assert sprite_grid.get_grid(champs, sprite_grid._local_files) is None
+
+
+def test_without_pillow_returns_none(monkeypatch):
+    monkeypatch.setattr(sprite_grid, "Image", None)
+    assert sprite_grid.get_grid([champ("Red")], sprite_grid._local_files) is None
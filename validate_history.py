@@ -0,0 +1,297 @@
+##
+# @file validate_history.py
+# @brief history_data.json / wins.json 무결성 검증기 (CLI).
+# @details PARSE_REPORT 작업 때 손으로 했던 점검(유령 라운드 r119/r126 찾기, 판당 승수 3 확인,
+#          wins.json ↔ history_data.json 대조)을 자동화한다. history_io.iter_games()로 판을
+#          하나씩 스트리밍하며 아래 불변식을 검사하고, 위반을 games 오프셋과 함께 출력한다.
+#            - round_gap / round_regression : 시즌 내 라운드 연속성
+#            - invalid_round                : round가 없거나 정수가 아님(연속성 검사에서 제외)
+#            - invalid_season               : season이 정수가 아님(직전 시즌으로 보고 계속)
+#            - season_order                 : 시즌 번호가 줄어들지 않음
+#            - invalid_game / invalid_team / invalid_player : 판이 객체가 아님, 팀이 플레이어 객체
+#              목록이 아님, id 없는 플레이어(해당 판의 팀 검사·승수 집계에서 제외)
+#            - team_size                    : 양 팀 3명씩
+#            - duplicate_player             : 한 판에 같은 플레이어 중복 없음
+#            - invalid_winner               : winner가 team1/team2
+#            - duplicate_game               : content_key 중복(같은 판 이중 기록)
+#            - invalid_wins / wins_total / wins_mismatch / rounds_mismatch : wins.json 형식,
+#              승수합=3×total_rounds, 마지막 시즌 개인 승수·판수가 wins.json과 일치
+#          형식이 깨진 입력도 예외로 멈추지 않고 위반으로 보고한다.
+#          시즌별 상태와 마지막 시즌 집계만 들고 있어 메모리는 판 수와 무관하다(예외: 중복 검사용
+#          content_key 다이제스트 집합은 판당 16바이트 — 파이썬 hash()와 달리 충돌로 오탐하지 않음).
+#
+#          처리량은 JSON 디코드가 상한이다(스트리밍 디코드만 판당 약 5µs, 약 20만 판/s). 검사는 판당
+#          팀을 한 번씩만 훑어 약 6µs이고, 합치면 --bench 기준 약 9만 판/s(1M판 파일 약 11초)다.
+#
+#          사용법:
+#            python validate_history.py [--dev] [--max-report N]
+#            python validate_history.py --bench 1000000   # 합성 데이터 처리량 측정
+import argparse
+import gc
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import paths
+from history_io import iter_games
+
+## 판당 팀 인원.
+TEAM_SIZE = 3
+
+
+##
+# @brief 위반 하나를 담는 레코드.
+class Violation:
+    __slots__ = ("offset", "rule", "message")
+
+    def __init__(self, offset, rule, message):
+        self.offset = offset
+        self.rule = rule
+        self.message = message
+
+    def __str__(self):
+        where = f"offset {self.offset}" if self.offset is not None else "wins"
+        return f"[{where}] {self.rule}: {self.message}"
+
+
+##
+# @brief 판 스트림을 검증하고 위반을 report 콜백으로 넘긴다.
+# @param games (offset, game) 이터러블(iter_games 결과).
+# @param report Violation을 받는 콜백.
+# @param wins wins.json dict(없으면 wins 관련 검사 생략).
+# @return {"games": 판 수, "seasons": 시즌 수, "violations": {rule: 개수}} 통계.
+def validate(games, report, wins=None):
+    # 스트리밍 중 만드는 객체는 순환 참조가 없으므로 순환 GC를 꺼서 디코드 비용을 줄인다
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _validate(games, report, wins)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+##
+# @brief validate()의 본체(GC 제어 없이 검사만 수행).
+def _validate(games, report, wins):
+    counts = {}
+
+    def emit(offset, rule, message):
+        counts[rule] = counts.get(rule, 0) + 1
+        report(Violation(offset, rule, message))
+
+    seen = set()
+    last_round = {}  # season -> 마지막 라운드
+    prev_season = None
+    season_wins = {}  # 마지막(현재) 시즌의 uid -> 승수
+    season_games = 0
+    seasons = 0
+    n = 0
+
+    for offset, g in games:
+        n += 1
+        if type(g) is not dict:
+            emit(offset, "invalid_game", f"판이 객체가 아님: {type(g).__name__}")
+            continue
+        season = g.get("season", 1)
+        rnd = g.get("round")
+        winner = g.get("winner")
+
+        if type(season) is not int:
+            emit(offset, "invalid_season", f"season={season!r}")
+            season = 1 if prev_season is None else prev_season
+        if season != prev_season:
+            if prev_season is not None and season < prev_season:
+                emit(offset, "season_order", f"S{prev_season} 다음에 S{season}")
+            seasons += 1
+            season_wins = {}
+            season_games = 0
+            prev_season = season
+        season_games += 1
+
+        prev = last_round.get(season)
+        if type(rnd) is not int:
+            emit(offset, "invalid_round", f"S{season}: round={rnd!r}")
+        else:
+            if prev is not None and rnd <= prev:
+                emit(offset, "round_regression", f"S{season} R{prev} 다음에 R{rnd}")
+            elif prev is not None and rnd != prev + 1:
+                missing = ", ".join(f"R{r}" for r in range(prev + 1, min(rnd, prev + 6)))
+                more = " ..." if rnd - prev - 1 > 5 else ""
+                emit(offset, "round_gap", f"S{season} R{prev} → R{rnd} (누락 {missing}{more})")
+            last_round[season] = rnd
+
+        # 팀마다 한 번만 훑어 id 목록과 다이제스트용 (id, 챔피언) 조각을 같이 만든다
+        try:
+            ids1 = [p.get("id") for p in g.get("team1") or ()]
+            ids2 = [p.get("id") for p in g.get("team2") or ()]
+            picks1 = sorted([f"{p.get('id')}\x1e{p.get('champ')}" for p in g.get("team1") or ()])
+            picks2 = sorted([f"{p.get('id')}\x1e{p.get('champ')}" for p in g.get("team2") or ()])
+            ids = set(ids1)
+            ids.update(ids2)
+        except (AttributeError, TypeError):
+            emit(offset, "invalid_team", f"S{season} R{rnd}: 팀이 플레이어 객체 목록이 아님")
+            continue
+
+        if len(ids1) != TEAM_SIZE or len(ids2) != TEAM_SIZE:
+            emit(offset, "team_size", f"S{season} R{rnd}: {len(ids1)}v{len(ids2)}")
+
+        if None in ids:
+            emit(offset, "invalid_player", f"S{season} R{rnd}: id 없는 플레이어")
+            continue
+        if len(ids) != len(ids1) + len(ids2):
+            emit(offset, "duplicate_player", f"S{season} R{rnd}: 중복 플레이어 {len(ids1) + len(ids2) - len(ids)}명")
+
+        if winner == "team1":
+            winners = ids1
+        elif winner == "team2":
+            winners = ids2
+        else:
+            winners = ()
+            emit(offset, "invalid_winner", f"S{season} R{rnd}: winner={winner!r}")
+
+        for uid in winners:
+            season_wins[uid] = season_wins.get(uid, 0) + 1
+
+        h = _digest(g.get("round_orig", rnd), winner, picks1, picks2)
+        if h in seen:
+            emit(offset, "duplicate_game", f"S{season} R{rnd}: 같은 내용의 판이 이미 있음")
+        else:
+            seen.add(h)
+
+    if wins is not None:
+        _check_wins(wins, season_wins, season_games, prev_season, emit)
+
+    return {"games": n, "seasons": seasons, "violations": counts}
+
+
+##
+# @brief content_key(라운드, 승리 팀, 팀별 정렬된 (id, 챔피언))의 중복 검사용 다이제스트(16바이트 blake2b).
+# @details 키 튜플 자체를 담으면 판당 수백 바이트라, 값이 같으면 같고 충돌은 사실상 없는 다이제스트만 둔다.
+#          repr(튜플) 대신 id·챔피언 이름에 나오지 않는 제어 문자로 이은 문자열을 해시한다(판당 ~3µs 절약).
+# @param round_key round_orig(없으면 round).
+# @param winner 승리 팀 키.
+# @param picks1 team1의 "id\x1e챔피언" 정렬 목록.
+# @param picks2 team2의 "id\x1e챔피언" 정렬 목록.
+def _digest(round_key, winner, picks1, picks2):
+    text = f"{round_key}\x1d{winner}\x1d" + "\x1f".join(picks1) + "\x1d" + "\x1f".join(picks2)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+##
+# @brief wins.json 내부 일관성과 마지막 시즌 집계와의 일치를 검사한다.
+# @param wins wins.json dict.
+# @param season_wins 마지막 시즌의 uid -> 승수.
+# @param season_games 마지막 시즌 판 수.
+# @param season 마지막 시즌 번호.
+# @param emit 위반 기록 함수(offset, rule, message).
+def _check_wins(wins, season_wins, season_games, season, emit):
+    if not isinstance(wins, dict):
+        emit(None, "invalid_wins", f"wins.json이 객체가 아님: {type(wins).__name__}")
+        return
+    total_rounds = wins.get("total_rounds", 0)
+    if type(total_rounds) is not int:
+        emit(None, "invalid_wins", f"total_rounds={total_rounds!r}")
+        return
+    players = {}
+    for uid, v in wins.items():
+        if not isinstance(v, dict):
+            continue
+        if type(v.get("wins", 0)) is not int:
+            emit(None, "invalid_wins", f"{uid}: wins={v.get('wins')!r}")
+            continue
+        players[uid] = v
+    total_wins = sum(v.get("wins", 0) for v in players.values())
+    if total_wins != total_rounds * TEAM_SIZE:
+        emit(None, "wins_total",
+             f"승수합 {total_wins} ≠ 3 × total_rounds({total_rounds}) = {total_rounds * TEAM_SIZE}")
+
+    if season is None:
+        return
+    if season_games != total_rounds:
+        emit(None, "rounds_mismatch",
+             f"S{season} 기록 {season_games}판 ≠ total_rounds {total_rounds} "
+             f"(차이 {total_rounds - season_games}: 유령 라운드/유실 판)")
+    for uid in sorted(set(players) | set(season_wins), key=str):
+        w_file = players.get(uid, {}).get("wins", 0)
+        w_hist = season_wins.get(uid, 0)
+        if w_file != w_hist:
+            name = players.get(uid, {}).get("name", uid)
+            emit(None, "wins_mismatch", f"{name}: wins.json {w_file}승 ≠ S{season} 기록 {w_hist}승")
+
+
+##
+# @brief 합성 history 파일을 만들어 처리량을 측정한다.
+# @param n 판 수.
+# @return 초당 처리 판 수.
+def bench(n):
+    import season_index
+
+    games = season_index.synthetic_games(n)
+    season_index.retag_seasons(games)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # indent=2 덤프는 순수 파이썬 인코더라 느리므로 판 단위로 C 인코더를 써서 기록
+            f.write(f'{{\n  "total_games": {n},\n  "players": {{}},\n  "games": [\n    ')
+            f.write(",\n    ".join(json.dumps(g, ensure_ascii=False) for g in games))
+            f.write("\n  ]\n}\n")
+        del games
+        t0 = time.perf_counter()
+        stats = validate(iter_games(path), lambda v: None)
+        elapsed = time.perf_counter() - t0
+    finally:
+        os.remove(path)
+    rate = stats["games"] / elapsed
+    print(f"[BENCH] {stats['games']} games in {elapsed:.2f}s -> {rate:,.0f} games/s")
+    return rate
+
+
+##
+# @brief CLI 진입점.
+# @return 위반이 있으면 1, 없으면 0.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="history_data.json / wins.json 무결성 검증")
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 검증")
+    parser.add_argument("--history", help="history json 경로(기본: paths.history_json)")
+    parser.add_argument("--wins", help="wins json 경로(기본: paths.wins_file)")
+    parser.add_argument("--no-wins", action="store_true", help="wins.json 대조 생략")
+    parser.add_argument("--max-report", type=int, default=200, help="출력할 최대 위반 수")
+    parser.add_argument("--bench", type=int, metavar="N", help="합성 N판으로 처리량 측정")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench(args.bench)
+        return 0
+
+    history = args.history or paths.history_json(args.dev)
+    wins = None
+    if not args.no_wins:
+        wins_path = args.wins or paths.wins_file(args.dev)
+        try:
+            with open(wins_path, "r", encoding="utf-8") as f:
+                wins = json.load(f)
+        except FileNotFoundError:
+            print(f"[WARN] {wins_path} 없음 → wins 대조 생략")
+
+    shown = [0]
+
+    def report(v):
+        shown[0] += 1
+        if shown[0] <= args.max_report:
+            print(v)
+
+    stats = validate(iter_games(history), report, wins)
+    total = sum(stats["violations"].values())
+    if shown[0] > args.max_report:
+        print(f"... 외 {shown[0] - args.max_report}건")
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(stats["violations"].items())) or "-"
+    print(f"[RESULT] {stats['games']} games, {stats['seasons']} seasons, {total} violations ({summary})")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+##
+# @file victory_commit.py
+# @brief 게임 id 단위로 승리 커밋을 정확히 한 번만 처리하는 파이프라인.
+# @details 승리 셀렉트는 게임 채널 3곳에 모두 올라가서 여러 명이 거의 동시에 누를 수 있다.
+#          예전에는 전역 victory_processed 플래그 하나로 막았는데, 플래그를 검증보다 먼저 세워
+#          픽이 빠진 경우 게임이 멈췄고, 중복 클릭이 round 번호만 소모한 유령 라운드(r119, r126)도 생겼다.
+#
+#          CommitPipeline.run(game_id, validate, commit):
+#            - 이미 끝났거나 진행 중인 game_id면 기다리지 않고 바로 DUPLICATE/IN_PROGRESS (3초 ack 보호)
+#            - game_id별 asyncio.Lock 안에서 validate() → 실패 시 아무 상태도 바꾸지 않고 INVALID
+#            - commit() 성공 시에만 done에 남긴다(실패하면 같은 game_id로 다시 시도 가능)
+#
+#          record(): 상태 저장소 트랜잭션 하나 안에서
+#            전적 반영 → history 기록(game_id 멱등) → 이벤트 로그 한 줄(game_id 멱등) → wins 파일 사본
+#          순서로 쓰고 저장소에 game_id 완료 표시를 남긴다. 같은 game_id로 다시 불리면(프로세스가 달라도)
+#          아무것도 더 쓰지 않고 처음 결과를 돌려준다. 중간에 실패하면 저장소는 롤백되고, 이미 쓴
+#          history/이벤트는 game_id로 걸러지므로 재시도해도 두 번 들어가지 않는다.
+#          파생 캐시(시즌 인덱스, 역색인, 승리 확률 모델, 열 내보내기)와 증분 백업은 커밋이 끝난 뒤
+#          트랜잭션 밖에서 갱신한다(game_recorder.after_commit, 실패해도 기록에는 영향 없음).
+#
+#          사용법:
+#            python victory_commit.py stress [--games 50 --clicks 300 --fail-rate 0.1]
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import paths
+import state_store
+from game_recorder import after_commit, record_game
+
+## run() 결과 상태.
+COMMITTED = "committed"
+DUPLICATE = "duplicate"
+IN_PROGRESS = "in_progress"
+INVALID = "invalid"
+
+## 완료한 game_id를 메모리에 기억하는 개수(넘으면 오래된 것부터 잊고 저장소 표시에 맡김).
+DONE_CACHE = 256
+
+## 저장소 namespace: game_id → {round, season, winner, time}.
+GAMES = "games"
+
+
+##
+# @brief 새 게임 id.
+def new_game_id():
+    return uuid.uuid4().hex
+
+
+##
+# @brief game_id별로 검증·커밋을 직렬화하고 한 번만 실행하는 파이프라인(이벤트 루프 하나 안에서 사용).
+class CommitPipeline:
+
+    def __init__(self):
+        self.locks = {}  # game_id -> (asyncio.Lock, 기다리는 수)
+        self.running = set()
+        self.done = OrderedDict()
+
+    ##
+    # @brief game_id의 커밋을 한 번만 실행한다.
+    # @param game_id 게임 id.
+    # @param validate 인자 없는 함수. 문제가 있으면 사용자 안내 문자열, 없으면 None.
+    # @param commit 인자 없는 코루틴 함수. 반환값이 결과로 남는다.
+    # @return (상태, 값): COMMITTED/DUPLICATE → commit 결과, INVALID → 안내 문자열, IN_PROGRESS → None.
+    async def run(self, game_id, validate, commit):
+        if game_id in self.done:
+            return DUPLICATE, self.done[game_id]
+        if game_id in self.running:
+            return IN_PROGRESS, None
+        lock, waiting = self.locks.get(game_id, (asyncio.Lock(), 0))
+        self.locks[game_id] = (lock, waiting + 1)
+        try:
+            async with lock:
+                if game_id in self.done:
+                    return DUPLICATE, self.done[game_id]
+                error = validate()
+                if error:
+                    return INVALID, error
+                self.running.add(game_id)
+                try:
+                    result = await commit()
+                finally:
+                    self.running.discard(game_id)
+                self.done[game_id] = result
+                while len(self.done) > DONE_CACHE:
+                    self.done.popitem(last=False)
+                return COMMITTED, result
+        finally:
+            lock, waiting = self.locks[game_id]
+            if waiting > 1:
+                self.locks[game_id] = (lock, waiting - 1)
+            else:
+                del self.locks[game_id]
+
+    ##
+    # @brief game_id가 이미 커밋됐는지.
+    def is_done(self, game_id):
+        return game_id in self.done
+
+
+##
+# @brief 이벤트 로그 마지막 줄의 game_id.
+def _last_event_id(path):
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 65536))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    for line in reversed(lines):
+        if line.strip():
+            try:
+                return json.loads(line).get("game_id")
+            except ValueError:
+                return None
+    return None
+
+
+##
+# @brief 이벤트 한 줄을 붙인다(마지막 줄이 같은 game_id면 건너뜀). fsync까지 한다.
+# @param path 이벤트 로그 경로.
+# @param event dict(game_id 포함).
+def append_event(path, event):
+    if _last_event_id(path) == event["game_id"]:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+##
+# @brief 승리 한 판을 history·이벤트 로그·전적에 한 트랜잭션으로 기록한다(game_id 멱등).
+# @details 트랜잭션이 샤드 프로세스 간 임계 구역이라 round 번호 순서대로 history에 들어간다.
+#          이미 기록된 game_id면 아무것도 쓰지 않는다. 새로 기록했으면 트랜잭션이 끝난 뒤 파생 캐시와
+#          백업을 갱신한다(백업엔 이 판까지 반영한 전적을 함께 남김).
+# @param store StateStore.
+# @param game_id 게임 id.
+# @param teams {"team1": [{"id","name","champ"}], "team2": [...]}.
+# @param team_key 승리 팀 키.
+# @param dev_mode True면 dev 데이터.
+# @return (전적 dict, {round, season, winner, time}, 새로 기록했으면 True).
+def record(store, game_id, teams, team_key, dev_mode):
+    with store.transaction() as txn:
+        done = txn.get(GAMES, game_id)
+        if done is not None:
+            return txn.items(state_store.WINS), done, False
+        round_num = (txn.get(state_store.WINS, state_store.TOTAL_ROUNDS) or 0) + 1
+        data = state_store.add_result(txn, [(p["id"], p["name"]) for p in teams[team_key]])
+        season, _ = record_game(round_num, teams, team_key, dev_mode, game_id=game_id)
+        now = datetime.now(timezone.utc).isoformat()
+        append_event(paths.events_log(dev_mode), {
+            "type": "victory",
+            "game_id": game_id,
+            "round": round_num,
+            "season": season,
+            "winner": team_key,
+            "teams": {tk: [[p["id"], p["champ"]] for p in teams[tk]] for tk in ("team1", "team2")},
+            "time": now,
+        })
+        state_store.export_wins(txn, paths.wins_file(dev_mode), data)
+        info = {"round": round_num, "season": season, "winner": team_key, "time": now}
+        txn.put(GAMES, game_id, info)
+    after_commit(dev_mode, data)
+    return data, info, True
+
+
+# === 스트레스 테스트 ===
+##
+# @brief 판마다 수백 개의 동시 승리 선택을 쏘고 정확히 한 번 기록됐는지 확인한다.
+# @details 선택 중 일부는 이전 게임 id(오래된 셀렉트)이고, 일부 판은 첫 시도의 history 기록을
+#          실패시켜 롤백 후 재시도 경로도 지난다. 데이터는 임시 폴더에 쓴다.
+# @param games 판 수.
+# @param clicks 판당 동시 선택 수.
+# @param fail_rate 판의 첫 커밋을 실패시킬 확률.
+# @return 모든 확인을 통과하면 0, 아니면 1.
+def stress(games, clicks, fail_rate, seed=0):
+    import game_recorder
+    import history_io
+
+    rng = random.Random(seed)
+    root = tempfile.mkdtemp(prefix="victory_stress_")
+    paths.DATA_DIR = os.path.join(root, "data")
+    paths.BACKUP_DIR = os.path.join(root, "backup")
+    store = state_store.SqliteStore(paths.state_db(True))
+    pipeline = CommitPipeline()
+    players = [(str(10**17 + i), f"P{i}") for i in range(20)]
+    counts = {COMMITTED: 0, DUPLICATE: 0, IN_PROGRESS: 0, INVALID: 0, "failed": 0}
+    real_record_game = game_recorder.record_game
+    fail_next = set()
+
+    def flaky_record_game(*args, **kwargs):
+        if kwargs.get("game_id") in fail_next:
+            fail_next.discard(kwargs["game_id"])
+            raise OSError("주입된 기록 실패")
+        return real_record_game(*args, **kwargs)
+
+    globals()["record_game"] = flaky_record_game
+
+    async def one_game(previous_id):
+        game_id = new_game_id()
+        abandoned_id = new_game_id()  # 승리를 고르기 전에 /게임시작으로 버려진 게임 (커밋된 적 없음)
+        picked = rng.sample(players, 6)
+        teams = {
+            "team1": [{"id": u, "name": n, "champ": f"C{rng.randrange(160)}"} for u, n in picked[:3]],
+            "team2": [{"id": u, "name": n, "champ": f"C{rng.randrange(160)}"} for u, n in picked[3:]],
+        }
+        if rng.random() < fail_rate:
+            fail_next.add(game_id)
+        current = {"id": game_id}
+
+        async def click(i):
+            await asyncio.sleep(rng.uniform(0, 0.002))
+            if i % 10 == 5:
+                clicked_id = abandoned_id  # 버려진 게임의 셀렉트 → 검증에서 INVALID
+            elif previous_id and i % 10 == 0:
+                clicked_id = previous_id  # 이미 커밋된 지난 게임의 셀렉트 → DUPLICATE
+            else:
+                clicked_id = game_id
+
+            def validate():
+                return "이전 게임의 선택창" if clicked_id != current["id"] else None
+
+            async def commit():
+                return await asyncio.to_thread(record, store, clicked_id, teams, rng.choice(["team1", "team2"]), True)
+
+            try:
+                status, _ = await pipeline.run(clicked_id, validate, commit)
+            except OSError:
+                counts["failed"] += 1
+                return
+            counts[status] += 1
+
+        await asyncio.gather(*(click(i) for i in range(clicks)))
+        if not pipeline.is_done(game_id):  # 실패만 하고 끝난 판은 한 번 더 눌러 마무리
+            status, _ = await pipeline.run(game_id, lambda: None, lambda: asyncio.to_thread(
+                record, store, game_id, teams, "team1", True))
+            counts[status] += 1
+        return game_id
+
+    async def main():
+        previous = None
+        for _ in range(games):
+            previous = await one_game(previous)
+
+    try:
+        start = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - start
+        history = history_io.load(paths.history_json(True))["games"]
+        with open(paths.events_log(True), encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        wins = store.items(state_store.WINS)
+        ids = [g.get("game_id") for g in history]
+        checks = {
+            "history 판 수 == 게임 수": len(history) == games,
+            "history game_id 중복 없음": len(set(ids)) == len(ids) == games,
+            "round 1..N 연속": [g["round"] for g in history] == list(range(1, games + 1)),
+            "이벤트 == history": [e["game_id"] for e in events] == ids,
+            "total_rounds == 게임 수": wins.get(state_store.TOTAL_ROUNDS) == games,
+            "승수 합 == 3 × 게임 수": sum(v["wins"] for k, v in wins.items() if k != state_store.TOTAL_ROUNDS)
+                                  == 3 * games,
+            "커밋 == 게임 수": counts[COMMITTED] == games,
+            "버려진 게임 선택 == INVALID": counts[INVALID] == games * len(range(5, clicks, 10)),
+        }
+        print(f"{games}판 × 동시 선택 {clicks}개 ({elapsed:.1f}s): " +
+              ", ".join(f"{k}={v}" for k, v in counts.items()))
+        for name, ok in checks.items():
+            print(f"[{'OK' if ok else 'FAIL'}] {name}")
+        return 0 if all(checks.values()) else 1
+    finally:
+        globals()["record_game"] = real_record_game
+        store.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="승리 커밋 파이프라인 스트레스 테스트")
+    parser.add_argument("command", choices=["stress"])
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=300, help="판당 동시 선택 수")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="판의 첫 커밋을 실패시킬 확률")
+    args = parser.parse_args(argv)
+    return stress(args.games, args.clicks, args.fail_rate)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
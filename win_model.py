@@ -0,0 +1,360 @@
+##
+# @file win_model.py
+# @brief history_data.json으로 학습하는 팀 승리 확률 모델 (희소 특성 로지스틱 회귀, NumPy).
+# @details 한 팀의 특성은 플레이어(p:uid), 챔피언(c:champ), 같은 팀 2인 조합(s:uid|uid)의 합이고,
+#          판의 입력은 TEAM1 특성 - TEAM2 특성이다(팀 순서를 바꾸면 확률이 1-p로 뒤집히도록 절편 없음).
+#          P(TEAM1 승) = sigmoid(w · x). 특성 가중치 w는 플레이어 레이팅·챔피언 보정·시너지 역할을 한다.
+#
+#          fit()은 전체 판으로 full-batch Adam + L2 학습을 하고(판마다 특성 인덱스 18개를 배열로
+#          들고 np.bincount로 기울기를 모음), update()는 판이 커밋된 직후 새 판 하나로 SGD 몇 스텝만
+#          돈다. predict()는 특성 18개 가중치 합이라 판 수와 무관한 O(1)이고, 같은 팀 구성은 모델이
+#          바뀔 때까지 캐시에서 바로 돌려준다. 챔피언을 아직 모르면(팀 구성 직후) 챔피언 특성은 빼고 계산한다.
+#
+#          사용법:
+#            python win_model.py fit [--dev]          # history에서 재학습 후 저장
+#            python win_model.py bench [--games N]    # 합성 데이터로 학습/갱신/예측 시간 측정
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import history_io
+import paths
+import safe_io
+from history_io import iter_games
+
+## 학습 기본값.
+EPOCHS = 200
+LEARNING_RATE = 0.05
+L2 = 1e-3
+
+## update()의 판당 SGD 스텝 수와 학습률.
+UPDATE_STEPS = 5
+UPDATE_LR = 0.05
+
+## predict() 캐시 최대 항목 수.
+PREDICT_CACHE = 1024
+
+
+##
+# @brief 한 팀의 특성 키 목록을 만든다.
+# @param team [(uid, champ 또는 None), ...].
+# @return 특성 키 리스트(플레이어, 챔피언, 2인 조합).
+def team_features(team):
+    keys = [f"p:{uid}" for uid, _ in team]
+    keys += [f"c:{champ}" for _, champ in team if champ]
+    ids = sorted(uid for uid, _ in team)
+    keys += [f"s:{ids[i]}|{ids[j]}" for i in range(len(ids)) for j in range(i + 1, len(ids))]
+    return keys
+
+
+##
+# @brief 판 레코드에서 (team1, team2) 튜플 리스트를 꺼낸다.
+# @param game 판 레코드.
+# @return ([(uid, champ)], [(uid, champ)]).
+def game_teams(game):
+    return (
+        [(p["id"], p.get("champ")) for p in game["team1"]],
+        [(p["id"], p.get("champ")) for p in game["team2"]],
+    )
+
+
+##
+# @brief 팀 승리 확률 로지스틱 회귀 모델.
+class WinModel:
+    __slots__ = ("index", "keys", "weights", "games", "cache")
+
+    def __init__(self):
+        self.index = {"": 0}  # 0번은 패딩용(부호 0)
+        self.keys = [""]
+        self.weights = np.zeros(1)
+        self.games = 0
+        self.cache = {}
+
+    ##
+    # @brief 특성 키의 인덱스를 반환한다(처음 보면 새로 부여, 가중치는 _grow()에서 늘림).
+    def _intern(self, key):
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.keys)
+            self.keys.append(key)
+        return i
+
+    ##
+    # @brief 새로 부여된 특성만큼 가중치 배열을 늘린다.
+    def _grow(self):
+        if len(self.weights) < len(self.keys):
+            self.weights = np.concatenate([self.weights, np.zeros(len(self.keys) - len(self.weights))])
+
+    ##
+    # @brief 판 목록을 (인덱스, 부호, 정답) 배열로 바꾼다.
+    # @param games 판 레코드 이터러블.
+    # @return (idx (n, m) int64, sign (n, m) float64, y (n,) float64).
+    def _design(self, games):
+        intern = self._intern
+        rows, widths, ys = [], [], []
+        for g in games:
+            t1, t2 = game_teams(g)
+            f1, f2 = team_features(t1), team_features(t2)
+            rows.append([intern(k) for k in f1 + f2])
+            widths.append(len(f1))
+            ys.append(1.0 if g.get("winner") == "team1" else 0.0)
+        self._grow()
+        width = max((len(r) for r in rows), default=0)
+        if all(len(r) == width for r in rows) and len(set(widths)) <= 1:
+            # 보통은 3v3 + 챔피언 전부 기록이라 폭이 같다 → 한 번에 배열로
+            idx = np.array(rows, dtype=np.int64).reshape(len(rows), width)
+            half = widths[0] if widths else 0
+            sign = np.tile(np.r_[np.ones(half), -np.ones(width - half)], (len(rows), 1))
+        else:
+            idx = np.zeros((len(rows), width), dtype=np.int64)
+            sign = np.zeros((len(rows), width))
+            for i, (r, h) in enumerate(zip(rows, widths)):
+                idx[i, :len(r)] = r
+                sign[i, :h] = 1.0
+                sign[i, h:len(r)] = -1.0
+        return idx, sign, np.array(ys)
+
+    ##
+    # @brief 전체 판으로 처음부터 학습한다(full-batch Adam + L2).
+    # @param games 판 레코드 이터러블.
+    # @param epochs 반복 횟수.
+    # @param lr 학습률.
+    # @param l2 L2 정규화 계수.
+    # @return 마지막 학습 log-loss.
+    def fit(self, games, epochs=EPOCHS, lr=LEARNING_RATE, l2=L2):
+        idx, sign, y = self._design(games)
+        n, F = len(y), len(self.keys)
+        w = np.zeros(F)
+        m = np.zeros(F)
+        v = np.zeros(F)
+        flat = idx.ravel()
+        loss = 0.0
+        for t in range(1, epochs + 1):
+            z = (w[idx] * sign).sum(axis=1)
+            p = 1.0 / (1.0 + np.exp(-z))
+            grad = np.bincount(flat, weights=((p - y)[:, None] * sign).ravel(), minlength=F) / max(n, 1)
+            grad += l2 * w
+            m = 0.9 * m + 0.1 * grad
+            v = 0.999 * v + 0.001 * grad * grad
+            w -= lr * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8)
+        if n:
+            z = (w[idx] * sign).sum(axis=1)
+            loss = float(np.mean(np.logaddexp(0, -z) * y + np.logaddexp(0, z) * (1 - y)))
+        w[0] = 0.0
+        self.weights = w
+        self.games = n
+        self.cache.clear()
+        return loss
+
+    ##
+    # @brief 새 판 하나로 증분 학습한다(SGD 몇 스텝).
+    # @param game 판 레코드.
+    # @param steps SGD 스텝 수.
+    # @param lr 학습률.
+    # @param l2 L2 정규화 계수.
+    def update(self, game, steps=UPDATE_STEPS, lr=UPDATE_LR, l2=L2):
+        idx, sign, y = self._design([game])
+        idx, sign, y = idx[0], sign[0], y[0]
+        for _ in range(steps):
+            p = 1.0 / (1.0 + np.exp(-(self.weights[idx] * sign).sum()))
+            np.subtract.at(self.weights, idx, lr * ((p - y) * sign + l2 * self.weights[idx]))
+        self.weights[0] = 0.0
+        self.games += 1
+        self.cache.clear()
+
+    ##
+    # @brief TEAM1 승리 확률을 반환한다(모르는 특성은 가중치 0).
+    # @param team1 [(uid, champ 또는 None), ...].
+    # @param team2 [(uid, champ 또는 None), ...].
+    # @return 0~1 확률.
+    def predict(self, team1, team2):
+        key = (tuple(team1), tuple(team2))
+        p = self.cache.get(key)
+        if p is None:
+            get, w = self.index.get, self.weights
+            z = sum(w[i] for i in map(get, team_features(team1)) if i is not None)
+            z -= sum(w[i] for i in map(get, team_features(team2)) if i is not None)
+            p = float(1.0 / (1.0 + np.exp(-z)))
+            if len(self.cache) >= PREDICT_CACHE:
+                self.cache.clear()
+            self.cache[key] = p
+        return p
+
+    ##
+    # @brief 저장용 dict.
+    def to_json(self):
+        return {"games": self.games, "features": self.keys[1:], "weights": [round(float(x), 6) for x in self.weights[1:]]}
+
+    ##
+    # @brief to_json() 결과로 모델을 복원한다.
+    @classmethod
+    def from_json(cls, data):
+        model = cls()
+        for k in data["features"]:
+            model._intern(k)
+        model.weights = np.array([0.0] + list(data["weights"]))
+        model.games = data["games"]
+        return model
+
+
+##
+# @brief 디스크의 모델을 로드한다(없거나 깨졌으면 None).
+# @param dev_mode True면 dev 모델.
+def load_model(dev_mode=False):
+    try:
+        with open(paths.win_model_json(dev_mode), "r", encoding="utf-8") as f:
+            return WinModel.from_json(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+        return None
+
+
+##
+# @brief 모델을 디스크에 저장한다.
+# @param model 저장할 모델.
+# @param dev_mode True면 dev 모델.
+def save_model(model, dev_mode=False):
+    data = json.dumps(model.to_json(), ensure_ascii=False).encode("utf-8")
+    safe_io.atomic_replace(paths.win_model_json(dev_mode), data)  # 다른 샤드가 읽는 중에도 온전한 파일만 보임
+
+
+##
+# @brief history_data.json 전체로 모델을 새로 학습하고 저장한다.
+# @param dev_mode True면 dev 데이터.
+# @return WinModel(history가 없으면 빈 모델).
+def fit_from_history(dev_mode=False):
+    model = WinModel()
+    path = paths.history_json(dev_mode)
+    if os.path.exists(path):
+        model.fit(g for _, g in iter_games(path))
+        save_model(model, dev_mode)
+    return model
+
+
+## 프로세스 내 모델 캐시 {dev_mode: WinModel}. 기록(스레드)과 예측(이벤트 루프)이 공유한다.
+_cache = {}
+_lock = threading.Lock()
+
+## 캐시한 모델이 읽은(또는 쓴) 디스크 파일의 mtime {dev_mode: mtime_ns}. 다르면 다른 프로세스가 갱신한 것.
+_stamps = {}
+
+## 캐시한 모델이 따라잡은 history 버전 {dev_mode: history_io.version()}. 다르면 어떤 프로세스가 판을 기록한 것.
+_versions = {}
+
+
+##
+# @brief 디스크 모델 파일의 mtime(없으면 None).
+def _model_stamp(dev_mode):
+    try:
+        return os.stat(paths.win_model_json(dev_mode)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+##
+# @brief 캐시의 모델을 반환한다(처음이거나 history 버전이 바뀌었으면 sync()로 따라잡음).
+# @details 캐시는 프로세스가 아니라 history 버전으로 무효화한다 — 다른 샤드 프로세스가 기록한 판도
+#          다음 예측부터 반영된다(디스크 모델을 이어받거나 새 판만 증분 학습).
+# @param dev_mode True면 dev 데이터.
+# @return WinModel.
+def get_model(dev_mode=False):
+    model = _cache.get(dev_mode)
+    if model is not None and _versions.get(dev_mode) == history_io.version(paths.history_json(dev_mode)):
+        return model
+    sync(dev_mode)
+    return _cache[dev_mode]
+
+
+##
+# @brief 모델을 history의 새 판까지 증분 학습하고 저장한다(game_recorder.after_commit()에서 호출).
+# @details 디스크 모델이 학습한 판 수 이후의 판만 스트리밍해 update()한다(다른 샤드 프로세스가 먼저
+#          학습했으면 그 모델을 이어받음 — 디스크 쓰기는 파일 잠금으로 직렬화). 모델이 없거나 history보다
+#          앞서 있으면(복구 등) 전체 재학습한다.
+# @param dev_mode True면 dev 데이터.
+def sync(dev_mode=False):
+    path = paths.history_json(dev_mode)
+    version = history_io.version(path)  # 세기 전에 잡아 둠 (그사이 기록되면 다음 get_model이 다시 따라잡음)
+    total = history_io.count(path)
+    with _lock, safe_io.file_lock(paths.win_model_json(dev_mode)):
+        _versions[dev_mode] = version
+        stamp = _model_stamp(dev_mode)
+        model = _cache.get(dev_mode)
+        if model is None or stamp is None or _stamps.get(dev_mode) != stamp:  # 다른 프로세스가 갱신함
+            model = load_model(dev_mode)
+        if model is None or model.games > total:
+            model = fit_from_history(dev_mode)
+        elif model.games < total:
+            for _, game in iter_games(path, start=model.games):
+                model.update(game)
+            save_model(model, dev_mode)
+        _cache[dev_mode] = model
+        _stamps[dev_mode] = _model_stamp(dev_mode)
+
+
+##
+# @brief 팀 승리 확률을 embed/메시지용 한 줄로 만든다.
+# @param p TEAM1 승리 확률.
+# @return 표시 문자열.
+def format_probability(p):
+    return f"🔵 TEAM1 **{p * 100:.0f}%** : **{(1 - p) * 100:.0f}%** TEAM2 🔴"
+
+
+##
+# @brief 합성 데이터로 학습/증분/예측 시간을 측정한다.
+# @param n 판 수.
+def bench(n):
+    import season_index
+
+    games = season_index.synthetic_games(n)
+    model = WinModel()
+    t0 = time.perf_counter()
+    loss = model.fit(games)
+    t1 = time.perf_counter()
+    print(f"[BENCH] fit {n} games ({len(model.keys) - 1} features, {EPOCHS} epochs): "
+          f"{t1 - t0:.2f}s, log-loss {loss:.4f}")
+
+    reps = 200
+    t0 = time.perf_counter()
+    for g in games[:reps]:
+        model.update(g)
+    print(f"[BENCH] update: {(time.perf_counter() - t0) / reps * 1000:.3f} ms/game")
+
+    t1, t2 = game_teams(games[0])
+    model.predict(t1, t2)
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        model.predict(t1, t2)
+    print(f"[BENCH] predict (cached): {(time.perf_counter() - t0) / 10000 * 1e6:.2f} us")
+    model.cache.clear()
+    t0 = time.perf_counter()
+    for g in games[:reps]:
+        model.predict(*game_teams(g))
+    print(f"[BENCH] predict (uncached): {(time.perf_counter() - t0) / reps * 1e6:.2f} us")
+
+
+##
+# @brief CLI 진입점.
+# @return 프로세스 종료 코드.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="팀 승리 확률 모델 학습/벤치마크")
+    parser.add_argument("command", choices=["fit", "bench"])
+    parser.add_argument("--dev", action="store_true", help="dev 데이터 사용")
+    parser.add_argument("--games", type=int, default=100_000, help="bench 판 수")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.games)
+        return 0
+    t0 = time.perf_counter()
+    model = fit_from_history(args.dev)
+    print(f"[FIT] {model.games} games, {len(model.keys) - 1} features: {time.perf_counter() - t0:.2f}s "
+          f"-> {paths.win_model_json(args.dev)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())